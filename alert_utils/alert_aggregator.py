@@ -0,0 +1,171 @@
+"""告警聚合模块
+同一类告警（按告警类型和代币分组）在持续触发时只推送一次，后续重复告警合并为汇总消息。
+
+- 分组内第一条告警立即推送，之后window秒内的重复告警不推送，只记录次数和数值范围
+- 每个window结束时，如有被合并的告警，推送一条汇总（次数、最小/最大值、最新一条内容）
+- 严重程度高于分组内已推送的最高级别时立即推送（升级）
+- 分组在window秒内没有新告警时关闭，下次告警重新立即推送
+
+使用示例:
+    >>> aggregator = AlertAggregator(on_emit=dispatcher.send, window=60).start()
+    >>> if aggregator.submit('liquidity_drop', 'BR', message, value=2.3,
+    ...                      severity=AlertAggregator.severity_level(2.3, 2), title='流动性减少'):
+    ...     play_alert_sound()
+"""
+
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class AlertAggregator:
+    """按(告警类型, 代币)去重、合并和升级告警
+
+    Attributes:
+        stats (dict): received / emitted / escalated / suppressed / digests
+    """
+
+    def __init__(self, on_emit: Callable[[str], Any], window: float = 60, check_interval: float = 1,
+                 windows: Optional[Dict[str, float]] = None, enabled: bool = True):
+        """
+        初始化告警聚合
+
+        Args:
+            on_emit: 推送回调 on_emit(message)
+            window: 默认合并窗口（秒），0表示不合并
+            check_interval: 后台线程检查汇总的间隔（秒）
+            windows: 按告警类型单独配置的合并窗口（秒）
+            enabled: 关闭时所有告警直接推送
+        """
+        self.on_emit = on_emit
+        self.window = window
+        self.windows = windows or {}
+        self.check_interval = check_interval
+        self.enabled = enabled
+        self.groups = {}
+        self.stats = {'received': 0, 'emitted': 0, 'escalated': 0, 'suppressed': 0, 'digests': 0}
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+    @staticmethod
+    def severity_level(value: float, threshold: float) -> int:
+        """按超过阈值的倍数分级：阈值的1~2倍为0级，2~4倍为1级，依此类推"""
+        if not threshold or value < threshold * 2:
+            return 0
+        return int(math.log2(value / threshold))
+
+    def _window(self, kind: str) -> float:
+        return self.windows.get(kind, self.window)
+
+    def submit(self, kind: str, key: str, message: str, value: Optional[float] = None, severity: int = 0,
+               title: Optional[str] = None) -> bool:
+        """提交一条告警，返回是否立即推送（调用方据此决定是否播放提示音）
+
+        Args:
+            kind: 告警类型
+            key: 分组键（如代币地址）
+            message: 告警内容
+            value: 用于汇总最小/最大值的数值
+            severity: 严重程度，高于分组内已推送的最高级别时立即推送
+            title: 汇总消息中显示的告警名称，默认为kind
+        """
+        now = time.time()
+        window = self._window(kind)
+        emit = None
+        with self.lock:
+            self.stats['received'] += 1
+            group = self.groups.get((kind, key))
+            if not self.enabled or window <= 0:
+                emit = message
+            elif group is None:
+                self.groups[(kind, key)] = {
+                    'title': title or kind,
+                    'started': now,
+                    'last_time': now,
+                    'severity': severity,
+                    'suppressed': 0,
+                    'min': value,
+                    'max': value,
+                    'last_message': message
+                }
+                emit = message
+            else:
+                group['last_time'] = now
+                group['last_message'] = message
+                if value is not None:
+                    group['min'] = value if group['min'] is None else min(group['min'], value)
+                    group['max'] = value if group['max'] is None else max(group['max'], value)
+                if severity > group['severity']:
+                    group['severity'] = severity
+                    self.stats['escalated'] += 1
+                    emit = f"⬆️ 告警升级\n{message}"
+                else:
+                    group['suppressed'] += 1
+                    self.stats['suppressed'] += 1
+            if emit is not None:
+                self.stats['emitted'] += 1
+        if emit is None:
+            return False
+        self.on_emit(emit)
+        return True
+
+    def _digest(self, kind: str, group: Dict[str, Any], window: float) -> str:
+        values = ''
+        if group['min'] is not None:
+            values = f"，数值 {group['min']:,.2f} ~ {group['max']:,.2f}"
+        return (f"[汇总] {group['title']}：最近{window:g}秒内另有 {group['suppressed']} 次重复告警{values}\n"
+                f"最新一次:\n{group['last_message']}")
+
+    def flush(self, now: Optional[float] = None) -> int:
+        """推送到期分组的汇总并关闭空闲分组，返回推送的汇总数"""
+        now = time.time() if now is None else now
+        digests = []
+        with self.lock:
+            for (kind, key), group in list(self.groups.items()):
+                window = self._window(kind)
+                if now - group['started'] < window:
+                    continue
+                if group['suppressed']:
+                    digests.append(self._digest(kind, group, window))
+                    # 持续触发时开始新一轮合并，数值范围重新统计
+                    group.update(started=now, suppressed=0, min=None, max=None)
+                elif now - group['last_time'] >= window:
+                    del self.groups[(kind, key)]
+            self.stats['digests'] += len(digests)
+            self.stats['emitted'] += len(digests)
+        for digest in digests:
+            self.on_emit(digest)
+        return len(digests)
+
+    def format_stats(self) -> str:
+        """格式化统计，用于探活消息"""
+        with self.lock:
+            stats = dict(self.stats)
+        return (f"告警聚合: 收到 {stats['received']} 推送 {stats['emitted']} 合并 {stats['suppressed']} "
+                f"汇总 {stats['digests']} 升级 {stats['escalated']}")
+
+    def start(self) -> 'AlertAggregator':
+        """启动后台线程，定期推送汇总"""
+        if self.running:
+            return self
+        self.running = True
+
+        def loop():
+            while self.running:
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f'【BR】告警汇总失败: {e}')
+                time.sleep(self.check_interval)
+
+        self.thread = threading.Thread(target=loop, name='alert-aggregator')
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """停止后台线程并推送剩余的汇总"""
+        self.running = False
+        self.flush(now=float('inf'))
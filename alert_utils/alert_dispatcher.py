@@ -0,0 +1,289 @@
+"""告警异步发送模块
+WebSocket回调线程只把告警放入队列，由后台线程发送，推送接口变慢时不会阻塞行情处理。
+
+每个推送渠道（企业微信、Server酱）有独立的有界队列和发送线程，一个渠道变慢不影响另一个渠道。
+发送失败按指数退避重试；队列满时丢弃最早的告警，保留最新的告警，并记录丢弃数量。
+默认渠道使用ServerChanClient / WeChatWorkClient：复用keep-alive会话，企业微信token由后台线程提前刷新，
+渠道连续失败时熔断，熔断期间的告警直接记为失败，不再逐条等待超时。
+
+AsyncAlertDispatcher为asyncio版本：队列和发送协程运行在事件循环中，推送请求在线程池中执行。
+
+使用示例:
+    >>> from alert_utils.alert_dispatcher import AlertDispatcher
+    >>> dispatcher = AlertDispatcher(config)
+    >>> dispatcher.send("流动性突然减少")
+    >>> dispatcher.send("系统运行正常", channels=['serverchan'])
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from alert_utils.circuit_breaker import CircuitBreaker
+from alert_utils.sc_alert import ServerChanClient
+from alert_utils.wechat_alert import WeChatWorkClient
+
+
+class AlertDispatcher:
+    """多渠道告警异步发送
+
+    Attributes:
+        stats (dict): 每个渠道的统计，queued / sent / failed / retries / dropped
+    """
+
+    def __init__(self, config: Dict[str, Any], senders: Optional[Dict[str, Callable[[str], Any]]] = None,
+                 max_queue: int = 100, workers: int = 1, max_retries: int = 3,
+                 backoff: float = 1.0, max_backoff: float = 30.0,
+                 circuit_breaker: Optional[Dict[str, Any]] = None):
+        """
+        初始化告警发送
+
+        Args:
+            config: 完整配置，用于判断渠道是否开启
+            senders: 渠道名 -> 发送函数 sender(message)，返回值为真表示成功；默认为已开启的企业微信和Server酱
+            max_queue: 每个渠道队列的最大长度
+            workers: 每个渠道的发送线程数
+            max_retries: 发送失败后的最大重试次数
+            backoff: 首次重试等待时间（秒），之后每次翻倍
+            max_backoff: 重试等待时间上限（秒）
+            circuit_breaker: 默认渠道的熔断参数 {'failure_threshold', 'reset_timeout'}
+        """
+        self.clients = {}
+        if senders is None:
+            breaker_config = circuit_breaker or {}
+            if config.get('wechat_work', {}).get('enabled'):
+                self.clients['wechat'] = WeChatWorkClient(config, breaker=CircuitBreaker(**breaker_config)).start()
+            if config.get('serverchan', {}).get('enabled'):
+                self.clients['serverchan'] = ServerChanClient(config, breaker=CircuitBreaker(**breaker_config))
+            senders = {channel: client.send for channel, client in self.clients.items()}
+        self.senders = senders
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.queues = {channel: queue.Queue(maxsize=max_queue) for channel in senders}
+        self.stats = {channel: {'queued': 0, 'sent': 0, 'failed': 0, 'retries': 0, 'dropped': 0}
+                      for channel in senders}
+        self.lock = threading.Lock()
+        self.running = True
+        self.threads = []
+        for channel in senders:
+            for i in range(workers):
+                thread = threading.Thread(target=self._worker, args=(channel,), name=f'alert-{channel}-{i}')
+                thread.daemon = True
+                thread.start()
+                self.threads.append(thread)
+
+    def _count(self, channel: str, key: str, value: int = 1) -> None:
+        with self.lock:
+            self.stats[channel][key] += value
+
+    def send(self, message: str, channels: Optional[Iterable[str]] = None) -> None:
+        """将告警放入各渠道的发送队列，立即返回
+
+        Args:
+            message: 告警内容
+            channels: 发送的渠道，默认全部渠道；未开启的渠道忽略
+        """
+        for channel in (self.senders if channels is None else channels):
+            channel_queue = self.queues.get(channel)
+            if channel_queue is None:
+                continue
+            item = (message, time.time())
+            while True:
+                try:
+                    channel_queue.put_nowait(item)
+                    break
+                except queue.Full:
+                    # 队列已满，丢弃最早的告警
+                    try:
+                        channel_queue.get_nowait()
+                        channel_queue.task_done()
+                        self._count(channel, 'dropped')
+                    except queue.Empty:
+                        pass
+            self._count(channel, 'queued')
+
+    def _worker(self, channel: str) -> None:
+        """渠道发送线程"""
+        sender = self.senders[channel]
+        channel_queue = self.queues[channel]
+        while self.running:
+            try:
+                message, _ = channel_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                delay = self.backoff
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        ok = sender(message)
+                    except Exception as e:
+                        print(f'【BR】{channel}告警发送异常: {e}')
+                        ok = False
+                    if ok:
+                        self._count(channel, 'sent')
+                        break
+                    breaker = getattr(self.clients.get(channel), 'breaker', None)
+                    if attempt == self.max_retries or (breaker and breaker.state == 'open'):
+                        self._count(channel, 'failed')
+                        print(f'【BR】{channel}告警发送失败，已重试{attempt}次: {message[:50]}')
+                        break
+                    self._count(channel, 'retries')
+                    time.sleep(delay)
+                    delay = min(delay * 2, self.max_backoff)
+            finally:
+                channel_queue.task_done()
+
+    def pending(self) -> int:
+        """所有渠道中尚未发送完成的告警数"""
+        return sum(channel_queue.unfinished_tasks for channel_queue in self.queues.values())
+
+    def flush(self, timeout: float = 5) -> bool:
+        """等待队列中的告警发送完成（用于退出前），返回是否全部完成"""
+        deadline = time.time() + timeout
+        while self.pending() and time.time() < deadline:
+            time.sleep(0.05)
+        return not self.pending()
+
+    def format_stats(self) -> str:
+        """格式化统计，用于探活消息"""
+        lines = []
+        with self.lock:
+            for channel, stats in self.stats.items():
+                line = f"{channel}: 发送 {stats['sent']} 失败 {stats['failed']} 重试 {stats['retries']} 丢弃 {stats['dropped']}"
+                breaker = getattr(self.clients.get(channel), 'breaker', None)
+                if breaker and breaker.state != 'closed':
+                    line += f' (熔断中，已跳过 {breaker.skipped})'
+                lines.append(line)
+        return '\n'.join(lines)
+
+    def stop(self) -> None:
+        """停止发送线程"""
+        self.running = False
+        for client in self.clients.values():
+            if hasattr(client, 'stop'):
+                client.stop()
+
+
+class AsyncAlertDispatcher(AlertDispatcher):
+    """asyncio版本的多渠道告警发送
+
+    每个渠道使用asyncio.Queue和发送协程，推送请求（阻塞的HTTP调用）在线程池中执行。
+    send()可以在任意线程调用：事件循环启动前的告警先缓存，start()时放入队列。
+    """
+
+    def __init__(self, config: Dict[str, Any], senders: Optional[Dict[str, Callable[[str], Any]]] = None,
+                 executor=None, workers: int = 1, **kwargs):
+        """
+        初始化告警发送
+
+        Args:
+            config: 完整配置，用于判断渠道是否开启
+            senders: 渠道名 -> 发送函数，同AlertDispatcher
+            executor: 执行推送请求的线程池，None时使用事件循环的默认线程池
+            workers: 每个渠道的发送协程数
+            **kwargs: max_queue / max_retries / backoff / max_backoff / circuit_breaker，同AlertDispatcher
+        """
+        super().__init__(config, senders=senders, workers=0, **kwargs)
+        self.executor = executor
+        self.workers = workers
+        self.max_queue = kwargs.get('max_queue', 100)
+        self.loop = None
+        self.backlog = []
+        # 保护loop和backlog：其他线程的send()与start()并发时，告警要么进入backlog后被start()取走，要么直接入队
+        self.backlog_lock = threading.Lock()
+        self.tasks = []
+
+    def start(self) -> None:
+        """在事件循环中启动发送协程（需在事件循环内调用）"""
+        loop = asyncio.get_running_loop()
+        self.queues = {channel: asyncio.Queue(maxsize=self.max_queue) for channel in self.senders}
+        for channel in self.senders:
+            for _ in range(self.workers):
+                self.tasks.append(loop.create_task(self._async_worker(channel)))
+        with self.backlog_lock:
+            # 先放入缓存的告警再公开loop，之后其他线程的告警排在缓存之后
+            for message, channels in self.backlog:
+                self._enqueue(message, channels)
+            self.backlog = []
+            self.loop = loop
+
+    def send(self, message: str, channels: Optional[Iterable[str]] = None) -> None:
+        """将告警放入各渠道的发送队列，立即返回（线程安全）"""
+        if self.loop is None:
+            with self.backlog_lock:
+                if self.loop is None:
+                    self.backlog.append((message, channels))
+                    return
+        try:
+            in_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            in_loop = False
+        if in_loop:
+            self._enqueue(message, channels)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._enqueue, message, channels)
+
+    def _enqueue(self, message: str, channels: Optional[Iterable[str]]) -> None:
+        for channel in (self.senders if channels is None else channels):
+            channel_queue = self.queues.get(channel)
+            if channel_queue is None:
+                continue
+            if channel_queue.full():
+                # 队列已满，丢弃最早的告警
+                channel_queue.get_nowait()
+                channel_queue.task_done()
+                self._count(channel, 'dropped')
+            channel_queue.put_nowait((message, time.time()))
+            self._count(channel, 'queued')
+
+    async def _async_worker(self, channel: str) -> None:
+        """渠道发送协程"""
+        sender = self.senders[channel]
+        channel_queue = self.queues[channel]
+        while True:
+            message, _ = await channel_queue.get()
+            try:
+                delay = self.backoff
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        ok = await self.loop.run_in_executor(self.executor, sender, message)
+                    except Exception as e:
+                        print(f'【BR】{channel}告警发送异常: {e}')
+                        ok = False
+                    if ok:
+                        self._count(channel, 'sent')
+                        break
+                    breaker = getattr(self.clients.get(channel), 'breaker', None)
+                    if attempt == self.max_retries or (breaker and breaker.state == 'open'):
+                        self._count(channel, 'failed')
+                        print(f'【BR】{channel}告警发送失败，已重试{attempt}次: {message[:50]}')
+                        break
+                    self._count(channel, 'retries')
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_backoff)
+            finally:
+                channel_queue.task_done()
+
+    def pending(self) -> int:
+        """所有渠道中等待发送的告警数"""
+        with self.backlog_lock:
+            if self.loop is None:
+                return len(self.backlog)
+        return sum(channel_queue.qsize() for channel_queue in self.queues.values())
+
+    async def drain(self, timeout: float = 5) -> bool:
+        """等待队列中的告警发送完成（用于退出前），返回是否全部完成"""
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self.queues.values())), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stop(self) -> None:
+        """取消发送协程"""
+        super().stop()
+        for task in self.tasks:
+            task.cancel()
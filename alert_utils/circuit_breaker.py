@@ -0,0 +1,69 @@
+"""熔断器模块
+推送渠道连续失败达到阈值后熔断一段时间，期间直接跳过该渠道，不再每条告警都等待超时。
+熔断时间结束后放行一次试探请求：成功则恢复，失败则继续熔断。
+
+使用示例:
+    >>> breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    >>> if breaker.allow():
+    ...     ok = send()
+    ...     breaker.record(ok)
+"""
+
+import threading
+import time
+
+
+class CircuitBreaker:
+    """连续失败熔断
+
+    状态: closed（正常）/ open（熔断，跳过请求）/ half_open（熔断结束，放行一次试探）
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60):
+        """
+        初始化熔断器
+
+        Args:
+            failure_threshold: 连续失败多少次后熔断
+            reset_timeout: 熔断持续时间（秒）
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.time() - self.opened_at < self.reset_timeout:
+                return 'open'
+            return 'half_open'
+
+    def allow(self) -> bool:
+        """是否放行本次请求；熔断期间返回False，熔断结束后只放行一次试探请求"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.time() - self.opened_at >= self.reset_timeout and not self.trial:
+                self.trial = True
+                return True
+            self.skipped += 1
+            return False
+
+    def record(self, success: bool) -> None:
+        """记录请求结果"""
+        with self.lock:
+            self.trial = False
+            if success:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                # 试探失败时重新计时
+                self.opened_at = time.time()
@@ -1,6 +1,17 @@
 """控制台日志模块"""
+import time
 from typing import Dict, List, Any
 
+_time_cache = {'second': None, 'text': ''}
+
+def current_time_str() -> str:
+    """当前时间字符串，同一秒内复用格式化结果"""
+    second = int(time.time())
+    if second != _time_cache['second']:
+        _time_cache['text'] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(second))
+        _time_cache['second'] = second
+    return _time_cache['text']
+
 def format_amount(amount: float) -> str:
     """将数量格式化为合适的单位（M、K等）"""
     if amount >= 1000000:
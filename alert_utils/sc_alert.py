@@ -1,7 +1,21 @@
 """Server酱告警模块"""
 import requests
 import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from alert_utils.circuit_breaker import CircuitBreaker
+
+
+def serverchan_url(sendkey: str) -> str:
+    """根据sendkey构造推送地址"""
+    # 判断 sendkey 是否以 'sctp' 开头，并提取数字构造 URL
+    if sendkey.startswith('sctp'):
+        match = re.match(r'sctp(\d+)t', sendkey)
+        if match:
+            num = match.group(1)
+            return f'https://9749.push.ft07.com/send/{sendkey}.send'
+        raise ValueError('Invalid sendkey format for sctp')
+    return f'https://sctapi.ftqq.com/{sendkey}.send'
 
 def send_serverchan_alert(message: str, config: Dict[str, Any], options=None) -> bool:
     """发送Server酱通知
@@ -21,16 +35,7 @@ def send_serverchan_alert(message: str, config: Dict[str, Any], options=None) ->
             options = {}
         sendkey = config['serverchan']['sckey']
         title = config['serverchan']['title']
-        # 判断 sendkey 是否以 'sctp' 开头，并提取数字构造 URL
-        if sendkey.startswith('sctp'):
-            match = re.match(r'sctp(\d+)t', sendkey)
-            if match:
-                num = match.group(1)
-                url = f'https://9749.push.ft07.com/send/{sendkey}.send'
-            else:
-                raise ValueError('Invalid sendkey format for sctp')
-        else:
-            url = f'https://sctapi.ftqq.com/{sendkey}.send'
+        url = serverchan_url(sendkey)
         params = {
             'title': title,
             'desp': message,
@@ -39,10 +44,55 @@ def send_serverchan_alert(message: str, config: Dict[str, Any], options=None) ->
         headers = {
             'Content-Type': 'application/json;charset=utf-8'
         }
-        response = requests.post(url, json=params, headers=headers)
+        response = requests.post(url, json=params, headers=headers, timeout=10)
         result = response.json()
         return result
 
     except Exception as e:
         print(f'【BR】Server酱通知发送失败: {e}')
         return False
+
+
+class ServerChanClient:
+    """Server酱推送客户端
+
+    推送地址只在初始化时构造一次，请求复用同一个keep-alive会话；连续失败时熔断，熔断期间直接返回False。
+    """
+
+    def __init__(self, config: Dict[str, Any], session: Optional[requests.Session] = None,
+                 breaker: Optional[CircuitBreaker] = None, timeout: float = 10):
+        """
+        初始化Server酱客户端
+
+        Args:
+            config: 完整配置
+            session: 复用的HTTP会话，默认新建
+            breaker: 熔断器，默认连续失败3次熔断60秒
+            timeout: 请求超时（秒）
+        """
+        self.url = serverchan_url(config['serverchan']['sckey'])
+        self.title = config['serverchan']['title']
+        self.session = session or requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json;charset=utf-8'})
+        self.breaker = breaker or CircuitBreaker()
+        self.timeout = timeout
+
+    def send(self, message: str, options=None) -> bool:
+        """发送通知，返回是否成功"""
+        if not self.breaker.allow():
+            return False
+        ok = False
+        try:
+            params = {
+                'title': self.title,
+                'desp': message,
+                **(options or {})
+            }
+            result = self.session.post(self.url, json=params, timeout=self.timeout).json()
+            ok = result.get('code') == 0
+            if not ok:
+                print(f'【BR】Server酱通知发送失败: {result}')
+        except Exception as e:
+            print(f'【BR】Server酱通知发送失败: {e}')
+        self.breaker.record(ok)
+        return ok
@@ -3,12 +3,19 @@ import os
 import threading
 import time
 
-def play_alert_sound():
-    """播放警报音 - Mac版本"""
+def play_alert_sound(executor=None):
+    """播放警报音 - Mac版本
+
+    Args:
+        executor: 可选的线程池，提供时在线程池中播放，否则新建线程
+    """
     def _play():
         for _ in range(5):
             os.system('afplay /System/Library/Sounds/Glass.aiff')  # macOS 系统提示音
             time.sleep(0.2)
+    if executor is not None:
+        executor.submit(_play)
+        return
     sound_thread = threading.Thread(target=_play)
     sound_thread.daemon = True
     sound_thread.start()
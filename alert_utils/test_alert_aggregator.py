@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AlertAggregator测试脚本 - 验证重复告警合并、汇总、升级和空闲分组关闭
+"""
+
+import time
+from alert_utils.alert_aggregator import AlertAggregator
+
+
+def test_merge_and_digest():
+    """分组内第一条立即推送，重复告警合并为窗口结束时的一条汇总"""
+    emitted = []
+    aggregator = AlertAggregator(emitted.append, window=60)
+    assert aggregator.submit('liquidity_drop', 'BR', '下降2.1M', value=2.1, title='流动性减少')
+    assert not aggregator.submit('liquidity_drop', 'BR', '下降2.5M', value=2.5)
+    assert not aggregator.submit('liquidity_drop', 'BR', '下降2.3M', value=2.3)
+    # 其他分组不受影响
+    assert aggregator.submit('large_trade', 'BR', '大额卖出')
+    assert emitted == ['下降2.1M', '大额卖出']
+
+    now = time.time()
+    assert aggregator.flush(now + 30) == 0
+    assert aggregator.flush(now + 61) == 1
+    assert emitted[-1] == '[汇总] 流动性减少：最近60秒内另有 2 次重复告警，数值 2.10 ~ 2.50\n最新一次:\n下降2.3M'
+
+    # 持续触发时开始新一轮合并；空闲一个窗口后分组关闭，下次告警重新立即推送
+    assert not aggregator.submit('liquidity_drop', 'BR', '下降2.2M', value=2.2)
+    assert aggregator.flush(now + 122) == 1
+    assert aggregator.flush(now + 300) == 0
+    assert aggregator.groups == {}
+    assert aggregator.submit('liquidity_drop', 'BR', '下降2.0M', value=2.0)
+    assert aggregator.stats == {'received': 6, 'emitted': 5, 'escalated': 0, 'suppressed': 3, 'digests': 2}
+
+
+def test_escalation_and_windows():
+    """严重程度升高时立即推送；按类型配置的窗口为0时不合并；关闭聚合时全部直接推送"""
+    emitted = []
+    aggregator = AlertAggregator(emitted.append, window=60, windows={'auto_remove': 0})
+    assert AlertAggregator.severity_level(3, 2) == 0
+    assert AlertAggregator.severity_level(4.5, 2) == 1
+    assert AlertAggregator.severity_level(9, 2) == 2
+
+    assert aggregator.submit('liquidity_drop', 'BR', '下降2.1M', severity=0)
+    assert aggregator.submit('liquidity_drop', 'BR', '下降4.5M', severity=1)
+    assert not aggregator.submit('liquidity_drop', 'BR', '下降4.1M', severity=1)
+    assert emitted[-1] == '⬆️ 告警升级\n下降4.5M'
+    assert aggregator.submit('auto_remove', 'BR', '自动移除') and aggregator.submit('auto_remove', 'BR', '自动移除')
+
+    disabled = AlertAggregator(emitted.append, enabled=False)
+    assert disabled.submit('liquidity_drop', 'BR', 'a') and disabled.submit('liquidity_drop', 'BR', 'a')
+
+    # 停止时推送剩余的汇总
+    aggregator.stop()
+    assert emitted[-1].startswith('[汇总] liquidity_drop：最近60秒内另有 1 次重复告警\n')
+
+
+def main():
+    for test in (test_merge_and_digest, test_escalation_and_windows):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
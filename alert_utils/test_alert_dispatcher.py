@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AlertDispatcher测试脚本 - 使用内存中的发送函数验证告警队列、重试和事件循环启动时的缓存
+"""
+
+import asyncio
+import threading
+import time
+from alert_utils.alert_dispatcher import AlertDispatcher, AsyncAlertDispatcher
+
+
+def recording_sender(sent, gate=None):
+    """返回把告警记录到sent的发送函数，gate未放行时阻塞"""
+    def sender(message):
+        if gate is not None:
+            gate.wait(5)
+        sent.append(message)
+        return True
+    return sender
+
+
+def test_slow_channel_does_not_block_others():
+    """一个渠道的推送阻塞时，其他渠道照常发送，send()立即返回"""
+    release = threading.Event()
+    sent = {'slow': [], 'fast': []}
+    dispatcher = AlertDispatcher({}, senders={
+        'slow': recording_sender(sent['slow'], release),
+        'fast': recording_sender(sent['fast']),
+    })
+    try:
+        started = time.perf_counter()
+        dispatcher.send('告警1')
+        dispatcher.send('告警2', channels=['fast', 'unknown'])
+        assert time.perf_counter() - started < 0.1
+        deadline = time.time() + 2
+        while len(sent['fast']) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        assert sent == {'slow': [], 'fast': ['告警1', '告警2']}
+
+        release.set()
+        assert dispatcher.flush(timeout=2)
+        assert sent['slow'] == ['告警1']
+        assert dispatcher.stats['slow']['queued'] == 1 and dispatcher.stats['fast']['sent'] == 2
+    finally:
+        release.set()
+        dispatcher.stop()
+
+
+def test_retry_with_backoff():
+    """发送失败按退避重试，超过重试次数记为失败"""
+    attempts = []
+
+    def flaky(message):
+        attempts.append((message, time.perf_counter()))
+        if message == '总是失败':
+            raise ConnectionError('推送接口超时')
+        return len(attempts) >= 3
+
+    dispatcher = AlertDispatcher({}, senders={'test': flaky}, max_retries=2, backoff=0.05)
+    try:
+        dispatcher.send('第三次成功')
+        assert dispatcher.flush(timeout=2)
+        times = [t for _, t in attempts]
+        assert len(times) == 3 and times[2] - times[1] >= 0.09 >= times[1] - times[0] >= 0.04
+        dispatcher.send('总是失败')
+        assert dispatcher.flush(timeout=2)
+        assert len(attempts) == 6
+        assert {key: dispatcher.stats['test'][key] for key in ('sent', 'failed', 'retries')} == \
+            {'sent': 1, 'failed': 1, 'retries': 4}
+    finally:
+        dispatcher.stop()
+
+
+def test_full_queue_drops_oldest():
+    """队列满时丢弃最早的告警，保留最新的告警"""
+    release = threading.Event()
+    sent = []
+    dispatcher = AlertDispatcher({}, senders={'test': recording_sender(sent, release)},
+                                 max_queue=2)
+    try:
+        dispatcher.send('告警0')
+        deadline = time.time() + 2
+        while dispatcher.queues['test'].qsize() and time.time() < deadline:
+            time.sleep(0.01)
+        for i in range(1, 5):
+            dispatcher.send(f'告警{i}')
+        release.set()
+        assert dispatcher.flush(timeout=2)
+        assert sent == ['告警0', '告警3', '告警4']
+        assert dispatcher.stats['test']['dropped'] == 2
+    finally:
+        release.set()
+        dispatcher.stop()
+
+
+class SlowBacklog(list):
+    """append时先停顿，模拟send()检查loop之后、写入缓存之前被start()抢先"""
+
+    def __init__(self):
+        super().__init__()
+        self.entered = threading.Event()
+
+    def append(self, item):
+        self.entered.set()
+        time.sleep(0.2)
+        super().append(item)
+
+
+def test_async_start_keeps_concurrent_alerts():
+    """事件循环启动时其他线程正在缓存的告警不丢失，且排在启动后的告警之前"""
+    sent = []
+    dispatcher = AsyncAlertDispatcher({}, senders={'test': recording_sender(sent)})
+    dispatcher.backlog = SlowBacklog()
+    producer = threading.Thread(target=dispatcher.send, args=('启动前',))
+    producer.start()
+    dispatcher.backlog.entered.wait()
+
+    async def run():
+        dispatcher.start()
+        await asyncio.get_running_loop().run_in_executor(None, producer.join)
+        dispatcher.send('启动后')
+        assert await dispatcher.drain(timeout=5)
+        dispatcher.stop()
+
+    asyncio.run(run())
+    assert sent == ['启动前', '启动后']
+    assert dispatcher.stats['test']['sent'] == 2
+
+
+def main():
+    for test in (test_slow_channel_does_not_block_others, test_retry_with_backoff, test_full_queue_drops_oldest,
+                 test_async_start_keeps_concurrent_alerts):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CircuitBreaker测试脚本 - 验证熔断状态切换，以及推送渠道熔断后跳过请求、不再重试
+"""
+
+import time
+from alert_utils.alert_dispatcher import AlertDispatcher
+from alert_utils.circuit_breaker import CircuitBreaker
+
+CONFIG = {'serverchan': {'enabled': True, 'sckey': 'SCT0000000000000000000000', 'title': 'BR监控'}}
+
+
+class FakeResponse:
+    def __init__(self, result):
+        self.result = result
+
+    def json(self):
+        return self.result
+
+
+class FakeSession:
+    """记录请求的HTTP会话，按ok决定推送接口的返回"""
+
+    def __init__(self, ok=False):
+        self.headers = {}
+        self.ok = ok
+        self.posts = []
+
+    def post(self, url, json=None, timeout=None):
+        self.posts.append(json['desp'])
+        if not self.ok:
+            raise ConnectionError('推送接口超时')
+        return FakeResponse({'code': 0})
+
+
+def test_state_transitions():
+    """连续失败达到阈值后熔断；熔断结束只放行一次试探，试探失败重新熔断，成功则恢复"""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record(False)
+    assert breaker.state == 'closed' and breaker.allow()
+    breaker.record(False)
+    assert breaker.state == 'open'
+    assert not breaker.allow() and breaker.skipped == 1
+
+    time.sleep(0.06)
+    assert breaker.state == 'half_open'
+    assert breaker.allow() and not breaker.allow()
+    breaker.record(False)
+    assert breaker.state == 'open'
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == 'closed' and breaker.failures == 0
+    assert breaker.allow() and breaker.allow()
+
+
+def test_dispatcher_skips_open_channel():
+    """渠道熔断后告警直接记为失败，不再请求推送接口，也不等待重试"""
+    dispatcher = AlertDispatcher(CONFIG, max_retries=3, backoff=0.01,
+                                 circuit_breaker={'failure_threshold': 2, 'reset_timeout': 60})
+    client = dispatcher.clients['serverchan']
+    client.session = FakeSession()
+    try:
+        dispatcher.send('告警1')
+        assert dispatcher.flush(timeout=2)
+        assert client.session.posts == ['告警1', '告警1'] and client.breaker.state == 'open'
+
+        started = time.perf_counter()
+        dispatcher.send('告警2')
+        assert dispatcher.flush(timeout=2)
+        assert time.perf_counter() - started < 0.5
+        assert client.session.posts == ['告警1', '告警1']
+        assert client.breaker.skipped == 1
+        assert dispatcher.stats['serverchan']['failed'] == 2
+        assert '熔断中，已跳过 1' in dispatcher.format_stats()
+
+        # 熔断结束后的试探成功，渠道恢复
+        client.session.ok = True
+        client.breaker.opened_at -= 60
+        dispatcher.send('告警3')
+        assert dispatcher.flush(timeout=2)
+        assert client.session.posts[-1] == '告警3' and client.breaker.state == 'closed'
+        assert dispatcher.stats['serverchan']['sent'] == 1
+    finally:
+        dispatcher.stop()
+
+
+def main():
+    for test in (test_state_transitions, test_dispatcher_skips_open_channel):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -26,9 +26,11 @@ class VoiceAlert:
     
     Attributes:
         voice_thread_active (bool): 标识当前是否有语音正在播放
+        executor: 可选的线程池，提供时语音在线程池中播放，否则每次新建线程
     """
-    def __init__(self):
+    def __init__(self, executor=None):
         self.voice_thread_active = False
+        self.executor = executor
 
     @staticmethod
     def get_available_voice() -> Optional[str]:
@@ -100,6 +102,9 @@ class VoiceAlert:
             finally:
                 self.voice_thread_active = False
         
+        if self.executor is not None:
+            self.executor.submit(_play_voice)
+            return
         voice_thread = threading.Thread(target=_play_voice)
         voice_thread.daemon = True
         voice_thread.start()
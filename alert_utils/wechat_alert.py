@@ -1,8 +1,11 @@
 """企业微信告警模块"""
 import os
+import threading
 import time
 import requests
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from alert_utils.circuit_breaker import CircuitBreaker
 
 # 企业微信token缓存
 wechat_token_cache = {
@@ -80,3 +83,120 @@ def send_wechat_work_alert(message: str, config: Dict[str, Any]) -> bool:
     except Exception as e:
         print(f'【BR】企业微信通知发送失败: {e}')
         return False
+
+
+class WeChatWorkClient:
+    """企业微信推送客户端
+
+    access_token由实例持有并加锁刷新，start()后由后台线程在过期前主动刷新，发送告警时不再等待获取token；
+    请求复用同一个keep-alive会话，连续失败时熔断，熔断期间直接返回False。
+    """
+
+    # token无效或过期的错误码，遇到时刷新token重发一次
+    TOKEN_ERRCODES = {40001, 40014, 42001}
+
+    def __init__(self, config: Dict[str, Any], session: Optional[requests.Session] = None,
+                 breaker: Optional[CircuitBreaker] = None, timeout: float = 10,
+                 refresh_margin: float = 300, check_interval: float = 60):
+        """
+        初始化企业微信客户端
+
+        Args:
+            config: 完整配置
+            session: 复用的HTTP会话，默认新建
+            breaker: 熔断器，默认连续失败3次熔断60秒
+            timeout: 请求超时（秒）
+            refresh_margin: token剩余有效期少于该值（秒）时刷新
+            check_interval: 后台线程检查token的间隔（秒）
+        """
+        wechat_config = config['wechat_work']
+        secret = os.getenv('WECHAT_WORK_SECRET', wechat_config['secret'])
+        self.token_url = f"https://qyapi.weixin.qq.com/cgi-bin/gettoken?corpid={wechat_config['corpid']}&corpsecret={secret}"
+        self.touser = wechat_config['touser']
+        self.agentid = wechat_config['agentid']
+        self.session = session or requests.Session()
+        # 配置代理
+        if 'proxy' in config and config['proxy']['enabled']:
+            self.session.proxies.update({
+                'http': config['proxy']['url'],
+                'https': config['proxy']['url']
+            })
+        self.breaker = breaker or CircuitBreaker()
+        self.timeout = timeout
+        self.refresh_margin = refresh_margin
+        self.check_interval = check_interval
+        self.token = ''
+        self.expires_at = 0
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+    def refresh_token(self, force: bool = False) -> str:
+        """获取access_token，未过期（剩余时间大于refresh_margin）且不强制刷新时返回缓存"""
+        with self.lock:
+            if not force and self.token and self.expires_at > time.time() + self.refresh_margin:
+                return self.token
+            try:
+                response = self.session.get(self.token_url, timeout=self.timeout).json()
+                token = response.get('access_token', '')
+                if token:
+                    # 提前100秒视为过期，避免边界问题
+                    self.token = token
+                    self.expires_at = time.time() + response.get('expires_in', 7200) - 100
+                else:
+                    print(f'【BR】获取企业微信token失败: {response}')
+            except Exception as e:
+                print(f'【BR】获取企业微信token失败: {e}')
+            return self.token if self.expires_at > time.time() else ''
+
+    def _post(self, message: str, token: str) -> Dict[str, Any]:
+        url = f"https://qyapi.weixin.qq.com/cgi-bin/message/send?access_token={token}"
+        data = {
+            "touser": self.touser,
+            "msgtype": "text",
+            "agentid": self.agentid,
+            "text": {
+                "content": f"【BR流动性告警】\n{message}"
+            },
+            "safe": 0
+        }
+        return self.session.post(url, json=data, timeout=self.timeout).json()
+
+    def send(self, message: str) -> bool:
+        """发送通知，返回是否成功"""
+        if not self.breaker.allow():
+            return False
+        ok = False
+        try:
+            token = self.refresh_token()
+            if token:
+                result = self._post(message, token)
+                if result.get('errcode') in self.TOKEN_ERRCODES:
+                    token = self.refresh_token(force=True)
+                    result = self._post(message, token) if token else result
+                ok = result.get('errcode') == 0
+                print(f'【BR】企业微信通知发送状态: {result} 内容: {message}')
+        except Exception as e:
+            print(f'【BR】企业微信通知发送失败: {e}')
+        self.breaker.record(ok)
+        return ok
+
+    def start(self) -> 'WeChatWorkClient':
+        """启动后台线程，在token过期前主动刷新"""
+        if self.running:
+            return self
+        self.running = True
+
+        def loop():
+            while self.running:
+                self.refresh_token()
+                time.sleep(self.check_interval)
+
+        self.thread = threading.Thread(target=loop, name='wechat-token')
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """停止后台线程"""
+        self.running = False
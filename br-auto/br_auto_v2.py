@@ -2,48 +2,71 @@
 # -*- coding: utf-8 -*-
 """
 重构后的BR流动性自动保护系统 - 面向对象版本 v2
+
+运行在单个asyncio事件循环中：
+- WebSocket读取、订阅检查：每个连接一个协程（aiohttp），消息处理函数直接在事件循环中执行
+- 头寸检查、探活消息、告警汇总：定时协程
+- 告警发送：每个渠道一个发送协程（AsyncAlertDispatcher）
+- 阻塞调用（Web3查询、自动移除、推送请求）提交到固定大小的线程池，提示音和语音使用单独的单线程池
+
+以下服务有意保留在各自的线程/进程中，触发的告警和自动移除通过线程安全的接口交给事件循环和线程池：
+- 链上池子数据源、内存池监听：按区块/毫秒级轮询同步的Web3 HTTP接口，放入事件循环会阻塞消息处理
+- Web3后台服务（健康检查、gas价格预言机、预签名退出、移除交易预模拟、回执监听）：与发送交易共用同步的Web3Manager
+- 原始消息录制的写文件线程、移除交易工作进程：与消息处理隔离，避免磁盘IO和交易签名占用事件循环
+
+运行:
+    python br-auto/br_auto_v2.py
 """
 
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
-import websocket
+import asyncio
 import json
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import os
-import random
-import ssl
 import subprocess
 import yaml
 import requests
 from web3_utils import Web3Manager
+from web3_utils.exit_worker import ExitWorker, remaining_exit_positions
+from web3_utils.pool_feed import PoolLiquidityFeed
+from web3_utils.mempool_watcher import MempoolWatcher
+from feed_utils import (DropDetector, FeedMerger, FrameDeduplicator, FrameRecorder, MessageRouter,
+                        SubscriptionManager, max_volume_prefilter)
+from feed_utils.async_ws import AsyncWSConnection
+from alert_utils.alert_aggregator import AlertAggregator
+from alert_utils.alert_dispatcher import AsyncAlertDispatcher
 from alert_utils.sc_alert import send_serverchan_alert
 from alert_utils.sound_alert import play_alert_sound
 from alert_utils.voice_alert import VoiceAlert
-from alert_utils.wechat_alert import send_wechat_work_alert, wechat_token_cache
 from alert_utils.console_logger import (
     format_amount,
     log_liquidity_alert,
     log_auto_remove_alert,
     log_kk_alert,
     log_position_change,
-    log_market_status
+    log_market_status,
+    current_time_str
 )
 
 class BRMonitor:
     """BR流动性监控与自动保护系统主类"""
     
     # 类常量
-    MAX_RECONNECT_ATTEMPTS = 10
     AUTO_REMOVE_COOLDOWN = 300  # 5分钟冷却
+    LIQUIDITY_SOURCE_NAMES = {'okx': 'OKX', 'chain': '链上', 'mempool': '内存池'}
     
     def __init__(self, config_path):
         """初始化监控器"""
         self.load_config(config_path)
         self.init_state()
+        self.init_alerting()
+        self.init_message_router()
         self.last_heartbeat_time = 0
         self.heartbeat_interval = self.config.get('heartbeat_interval', 3600)  # 默认1小时
         
@@ -67,37 +90,103 @@ class BRMonitor:
         
     def init_state(self):
         """初始化状态变量"""
-        self.liquidity_history = []
-        self.liquidity_history_with_time = []
-        self.reconnect_count = 0
-        self.reconnect_delay = 5
-        self.heartbeat_running = False
-        self.heartbeat_thread = None
-        self.current_ws = None
+        # 按数据源分别检测流动性下降：okx为OKX推送，chain为链上池子事件
+        self.drop_detectors = {}
+        # 合并多个数据源的同一事件，只由最先检测到的数据源告警，并统计数据源间的延迟
+        merge_config = self.BR_CONFIG.get('feed_merge', {})
+        self.feed_merger = FeedMerger(
+            window=merge_config.get('window', 30),
+            min_move=merge_config.get('min_move', 0.05),
+            tolerance=merge_config.get('tolerance', 0.3)
+        )
+        # WebSocket连接协程（websocket.connections为2时同时维持两个连接），多连接时按内容去重
+        self.ws_supervisors = []
+        self.frame_dedup = None
+        # 原始消息录制（frame_recorder.enabled开启时创建）
+        self.frame_recorder = None
         self.top_pool_data = None
         self.web3_manager = None
         self.auto_remove_in_progress = False
         self.last_auto_remove_time = 0
+        # 多个数据源可能同时触发自动移除，只执行最先触发的一次
+        self.auto_remove_lock = threading.Lock()
+        self.pool_feed = None
+        self.mempool_watcher = None
         self.voice_thread_active = False
         self.current_positions = []
+        # 独立的移除交易工作进程（web3_config.exit_worker开启时创建）及最近一次同步给它的头寸
+        self.exit_worker = None
+        self.exit_worker_positions = None
+        runtime_config = self.config.get('async_runtime', {})
+        # Web3查询、自动移除和推送请求共用的线程池，大小固定
+        self.executor = ThreadPoolExecutor(max_workers=runtime_config.get('executor_workers', 4),
+                                           thread_name_prefix='br-blocking')
+        # 提示音和语音单独排队播放，不占用自动移除的线程
+        self.alert_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='br-alert')
         # 语音播报类 用于告警时播报语音
-        self.voice_alert = VoiceAlert()
-    
+        self.voice_alert = VoiceAlert(executor=self.alert_executor)
+        # 事件循环及其中的定时协程，main()中创建
+        self.loop = None
+        self.tasks = []
+
+    def init_alerting(self):
+        """创建告警发送和聚合：发送协程在事件循环启动后创建，汇总由定时协程推送"""
+        # 告警由发送协程推送，行情处理不等待推送接口
+        self.alert_dispatcher = AsyncAlertDispatcher(self.config, executor=self.executor,
+                                                     **self.config.get('alert_dispatch', {}))
+        # 持续触发的同类告警只推送一次，重复告警合并为汇总
+        self.alert_aggregator = AlertAggregator(self.send_alert, **self.config.get('alert_aggregation', {}))
+
+    def run_background(self, func, *args):
+        """在线程池中执行阻塞任务，不阻塞行情处理（可在任意线程调用）"""
+        self.executor.submit(func, *args)
+
+    async def run_blocking(self, func, *args):
+        """在线程池中执行阻塞调用并等待结果"""
+        return await self.loop.run_in_executor(self.executor, func, *args)
+
+    async def every(self, interval, func, blocking=False):
+        """每interval秒执行一次func，blocking为True时在线程池中执行；单次失败只记录，不影响之后的执行"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if blocking:
+                    await self.run_blocking(func)
+                else:
+                    func()
+            except Exception as e:
+                print(f'【BR】定时任务 {func.__name__} 失败: {e}')
+
+    def alert_sound(self):
+        """播放告警提示音"""
+        play_alert_sound(executor=self.alert_executor)
+
+    def play_kk_sell_alert(self):
+        """KK大额卖出：语音播报后播放提示音（在后台执行）"""
+        self.voice_alert.play_voice_alert("警告！KK大额卖出，KK大额卖出")
+        time.sleep(4)
+        self.alert_sound()
+
+    def send_alert(self, message, channels=None):
+        """异步发送告警（企业微信和Server酱），立即返回"""
+        self.alert_dispatcher.send(message, channels=channels)
+
     def auto_remove_positions(self):
         """自动移除所有USDT-BR头寸"""
         # 检查是否在冷却期内
-        current_time = time.time()
-        if current_time - self.last_auto_remove_time < self.AUTO_REMOVE_COOLDOWN:
-            remaining_time = self.AUTO_REMOVE_COOLDOWN - (current_time - self.last_auto_remove_time)
-            print(f"【BR】⏰ 自动移除冷却中，剩余 {remaining_time:.0f} 秒")
-            return
-        
-        if self.auto_remove_in_progress:
-            print("【BR】⚠️ 自动移除正在进行中，跳过")
-            return
-        
-        self.auto_remove_in_progress = True
-        self.last_auto_remove_time = current_time
+        with self.auto_remove_lock:
+            current_time = time.time()
+            if current_time - self.last_auto_remove_time < self.AUTO_REMOVE_COOLDOWN:
+                remaining_time = self.AUTO_REMOVE_COOLDOWN - (current_time - self.last_auto_remove_time)
+                print(f"【BR】⏰ 自动移除冷却中，剩余 {remaining_time:.0f} 秒")
+                return
+
+            if self.auto_remove_in_progress:
+                print("【BR】⚠️ 自动移除正在进行中，跳过")
+                return
+
+            self.auto_remove_in_progress = True
+            self.last_auto_remove_time = current_time
         
         try:
             print("【BR】🚨 触发自动移除保护机制！")
@@ -113,21 +202,26 @@ class BRMonitor:
                 print(f"【BR】⚡ 使用缓存头寸信息，跳过查询步骤")
             else:
                 print("【BR】🔍 缓存为空，重新查询头寸")
-                self.web3_manager.get_v3_positions()
+                self.web3_manager.refresh_positions()
                 positions = self.web3_manager.get_current_positions()
                 if not positions:
                     print("【BR】❌ 未找到活跃的USDT-BR头寸")
                     return
             
             print(f"【BR】🎯 找到 {len(positions)} 个USDT-BR头寸，开始自动移除")
+
+            # 预模拟结果已在后台按区块更新，这里直接读取
+            simulator = self.web3_manager.exit_simulator
+            simulation = simulator.result_for(positions) if simulator else None
+            if simulation and simulation['ok']:
+                print(f"【BR】🧪 区块 {simulation['block']} 模拟通过，gas估算: {simulation['gas']}")
+            elif simulation:
+                print(f"【BR】⚠️ 区块 {simulation['block']} 模拟回滚: {'; '.join(simulation['errors'])}")
             
-            success_count = 0
-            for i, position in enumerate(positions):
-                print(f"【BR】处理头寸 #{position['token_id']} ({i+1}/{len(positions)})")
-                if self.web3_manager.execute_multicall(position):
-                    success_count += 1
-                if i < len(positions) - 1:
-                    time.sleep(3)
+            if self.exit_worker:
+                success_count = self.remove_with_exit_worker(positions)
+            else:
+                success_count = self.remove_in_process(positions)
             
             print(f"【BR】🎉 自动移除完成，成功移除 {success_count}/{len(positions)} 个头寸")
             if success_count > 0:
@@ -135,314 +229,464 @@ class BRMonitor:
                 self.voice_alert.play_voice_alert(f"自动移除完成，成功保护了 {success_count} 个头寸")
             
             # 更新当前头寸信息
-            self.web3_manager.get_v3_positions()
+            self.web3_manager.refresh_positions()
             self.current_positions = self.web3_manager.get_current_positions()
+            self.sync_exit_worker(self.current_positions)
             
         except Exception as e:
             print(f'【BR】自动移除过程中发生错误: {e}')
         finally:
             self.auto_remove_in_progress = False
 
-    def on_message(self, ws, message):
-        """处理WebSocket消息"""
+    def start_exit_services(self):
+        """在本进程启动gas价格预言机、移除交易预模拟和预签名退出"""
+        # gas价格预言机和移除交易预模拟需要在预签名之前启动，预签名交易直接使用其结果
+        if self.WEB3_CONFIG.get('gas_oracle', {}).get('enabled', False):
+            try:
+                self.web3_manager.start_gas_oracle()
+                print('【BR】⛽ gas价格预言机已启动')
+            except Exception as e:
+                print(f'【BR】❌ gas价格预言机启动失败，使用固定gas价格: {e}')
+        if self.BR_CONFIG['auto_remove_enabled'] and self.WEB3_CONFIG.get('simulate_exit', False):
+            self.web3_manager.start_exit_simulator()
+            print('【BR】🧪 移除交易预模拟已启动')
+        # 预签名退出模式
+        if self.BR_CONFIG['auto_remove_enabled'] and self.WEB3_CONFIG.get('armed_exit', False):
+            self.web3_manager.start_armed_exit()
+            print('【BR】🔫 预签名退出模式已开启')
+
+    def remove_in_process(self, positions):
+        """在本进程广播移除交易并等待上链，返回成功移除的头寸数量"""
+        # 预签名交易优先，其余头寸按batch_exit合并或逐个广播，全部广播后统一等待
+        pending = self.web3_manager.submit_exits(positions)
+        success_count = 0
+        # 回执由后台监听服务按区块批量查询，这里只等待结果
+        futures = {self.web3_manager.watch_exit(tx_hash, group): group for group, tx_hash in pending}
+        for future in as_completed(futures):
+            try:
+                if future.result().status == 1:
+                    success_count += len(futures[future])
+            except Exception:
+                pass
+        return success_count
+
+    def remove_with_exit_worker(self, positions):
+        """通过独立工作进程移除头寸，返回成功移除的头寸数量
+
+        工作进程已退出或未在 web3_config.exit_worker_submit_timeout 内报告广播结果时，由本进程接管；
+        工作进程报告未能广播的头寸直接在本进程发送。
+        """
         try:
-            data = json.loads(message)
-            
-            if 'arg' not in data or 'data' not in data:
+            if not self.exit_worker.is_alive():
+                raise ConnectionError('移除交易工作进程已退出')
+            request = self.exit_worker.trigger(positions)
+            submitted = request['submitted'].result(timeout=self.WEB3_CONFIG.get('exit_worker_submit_timeout', 0.5))
+        except Exception as e:
+            print(f"【BR】❌ 工作进程未报告广播结果: {e!r}，改为在本进程发送")
+            return self.take_over_from_exit_worker(positions)
+
+        timings = submitted['timings']
+        for tx in submitted['txs']:
+            print(f"【BR】🚀 工作进程已广播移除交易 {', '.join(f'#{i}' for i in tx['token_ids'])}: {tx['tx_hash']}")
+        if submitted['error']:
+            print(f"【BR】❌ 工作进程广播失败: {submitted['error']}")
+        print(f"【BR】⚡ 触发→广播 {timings['trigger_to_submit_ms']:.1f}ms (IPC {timings['ipc_ms']:.1f}ms)")
+
+        success_count = 0
+        sent_ids = {token_id for tx in submitted['txs'] for token_id in tx['token_ids']}
+        remaining = [p for p in positions if p['token_id'] not in sent_ids]
+        if remaining:
+            print(f"【BR】⚠️ 工作进程未广播 {len(remaining)} 个头寸，改为在本进程发送")
+            success_count += self.remove_in_process_after_worker(remaining)
+
+        # 已广播的交易不重发，等待回执失败只记录
+        try:
+            result = request['result'].result(timeout=self.WEB3_CONFIG.get('receipt_timeout', 120) + 30)
+            print(f"【BR】⏱️ 触发→上链 {result['timings']['total_ms']:.0f}ms")
+            success_count += result['success_count']
+        except Exception as e:
+            print(f"【BR】等待工作进程移除结果失败: {e!r}")
+        return success_count
+
+    def take_over_from_exit_worker(self, positions):
+        """终止失去响应的工作进程，等待其可能已广播的交易上链后，只在本进程移除仍有流动性的头寸"""
+        self.exit_worker.stop(timeout=0)
+        self.exit_worker = None
+        remaining = remaining_exit_positions(self.web3_manager, positions,
+                                             timeout=self.WEB3_CONFIG.get('receipt_timeout', 120))
+        removed = len(positions) - len(remaining)
+        if removed:
+            print(f"【BR】✅ 工作进程已移除 {removed} 个头寸")
+        return removed + (self.remove_in_process(remaining) if remaining else 0)
+
+    def remove_in_process_after_worker(self, positions):
+        """工作进程失败后在本进程移除，先与链上nonce同步（工作进程可能已用同一钱包发出交易）"""
+        if self.web3_manager.nonce_manager:
+            self.web3_manager.nonce_manager.sync()
+        return self.remove_in_process(positions)
+
+    def sync_exit_worker(self, positions):
+        """头寸变化时同步给移除交易工作进程"""
+        if not self.exit_worker:
+            return
+        key = [(p['token_id'], p['liquidity']) for p in positions]
+        if key != self.exit_worker_positions:
+            self.exit_worker.update_positions(positions)
+            self.exit_worker_positions = key
+
+    def check_liquidity_drop(self, source, liquidity_m):
+        """按数据源检测流动性下降，超过阈值时告警或触发自动移除
+
+        每个数据源使用独立的DropDetector，窗口和阈值来自br_config.drop_windows。
+        任一数据源先检测到下降即触发，自动移除的冷却和互斥保证只执行一次。
+
+        Args:
+            source (str): 数据源名称，okx 或 chain
+            liquidity_m (float): 当前流动性（百万美元）
+        """
+        event = self.feed_merger.observe(source, liquidity_m)
+        event_id = event['event_id'] if event else None
+        detector = self.drop_detectors.get(source)
+        if detector is None:
+            detector = self.drop_detectors[source] = DropDetector.from_config(self.BR_CONFIG)
+        result = detector.update(liquidity_m)
+        if result is None:
+            return
+        source_name = self.LIQUIDITY_SOURCE_NAMES.get(source, source)
+        auto, alert = result['auto'], result['alert']
+
+        if auto and self.BR_CONFIG['auto_remove_enabled'] and self.current_positions:
+            if not self.claim_liquidity_event('auto_remove', source, event_id):
                 return
-                
-            channel = data['arg'].get('channel', '')
-            chain_id = data['arg'].get('chainId', data['arg'].get('chainIndex', ''))
-            
-            if chain_id != '56':
+            log_auto_remove_alert(liquidity_m, auto['peak'], auto['threshold'])
+            self.run_background(self.auto_remove_positions)
+            peak_time = time.strftime('%H:%M:%S', time.localtime(auto['peak_time']))
+            alert_msg = (f"[{source_name}] {auto['window']}内流动性减少超过自动移除阈值 {auto['threshold']}M\n"
+                         f"从 {auto['peak']:.2f}M（{peak_time}）降至 {liquidity_m:.2f}M")
+            self.send_alert(alert_msg)
+
+        # 独立的警报检查
+        elif alert:
+            if not self.claim_liquidity_event('alert', source, event_id):
                 return
-                
-            token_address = data['arg'].get('tokenAddress', 
-                                         data.get('data', [{}])[0].get('tokenContractAddress', ''))
-                
-            if not token_address or token_address.lower() != self.BR_CONFIG['address'].lower():
+            log_liquidity_alert(liquidity_m, alert['peak'], alert['drop'], alert['threshold'])
+            peak_time = time.strftime('%H:%M:%S', time.localtime(alert['peak_time']))
+            alert_msg = (f"[{source_name}] {alert['window']}内流动性突然减少 {alert['drop']:.2f}M\n"
+                         f"从 {alert['peak']:.2f}M（{peak_time}）降至 {liquidity_m:.2f}M")
+            # 下降持续期间每次更新都会触发，只在首次和下降幅度升级时推送并播放提示音
+            severity = AlertAggregator.severity_level(alert['drop'], alert['threshold'])
+            if self.alert_aggregator.submit('liquidity_drop', self.br_address, alert_msg, value=alert['drop'],
+                                            severity=severity, title='流动性突然减少(M)'):
+                self.alert_sound()
+
+    def claim_liquidity_event(self, kind, source, event_id=None):
+        """同一次流动性下降只由最先检测到的数据源处理，返回本数据源是否应处理
+
+        event_id为FeedMerger匹配到的事件，为None时使用该数据源最近参与的事件。
+        """
+        first, leader, lead = self.feed_merger.claim(kind, source, event_id)
+        if not first:
+            leader_name = self.LIQUIDITY_SOURCE_NAMES.get(leader, leader)
+            source_name = self.LIQUIDITY_SOURCE_NAMES.get(source, source)
+            print(f'【BR】⏭️ {source_name}检测到的流动性下降已由{leader_name}先处理（领先 {lead:.2f}s），跳过')
+        return first
+
+    def on_pool_feed_update(self, snapshot):
+        """链上池子数据更新回调（在池子数据线程中执行）"""
+        self.check_liquidity_drop('chain', snapshot['liquidity_usd'] / 1000000)
+
+    def on_mempool_event(self, event):
+        """内存池事件回调（在内存池监听线程中执行）：撤池达到阈值时在交易上链前触发自动移除"""
+        removed_m = event['removed_usd'] / 1000000
+        sender = 'KK' if event['kk'] else (self.WALLET_NAMES.get(event['from']) or event['from'])
+        gas_price = f"{event['gas_price'] / 10 ** 9:g} gwei" if event['gas_price'] else 'N/A'
+        print(f"\033[95m【BR】👀 内存池发现待上链交易 {event['hash']} 来自 {sender}: {', '.join(event['kinds']) or '其他调用'}"
+              f"，移除流动性约 {removed_m:.2f}M，卖出约 ${event['swap_usd']:,.0f}，gas {gas_price}\033[0m")
+
+        if event['trigger'] and self.BR_CONFIG['auto_remove_enabled'] and self.current_positions:
+            # 登记为预告的流动性下降，链上随后报告的同一次下降与之匹配，不再重复处理
+            move = self.feed_merger.observe_move('mempool', -removed_m)
+            if not self.claim_liquidity_event('auto_remove', 'mempool', move['event_id'] if move else None):
                 return
-                
-            # 处理dex-market-v3-topPool数据
-            if channel == 'dex-market-v3-topPool':
-                try:
-                    token_address = data['arg']['tokenAddress']
-                    if 'data' in data and len(data['data']) > 0 and 'data' in data['data'][0]:
-                        pool_list = data['data'][0]['data']
-                        
-                        if token_address.lower() == self.BR_CONFIG['address'].lower():
-                            total_liquidity = 0
-                            token_amounts = {}
-                            pool_details = []
-                            
-                            for i, pool in enumerate(pool_list):
-                                pool_liquidity = float(pool['liquidity'])
-                                total_liquidity += pool_liquidity
-                                
-                                pool_tokens = []
-                                for token_info in pool['poolTokenInfoList']:
-                                    if token_info['tokenSymbol'] != 'BR':
-                                        pool_tokens.append(token_info['tokenSymbol'])
-                                
-                                pool_info = {
-                                    'index': i + 1,
-                                    'liquidity': pool_liquidity,
-                                    'pool_address': pool.get('poolAddress', 'N/A'),
-                                    'tokens': pool_tokens
-                                }
-                                pool_details.append(pool_info)
-                                
-                                for token_info in pool['poolTokenInfoList']:
-                                    token_symbol = token_info['tokenSymbol']
-                                    token_amount = float(token_info['amount'])
-                                    
-                                    if token_symbol in token_amounts:
-                                        token_amounts[token_symbol] += token_amount
-                                    else:
-                                        token_amounts[token_symbol] = token_amount
-                            
-                            self.top_pool_data = {
-                                'total_liquidity': total_liquidity,
-                                'token_amounts': token_amounts,
-                                'pool_details': pool_details
-                            }
-                except Exception as e:
-                    print(f'【BR】处理topPool数据错误: {e}')
-            
-            # 处理市场数据
-            elif channel == 'dex-market-v3':
-                if 'data' in data and len(data['data']) > 0:
-                    market_data = data['data'][0]
-                    token_address = market_data['tokenContractAddress']
-                    
-                    if token_address.lower() != self.BR_CONFIG['address'].lower():
-                        return
-                    
-                    current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    
-                    # 使用topPool的流动性数据
-                    if self.top_pool_data is not None:
-                        liquidity = self.top_pool_data['total_liquidity']
-                        token_amounts = self.top_pool_data['token_amounts']
-                    else:
-                        liquidity = float(market_data['liquidity'])
-                        token_amounts = {}
-                        
-                    liquidity_m = liquidity / 1000000
-                    price = float(market_data['price'])
-                    volume_5m = float(market_data['volume5M'])
-                    volume_5m_m = volume_5m / 1000000
-                    
-                    # 添加当前流动性到历史记录
-                    self.liquidity_history.append(liquidity_m)
-                    if len(self.liquidity_history) > 10:
-                        self.liquidity_history.pop(0)
-                        
-                        # 维护带时间戳的历史记录
-                        current_timestamp = time.time()
-                        self.liquidity_history_with_time.append((current_timestamp, liquidity_m))
-                        
-                        # 清理2分钟之外的数据
-                        self.liquidity_history_with_time = [
-                            (ts, liq) for ts, liq in self.liquidity_history_with_time 
-                            if current_timestamp - ts <= 120
-                        ]
-                        
-                        # 检查流动性是否突然减少
-                        if len(self.liquidity_history) > 1:
-                            current_liquidity = self.liquidity_history[-1]
-                            threshold = self.BR_CONFIG['liquidity_threshold']
-                            auto_threshold = self.BR_CONFIG['auto_remove_threshold']
-                            
-                            # 计算最大流动性下降
-                            max_liquidity_drop = 0
-                            max_drop_from = 0
-                            
-                            for historical_liquidity in self.liquidity_history[:-1]:
-                                liquidity_drop = historical_liquidity - current_liquidity
-                                if liquidity_drop > max_liquidity_drop:
-                                    max_liquidity_drop = liquidity_drop
-                                    max_drop_from = historical_liquidity
-                            
-                            # 2分钟时间窗口检测
-                            time_window_triggered = False
-                            if self.BR_CONFIG['auto_remove_enabled'] and len(self.liquidity_history_with_time) >= 2 and self.current_positions:
-                                max_liquidity_in_2min = max(liq for _, liq in self.liquidity_history_with_time)
-                                time_window_drop = max_liquidity_in_2min - current_liquidity
-                                
-                                if time_window_drop > auto_threshold:
-                                    log_auto_remove_alert(current_liquidity, max_liquidity_in_2min, auto_threshold)
-                                    auto_remove_thread = threading.Thread(target=self.auto_remove_positions)
-                                    auto_remove_thread.daemon = True
-                                    auto_remove_thread.start()
-                                    time_window_triggered = True
-                                    alert_msg = f"2分钟内流动性减少超过自动移除阈值 {auto_threshold}M\n从 {max_liquidity_in_2min:.2f}M 降至 {current_liquidity:.2f}M"
-                                    send_wechat_work_alert(alert_msg, config=self.config)
-                                    send_serverchan_alert(alert_msg, config=self.config)
-                            
-                            # 传统检测逻辑
-                            if not time_window_triggered and self.BR_CONFIG['auto_remove_enabled'] and max_liquidity_drop > auto_threshold and self.current_positions:
-                                log_auto_remove_alert(current_liquidity, max_drop_from, auto_threshold)
-                                auto_remove_thread = threading.Thread(target=self.auto_remove_positions)
-                                auto_remove_thread.daemon = True
-                                auto_remove_thread.start()
-                                alert_msg = f"流动性减少超过自动移除阈值 {auto_threshold}M\n从 {max_drop_from:.2f}M 降至 {current_liquidity:.2f}M"
-                                send_wechat_work_alert(alert_msg, config=self.config)
-                                send_serverchan_alert(alert_msg, config=self.config)
-                            
-                            # 独立的警报检查
-                            elif not time_window_triggered and max_liquidity_drop > threshold:
-                                log_liquidity_alert(current_liquidity, max_drop_from, max_liquidity_drop, threshold)
-                                play_alert_sound()
-                                alert_msg = f"流动性突然减少 {max_liquidity_drop:.2f}M\n从 {max_drop_from:.2f}M 降至 {current_liquidity:.2f}M"
-                                send_wechat_work_alert(alert_msg, config=self.config)
-                                send_serverchan_alert(alert_msg, config=self.config)
-                        
-                        # 显示当前状态
-                        if token_amounts:
-                            token_amounts_str = ", ".join([f"{symbol}: {format_amount(amount)}" for symbol, amount in token_amounts.items()])
-                            
-                            position_info_str = ""
-                            if self.current_positions:
-                                position_ids = [f"\033[93m#{pos['token_id']}\033[0m" for pos in self.current_positions]
-                                position_info_str = f"  LP池子：{', '.join(position_ids)}"
-                            
-                            print(f'【BR】Time: {current_time}  Liquidity: {liquidity_m:.2f}M   Price: {price:.5f}  Volume (5min): {volume_5m_m:.2f}M  代币数量: {token_amounts_str}{position_info_str}')
-                        else:
-                            position_info_str = ""
-                            if self.current_positions:
-                                position_ids = [f"\033[93m#{pos['token_id']}\033[0m" for pos in self.current_positions]
-                                position_info_str = f"  LP池子：{', '.join(position_ids)}"
-                            
-                            print(f'【BR】Time: {current_time}  Liquidity: {liquidity_m:.2f}M   Price: {price:.5f}  Volume (5min): {volume_5m_m:.2f}M{position_info_str}')
-            
-            # 处理池子历史数据
-            elif channel == 'dex-market-pool-history':
-                pool_data = data['data']
-                if pool_data['chainId'] == '56':
-                    token_contract_address = pool_data.get('tokenContractAddress', '')
-                    
-                    if token_contract_address and token_contract_address.lower() == self.BR_CONFIG['address'].lower():
-                        changed_tokens = pool_data.get('changedTokenInfo', [])
-                        if changed_tokens:
-                            token_info_str = ", ".join([f"{token['tokenSymbol']}: {float(token['amount']):.6f}" for token in changed_tokens])
-                            
-                            value = float(pool_data['value'])
-                            type_str = pool_data['type']
-                            wallet_address = pool_data.get('userWalletAddress', '')
-                            wallet_name = self.WALLET_NAMES.get(wallet_address, '')
-                            wallet_info = f", 钱包: {wallet_name}" if wallet_name else ""
-                            
-                            # 检查是否是KK地址的操作
-                            if wallet_address.lower() == self.KK_ADDRESS.lower():
-                                if type_str == '1':
-                                    log_kk_alert('enter', value, token_info_str)
-                                    self.voice_alert.play_voice_alert("请注意，KK入场了，KK入场了")
-                                    alert_msg = f"KK入场警报！新增流动性\n价值: ${value:.2f}\n代币变化: {token_info_str}"
-                                    send_wechat_work_alert(alert_msg, config=self.config)
-                                    send_serverchan_alert(alert_msg, config=self.config)
-                                elif type_str == '2':
-                                    log_kk_alert('exit', value, token_info_str)
-                                    self.voice_alert.play_voice_alert("请注意，KK跑路了，KK跑路了")
-                                    alert_msg = f"KK跑路警报！减少流动性\n价值: ${value:.2f}\n代币变化: {token_info_str}"
-                                    send_wechat_work_alert(alert_msg, config=self.config)
-                                    send_serverchan_alert(alert_msg, config=self.config)
-                            else:
-                                if type_str == '1':
-                                    print(f'\033[92m【BR】新增流动性 - 价值: ${value:.2f}, 代币变化: {token_info_str}{wallet_info}\033[0m')
-                                elif type_str == '2':
-                                    print(f'\033[91m【BR】减少流动性 - 价值: ${value:.2f}, 代币变化: {token_info_str}{wallet_info}\033[0m')
-
-            # 处理交易历史数据
-            elif channel == 'dex-market-trade-history-pub':
-                if isinstance(data['data'], list):
-                    for trade_info in data['data']:
-                        try:
-                            is_buy = trade_info.get('isBuy', '')
-                            wallet = trade_info.get('userAddress', '')
-                            timestamp = trade_info.get('timestamp', '')
-                            volume = trade_info.get('volume', 0)
-                            
-                            br_amount = 0
-                            usdt_amount = 0
-                            changed_tokens = trade_info.get('changedTokenInfo', [])
-                            for token_info in changed_tokens:
-                                if token_info.get('tokenSymbol') == 'BR':
-                                    br_amount = float(token_info.get('amount', 0))
-                                elif token_info.get('tokenSymbol') == 'USDT':
-                                    usdt_amount = float(token_info.get('amount', 0))
-                            
-                            if wallet and br_amount > 0 and is_buy == "0":
-                                if timestamp:
-                                    try:
-                                        trade_time = datetime.fromtimestamp(int(timestamp) / 1000).strftime('%Y-%m-%d %H:%M:%S')
-                                    except Exception as e:
-                                        print(f'【BR】时间戳转换错误: {e}')
-                                        trade_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                                else:
-                                    trade_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                                
-                                # 格式化钱包地址
-                                display_address = wallet
-                                
-                                if float(volume) >= self.LARGE_SELL_ALERT_CONFIG['threshold']:
-                                    print(f'\033[91m【卖出】{trade_time} - {display_address} 卖出 {br_amount:.2f} BR 获得 {usdt_amount:.2f} USDT (交易量: ${float(volume):.2f})\033[0m')
-                                    
-                                    if self.LARGE_SELL_ALERT_CONFIG['enabled'] and float(volume) >= self.LARGE_SELL_ALERT_CONFIG['threshold']:
-                                        if wallet.lower() == self.KK_ADDRESS.lower():
-                                            self.voice_alert.play_voice_alert("警告！KK大额卖出，KK大额卖出")
-                                            time.sleep(4)
-                                            play_alert_sound()
-                                        else:
-                                            play_alert_sound()
-                                        # 发送微信通知
-                                        alert_msg = f"大额卖出警报！\n时间: {trade_time}\n地址: {display_address}\n卖出: {br_amount:.2f} BR\n获得: {usdt_amount:.2f} USDT\n交易量: ${float(volume):.2f}"
-                                        send_wechat_work_alert(alert_msg, config=self.config)
-                                        send_serverchan_alert(alert_msg, config=self.config)
-                        except Exception as e:
-                            print(f'【BR】处理交易历史数据错误: {e}')
-                            continue
-
-            # 处理实时交易数据
-            elif channel == 'dex-market-tradeRealTime':
-                if 'data' in data and len(data['data']) > 0:
-                    trade_data = data['data'][0]
-                    sell_volume = float(trade_data['tradeNumSell5M'])
-                    buy_volume = float(trade_data['tradeNumBuy5M'])
-                    volume_diff = sell_volume - buy_volume
-                    
-                    if volume_diff > self.BR_CONFIG['sell_threshold']:
-                        print(f'\033[91m【BR】警告：5分钟内卖出量超过买入量 {volume_diff:.2f} 个代币\033[0m')
+            print(f"\033[93m【BR】🚨 待上链交易将移除约 {removed_m:.2f}M 流动性，提前触发自动保护！\033[0m")
+            self.run_background(self.auto_remove_positions)
+            alert_msg = f"[内存池] 待上链交易将移除约 {removed_m:.2f}M 流动性，已提前触发自动移除\n交易: {event['hash']}\n来自: {sender}"
+            self.send_alert(alert_msg)
+        elif event['kk'] or removed_m > self.BR_CONFIG['liquidity_threshold']:
+            alert_msg = f"[内存池] {sender} 待上链交易: {', '.join(event['kinds']) or '其他调用'}\n移除流动性约 {removed_m:.2f}M\n交易: {event['hash']}"
+            self.send_alert(alert_msg)
+
+    def start_mempool_watcher(self):
+        """启动内存池监听，池子价格和费率来自链上池子数据源"""
+        watcher_config = self.WEB3_CONFIG.get('mempool_watcher', {})
+        self.mempool_watcher = MempoolWatcher(
+            self.web3_manager,
+            self.pool_feed,
+            trigger_usd=watcher_config.get('trigger_threshold', self.BR_CONFIG['auto_remove_threshold']) * 1000000,
+            large_swap_usd=watcher_config.get('large_swap_usd', self.LARGE_SELL_ALERT_CONFIG['threshold']),
+            kk_address=self.KK_ADDRESS,
+            poll_interval=watcher_config.get('poll_interval', 0.2),
+            max_batch=watcher_config.get('max_batch', 500),
+            on_event=self.on_mempool_event
+        )
+        self.mempool_watcher.start()
+        print('【BR】👀 内存池监听已启动')
+
+    def start_pool_feed(self):
+        """启动链上池子数据源，与OKX推送共同参与流动性下降检测"""
+        feed_config = self.WEB3_CONFIG.get('pool_feed', {})
+        self.pool_feed = PoolLiquidityFeed(
+            self.web3_manager,
+            pools=feed_config.get('pools') or None,
+            poll_interval=feed_config.get('poll_interval', 1),
+            resync_blocks=feed_config.get('resync_blocks', 20),
+            on_update=self.on_pool_feed_update,
+            max_log_blocks=feed_config.get('max_log_blocks', 500),
+            max_gap_blocks=feed_config.get('max_gap_blocks', 5000)
+        )
+        self.pool_feed.start()
+        snapshot = self.pool_feed.snapshot
+        if snapshot:
+            print(f"【BR】⛓️ 链上池子数据源已启动，{len(self.pool_feed.pools)} 个池子，"
+                  f"当前流动性 {snapshot['liquidity_usd'] / 1000000:.2f}M")
+
+    def init_message_router(self):
+        """注册各频道的处理函数，地址在此统一转为小写，处理消息时不再重复转换"""
+        self.br_address = self.BR_CONFIG['address'].lower()
+        self.kk_address = self.KK_ADDRESS.lower()
+        self.wallet_names = {address.lower(): name for address, name in self.WALLET_NAMES.items()}
+        self.message_router = MessageRouter(chain_id='56', token_address=self.br_address,
+                                            on_error=self.on_handler_error)
+        self.message_router.register('dex-market-v3-topPool', self.handle_top_pool)
+        self.message_router.register('dex-market-v3', self.handle_market)
+        self.message_router.register('dex-market-pool-history', self.handle_pool_history)
+        # 成交明细只处理大额卖出，没有达到阈值的成交时不解析整条消息
+        self.message_router.register('dex-market-trade-history-pub', self.handle_trade_history,
+                                     prefilter=max_volume_prefilter(self.LARGE_SELL_ALERT_CONFIG['threshold']))
+        self.message_router.register('dex-market-tradeRealTime', self.handle_trade_realtime)
 
+    def create_subscriptions(self):
+        """创建一个连接的订阅管理并登记BR代币的订阅频道，失效时间按频道的推送频率配置"""
+        sub_config = dict(self.config.get('subscriptions', {}))
+        stale_after = {'dex-market-v3': 60, 'dex-market-v3-topPool': 120}
+        stale_after.update(sub_config.pop('stale_after', {}))
+        subscriptions = SubscriptionManager(stale_after=stale_after, **sub_config)
+        address = self.BR_CONFIG['address']
+        subscriptions.add('dex-market-v3', {
+            "channel": "dex-market-v3",
+            "chainId": 56,
+            "tokenAddress": address
+        })
+        subscriptions.add('dex-market-v3-topPool', {
+            "channel": "dex-market-v3-topPool",
+            "chainId": "56",
+            "tokenAddress": address
+        })
+        subscriptions.add('dex-market-pool-history', {
+            "channel": "dex-market-pool-history",
+            "extraParams": json.dumps({
+                "chainId": "56",
+                "tokenContractAddress": address,
+                "type": "0",
+                "userAddressList": [],
+                "volumeMin": "10000",
+                "volumeMax": ""
+            })
+        })
+        subscriptions.add('dex-market-tradeRealTime', {
+            "channel": "dex-market-tradeRealTime",
+            "chainId": "56",
+            "tokenAddress": address
+        })
+        subscriptions.add('dex-market-trade-history-pub', {
+            "channel": "dex-market-trade-history-pub",
+            "chainIndex": "56",
+            "tokenContractAddress": address
+        })
+        return subscriptions
+
+    def on_handler_error(self, channel, error):
+        """频道处理函数异常"""
+        if channel == 'dex-market-v3-topPool':
+            print(f'【BR】处理topPool数据错误: {error}')
+        else:
+            print(f'【BR】Error processing message: {error}')
+
+    def on_message(self, name, message):
+        """处理WebSocket数据消息（pong和订阅确认已由各连接的订阅管理处理）"""
+        try:
+            # 多连接时同一条推送只处理最先到达的一次
+            if self.frame_dedup and not self.frame_dedup.accept(name, message):
+                return
+            self.message_router.dispatch(message)
         except Exception as e:
             print(f'【BR】Error processing message: {e}')
 
-    def on_error(self, ws, error):
-        """WebSocket错误处理"""
-        print(f'【BR】WebSocket Error: {error}')
-        self.stop_heartbeat()
+    def handle_top_pool(self, data):
+        """处理dex-market-v3-topPool数据：汇总各池子的流动性和代币数量"""
+        if not data['data'] or 'data' not in data['data'][0]:
+            return
+        total_liquidity = 0
+        token_amounts = {}
+        pool_details = []
 
-    def on_close(self, ws, close_status_code, close_msg):
-        """WebSocket关闭处理"""
-        print(f'【BR】WebSocket连接关闭: {close_status_code} - {close_msg}')
-        
-        self.stop_heartbeat()
-        self.current_ws = None
-        
-        if self.reconnect_count < self.MAX_RECONNECT_ATTEMPTS:
-            jitter = random.uniform(0.1, 0.5) * self.reconnect_delay
-            next_delay = min(60, self.reconnect_delay + jitter)
-            
-            print(f'【BR】将在 {next_delay:.2f} 秒后尝试重新连接... (尝试 {self.reconnect_count + 1}/{self.MAX_RECONNECT_ATTEMPTS})')
-            time.sleep(next_delay)
-            
-            self.reconnect_count += 1
-            self.reconnect_delay = min(60, self.reconnect_delay * 1.5)
-            self.connect_websocket()
+        for i, pool in enumerate(data['data'][0]['data']):
+            pool_liquidity = float(pool['liquidity'])
+            total_liquidity += pool_liquidity
+
+            pool_tokens = []
+            for token_info in pool['poolTokenInfoList']:
+                token_symbol = token_info['tokenSymbol']
+                if token_symbol != 'BR':
+                    pool_tokens.append(token_symbol)
+                token_amounts[token_symbol] = token_amounts.get(token_symbol, 0) + float(token_info['amount'])
+
+            pool_details.append({
+                'index': i + 1,
+                'liquidity': pool_liquidity,
+                'pool_address': pool.get('poolAddress', 'N/A'),
+                'tokens': pool_tokens
+            })
+
+        self.top_pool_data = {
+            'total_liquidity': total_liquidity,
+            'token_amounts': token_amounts,
+            'pool_details': pool_details
+        }
+
+    def handle_market(self, data):
+        """处理dex-market-v3数据：流动性下降检测并显示当前状态"""
+        if not data['data']:
+            return
+        market_data = data['data'][0]
+        if market_data['tokenContractAddress'].lower() != self.br_address:
+            return
+
+        # 使用topPool的流动性数据
+        if self.top_pool_data is not None:
+            liquidity = self.top_pool_data['total_liquidity']
+            token_amounts = self.top_pool_data['token_amounts']
         else:
-            print(f'【BR】达到最大重连次数 ({self.MAX_RECONNECT_ATTEMPTS})，停止重连')
-            self.reconnect_count = 0
-            self.reconnect_delay = 5
+            liquidity = float(market_data['liquidity'])
+            token_amounts = {}
+
+        liquidity_m = liquidity / 1000000
+        price = float(market_data['price'])
+        volume_5m_m = float(market_data['volume5M']) / 1000000
+
+        # 流动性下降检测（与链上数据源共用）
+        self.check_liquidity_drop('okx', liquidity_m)
+
+        # 显示当前状态
+        position_info_str = ""
+        if self.current_positions:
+            position_ids = [f"\033[93m#{pos['token_id']}\033[0m" for pos in self.current_positions]
+            position_info_str = f"  LP池子：{', '.join(position_ids)}"
+        token_amounts_str = ""
+        if token_amounts:
+            token_amounts_str = "  代币数量: " + ", ".join(
+                [f"{symbol}: {format_amount(amount)}" for symbol, amount in token_amounts.items()])
+        print(f'【BR】Time: {current_time_str()}  Liquidity: {liquidity_m:.2f}M   Price: {price:.5f}  '
+              f'Volume (5min): {volume_5m_m:.2f}M{token_amounts_str}{position_info_str}')
+
+    def handle_pool_history(self, data):
+        """处理dex-market-pool-history数据：流动性增减及KK地址的操作"""
+        pool_data = data['data']
+        if pool_data['chainId'] != '56':
+            return
+        if pool_data.get('tokenContractAddress', '').lower() != self.br_address:
+            return
+        changed_tokens = pool_data.get('changedTokenInfo', [])
+        if not changed_tokens:
+            return
+
+        token_info_str = ", ".join([f"{token['tokenSymbol']}: {float(token['amount']):.6f}" for token in changed_tokens])
+        value = float(pool_data['value'])
+        type_str = pool_data['type']
+        wallet_address = pool_data.get('userWalletAddress', '').lower()
+        wallet_name = self.wallet_names.get(wallet_address, '')
+        wallet_info = f", 钱包: {wallet_name}" if wallet_name else ""
+
+        # 检查是否是KK地址的操作
+        if wallet_address == self.kk_address:
+            if type_str == '1':
+                log_kk_alert('enter', value, token_info_str)
+                self.voice_alert.play_voice_alert("请注意，KK入场了，KK入场了")
+                alert_msg = f"KK入场警报！新增流动性\n价值: ${value:.2f}\n代币变化: {token_info_str}"
+                self.send_alert(alert_msg)
+            elif type_str == '2':
+                log_kk_alert('exit', value, token_info_str)
+                self.voice_alert.play_voice_alert("请注意，KK跑路了，KK跑路了")
+                alert_msg = f"KK跑路警报！减少流动性\n价值: ${value:.2f}\n代币变化: {token_info_str}"
+                self.send_alert(alert_msg)
+        elif type_str == '1':
+            print(f'\033[92m【BR】新增流动性 - 价值: ${value:.2f}, 代币变化: {token_info_str}{wallet_info}\033[0m')
+        elif type_str == '2':
+            print(f'\033[91m【BR】减少流动性 - 价值: ${value:.2f}, 代币变化: {token_info_str}{wallet_info}\033[0m')
+
+    def handle_trade_history(self, data):
+        """处理dex-market-trade-history-pub数据：大额卖出警报"""
+        if not isinstance(data['data'], list):
+            return
+        threshold = self.LARGE_SELL_ALERT_CONFIG['threshold']
+        for trade_info in data['data']:
+            try:
+                if trade_info.get('isBuy', '') != "0":
+                    continue
+                volume = float(trade_info.get('volume', 0))
+                # 未达到大额阈值的卖出不输出，跳过后续解析
+                if volume < threshold:
+                    continue
+                wallet = trade_info.get('userAddress', '')
+
+                br_amount = 0
+                usdt_amount = 0
+                for token_info in trade_info.get('changedTokenInfo', []):
+                    if token_info.get('tokenSymbol') == 'BR':
+                        br_amount = float(token_info.get('amount', 0))
+                    elif token_info.get('tokenSymbol') == 'USDT':
+                        usdt_amount = float(token_info.get('amount', 0))
+                if not wallet or br_amount <= 0:
+                    continue
+
+                timestamp = trade_info.get('timestamp', '')
+                if timestamp:
+                    try:
+                        trade_time = datetime.fromtimestamp(int(timestamp) / 1000).strftime('%Y-%m-%d %H:%M:%S')
+                    except Exception as e:
+                        print(f'【BR】时间戳转换错误: {e}')
+                        trade_time = current_time_str()
+                else:
+                    trade_time = current_time_str()
+
+                print(f'\033[91m【卖出】{trade_time} - {wallet} 卖出 {br_amount:.2f} BR 获得 {usdt_amount:.2f} USDT (交易量: ${volume:.2f})\033[0m')
+
+                if self.LARGE_SELL_ALERT_CONFIG['enabled']:
+                    is_kk = wallet.lower() == self.kk_address
+                    alert_msg = f"大额卖出警报！\n时间: {trade_time}\n地址: {wallet}\n卖出: {br_amount:.2f} BR\n获得: {usdt_amount:.2f} USDT\n交易量: ${volume:.2f}"
+                    # 连续大额卖出合并推送，单笔成交额翻倍升级时立即推送
+                    severity = AlertAggregator.severity_level(volume, threshold)
+                    if not self.alert_aggregator.submit('kk_large_sell' if is_kk else 'large_sell', self.br_address,
+                                                        alert_msg, value=volume, severity=severity,
+                                                        title='KK大额卖出($)' if is_kk else '大额卖出($)'):
+                        continue
+                    if is_kk:
+                        # 语音和提示音在后台播放，不阻塞消息处理
+                        self.run_background(self.play_kk_sell_alert)
+                    else:
+                        self.alert_sound()
+            except Exception as e:
+                print(f'【BR】处理交易历史数据错误: {e}')
+                continue
+
+    def handle_trade_realtime(self, data):
+        """处理dex-market-tradeRealTime数据：5分钟卖出量超过买入量时警告"""
+        if not data['data']:
+            return
+        trade_data = data['data'][0]
+        volume_diff = float(trade_data['tradeNumSell5M']) - float(trade_data['tradeNumBuy5M'])
+        if volume_diff > self.BR_CONFIG['sell_threshold']:
+            print(f'\033[91m【BR】警告：5分钟内卖出量超过买入量 {volume_diff:.2f} 个代币\033[0m')
 
     def send_heartbeat_message(self):
         """发送探活消息到serverchan"""
@@ -457,277 +701,246 @@ class BRMonitor:
             
             current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             message = f"【BR】系统运行正常\n时间: {current_time}\n{position_info}\n总流动性: {liquidity_info}"
+
+            # 多数据源的领先/滞后统计
+            merge_report = self.feed_merger.format_report()
+            if merge_report:
+                message += f"\n数据源延迟:\n{merge_report}"
+
+            # 各连接及其频道的订阅状态和最近消息时间
+            if self.ws_supervisors:
+                message += "\n连接状态:\n" + "\n".join(supervisor.format_status() for supervisor in self.ws_supervisors)
+            if self.frame_dedup:
+                message += f"\n{self.frame_dedup.format_stats()}"
+            if self.frame_recorder:
+                message += f"\n{self.frame_recorder.format_stats()}"
+
+            # 告警发送统计
+            dispatch_stats = self.alert_dispatcher.format_stats()
+            if dispatch_stats:
+                message += f"\n告警发送:\n{dispatch_stats}\n{self.alert_aggregator.format_stats()}"
+
+            # 多节点RPC连接池的路由统计
+            if self.web3_manager and self.web3_manager.get_rpc_stats():
+                message += f"\nRPC节点:\n{self.web3_manager.web3.provider.format_stats()}"
             
-            send_serverchan_alert(message, config=self.config)
+            self.send_alert(message, channels=['serverchan'])
             print(f'【BR】探活消息已发送: {message}')
         except Exception as e:
             print(f'【BR】发送探活消息失败: {e}')
 
-    def stop_heartbeat(self):
-        """停止心跳线程"""
-        self.heartbeat_running = False
-        if self.heartbeat_thread and self.heartbeat_thread.is_alive():
-            print('【BR】正在停止心跳线程...')
-            self.heartbeat_thread.join(timeout=2)
-
-    def start_heartbeat(self, ws):
-        """启动心跳线程"""
-        self.stop_heartbeat()
-        self.heartbeat_running = True
-        self.current_ws = ws
+    def check_positions(self):
+        """刷新头寸并输出变化，返回是否检查成功"""
+        if not self.web3_manager:
+            return False
+        try:
+            self.web3_manager.refresh_positions()
+            new_positions = self.web3_manager.get_current_positions()
+
+            # 按 (token_id, 流动性) 比较，流动性变化也要同步给退出流程，保证移除交易使用准确的流动性
+            old_key = [(pos['token_id'], pos['liquidity']) for pos in self.current_positions]
+            new_key = [(pos['token_id'], pos['liquidity']) for pos in new_positions]
+            if new_key != old_key:
+                if set(token_id for token_id, _ in new_key) != set(token_id for token_id, _ in old_key):
+                    log_position_change(len(self.current_positions), len(new_positions),
+                                        [str(pos['token_id']) for pos in new_positions])
+                else:
+                    print(f"【BR】头寸流动性变化: {', '.join(f'#{i} {l}' for i, l in new_key)}")
+                self.current_positions = new_positions
+
+            self.sync_exit_worker(new_positions)
+            return True
+        except Exception as e:
+            print(f'【BR】头寸检查失败: {e}')
+            return False
+
+    def start_frame_recorder(self):
+        """frame_recorder.enabled开启时启动原始消息录制"""
+        recorder_config = dict(self.config.get('frame_recorder', {}))
+        if not recorder_config.pop('enabled', False):
+            return None
+        try:
+            self.frame_recorder = FrameRecorder(recorder_config.pop('directory', 'br-auto/captures'),
+                                                **recorder_config).start()
+            print(f'【BR】📼 原始消息录制已开启: {self.frame_recorder.directory} ({self.frame_recorder.compression})')
+        except Exception as e:
+            print(f'【BR】❌ 原始消息录制启动失败: {e}')
+            self.frame_recorder = None
+        return self.frame_recorder
+
+    def stop_frame_recorder(self):
+        """写完缓存的消息后停止录制"""
+        if self.frame_recorder:
+            self.frame_recorder.stop()
+
+    def start_websockets(self):
+        """在事件循环中启动WebSocket连接协程，断开后无限重连；websocket.connections为2时同时维持两个连接"""
+        ws_config = self.config.get('websocket', {})
+        connections = ws_config.get('connections', 1)
+        self.start_frame_recorder()
+        if connections > 1:
+            self.frame_dedup = FrameDeduplicator(window=ws_config.get('dedup_window', 10))
+        for i in range(connections):
+            connection = AsyncWSConnection(
+                f'ws{i + 1}',
+                ws_config.get('url', "wss://wsdexpri.okx.com/ws/v5/ipublic"),
+                self.create_subscriptions(),
+                self.on_message,
+                # Mac系统SSL配置：不校验证书
+                ssl=False,
+                backoff=ws_config.get('backoff', 1),
+                max_backoff=ws_config.get('max_backoff', 60),
+                stable_after=ws_config.get('stable_after', 60),
+                recorder=self.frame_recorder
+            )
+            self.ws_supervisors.append(connection.start())
+
+    def stop_websockets(self):
+        """停止所有WebSocket连接"""
+        for supervisor in self.ws_supervisors:
+            supervisor.stop()
+
+    def start_services(self):
+        """输出配置，连接Web3并启动头寸、链上数据源等后台服务"""
+        msg = f'【BR】🔔 BR流动性监控系统已启动'
+        self.send_alert(msg)
+        print('【BR】🚀 启动BR流动性自动保护系统 - Mac版本...')
+        print(f'【BR】监控代币地址: {self.BR_CONFIG["address"]}')
+        print(f'【BR】流动性减少阈值: {self.BR_CONFIG["liquidity_threshold"]}M')
         
-        def heartbeat():
-            consecutive_errors = 0
-            max_consecutive_errors = 3
-            last_position_check = 0
-            position_check_interval = 300  # 5分钟检查一次头寸
-            last_heartbeat_time = time.time()
-            
-            while self.heartbeat_running:
-                try:
-                    if not self.current_ws or self.current_ws.sock is None:
-                        print('【BR】WebSocket连接已断开，停止心跳')
-                        break
-
-                    # BR代币订阅消息
-                    messages = [
-                        {
-                            "op": "unsubscribe",
-                            "args": [{
-                                "channel": "dex-market-v3",
-                                "chainId": 56,
-                                "tokenAddress": self.BR_CONFIG['address']
-                            }]
-                        },
-                        {
-                            "op": "subscribe",
-                            "args": [{
-                                "channel": "dex-market-v3",
-                                "chainId": 56,
-                                "tokenAddress": self.BR_CONFIG['address']
-                            }]
-                        },
-                        {
-                            "op": "subscribe",
-                            "args": [{
-                                "channel": "dex-market-v3-topPool",
-                                "chainId": "56",
-                                "tokenAddress": self.BR_CONFIG['address']
-                            }]
-                        },
-                        {
-                            "op": "subscribe",
-                            "args": [{
-                                "channel": "dex-market-pool-history",
-                                "extraParams": json.dumps({
-                                    "chainId": "56",
-                                    "tokenContractAddress": self.BR_CONFIG['address'],
-                                    "type": "0",
-                                    "userAddressList": [],
-                                    "volumeMin": "10000",
-                                    "volumeMax": ""
-                                })
-                            }]
-                        },
-                        {
-                            "op": "subscribe",
-                            "args": [{
-                                "channel": "dex-market-tradeRealTime",
-                                "chainId": "56",
-                                "tokenAddress": self.BR_CONFIG['address']
-                            }]
-                        },
-                        {
-                            "op": "subscribe",
-                            "args": [{
-                                "channel": "dex-market-trade-history-pub",
-                                "chainIndex": "56",
-                                "tokenContractAddress": self.BR_CONFIG['address']
-                            }]
-                        }
-                    ]
-                    
-                    for msg in messages:
-                        if not self.heartbeat_running:
-                            break
-                        self.current_ws.send(json.dumps(msg))
-                        time.sleep(0.1)
-                    
-                    consecutive_errors = 0
-                    
-                    # 检查是否需要更新头寸信息
-                    current_time = time.time()
-                    if current_time - last_position_check >= position_check_interval:
-                        if self.web3_manager:
-                            try:
-                                self.web3_manager.get_v3_positions()
-                                new_positions = self.web3_manager.get_current_positions()
-                                
-                                # 检查头寸是否有变化
-                                if len(new_positions) != len(self.current_positions):
-                                    old_count = len(self.current_positions)
-                                    self.current_positions = new_positions
-                                    new_count = len(self.current_positions)
-                                    
-                                    if new_count > old_count:
-                                        log_position_change(old_count, new_count, [str(pos['token_id']) for pos in self.current_positions])
-                                    elif new_count < old_count:
-                                        log_position_change(old_count, new_count, [str(pos['token_id']) for pos in self.current_positions])
-                                else:
-                                    # 即使数量相同，也检查token_id是否有变化
-                                    old_ids = set(pos['token_id'] for pos in self.current_positions)
-                                    new_ids = set(pos['token_id'] for pos in new_positions)
-                                    
-                                    if old_ids != new_ids:
-                                        log_position_change(len(self.current_positions), len(new_positions), [str(pos['token_id']) for pos in new_positions])
-                                        self.current_positions = new_positions
-                                
-                                last_position_check = current_time
-                            except Exception as e:
-                                print(f'【BR】头寸检查失败: {e}')
-                    
-                    for _ in range(20):
-                        if not self.heartbeat_running:
-                            break
-                        time.sleep(1)
-                        
-                        # 检查是否需要发送探活消息
-                        current_time = time.time()
-                        if current_time - last_heartbeat_time >= self.heartbeat_interval:
-                            self.send_heartbeat_message()
-                            last_heartbeat_time = current_time
-                        
-                except Exception as e:
-                    consecutive_errors += 1
-                    print(f'【BR】心跳发送错误 ({consecutive_errors}/{max_consecutive_errors}): {e}')
-                    
-                    if consecutive_errors >= max_consecutive_errors:
-                        print('【BR】连续心跳错误过多，停止心跳线程')
-                        break
-                    
-                    time.sleep(2)
-            
-            print('【BR】心跳线程已停止')
+        # 自动移除功能状态
+        auto_status = "开启" if self.BR_CONFIG['auto_remove_enabled'] else "关闭"
+        auto_color = '\033[92m' if self.BR_CONFIG['auto_remove_enabled'] else '\033[91m'
+        print(f'【BR】🛡️ 自动移除保护: {auto_color}{auto_status}\033[0m')
+        if self.BR_CONFIG['auto_remove_enabled']:
+            print(f'【BR】🚨 自动移除阈值: {self.BR_CONFIG["auto_remove_threshold"]}M')
+            print(f'【BR】⏰ 自动移除冷却时间: {self.AUTO_REMOVE_COOLDOWN}秒')
         
-        self.heartbeat_thread = threading.Thread(target=heartbeat)
-        self.heartbeat_thread.daemon = True
-        self.heartbeat_thread.start()
-
-    def on_open(self, ws):
-        """WebSocket连接建立"""
-        print('【BR】WebSocket连接已建立')
+        # 大额卖出警报状态
+        alert_status = "开启" if self.LARGE_SELL_ALERT_CONFIG['enabled'] else "关闭"
+        alert_color = '\033[92m' if self.LARGE_SELL_ALERT_CONFIG['enabled'] else '\033[91m'
+        print(f'【BR】🚨 大额卖出阈值: ${self.LARGE_SELL_ALERT_CONFIG["threshold"]:,} USDT')
+        print(f'【BR】🔔 大额卖出警报状态: {alert_color}{alert_status}\033[0m')
+        
+        print(f'【BR】特殊监控地址: {self.KK_ADDRESS} (KK)')
         
-        self.reconnect_count = 0
-        self.reconnect_delay = 5
+        # 检查钱包地址配置
+        if not self.WEB3_CONFIG['wallet_address']:
+            print('\n【BR】⚠️ 钱包地址未配置！')
+            print('【BR】📝 请在脚本中的 WEB3_CONFIG["wallet_address"] 处配置您的钱包地址')
+            print('【BR】💡 配置后重启脚本即可启用头寸查询和自动移除功能')
+            print('【BR】🔄 当前将只进行流动性监控，不进行头寸相关操作\n')
         
-        self.start_heartbeat(ws)
+        # 初始化Web3Manager
+        print('【BR】🔗 初始化Web3Manager...')
+        self.web3_manager = Web3Manager(self.config)
+        if self.web3_manager.connect():
+            print('【BR】✅ Web3连接成功')
+            # 检查当前头寸（仅在有钱包地址时）
+            if self.WEB3_CONFIG['wallet_address']:
+                self.web3_manager.refresh_positions()
+                self.current_positions = self.web3_manager.get_current_positions()
+                print(f'【BR】📊 当前USDT-BR头寸数量: {len(self.current_positions)}')
+                if self.current_positions:
+                    position_ids = [str(pos['token_id']) for pos in self.current_positions]
+                    print(f'【BR】📋 头寸编号: {", ".join(position_ids)}')
+                if self.BR_CONFIG['auto_remove_enabled'] and self.WEB3_CONFIG.get('exit_worker', False):
+                    # 独立工作进程负责发送交易（含预签名、gas预言机、预模拟），本进程只维护头寸
+                    try:
+                        self.exit_worker = ExitWorker(self.config).start()
+                        self.sync_exit_worker(self.current_positions)
+                    except Exception as e:
+                        print(f'【BR】❌ 移除交易工作进程启动失败，改为在本进程执行: {e}')
+                        self.exit_worker = None
+                if not self.exit_worker:
+                    self.start_exit_services()
+            else:
+                print('【BR】⚠️ 未配置钱包地址，跳过头寸查询')
+            mempool_enabled = self.WEB3_CONFIG.get('mempool_watcher', {}).get('enabled', False)
+            # 内存池监听依赖链上池子数据源提供价格，开启时一并启动
+            if self.WEB3_CONFIG.get('pool_feed', {}).get('enabled', False) or mempool_enabled:
+                try:
+                    self.start_pool_feed()
+                except Exception as e:
+                    print(f'【BR】❌ 链上池子数据源启动失败，仅使用OKX推送: {e}')
+                    self.pool_feed = None
+            if mempool_enabled and self.pool_feed:
+                try:
+                    self.start_mempool_watcher()
+                except Exception as e:
+                    print(f'【BR】❌ 内存池监听启动失败: {e}')
+                    self.mempool_watcher = None
+        else:
+            print('【BR】❌ Web3连接失败，将在后台重试连接')
+        # 后台维护连接状态并自动重连，移除头寸时无需再检查连接
+        self.web3_manager.start_health_monitor()
 
-    def connect_websocket(self):
-        """连接WebSocket"""
+    async def main(self):
+        """事件循环主协程：启动服务和连接，运行定时协程直到被取消或连接协程异常退出"""
+        self.loop = asyncio.get_running_loop()
+        self.alert_dispatcher.start()
         try:
-            ws = websocket.WebSocketApp(
-                "wss://wsdexpri.okx.com/ws/v5/ipublic",
-                on_message=self.on_message,
-                on_error=self.on_error,
-                on_close=self.on_close,
-                on_open=self.on_open
-            )
-            
-            self.current_ws = ws
-            
-            # Mac系统SSL配置
-            wst = threading.Thread(target=lambda: ws.run_forever(
-                sslopt={"cert_reqs": ssl.CERT_NONE, "check_hostname": False}
-            ))
-            wst.daemon = True
-            wst.start()
-            
-            return ws
-        except Exception as e:
-            print(f'【BR】创建WebSocket连接失败: {e}')
-            return None
+            await self.run_blocking(self.start_services)
 
-    def run(self):
-        """运行监控系统"""
-        try:
-            msg = f'【BR】🔔 BR流动性监控系统已启动'
-            send_wechat_work_alert(msg, config=self.config)
-            send_serverchan_alert(msg, config=self.config)
-            print('【BR】🚀 启动BR流动性自动保护系统 - Mac版本...')
-            print(f'【BR】监控代币地址: {self.BR_CONFIG["address"]}')
-            print(f'【BR】流动性减少阈值: {self.BR_CONFIG["liquidity_threshold"]}M')
-            
-            # 自动移除功能状态
-            auto_status = "开启" if self.BR_CONFIG['auto_remove_enabled'] else "关闭"
-            auto_color = '\033[92m' if self.BR_CONFIG['auto_remove_enabled'] else '\033[91m'
-            print(f'【BR】🛡️ 自动移除保护: {auto_color}{auto_status}\033[0m')
-            if self.BR_CONFIG['auto_remove_enabled']:
-                print(f'【BR】🚨 自动移除阈值: {self.BR_CONFIG["auto_remove_threshold"]}M')
-                print(f'【BR】⏰ 自动移除冷却时间: {self.AUTO_REMOVE_COOLDOWN}秒')
-            
-            # 大额卖出警报状态
-            alert_status = "开启" if self.LARGE_SELL_ALERT_CONFIG['enabled'] else "关闭"
-            alert_color = '\033[92m' if self.LARGE_SELL_ALERT_CONFIG['enabled'] else '\033[91m'
-            print(f'【BR】🚨 大额卖出阈值: ${self.LARGE_SELL_ALERT_CONFIG["threshold"]:,} USDT')
-            print(f'【BR】🔔 大额卖出警报状态: {alert_color}{alert_status}\033[0m')
-            
-            print(f'【BR】特殊监控地址: {self.KK_ADDRESS} (KK)')
-            
-            # 检查钱包地址配置
-            if not self.WEB3_CONFIG['wallet_address']:
-                print('\n【BR】⚠️ 钱包地址未配置！')
-                print('【BR】📝 请在脚本中的 WEB3_CONFIG["wallet_address"] 处配置您的钱包地址')
-                print('【BR】💡 配置后重启脚本即可启用头寸查询和自动移除功能')
-                print('【BR】🔄 当前将只进行流动性监控，不进行头寸相关操作\n')
-            
-            # 初始化Web3Manager
-            print('【BR】🔗 初始化Web3Manager...')
-            self.web3_manager = Web3Manager(self.config)
-            if self.web3_manager.connect():
-                print('【BR】✅ Web3连接成功')
-                # 检查当前头寸（仅在有钱包地址时）
-                if self.WEB3_CONFIG['wallet_address']:
-                    self.web3_manager.get_v3_positions()
-                    self.current_positions = self.web3_manager.get_current_positions()
-                    print(f'【BR】📊 当前USDT-BR头寸数量: {len(self.current_positions)}')
-                    if self.current_positions:
-                        position_ids = [str(pos['token_id']) for pos in self.current_positions]
-                        print(f'【BR】📋 头寸编号: {", ".join(position_ids)}')
-                else:
-                    print('【BR】⚠️ 未配置钱包地址，跳过头寸查询')
-            else:
-                print('【BR】❌ Web3连接失败，自动移除功能将不可用')
-            
             # 启动WebSocket监控
             print('【BR】📡 启动WebSocket监控...')
-            ws = self.connect_websocket()
-            
-            if ws:
-                print('【BR】✅ 监控系统启动成功')
-                print('【BR】🔍 开始监控流动性变化...')
-                print('【BR】💡 当流动性减少超过阈值时，系统将自动移除头寸保护资金')
-                print('【BR】🔄 系统将每5分钟自动检查头寸变化，如需立即刷新请重启脚本')
-                
-                # 发送初始探活消息
-                self.send_heartbeat_message()
-                
-                # 保持主线程运行
-                while True:
-                    time.sleep(1)
-            else:
-                print('【BR】❌ WebSocket连接失败')
-                
-        except KeyboardInterrupt:
+            self.start_websockets()
+            print(f'【BR】✅ 监控系统启动成功（{len(self.ws_supervisors)} 个WebSocket连接）')
+            print('【BR】🔍 开始监控流动性变化...')
+            print('【BR】💡 当流动性减少超过阈值时，系统将自动移除头寸保护资金')
+            print('【BR】🔄 系统将每5分钟自动检查头寸变化，如需立即刷新请重启脚本')
+
+            # 发送初始探活消息
+            await self.run_blocking(self.send_heartbeat_message)
+
+            self.tasks = [
+                asyncio.ensure_future(self.every(300, self.check_positions, blocking=True)),
+                asyncio.ensure_future(self.every(self.heartbeat_interval, self.send_heartbeat_message, blocking=True)),
+                asyncio.ensure_future(self.every(self.alert_aggregator.check_interval, self.alert_aggregator.flush))
+            ]
+            await asyncio.gather(*self.tasks, *(connection.task for connection in self.ws_supervisors))
+        except asyncio.CancelledError:
             print('\n【BR】程序被用户终止')
-            self.stop_heartbeat()
-            send_serverchan_alert("【BR】监控系统被用户手动终止", config=self.config)
+            self.send_alert("【BR】监控系统被用户手动终止", channels=['serverchan'])
         except Exception as e:
             print(f'【BR】程序异常: {e}')
-            self.stop_heartbeat()
-            send_serverchan_alert(f"【BR】监控系统异常退出: {str(e)}", config=self.config)
+            self.send_alert(f"【BR】监控系统异常退出: {str(e)}", channels=['serverchan'])
         finally:
-            # Handle normal exit case
-            send_serverchan_alert("【BR】监控系统已停止运行", config=self.config)
+            await self.shutdown()
+
+    def run(self):
+        """运行监控系统"""
+        try:
+            asyncio.run(self.main())
+        except KeyboardInterrupt:
+            pass
+
+    def stop_services(self):
+        """停止移除交易工作进程和链上数据源"""
+        if self.exit_worker:
+            # 等待工作进程退出，超时强制终止，避免留下仍持有私钥的孤儿进程
+            self.exit_worker.stop()
+            self.exit_worker = None
+        if self.mempool_watcher:
+            self.mempool_watcher.stop()
+        if self.pool_feed:
+            self.pool_feed.stop()
+
+    async def shutdown(self):
+        """取消定时协程，停止连接、后台服务和录制，推送剩余告警并关闭线程池"""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.stop_websockets()
+        await self.run_blocking(self.stop_services)
+        self.stop_frame_recorder()
+        self.send_alert("【BR】监控系统已停止运行", channels=['serverchan'])
+        # 退出前推送剩余的汇总，并等待队列中的告警发送完成
+        self.alert_aggregator.stop()
+        await self.alert_dispatcher.drain(timeout=10)
+        self.alert_dispatcher.stop()
+        self.executor.shutdown(wait=False)
+        self.alert_executor.shutdown(wait=False)
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BRMonitor运行时测试脚本 - 验证定时协程的调度、阻塞任务在线程池中执行，以及退出时取消定时协程并关闭线程池
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+
+import yaml
+from br_auto_v2 import BRMonitor
+from alert_utils.alert_dispatcher import AsyncAlertDispatcher
+
+CONFIG = {
+    'br_config': {
+        'name': 'BR',
+        'address': '0xff7d6a96ae471bbcd7713af9cb1feeb16cf56b41',
+        'liquidity_threshold': 2,
+        'auto_remove_enabled': False,
+        'auto_remove_threshold': 1,
+        'sell_threshold': 100000,
+    },
+    'web3_config': {'rpc_url': 'http://127.0.0.1:1', 'wallet_address': ''},
+    'proxy_config': {'enabled': False},
+    'large_sell_alert_config': {'enabled': False, 'threshold': 100000},
+    'wallet_names': {},
+    'kk_address': '0x' + '00' * 20,
+    'wechat_work': {'enabled': False},
+    'async_runtime': {'executor_workers': 2},
+}
+
+
+def create_monitor():
+    """使用临时配置文件创建监控器，告警记录到列表而不推送"""
+    with tempfile.NamedTemporaryFile('w', suffix='.yaml', delete=False) as f:
+        yaml.safe_dump(CONFIG, f)
+    try:
+        monitor = BRMonitor(f.name)
+    finally:
+        os.unlink(f.name)
+    sent = []
+    monitor.alert_dispatcher = AsyncAlertDispatcher({}, senders={'serverchan': lambda message: sent.append(message) or True},
+                                                    executor=monitor.executor)
+    return monitor, sent
+
+
+def test_every_schedules_and_survives_errors():
+    """按间隔重复执行，单次异常不影响之后的执行；blocking任务在线程池中执行"""
+    monitor, _ = create_monitor()
+    calls = []
+    threads = []
+
+    def flaky():
+        calls.append(len(calls))
+        if len(calls) == 2:
+            raise RuntimeError('boom')
+
+    def blocking():
+        threads.append(threading.current_thread().name)
+
+    async def run():
+        monitor.loop = asyncio.get_running_loop()
+        tasks = [asyncio.ensure_future(monitor.every(0.02, flaky)),
+                 asyncio.ensure_future(monitor.every(0.02, blocking, blocking=True))]
+        await asyncio.sleep(0.15)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    try:
+        asyncio.run(run())
+        assert len(calls) >= 4
+        assert threads and all(name.startswith('br-blocking') for name in threads)
+    finally:
+        monitor.executor.shutdown(wait=False)
+        monitor.alert_executor.shutdown(wait=False)
+
+
+def test_main_cancels_scheduled_tasks_on_shutdown():
+    """主协程被取消时取消全部定时协程，推送终止告警后关闭线程池"""
+    monitor, sent = create_monitor()
+    # 不连接Web3和WebSocket，只运行定时协程
+    monitor.start_services = lambda: None
+    monitor.start_websockets = lambda: None
+    monitor.heartbeat_interval = 0.02
+    heartbeats = []
+    monitor.send_heartbeat_message = lambda: heartbeats.append(threading.current_thread().name)
+
+    async def run():
+        main = asyncio.ensure_future(monitor.main())
+        while len(heartbeats) < 3:
+            await asyncio.sleep(0.01)
+        main.cancel()
+        await main
+
+    asyncio.run(run())
+    assert len(monitor.tasks) == 3 and all(task.cancelled() for task in monitor.tasks)
+    assert all(name.startswith('br-blocking') for name in heartbeats)
+    assert sent == ['【BR】监控系统被用户手动终止', '【BR】监控系统已停止运行']
+    try:
+        monitor.executor.submit(print)
+        assert False, '线程池应已关闭'
+    except RuntimeError:
+        pass
+
+
+def main():
+    for test in (test_every_schedules_and_survives_errors, test_main_cancels_scheduled_tasks_on_shutdown):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
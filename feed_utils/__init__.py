@@ -0,0 +1,10 @@
+# Feed utilities package
+from .drop_detector import DropDetector
+from .feed_merger import FeedMerger
+from .frame_recorder import FrameRecorder
+from .message_router import MessageRouter, max_volume_prefilter
+from .subscription_manager import SubscriptionManager
+from .ws_supervisor import FrameDeduplicator, WSSupervisor
+
+__all__ = ['DropDetector', 'FeedMerger', 'MessageRouter', 'max_volume_prefilter', 'SubscriptionManager',
+           'FrameDeduplicator', 'WSSupervisor', 'FrameRecorder']
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+asyncio版本的WebSocket连接守护 - 基于aiohttp，读取、发送和订阅检查都是同一事件循环中的协程
+
+重连、去重和订阅管理的行为与WSSupervisor相同：断开后按指数退避无限重连，每个连接使用自己的SubscriptionManager，
+连接建立时订阅全部频道，之后每check_interval秒检查订阅和ping/pong。订阅管理发出的消息放入发送队列，由发送协程写出。
+
+使用示例:
+    >>> connection = AsyncWSConnection('ws1', url, subscriptions, on_message)
+    >>> connection.start()  # 在事件循环中调用
+"""
+
+import asyncio
+import random
+import time
+
+import aiohttp
+
+from .ws_supervisor import WSSupervisor
+
+
+class AsyncWSConnection(WSSupervisor):
+    """在事件循环中维持一个WebSocket连接并无限重连"""
+
+    def __init__(self, name, url, subscriptions, on_message, ssl=True, **kwargs):
+        """
+        初始化连接
+
+        Args:
+            name (str): 连接名称，用于日志和去重
+            url (str): WebSocket地址
+            subscriptions (SubscriptionManager): 该连接的订阅管理
+            on_message (callable): 数据消息回调 on_message(name, message)，在事件循环中执行
+            ssl: 传给aiohttp的SSL参数，默认校验证书，False表示不校验
+            **kwargs: backoff / max_backoff / stable_after / check_interval / recorder，同WSSupervisor
+        """
+        super().__init__(name, url, subscriptions, on_message, **kwargs)
+        self.ssl = ssl
+        self.task = None
+
+    async def _write(self, ws, outbox):
+        """发送协程：写出订阅管理放入队列的消息"""
+        while True:
+            await ws.send_str(await outbox.get())
+
+    async def _check(self, ws):
+        """订阅检查协程，pong超时时关闭连接触发重连"""
+        while True:
+            await asyncio.sleep(self.check_interval)
+            if not self.subscriptions.check():
+                print(f'【BR】⚠️ {self.name} 未收到pong，关闭连接重新连接')
+                await ws.close()
+                return
+
+    async def _connect(self, session):
+        async with session.ws_connect(self.url, ssl=self.ssl) as ws:
+            self.ws = ws
+            print(f'【BR】WebSocket连接已建立 ({self.name})')
+            outbox = asyncio.Queue()
+            self.subscriptions.set_sender(outbox.put_nowait)
+            self.subscriptions.subscribe_all()
+            self.connected = True
+            self.connected_at = time.time()
+            self.stats['connects'] += 1
+            tasks = [asyncio.ensure_future(self._write(ws, outbox)), asyncio.ensure_future(self._check(ws))]
+            try:
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        self._on_message(ws, msg.data)
+                    elif msg.type == aiohttp.WSMsgType.BINARY:
+                        self._on_message(ws, msg.data.decode())
+                    elif msg.type == aiohttp.WSMsgType.ERROR:
+                        print(f'【BR】WebSocket Error ({self.name}): {ws.exception()}')
+                        break
+            finally:
+                for task in tasks:
+                    task.cancel()
+            print(f'【BR】WebSocket连接关闭 ({self.name}): {ws.close_code}')
+
+    async def run(self):
+        """连接循环：断开后按指数退避重连，不限次数"""
+        attempt = 0
+        async with aiohttp.ClientSession() as session:
+            while self.running:
+                try:
+                    await self._connect(session)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f'【BR】WebSocket连接异常 ({self.name}): {e}')
+                if self.connected:
+                    self.stats['disconnects'] += 1
+                    if time.time() - self.connected_at >= self.stable_after:
+                        attempt = 0
+                self.connected = False
+                if not self.running:
+                    break
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(1, 1.5)
+                attempt += 1
+                print(f'【BR】{self.name} 将在 {delay:.2f} 秒后重新连接 (第 {attempt} 次)')
+                await asyncio.sleep(delay)
+
+    def start(self):
+        """在当前事件循环中启动连接协程"""
+        if self.running:
+            return self
+        self.running = True
+        self.task = asyncio.ensure_future(self.run())
+        return self
+
+    def stop(self):
+        """停止重连并取消连接协程"""
+        self.running = False
+        if self.task:
+            self.task.cancel()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流动性下降检测 - 多个滑动窗口同时维护窗口内最大值，O(1)均摊更新
+
+每个窗口用单调递减队列维护窗口内的流动性最大值：新样本入队时弹出队尾所有不大于它的样本，
+过期样本从队首移出，队首即窗口内最大值及其时间戳。窗口可以按时间（seconds）或按样本数（samples）定义，
+各自配置告警阈值和自动移除阈值。
+
+队列只按窗口淘汰样本，不设长度上限（按长度截断会丢掉队首的峰值）：按样本数的窗口最多保留samples个样本，
+按时间的窗口最多保留 seconds × 样本频率 个样本（只有流动性在窗口内持续下降时才会达到）。
+
+默认窗口与原有检测逻辑一致：最近10个样本（告警/自动移除）和2分钟（自动移除）。
+
+使用示例:
+    >>> detector = DropDetector([
+    ...     {'name': '10秒', 'seconds': 10, 'auto_threshold': 0.5},
+    ...     {'name': '2分钟', 'seconds': 120, 'alert_threshold': 2, 'auto_threshold': 1},
+    ... ])
+    >>> result = detector.update(9.1)
+    >>> if result['auto']:
+    ...     print(result['auto']['window'], result['auto']['peak'], result['auto']['peak_time'])
+"""
+
+import itertools
+import time
+from collections import deque
+
+
+class DropWindow:
+    """单个滑动窗口的最大值"""
+
+    def __init__(self, name, seconds=None, samples=None, alert_threshold=None, auto_threshold=None):
+        """
+        初始化滑动窗口
+
+        Args:
+            name (str): 窗口名称，用于日志和告警
+            seconds (float): 按时间定义的窗口长度（秒）
+            samples (int): 按样本数定义的窗口长度（包含当前样本）
+            alert_threshold (float): 窗口内下降超过该值（M）时告警，None表示不告警
+            auto_threshold (float): 窗口内下降超过该值（M）时自动移除，None表示不触发
+        """
+        if seconds is None and samples is None:
+            raise ValueError(f'窗口 {name} 需要配置seconds或samples')
+        self.name = name
+        self.seconds = seconds
+        self.samples = samples
+        self.alert_threshold = alert_threshold
+        self.auto_threshold = auto_threshold
+        # (序号, 时间戳, 流动性)，流动性从队首到队尾单调递减
+        self.queue = deque()
+
+    def push(self, index, timestamp, value):
+        """加入新样本并移出过期样本，返回窗口内最大值 (序号, 时间戳, 流动性)"""
+        queue = self.queue
+        while queue and queue[-1][2] <= value:
+            queue.pop()
+        queue.append((index, timestamp, value))
+        if self.seconds is not None:
+            while queue[0][1] < timestamp - self.seconds:
+                queue.popleft()
+        if self.samples is not None:
+            while queue[0][0] <= index - self.samples:
+                queue.popleft()
+        return queue[0]
+
+
+class DropDetector:
+    """单个数据源的流动性下降检测"""
+
+    DEFAULT_WINDOWS = [
+        {'name': '最近10次', 'samples': 10, 'alert_threshold': 'liquidity_threshold',
+         'auto_threshold': 'auto_remove_threshold'},
+        {'name': '2分钟', 'seconds': 120, 'auto_threshold': 'auto_remove_threshold'},
+    ]
+
+    def __init__(self, windows, warmup=10):
+        """
+        初始化下降检测
+
+        Args:
+            windows (list): 窗口配置列表，字段同DropWindow
+            warmup (int): 前多少个样本只用于预热，不触发检测
+        """
+        self.windows = [DropWindow(**window) for window in windows]
+        self.warmup = warmup
+        self.index = itertools.count(1)
+        self.count = 0
+
+    @classmethod
+    def from_config(cls, br_config, **kwargs):
+        """按br_config创建：drop_windows未配置时使用默认窗口，阈值可以引用br_config中的字段名"""
+        windows = []
+        for window in br_config.get('drop_windows') or cls.DEFAULT_WINDOWS:
+            window = dict(window)
+            for key in ('alert_threshold', 'auto_threshold'):
+                if isinstance(window.get(key), str):
+                    window[key] = br_config[window[key]]
+            windows.append(window)
+        return cls(windows, **kwargs)
+
+    def update(self, value, timestamp=None):
+        """加入新样本并检测下降
+
+        Args:
+            value (float): 当前流动性（M）
+            timestamp (float): 样本时间，默认当前时间
+
+        Returns:
+            dict: {'current', 'time', 'drops', 'alert', 'auto'}。drops为每个窗口的下降详情
+                {'window', 'peak', 'peak_time', 'drop', 'threshold'}；alert/auto为超过对应阈值且下降最大的窗口，
+                没有时为None。预热期间返回None
+        """
+        now = time.time() if timestamp is None else timestamp
+        index = next(self.index)
+        self.count += 1
+        peaks = [window.push(index, now, value) for window in self.windows]
+        if self.count <= self.warmup:
+            return None
+
+        drops, alert, auto = [], None, None
+        for window, (_, peak_time, peak) in zip(self.windows, peaks):
+            drop = {'window': window.name, 'peak': peak, 'peak_time': peak_time, 'drop': peak - value}
+            drops.append(drop)
+            if window.auto_threshold is not None and drop['drop'] > window.auto_threshold:
+                if auto is None or drop['drop'] > auto['drop']:
+                    auto = dict(drop, threshold=window.auto_threshold)
+            if window.alert_threshold is not None and drop['drop'] > window.alert_threshold:
+                if alert is None or drop['drop'] > alert['drop']:
+                    alert = dict(drop, threshold=window.alert_threshold)
+        return {'current': value, 'time': now, 'drops': drops, 'alert': alert, 'auto': auto}
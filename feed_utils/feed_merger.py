@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多数据源合并 - 识别不同数据源报告的同一次流动性变化，按最先到达的数据源处理，并统计各数据源的领先/滞后时间
+
+每个数据源的流动性变化超过min_move时记为一次变动。其他数据源在window秒内报告方向相同、幅度相近
+（相对差不超过tolerance）的变动时视为同一事件，记录两者到达时间差：先到达的数据源记一次领先，
+后到达的记一次滞后。window内没有被其他数据源确认的变动记为未匹配。
+
+同一事件的告警/自动移除只由最先检测到的数据源执行，后到达的数据源通过claim()得知已被处理。
+claim按observe()返回的event_id去重，window内幅度不同的另一次变动是新的事件，不会被前一次的处理吞掉。
+内存池等预告变动的数据源通过observe_move()直接登记变动幅度，链上随后报告的同一次变动与之匹配。
+
+使用示例:
+    >>> merger = FeedMerger(window=30, min_move=0.05)
+    >>> merger.observe('chain', 9.2)
+    >>> merger.observe('okx', 9.21)  # {'event_id': 1, 'first': False, 'leader': 'chain', 'lag': 2.1}
+    >>> print(merger.format_report())
+"""
+
+import itertools
+import math
+import threading
+import time
+from collections import deque
+
+
+def percentile(samples, q):
+    """最近秩法计算分位数，samples为空时返回None"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class FeedMerger:
+    """合并多个流动性数据源的事件，统计数据源间的延迟"""
+
+    def __init__(self, window=30, min_move=0.05, tolerance=0.3, max_samples=1000):
+        """
+        初始化多数据源合并
+
+        Args:
+            window (float): 同一事件在不同数据源之间的最大到达时间差（秒）
+            min_move (float): 记为一次变动的最小流动性变化（M）
+            tolerance (float): 两个数据源的变动幅度允许的相对差
+            max_samples (int): 每个数据源保留的延迟样本数
+        """
+        self.window = window
+        self.min_move = min_move
+        self.tolerance = tolerance
+        self.max_samples = max_samples
+        self.last_values = {}
+        self.pending = deque()
+        # event_id -> {kind: {'source', 'time'}}，事件过期时一并清理
+        self.claims = {}
+        # 数据源 -> 最近参与的事件id
+        self.current_events = {}
+        self.stats = {}
+        self.event_ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def _source_stats(self, source):
+        return self.stats.setdefault(source, {
+            'moves': 0,
+            'first': 0,
+            'unmatched': 0,
+            'lead': deque(maxlen=self.max_samples),
+            'lag': deque(maxlen=self.max_samples)
+        })
+
+    def _expire(self, now):
+        """清理超出时间窗口的变动，未被其他数据源确认的记为未匹配"""
+        while self.pending and now - self.pending[0]['time'] > self.window:
+            event = self.pending.popleft()
+            self.claims.pop(event['id'], None)
+            if not event['sources'] - {event['leader']}:
+                self._source_stats(event['leader'])['unmatched'] += 1
+
+    def _matches(self, event, move):
+        if (event['move'] > 0) != (move > 0):
+            return False
+        return abs(event['move'] - move) <= self.tolerance * max(abs(event['move']), abs(move))
+
+    def observe(self, source, value, timestamp=None):
+        """记录一个数据源的最新流动性
+
+        Args:
+            source (str): 数据源名称
+            value (float): 流动性（M）
+            timestamp (float): 到达时间，默认当前时间
+
+        Returns:
+            dict: 产生变动时返回 {'event_id', 'first', 'leader', 'lag'}，first表示该数据源最先报告此事件；
+                未产生变动时返回None
+        """
+        now = time.time() if timestamp is None else timestamp
+        with self.lock:
+            self._expire(now)
+            previous = self.last_values.get(source)
+            self.last_values[source] = value
+            if previous is None or abs(value - previous) < self.min_move:
+                return None
+            return self._record(source, value - previous, now)
+
+    def observe_move(self, source, move, timestamp=None):
+        """直接记录一个数据源报告的流动性变化（如内存池中待上链的撤池交易），返回值同observe"""
+        now = time.time() if timestamp is None else timestamp
+        with self.lock:
+            self._expire(now)
+            if abs(move) < self.min_move:
+                return None
+            return self._record(source, move, now)
+
+    def _record(self, source, move, now):
+        """与其他数据源的待匹配变动比对，匹配时并入同一事件，否则新建事件"""
+        stats = self._source_stats(source)
+        stats['moves'] += 1
+
+        for event in self.pending:
+            if source in event['sources'] or not self._matches(event, move):
+                continue
+            event['sources'].add(source)
+            self.current_events[source] = event['id']
+            lag = now - event['time']
+            stats['lag'].append(lag)
+            self._source_stats(event['leader'])['lead'].append(lag)
+            return {'event_id': event['id'], 'first': False, 'leader': event['leader'], 'lag': lag}
+
+        event = {'id': next(self.event_ids), 'time': now, 'move': move, 'leader': source, 'sources': {source}}
+        self.pending.append(event)
+        self.current_events[source] = event['id']
+        stats['first'] += 1
+        return {'event_id': event['id'], 'first': True, 'leader': source, 'lag': 0}
+
+    def claim(self, kind, source, event_id=None, timestamp=None):
+        """申请处理一次事件的一类动作（如告警、自动移除）
+
+        Args:
+            kind (str): 动作类型
+            source (str): 申请的数据源
+            event_id (int): observe()返回的事件id，默认为该数据源最近参与且未过期的事件
+
+        Returns:
+            tuple: 同一事件已由其他数据源处理过同类动作时返回 (False, 先处理的数据源, 领先时间)，
+                否则记录本次处理并返回 (True, source, 0)。同一数据源重复申请、或没有对应事件时总是成功。
+        """
+        now = time.time() if timestamp is None else timestamp
+        with self.lock:
+            self._expire(now)
+            if event_id is None:
+                event_id = self.current_events.get(source)
+            if event_id is None or not any(event['id'] == event_id for event in self.pending):
+                return True, source, 0
+            claims = self.claims.setdefault(event_id, {})
+            claimed = claims.get(kind)
+            if claimed and claimed['source'] != source:
+                return False, claimed['source'], now - claimed['time']
+            claims[kind] = {'source': source, 'time': now}
+            return True, source, 0
+
+    def report(self):
+        """各数据源的领先/滞后统计（秒）"""
+        with self.lock:
+            report = {}
+            for source, stats in self.stats.items():
+                report[source] = {
+                    'moves': stats['moves'],
+                    'first': stats['first'],
+                    'unmatched': stats['unmatched'],
+                    'lead': {f'p{q}': percentile(stats['lead'], q) for q in (50, 95, 99)},
+                    'lag': {f'p{q}': percentile(stats['lag'], q) for q in (50, 95, 99)}
+                }
+            return report
+
+    def format_report(self):
+        """格式化统计，用于日志和探活消息"""
+        def fmt(values):
+            if values['p50'] is None:
+                return '-'
+            return '/'.join(f'{values[q]:.2f}' for q in ('p50', 'p95', 'p99')) + 's'
+
+        lines = []
+        for source, stats in self.report().items():
+            lines.append(f"{source}: 变动 {stats['moves']} 首先 {stats['first']} 未匹配 {stats['unmatched']} "
+                         f"领先(p50/p95/p99) {fmt(stats['lead'])} 滞后 {fmt(stats['lag'])}")
+        return '\n'.join(lines)
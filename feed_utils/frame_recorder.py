@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebSocket原始消息录制 - 把收到的每一条消息追加写入按时间轮转的压缩文件，用于事后回放和排查
+
+record()只把消息和接收时间（time.monotonic_ns）放入有界队列，不做任何IO，队列满时丢弃并计数，不阻塞消息处理。
+后台线程批量取出消息，每行写入一条JSON：
+
+    [接收时间(monotonic纳秒), 连接名称, 原始消息]
+
+每个文件第一行为 {"type": "header", "wall_time": ..., "monotonic_ns": ...}，用于把monotonic时间换算为实际时间；
+发生丢弃时写入 {"type": "dropped", "count": ..., "monotonic_ns": ...}，回放时可以看到缺口。
+
+文件按rotate_minutes或rotate_mb轮转，超过retention_days的文件自动删除。压缩默认使用gzip，
+安装了zstandard时可使用zstd（未安装时退回gzip）。
+
+使用示例:
+    >>> recorder = FrameRecorder('br-auto/captures').start()
+    >>> recorder.record(message, 'ws1')  # 在on_message中调用
+    >>> recorder.stop()
+"""
+
+import gzip
+import io
+import json
+import os
+import queue
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class FrameRecorder:
+    """原始消息录制
+
+    Attributes:
+        stats (dict): recorded / dropped / written / bytes / files
+    """
+
+    def __init__(self, directory, compression='gzip', level=None, rotate_minutes=60, rotate_mb=100,
+                 retention_days=7, max_queue=10000, batch_size=1000, flush_interval=5, prefix='frames'):
+        """
+        初始化录制
+
+        Args:
+            directory (str): 录制文件目录，不存在时创建
+            compression (str): gzip 或 zstd
+            level (int): 压缩级别，默认gzip为6、zstd为3
+            rotate_minutes (float): 每个文件最长记录时间（分钟）
+            rotate_mb (float): 每个文件最大的未压缩数据量（MB）
+            retention_days (float): 保留最近多少天的文件，None表示不删除
+            max_queue (int): 内存中最多缓存的消息数，超出时丢弃
+            batch_size (int): 后台线程每次最多写入的消息数
+            flush_interval (float): 写入缓冲刷新到磁盘的间隔（秒）
+            prefix (str): 文件名前缀
+        """
+        if compression == 'zstd' and zstandard is None:
+            print('【BR】⚠️ 未安装zstandard，录制改用gzip压缩')
+            compression = 'gzip'
+        self.directory = directory
+        self.compression = compression
+        self.level = level if level is not None else (3 if compression == 'zstd' else 6)
+        self.rotate_seconds = rotate_minutes * 60
+        self.rotate_bytes = rotate_mb * 1024 * 1024
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.prefix = prefix
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stats = {'recorded': 0, 'dropped': 0, 'written': 0, 'bytes': 0, 'files': 0}
+        # record()可能在多个连接的线程中同时调用，recorded/dropped计数需要加锁；其余统计只由写入线程更新
+        self.lock = threading.Lock()
+        self.reported_drops = 0
+        self.file = None
+        self.path = None
+        self.opened_at = 0
+        self.file_bytes = 0
+        self.running = False
+        self.thread = None
+
+    def record(self, message, source=''):
+        """缓存一条消息，立即返回；队列已满时丢弃"""
+        try:
+            self.queue.put_nowait((time.monotonic_ns(), source, message))
+            key = 'recorded'
+        except queue.Full:
+            key = 'dropped'
+        with self.lock:
+            self.stats[key] += 1
+
+    def _open(self):
+        """打开新的录制文件并写入时间基准"""
+        os.makedirs(self.directory, exist_ok=True)
+        suffix = 'zst' if self.compression == 'zstd' else 'gz'
+        name = f"{self.prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{self.stats['files'] + 1}.jsonl.{suffix}"
+        self.path = os.path.join(self.directory, name)
+        if self.compression == 'zstd':
+            self.file = zstandard.ZstdCompressor(level=self.level).stream_writer(open(self.path, 'ab'))
+        else:
+            self.file = gzip.open(self.path, 'ab', compresslevel=self.level)
+        self.opened_at = time.time()
+        self.file_bytes = 0
+        self.stats['files'] += 1
+        self._write_line({'type': 'header', 'wall_time': time.time(), 'monotonic_ns': time.monotonic_ns()})
+        self._cleanup()
+
+    def _close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def _cleanup(self):
+        """删除超过保留时间的录制文件"""
+        if self.retention_days is None:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith(self.prefix + '-') and path != self.path and os.path.getmtime(path) < cutoff:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f'【BR】删除录制文件失败: {e}')
+
+    def _write_line(self, item):
+        data = (json.dumps(item, ensure_ascii=False) + '\n').encode()
+        self.file.write(data)
+        self.file_bytes += len(data)
+        self.stats['bytes'] += len(data)
+
+    def _write_batch(self, batch):
+        if self.file is None or time.time() - self.opened_at >= self.rotate_seconds \
+                or self.file_bytes >= self.rotate_bytes:
+            self._close()
+            self._open()
+        with self.lock:
+            dropped = self.stats['dropped']
+        if dropped > self.reported_drops:
+            self._write_line({'type': 'dropped', 'count': dropped - self.reported_drops,
+                              'monotonic_ns': time.monotonic_ns()})
+            self.reported_drops = dropped
+        for item in batch:
+            if isinstance(item[2], bytes):
+                item = (item[0], item[1], item[2].decode(errors='replace'))
+            self._write_line(item)
+        self.stats['written'] += len(batch)
+
+    def _drain(self, timeout):
+        """取出一批消息，没有消息时最多等待timeout秒"""
+        batch = []
+        try:
+            batch.append(self.queue.get(timeout=timeout))
+            while len(batch) < self.batch_size:
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _loop(self):
+        last_flush = time.time()
+        while self.running or not self.queue.empty():
+            try:
+                batch = self._drain(timeout=self.flush_interval if self.running else 0)
+                if batch:
+                    self._write_batch(batch)
+                if self.file is not None and time.time() - last_flush >= self.flush_interval:
+                    self.file.flush()
+                    last_flush = time.time()
+            except Exception as e:
+                print(f'【BR】录制写入失败: {e}')
+                self._close()
+                time.sleep(1)
+        self._close()
+
+    def start(self):
+        """启动写入线程"""
+        if self.running:
+            return self
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name='frame-recorder')
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        """写完队列中的消息后关闭文件"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=timeout)
+
+    def format_stats(self):
+        """格式化统计，用于探活消息"""
+        return (f"录制: 接收 {self.stats['recorded']} 写入 {self.stats['written']} 丢弃 {self.stats['dropped']} "
+                f"文件 {self.stats['files']} 原始数据 {self.stats['bytes'] / 1024 / 1024:.1f}MB ({self.compression})")
+
+    @staticmethod
+    def read(path):
+        """读取录制文件，逐行返回解析后的记录（用于回放和排查）"""
+        if path.endswith('.zst'):
+            if zstandard is None:
+                raise ImportError('读取zstd录制文件需要安装zstandard')
+            with open(path, 'rb') as f:
+                reader = io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True),
+                                          encoding='utf-8')
+                for line in reader:
+                    yield json.loads(line)
+        else:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    yield json.loads(line)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebSocket消息路由 - 按频道分发OKX推送，在完整解析之前过滤无关消息
+
+OKX推送的格式为 {"arg": {"channel": ..., "chainId": ..., "tokenAddress": ...}, "data": ...}。
+路由只截取并解析很小的arg对象，频道未注册、链或代币不匹配、订阅确认等不含data的消息
+在解析data之前直接丢弃；需要处理的消息才完整解析并交给对应频道的处理函数。
+注册频道时可提供预过滤函数，直接在原始文本上判断消息是否值得解析（如交易明细中没有达到大额阈值的成交时整条跳过）。
+
+安装了orjson时使用orjson解析，否则使用标准库json。
+
+使用示例:
+    >>> router = MessageRouter(chain_id='56', token_address=br_address)
+    >>> router.register('dex-market-v3', handle_market)
+    >>> router.dispatch(message)
+"""
+
+import json
+import re
+import time
+
+try:
+    import orjson
+    loads = orjson.loads
+    JSON_BACKEND = 'orjson'
+except ImportError:
+    loads = json.loads
+    JSON_BACKEND = 'json'
+
+ARG_KEY = '"arg":'
+VOLUME_PATTERN = re.compile(r'"volume"\s*:\s*"?([0-9.eE+-]+)')
+
+
+def max_volume_prefilter(threshold):
+    """创建预过滤函数：消息中没有成交额达到threshold的交易时跳过（找不到成交额字段时不跳过）"""
+    def prefilter(message):
+        volumes = VOLUME_PATTERN.findall(message)
+        if not volumes:
+            return True
+        try:
+            return max(float(volume) for volume in volumes) >= threshold
+        except ValueError:
+            return True
+    return prefilter
+
+
+class MessageRouter:
+    """按频道分发WebSocket消息
+
+    Attributes:
+        counts (dict): 消息统计，received / skipped / dispatched / errors
+        handler_time (dict): 每个频道处理函数的累计耗时（秒）
+    """
+
+    def __init__(self, chain_id='56', token_address=None, on_error=None):
+        """
+        初始化消息路由
+
+        Args:
+            chain_id (str): 只处理该链的消息
+            token_address (str): 只处理该代币的消息（arg中不带代币地址的频道由处理函数自行过滤）
+            on_error (callable): 处理函数抛出异常时的回调 on_error(channel, exception)
+        """
+        self.chain_id = str(chain_id)
+        self.token_address = token_address.lower() if token_address else None
+        self.on_error = on_error
+        self.handlers = {}
+        self.prefilters = {}
+        self.counts = {'received': 0, 'skipped': 0, 'dispatched': 0, 'errors': 0}
+        self.handler_time = {}
+
+    def register(self, channel, handler, prefilter=None):
+        """注册频道处理函数
+
+        Args:
+            channel (str): 频道名称
+            handler (callable): handler(frame)，frame为完整解析后的消息
+            prefilter (callable): 可选，prefilter(message) 在原始文本上判断是否需要解析，返回False时跳过
+        """
+        self.handlers[channel] = handler
+        if prefilter:
+            self.prefilters[channel] = prefilter
+        self.handler_time.setdefault(channel, 0.0)
+
+    def _parse_arg(self, message):
+        """只解析消息中的arg对象（arg只包含字符串/数字字段），无法截取时返回None"""
+        start = message.find(ARG_KEY)
+        if start < 0:
+            return None
+        start = message.find('{', start + len(ARG_KEY))
+        end = message.find('}', start)
+        if start < 0 or end < 0:
+            return None
+        try:
+            return loads(message[start:end + 1])
+        except ValueError:
+            return None
+
+    def accepts(self, arg):
+        """根据arg判断消息是否需要处理"""
+        if arg.get('channel') not in self.handlers:
+            return False
+        chain_id = arg.get('chainId', arg.get('chainIndex'))
+        if chain_id is not None and str(chain_id) != self.chain_id:
+            return False
+        token_address = arg.get('tokenAddress') or arg.get('tokenContractAddress')
+        if self.token_address and token_address and token_address.lower() != self.token_address:
+            return False
+        return True
+
+    def dispatch(self, message):
+        """分发一条消息，返回是否交给了处理函数"""
+        self.counts['received'] += 1
+        if isinstance(message, bytes):
+            message = message.decode()
+        # 心跳回复（pong）等非JSON对象消息
+        if not message.startswith('{') or '"data"' not in message:
+            self.counts['skipped'] += 1
+            return False
+
+        arg = self._parse_arg(message)
+        if arg is not None:
+            prefilter = self.prefilters.get(arg.get('channel'))
+            if not self.accepts(arg) or (prefilter and not prefilter(message)):
+                self.counts['skipped'] += 1
+                return False
+
+        frame = loads(message)
+        if arg is None:
+            arg = frame.get('arg')
+            if not isinstance(arg, dict) or not self.accepts(arg):
+                self.counts['skipped'] += 1
+                return False
+        if 'data' not in frame:
+            self.counts['skipped'] += 1
+            return False
+
+        channel = arg['channel']
+        started = time.perf_counter()
+        try:
+            self.handlers[channel](frame)
+        except Exception as e:
+            self.counts['errors'] += 1
+            if self.on_error:
+                self.on_error(channel, e)
+            else:
+                raise
+        finally:
+            self.handler_time[channel] += time.perf_counter() - started
+        self.counts['dispatched'] += 1
+        return True
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebSocket订阅管理 - 连接建立时订阅一次，之后只重新订阅失效的频道
+
+- 记录每个频道的订阅状态：pending（已发送未确认）/ active（已确认）/ rejected（被拒绝）
+- 订阅确认超时或被拒绝的频道重新订阅，连续失败时等待时间从retry_delay起翻倍，最长max_retry_delay秒
+- 未收到确认但已收到该频道数据时视为订阅成功
+- 已确认的频道超过stale_after秒没有收到数据时视为失效，先取消订阅再重新订阅
+- 连接空闲ping_interval秒时发送ping，pong_timeout秒内没有收到pong时判定连接已断开
+- 每个频道最近一条数据消息的时间在observe()中记录（只截取消息开头的channel字段），每个连接各自统计
+
+使用示例:
+    >>> manager = SubscriptionManager(ws.send, stale_after={'dex-market-v3': 60})
+    >>> manager.add('dex-market-v3', {'channel': 'dex-market-v3', 'chainId': 56, 'tokenAddress': address})
+    >>> manager.subscribe_all()
+    >>> if manager.observe(message):  # 在on_message中先处理pong和订阅确认
+    ...     return
+    >>> if not manager.check():  # 在心跳线程中每秒调用
+    ...     ws.close()
+"""
+
+import json
+import re
+import threading
+import time
+
+CHANNEL_PATTERN = re.compile(r'"channel"\s*:\s*"([^"]+)"')
+
+
+class SubscriptionManager:
+    """跟踪订阅确认和频道数据时间，按需重新订阅
+
+    Attributes:
+        subscriptions (dict): 频道 -> {'arg', 'state', 'sent', 'acked', 'failures', 'resubscribes', 'error'}
+        last_seen (dict): 频道 -> 最近一条数据消息的时间
+    """
+
+    def __init__(self, send=None, stale_after=None, default_stale_after=600, ack_timeout=10,
+                 retry_delay=5, max_retry_delay=300, ping_interval=20, pong_timeout=10):
+        """
+        初始化订阅管理
+
+        Args:
+            send (callable): 发送文本帧 send(text)，重连时通过set_sender更换
+            stale_after (dict): 按频道配置的失效时间（秒），None表示不检查该频道
+            default_stale_after (float): 未单独配置的频道的失效时间（秒），None表示不检查
+            ack_timeout (float): 订阅确认超时（秒）
+            retry_delay (float): 订阅确认超时或被拒绝后重新订阅的初始等待时间（秒）
+            max_retry_delay (float): 连续失败时重新订阅等待时间的上限（秒）
+            ping_interval (float): 连接空闲多久后发送ping（秒）
+            pong_timeout (float): 发送ping后等待pong的时间（秒）
+        """
+        self.send = send
+        self.last_seen = {}
+        self.stale_after = stale_after or {}
+        self.default_stale_after = default_stale_after
+        self.ack_timeout = ack_timeout
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.ping_interval = ping_interval
+        self.pong_timeout = pong_timeout
+        self.subscriptions = {}
+        self.last_received = time.time()
+        self.ping_sent = None
+        self.lock = threading.Lock()
+
+    def add(self, channel, arg):
+        """登记一个频道的订阅参数"""
+        self.subscriptions[channel] = {'arg': arg, 'state': 'idle', 'sent': 0, 'acked': None, 'failures': 0,
+                                       'resubscribes': 0, 'error': None}
+
+    def set_sender(self, send):
+        """新连接建立时更换发送函数并重置连接状态"""
+        with self.lock:
+            self.send = send
+            self.last_received = time.time()
+            self.ping_sent = None
+            for subscription in self.subscriptions.values():
+                subscription.update(state='idle', failures=0)
+
+    def _send(self, op, channel):
+        self.send(json.dumps({'op': op, 'args': [self.subscriptions[channel]['arg']]}))
+
+    def _subscribe(self, channel, now, unsubscribe=False):
+        subscription = self.subscriptions[channel]
+        if unsubscribe:
+            self._send('unsubscribe', channel)
+        self._send('subscribe', channel)
+        if subscription['state'] != 'idle':
+            subscription['resubscribes'] += 1
+        subscription.update(state='pending', sent=now)
+
+    def subscribe_all(self):
+        """订阅所有频道（连接建立时调用）"""
+        now = time.time()
+        with self.lock:
+            for channel in self.subscriptions:
+                self._subscribe(channel, now)
+
+    def observe(self, message):
+        """记录收到的消息，处理pong和订阅确认/错误，返回是否为控制消息（无需再分发）"""
+        now = time.time()
+        self.last_received = now
+        if message == 'pong':
+            self.ping_sent = None
+            return True
+        if not message.startswith('{"event"'):
+            match = CHANNEL_PATTERN.search(message, 0, 200)
+            if match:
+                self.last_seen[match.group(1)] = now
+            return False
+        try:
+            event = json.loads(message)
+        except ValueError:
+            return True
+        with self.lock:
+            channel = (event.get('arg') or {}).get('channel')
+            if event.get('event') == 'subscribe' and channel in self.subscriptions:
+                self.subscriptions[channel].update(state='active', acked=now, failures=0, error=None)
+            elif event.get('event') == 'error':
+                error = f"{event.get('code')} {event.get('msg')}"
+                print(f'【BR】⚠️ 订阅失败: {error}')
+                # 错误消息通常不带arg，无法对应频道时视为所有未确认的订阅都被拒绝
+                channels = [channel] if channel in self.subscriptions else [
+                    name for name, subscription in self.subscriptions.items() if subscription['state'] == 'pending']
+                for name in channels:
+                    self.subscriptions[name].update(state='rejected', sent=now, error=error)
+                    self.subscriptions[name]['failures'] += 1
+        return True
+
+    def _stale_after(self, channel):
+        return self.stale_after.get(channel, self.default_stale_after)
+
+    def _retry_after(self, subscription):
+        return min(self.retry_delay * 2 ** max(subscription['failures'] - 1, 0), self.max_retry_delay)
+
+    def check(self, now=None):
+        """检查订阅和连接状态（心跳线程中定期调用）
+
+        重新订阅确认超时、被拒绝或数据失效的频道，空闲时发送ping。
+
+        Returns:
+            bool: 连接是否存活，pong超时时返回False，调用方应关闭连接重连
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            if self.ping_sent is not None and now - self.ping_sent > self.pong_timeout:
+                return False
+            if self.ping_sent is None and now - self.last_received >= self.ping_interval:
+                self.send('ping')
+                self.ping_sent = now
+
+            for channel, subscription in self.subscriptions.items():
+                if subscription['state'] == 'pending' and self.last_seen.get(channel, 0) >= subscription['sent']:
+                    # 没有收到确认但已经有数据
+                    subscription.update(state='active', acked=now, failures=0, error=None)
+                elif subscription['state'] == 'pending' and now - subscription['sent'] > self.ack_timeout:
+                    subscription.update(state='rejected', error='确认超时')
+                    subscription['failures'] += 1
+                state = subscription['state']
+                if state == 'rejected' and now - subscription['sent'] > self._retry_after(subscription):
+                    print(f'【BR】🔁 {channel} 订阅被拒绝（{subscription["error"]}），重新订阅')
+                    self._subscribe(channel, now)
+                elif state == 'active':
+                    stale_after = self._stale_after(channel)
+                    last = max(self.last_seen.get(channel, 0), subscription['acked'] or 0)
+                    if stale_after is not None and now - last > stale_after:
+                        print(f'【BR】🔁 {channel} {now - last:.0f}秒没有数据，重新订阅')
+                        self._subscribe(channel, now, unsubscribe=True)
+        return True
+
+    def status(self, now=None):
+        """各频道的订阅状态和最近一条消息距今的秒数（没有收到过消息时为None）"""
+        now = time.time() if now is None else now
+        with self.lock:
+            return {
+                channel: {
+                    'state': subscription['state'],
+                    'age': now - self.last_seen[channel] if channel in self.last_seen else None,
+                    'resubscribes': subscription['resubscribes']
+                }
+                for channel, subscription in self.subscriptions.items()
+            }
+
+    def format_status(self):
+        """格式化订阅状态，用于探活消息"""
+        lines = []
+        for channel, status in self.status().items():
+            age = f"{status['age']:.0f}s前" if status['age'] is not None else '无数据'
+            lines.append(f"{channel}: {status['state']} 最近消息 {age} 重订阅 {status['resubscribes']}")
+        return '\n'.join(lines)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AsyncWSConnection测试脚本 - 基于本地aiohttp WebSocket服务验证断开后重连、重新订阅，以及重连等待的指数退避、上限和重置
+"""
+
+import asyncio
+import json
+import time
+
+from aiohttp import web
+from feed_utils.async_ws import AsyncWSConnection
+from feed_utils.subscription_manager import SubscriptionManager
+
+
+def data(channel):
+    return json.dumps({'arg': {'channel': channel, 'chainId': '56'}, 'data': [{'value': 1}]})
+
+
+class LocalWSServer:
+    """本地WebSocket服务，按顺序对每次连接执行给定动作
+
+    动作: 'reject' 拒绝升级（HTTP 503），'drop' 收到订阅后立即关闭，'serve' 收到订阅后推送一条数据并保持连接，
+    'close' 收到订阅后推送一条数据再关闭；动作用完后按 'serve' 处理。
+    """
+
+    def __init__(self, actions):
+        self.actions = list(actions)
+        self.attempts = []  # 每次连接请求的时间
+        self.subscribes = 0
+        self.runner = None
+        self.url = None
+
+    async def handle(self, request):
+        self.attempts.append(time.monotonic())
+        action = self.actions.pop(0) if self.actions else 'serve'
+        if action == 'reject':
+            return web.Response(status=503)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        frame = json.loads(await ws.receive_str())
+        assert frame['op'] == 'subscribe'
+        self.subscribes += 1
+        if action != 'drop':
+            await ws.send_str(data(frame['args'][0]['channel']))
+        if action == 'serve':
+            async for _ in ws:
+                pass
+        await ws.close()
+        return ws
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/ws', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'ws://127.0.0.1:{port}/ws'
+        return self
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def create_connection(url, received, **kwargs):
+    subscriptions = SubscriptionManager(ping_interval=1000)
+    subscriptions.add('ch', {'channel': 'ch', 'chainId': 56})
+    return AsyncWSConnection('ws1', url, subscriptions, lambda name, message: received.append((name, message)),
+                             **kwargs)
+
+
+async def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, '等待超时'
+        await asyncio.sleep(0.01)
+
+
+async def stop_connection(connection):
+    connection.stop()
+    await asyncio.gather(connection.task, return_exceptions=True)
+
+
+def test_reconnect_and_resubscribe():
+    """服务端断开后按backoff等待重连，新连接重新订阅并继续推送数据"""
+    async def run():
+        server = await LocalWSServer(['drop', 'serve']).start()
+        received = []
+        connection = create_connection(server.url, received, backoff=0.1, max_backoff=1, stable_after=60)
+        try:
+            connection.start()
+            await wait_until(lambda: received)
+            assert received == [('ws1', data('ch'))]
+            assert server.subscribes == 2 and len(server.attempts) == 2
+            assert server.attempts[1] - server.attempts[0] >= 0.1
+            assert connection.connected
+            assert connection.stats['connects'] == 2 and connection.stats['disconnects'] == 1
+            assert connection.stats['messages'] == 1
+        finally:
+            await stop_connection(connection)
+            await server.stop()
+        assert connection.task.done()
+
+    asyncio.run(run())
+
+
+def test_backoff_grows_caps_and_resets():
+    """连续失败时重连等待翻倍且不超过max_backoff；连接稳定超过stable_after后断开时等待时间重置"""
+    async def run():
+        server = await LocalWSServer(['reject', 'reject', 'reject', 'close', 'serve']).start()
+        received = []
+        connection = create_connection(server.url, received, backoff=0.1, max_backoff=0.3, stable_after=0)
+        try:
+            connection.start()
+            await wait_until(lambda: len(received) == 2)
+            gaps = [b - a for a, b in zip(server.attempts, server.attempts[1:])]
+            assert len(gaps) == 4
+            # 每次等待为 min(max_backoff, backoff * 2^n) * [1, 1.5)
+            assert 0.1 <= gaps[0] < gaps[2]
+            assert gaps[1] >= 0.2
+            assert 0.3 <= gaps[2] < 0.6
+            # 第4次连接成功后被服务端关闭，stable_after=0视为稳定，下一次等待回到backoff
+            assert gaps[3] < 0.3
+            assert connection.stats['connects'] == 2 and connection.stats['disconnects'] == 1
+        finally:
+            await stop_connection(connection)
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def main():
+    for test in (test_reconnect_and_resubscribe, test_backoff_grows_caps_and_resets):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
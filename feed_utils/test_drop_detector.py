@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DropDetector测试脚本 - 与原有的列表遍历检测逻辑（最近10个样本 / 2分钟）逐个样本对比
+"""
+
+import random
+from feed_utils.drop_detector import DropDetector
+
+BR_CONFIG = {'liquidity_threshold': 2, 'auto_remove_threshold': 1}
+
+
+class BruteForceDetector:
+    """原有检测逻辑：保留最近11个样本和2分钟内的样本，遍历求最大值"""
+
+    def __init__(self):
+        self.history = []
+        self.history_with_time = []
+
+    def update(self, value, timestamp):
+        self.history.append(value)
+        self.history_with_time = [(ts, v) for ts, v in self.history_with_time if timestamp - ts <= 120]
+        self.history_with_time.append((timestamp, value))
+        if len(self.history) <= 10:
+            return None
+        self.history.pop(0)
+        return {
+            'samples': max(self.history) - value,
+            'seconds': max(v for _, v in self.history_with_time) - value,
+        }
+
+
+def test_matches_brute_force():
+    """随机游走的流动性序列上，两个默认窗口的下降幅度和触发结果与原有逻辑一致"""
+    rng = random.Random(7)
+    detector = DropDetector.from_config(BR_CONFIG)
+    baseline = BruteForceDetector()
+    value, timestamp = 50.0, 0.0
+    triggered = 0
+    for _ in range(3000):
+        value = max(0.0, value + rng.uniform(-0.8, 0.7))
+        timestamp += rng.uniform(0.1, 5)
+        result = detector.update(value, timestamp)
+        expected = baseline.update(value, timestamp)
+        if expected is None:
+            assert result is None
+            continue
+
+        drops = [d['drop'] for d in result['drops']]
+        assert drops == [expected['samples'], expected['seconds']]
+        expected_auto = max(expected['samples'], expected['seconds'])
+        assert (result['auto'] is not None) == (expected_auto > BR_CONFIG['auto_remove_threshold'])
+        assert (result['alert'] is not None) == (expected['samples'] > BR_CONFIG['liquidity_threshold'])
+        if result['auto']:
+            assert result['auto']['drop'] == expected_auto
+            triggered += 1
+    assert triggered > 0
+
+
+def test_peak_time_and_expiry():
+    """返回窗口最大值的时间戳；早于2分钟的峰值过期"""
+    detector = DropDetector.from_config(BR_CONFIG, warmup=0)
+    detector.update(10, timestamp=0)
+    detector.update(20, timestamp=5)
+    result = detector.update(18, timestamp=10)
+    assert result['drops'][1] == {'window': '2分钟', 'peak': 20, 'peak_time': 5, 'drop': 2}
+    assert result['auto']['peak'] == 20 and result['auto']['threshold'] == 1
+
+    for t in range(20, 130, 10):
+        detector.update(17, timestamp=t)
+    result = detector.update(17, timestamp=131)
+    assert result['drops'][1]['peak'] == 17 and result['auto'] is None
+
+
+def test_peak_kept_under_high_sample_rate():
+    """时间窗口内样本很多且持续下降时，峰值仍保留到过期，不会因队列长度被淘汰"""
+    detector = DropDetector([{'name': '2分钟', 'seconds': 120, 'auto_threshold': 1}], warmup=0)
+    count = 20000
+    for i in range(count):
+        result = detector.update(30 - 2 * i / count, timestamp=i / 200)
+    assert result['auto']['peak'] == 30 and result['auto']['peak_time'] == 0
+    assert len(detector.windows[0].queue) == count
+
+
+def main():
+    for test in (test_matches_brute_force, test_peak_time_and_expiry, test_peak_kept_under_high_sample_rate):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
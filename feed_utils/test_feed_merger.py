@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FeedMerger测试脚本 - 验证多数据源事件匹配、领先/滞后统计和按事件去重
+"""
+
+from feed_utils.feed_merger import FeedMerger
+
+
+def test_match_and_lag():
+    """方向相同、幅度相近的变动视为同一事件，后到达的数据源记滞后"""
+    merger = FeedMerger(window=30, min_move=0.05, tolerance=0.3)
+    merger.observe('chain', 10, timestamp=0)
+    merger.observe('okx', 10, timestamp=0)
+    first = merger.observe('chain', 9, timestamp=1)
+    second = merger.observe('okx', 9.05, timestamp=3)
+    assert first == {'event_id': 1, 'first': True, 'leader': 'chain', 'lag': 0}
+    assert second == {'event_id': 1, 'first': False, 'leader': 'chain', 'lag': 2}
+    report = merger.report()
+    assert report['chain']['lead']['p50'] == 2
+    assert report['okx']['lag']['p50'] == 2
+
+    # 超出窗口未被确认的变动记为未匹配
+    merger.observe('chain', 8, timestamp=5)
+    merger.observe('chain', 8, timestamp=40)
+    assert merger.report()['chain']['unmatched'] == 1
+
+
+def test_claim_same_event_once():
+    """同一事件的同类动作只由最先申请的数据源执行"""
+    merger = FeedMerger(window=30, min_move=0.05)
+    merger.observe('chain', 10, timestamp=0)
+    merger.observe('okx', 10, timestamp=0)
+    chain = merger.observe('chain', 9, timestamp=1)
+    okx = merger.observe('okx', 9, timestamp=2)
+    assert merger.claim('alert', 'chain', chain['event_id'], timestamp=1) == (True, 'chain', 0)
+    assert merger.claim('alert', 'okx', okx['event_id'], timestamp=2) == (False, 'chain', 1)
+    # 其他动作类型和同一数据源的重复申请不受影响
+    assert merger.claim('auto_remove', 'okx', okx['event_id'], timestamp=2)[0]
+    assert merger.claim('alert', 'chain', timestamp=3)[0]
+
+
+def test_claim_different_event_in_window():
+    """窗口内幅度不同的另一次下降是新的事件，不会被前一次的处理吞掉"""
+    merger = FeedMerger(window=30, min_move=0.05, tolerance=0.3)
+    merger.observe('chain', 10, timestamp=0)
+    merger.observe('okx', 10, timestamp=0)
+    chain = merger.observe('chain', 9.5, timestamp=1)
+    assert merger.claim('alert', 'chain', chain['event_id'], timestamp=1)[0]
+
+    okx = merger.observe('okx', 7, timestamp=5)
+    assert okx['first'] and okx['event_id'] != chain['event_id']
+    assert merger.claim('alert', 'okx', okx['event_id'], timestamp=5) == (True, 'okx', 0)
+
+
+def test_mempool_move_matches_chain():
+    """内存池预告的撤池与链上随后报告的下降匹配为同一事件"""
+    merger = FeedMerger(window=30, min_move=0.05, tolerance=0.3)
+    merger.observe('chain', 10, timestamp=0)
+    predicted = merger.observe_move('mempool', -2, timestamp=1)
+    assert merger.claim('auto_remove', 'mempool', predicted['event_id'], timestamp=1)[0]
+
+    chain = merger.observe('chain', 8.1, timestamp=4)
+    assert chain['event_id'] == predicted['event_id'] and chain['leader'] == 'mempool'
+    assert merger.claim('auto_remove', 'chain', chain['event_id'], timestamp=4) == (False, 'mempool', 3)
+
+    # 事件过期后清理申请记录
+    merger.observe('chain', 8.1, timestamp=60)
+    assert not merger.claims
+
+
+def main():
+    for test in (test_match_and_lag, test_claim_same_event_once, test_claim_different_event_in_window,
+                 test_mempool_move_matches_chain):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
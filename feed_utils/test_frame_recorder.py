@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FrameRecorder测试脚本 - 验证录制回读、多线程同时录制的计数、队列满时的丢弃标记、按大小轮转和过期文件清理
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from feed_utils import frame_recorder
+from feed_utils.frame_recorder import FrameRecorder
+
+
+def read_all(directory):
+    """按文件创建顺序读取目录下全部录制记录"""
+    paths = sorted((os.path.join(directory, name) for name in os.listdir(directory)),
+                   key=lambda path: int(path.split('-')[-1].split('.')[0]))
+    return [list(FrameRecorder.read(path)) for path in paths]
+
+
+def test_record_and_read():
+    """录制的消息按接收顺序写入，bytes消息解码为文本，首行为时间基准"""
+    directory = tempfile.mkdtemp()
+    recorder = FrameRecorder(directory, flush_interval=0.05).start()
+    recorder.record('{"arg": {"channel": "dex-market-v3"}}', 'ws1')
+    recorder.record(b'pong', 'ws2')
+    recorder.stop()
+
+    (records,) = read_all(directory)
+    header, first, second = records
+    assert header['type'] == 'header' and header['wall_time'] <= time.time()
+    assert first[1:] == ['ws1', '{"arg": {"channel": "dex-market-v3"}}'] and second[1:] == ['ws2', 'pong']
+    assert first[0] <= second[0]
+    assert recorder.stats['recorded'] == recorder.stats['written'] == 2 and recorder.stats['files'] == 1
+
+
+def test_concurrent_record_counts():
+    """多个连接线程同时录制时，接收和丢弃计数之和等于消息总数"""
+    recorder = FrameRecorder(tempfile.mkdtemp(), max_queue=5000)
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=lambda name=f'ws{i}': [recorder.record('frame', name) for _ in range(5000)])
+                   for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert recorder.stats['recorded'] == 5000
+    assert recorder.stats['recorded'] + recorder.stats['dropped'] == 20000
+
+
+def test_dropped_marker():
+    """队列满时丢弃消息并计数，写入时留下丢弃标记"""
+    directory = tempfile.mkdtemp()
+    recorder = FrameRecorder(directory, max_queue=2, flush_interval=0.05)
+    for i in range(4):
+        recorder.record(f'frame-{i}', 'ws1')
+    assert recorder.stats['dropped'] == 2
+    recorder.start().stop()
+
+    (records,) = read_all(directory)
+    assert records[1]['type'] == 'dropped' and records[1]['count'] == 2
+    assert [record[2] for record in records[2:]] == ['frame-0', 'frame-1']
+    assert '丢弃 2' in recorder.format_stats()
+
+
+def test_rotate_and_cleanup():
+    """未压缩数据量超过rotate_mb时换新文件；超过保留时间的旧录制文件被删除，其他文件保留"""
+    directory = tempfile.mkdtemp()
+    expired = os.path.join(directory, 'frames-20200101-000000-1.jsonl.gz')
+    unrelated = os.path.join(directory, 'notes.txt')
+    for path in (expired, unrelated):
+        open(path, 'w').close()
+        os.utime(path, (0, 0))
+
+    recorder = FrameRecorder(directory, rotate_mb=300 / 1024 / 1024, batch_size=1, retention_days=1,
+                             flush_interval=0.05)
+    for i in range(6):
+        recorder.record('x' * 100 + str(i), 'ws1')
+    recorder.start().stop()
+    assert not os.path.exists(expired) and os.path.exists(unrelated)
+
+    os.remove(unrelated)
+    files = read_all(directory)
+    assert len(files) == recorder.stats['files'] == 3
+    assert all(records[0]['type'] == 'header' for records in files)
+    assert [record[2][-1] for records in files for record in records[1:]] == [str(i) for i in range(6)]
+
+
+def test_zstd_fallback():
+    """未安装zstandard时zstd配置退回gzip"""
+    recorder = FrameRecorder(tempfile.mkdtemp(), compression='zstd', flush_interval=0.05)
+    if frame_recorder.zstandard is None:
+        assert recorder.compression == 'gzip' and recorder.level == 6
+    else:
+        recorder.start()
+        recorder.record('frame', 'ws1')
+        recorder.stop()
+        (records,) = read_all(recorder.directory)
+        assert recorder.path.endswith('.zst') and records[1][2] == 'frame'
+
+
+def main():
+    for test in (test_record_and_read, test_concurrent_record_counts, test_dropped_marker, test_rotate_and_cleanup, test_zstd_fallback):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MessageRouter测试脚本 - 验证按频道分发、只解析arg的预过滤和大额成交预过滤
+"""
+
+import json
+from feed_utils import message_router
+from feed_utils.message_router import MessageRouter, max_volume_prefilter
+
+BR = '0xFf7d6A96ae471BbCD7713aF9CB1fEeB16cf56B41'
+
+
+def frame(channel, data, chain_id='56', token_address=BR):
+    return json.dumps({'arg': {'channel': channel, 'chainId': chain_id, 'tokenAddress': token_address},
+                       'data': data})
+
+
+def create_router():
+    """注册两个频道的路由，返回 (路由, 各频道收到的消息, 解析过的文本)"""
+    received = {'dex-market-v3': [], 'dex-market-v3-topPool': []}
+    router = MessageRouter(chain_id='56', token_address=BR.lower())
+    for channel in received:
+        router.register(channel, received[channel].append)
+    parsed = []
+
+    def loads(text):
+        parsed.append(text)
+        return json.loads(text)
+
+    message_router.loads = loads
+    return router, received, parsed
+
+
+def test_dispatch_to_channel_handler():
+    """匹配的消息完整解析后交给对应频道的处理函数"""
+    router, received, parsed = create_router()
+    try:
+        market = frame('dex-market-v3', [{'price': '1.5'}])
+        top_pool = frame('dex-market-v3-topPool', [{'data': []}])
+        assert router.dispatch(market) and router.dispatch(top_pool.encode())
+        assert received['dex-market-v3'] == [json.loads(market)]
+        assert received['dex-market-v3-topPool'] == [json.loads(top_pool)]
+        assert parsed[1] == market and parsed[3] == top_pool
+        assert router.counts == {'received': 2, 'skipped': 0, 'dispatched': 2, 'errors': 0}
+    finally:
+        message_router.loads = json.loads
+
+
+def test_filtered_messages_parse_arg_only():
+    """未注册频道、其他链、其他代币的消息只解析arg即丢弃；订阅确认和心跳不解析"""
+    router, received, parsed = create_router()
+    try:
+        dropped = [
+            frame('dex-market-v3-trade', [{'price': '1'}]),
+            frame('dex-market-v3', [{'price': '1'}], chain_id='1'),
+            frame('dex-market-v3', [{'price': '1'}], token_address='0x' + '11' * 20),
+        ]
+        for message in dropped:
+            assert router.dispatch(message) is False
+        assert all(text.startswith('{"channel"') for text in parsed) and len(parsed) == 3
+
+        parsed.clear()
+        assert router.dispatch('pong') is False
+        assert router.dispatch(json.dumps({'event': 'subscribe', 'arg': {'channel': 'dex-market-v3'}})) is False
+        assert parsed == []
+        assert received == {'dex-market-v3': [], 'dex-market-v3-topPool': []}
+        assert router.counts['skipped'] == 5 and router.counts['dispatched'] == 0
+    finally:
+        message_router.loads = json.loads
+
+
+def test_volume_prefilter_and_errors():
+    """预过滤在原始文本上跳过没有大额成交的消息；处理函数异常交给on_error"""
+    errors = []
+    trades = []
+    router = MessageRouter(token_address=BR, on_error=lambda channel, e: errors.append((channel, str(e))))
+    router.register('dex-market-trade-history-pub', trades.append, prefilter=max_volume_prefilter(1000))
+
+    def fail(message):
+        raise RuntimeError('bad frame')
+
+    router.register('dex-market-v3', fail)
+    assert router.dispatch(frame('dex-market-trade-history-pub', [{'volume': '12.5'}, {'volume': '300'}])) is False
+    assert router.dispatch(frame('dex-market-trade-history-pub', [{'volume': '12.5'}, {'volume': '5000'}]))
+    assert len(trades) == 1
+    assert router.dispatch(frame('dex-market-v3', [{'price': '1'}]))
+    assert errors == [('dex-market-v3', 'bad frame')]
+    assert router.counts == {'received': 3, 'skipped': 1, 'dispatched': 2, 'errors': 1}
+
+
+def main():
+    for test in (test_dispatch_to_channel_handler, test_filtered_messages_parse_arg_only,
+                 test_volume_prefilter_and_errors):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SubscriptionManager测试脚本 - 验证只重新订阅被拒绝或失效的频道、退避重试和ping/pong检测
+"""
+
+import json
+import time
+from feed_utils.subscription_manager import SubscriptionManager
+
+
+def create_manager(channels, **kwargs):
+    """创建订阅管理并订阅全部频道，返回 (订阅管理, 发送的帧)"""
+    sent = []
+    manager = SubscriptionManager(sent.append, **kwargs)
+    for channel in channels:
+        manager.add(channel, {'channel': channel, 'chainId': 56})
+    manager.subscribe_all()
+    return manager, sent
+
+
+def frames(sent):
+    """解析发送的订阅帧为 (op, channel) 列表，并清空记录"""
+    result = [(frame['op'], frame['args'][0]['channel']) for frame in map(json.loads, sent)]
+    sent.clear()
+    return result
+
+
+def data(channel):
+    return json.dumps({'arg': {'channel': channel, 'chainId': '56'}, 'data': [{}]})
+
+
+def test_resubscribe_only_failed_channels():
+    """确认或已有数据的频道保持不变，被拒绝的频道按退避重新订阅，失效的频道先取消再订阅"""
+    manager, sent = create_manager(['a', 'b', 'c'], stale_after={'a': 60}, default_stale_after=None,
+                                   ack_timeout=2, retry_delay=5, max_retry_delay=20, ping_interval=1000)
+    assert frames(sent) == [('subscribe', 'a'), ('subscribe', 'b'), ('subscribe', 'c')]
+    now = time.time()
+
+    assert manager.observe(json.dumps({'event': 'subscribe', 'arg': {'channel': 'a'}}))
+    assert manager.observe(data('b')) is False
+    assert manager.check(now)
+    assert {channel: s['state'] for channel, s in manager.status(now).items()} == \
+        {'a': 'active', 'b': 'active', 'c': 'pending'}
+
+    # 不带arg的错误消息对应所有未确认的订阅
+    assert manager.observe(json.dumps({'event': 'error', 'code': '60012', 'msg': 'Invalid request'}))
+    assert manager.subscriptions['c']['state'] == 'rejected'
+    rejected_at = manager.subscriptions['c']['sent']
+    manager.check(rejected_at + 4)
+    assert frames(sent) == []
+    manager.check(rejected_at + 6)
+    assert frames(sent) == [('subscribe', 'c')]
+
+    # 再次确认超时，等待时间翻倍（从上次订阅起算），并以max_retry_delay为上限
+    manager.check(rejected_at + 9)
+    assert manager.subscriptions['c']['state'] == 'rejected' and manager.subscriptions['c']['failures'] == 2
+    manager.check(rejected_at + 15)
+    assert frames(sent) == []
+    manager.check(rejected_at + 17)
+    assert frames(sent) == [('subscribe', 'c')]
+    for failures in (3, 4):
+        manager.subscriptions['c'].update(state='rejected', failures=failures, sent=now)
+        assert manager._retry_after(manager.subscriptions['c']) == 20
+
+    # a超过60秒没有数据：取消后重新订阅；b未配置失效时间，不检查
+    manager.subscriptions['c'].update(state='active', acked=now + 1000)
+    manager.check(now + 61)
+    assert frames(sent) == [('unsubscribe', 'a'), ('subscribe', 'a')]
+    assert manager.status(now + 61)['a']['resubscribes'] == 1
+    assert manager.status(now + 61)['b']['resubscribes'] == 0
+
+
+def test_ping_pong():
+    """连接空闲时发送ping，收到pong后恢复；pong超时时判定连接断开，新连接重置状态"""
+    manager, sent = create_manager(['a'], ping_interval=20, pong_timeout=10)
+    sent.clear()
+    manager.observe(json.dumps({'event': 'subscribe', 'arg': {'channel': 'a'}}))
+    now = manager.last_received
+    assert manager.check(now + 19) and sent == []
+    assert manager.check(now + 20) and sent == ['ping']
+    assert manager.observe('pong') and manager.ping_sent is None
+
+    assert manager.check(manager.last_received + 20)
+    assert manager.check(manager.ping_sent + 10)
+    assert manager.check(manager.ping_sent + 11) is False
+
+    reconnected = []
+    manager.set_sender(reconnected.append)
+    assert manager.ping_sent is None and manager.subscriptions['a']['state'] == 'idle'
+    manager.subscribe_all()
+    assert frames(reconnected) == [('subscribe', 'a')]
+    assert manager.subscriptions['a']['resubscribes'] == 0
+
+
+def main():
+    for test in (test_resubscribe_only_failed_channels, test_ping_pong):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
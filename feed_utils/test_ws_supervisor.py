@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FrameDeduplicator测试脚本 - 验证双连接冗余时按seqId或内容去重、单连接内的重复内容和过期清理
+"""
+
+import hashlib
+import json
+import time
+from feed_utils.ws_supervisor import FrameDeduplicator, frame_key
+
+
+def test_first_arrival_wins():
+    """同一消息只处理最先到达的一份，统计各连接最先送达的次数"""
+    dedup = FrameDeduplicator(window=10)
+    assert dedup.accept('ws1', 'frame-1') and not dedup.accept('ws2', 'frame-1')
+    assert dedup.accept('ws2', 'frame-2') and not dedup.accept('ws1', 'frame-2')
+    assert dedup.accept('ws2', 'frame-3')
+    assert dedup.stats == {'accepted': 3, 'duplicates': 2, 'first': {'ws1': 1, 'ws2': 2}}
+    assert dedup.format_stats() == '去重: 处理 3 重复 2 最先送达 ws1 1 ws2 2'
+
+
+def test_repeated_content_on_one_connection():
+    """同一连接上内容相同的多条消息（如未变化的快照）都处理，另一连接只补上多出的份数"""
+    dedup = FrameDeduplicator(window=10)
+    assert dedup.accept('ws1', 'snapshot') and dedup.accept('ws1', 'snapshot')
+    assert not dedup.accept('ws2', 'snapshot') and not dedup.accept('ws2', 'snapshot')
+    assert dedup.accept('ws2', 'snapshot')
+    assert not dedup.accept('ws1', 'snapshot')
+
+
+def test_seq_id_key():
+    """带seqId的推送按 (频道参数, seqId) 去重，不受字段顺序和空白影响；不同频道参数或seqId不视为重复"""
+    arg = {'channel': 'dex-market-v3', 'chainId': '56'}
+    frame = json.dumps({'arg': arg, 'data': [{'seqId': 7, 'price': '1'}]})
+    reordered = json.dumps({'data': [{'price': '1', 'seqId': 7}], 'arg': dict(reversed(list(arg.items())))}, indent=1)
+    assert frame_key(frame) == frame_key(reordered)
+
+    dedup = FrameDeduplicator(window=10)
+    assert dedup.accept('ws1', frame) and not dedup.accept('ws2', reordered)
+    assert dedup.accept('ws1', json.dumps({'arg': arg, 'data': [{'seqId': 8}]}))
+    assert dedup.accept('ws1', json.dumps({'arg': {**arg, 'chainId': '1'}, 'data': [{'seqId': 7}]}))
+    assert dedup.accept('ws1', json.dumps({'arg': arg, 'seqId': 9, 'data': []}))
+
+
+def test_content_digest_key():
+    """不带seqId的消息使用内容的SHA-256摘要，与进程无关"""
+    assert frame_key('frame') == hashlib.sha256(b'frame').digest()
+    assert frame_key(b'frame') == frame_key('frame')
+    assert frame_key('{"seqId": ') == hashlib.sha256(b'{"seqId": ').digest()
+
+
+def test_expiry():
+    """超过window的内容不再视为重复；记录数超过max_entries时清理最早的内容"""
+    dedup = FrameDeduplicator(window=0.05)
+    assert dedup.accept('ws1', 'frame')
+    time.sleep(0.06)
+    assert dedup.accept('ws2', 'frame')
+    assert len(dedup.entries) == 1
+
+    dedup = FrameDeduplicator(window=10, max_entries=2)
+    for i in range(3):
+        assert dedup.accept('ws1', f'frame-{i}')
+    assert dedup.accept('ws1', 'frame-3')
+    assert len(dedup.entries) == 3
+    assert dedup.accept('ws2', 'frame-0') and not dedup.accept('ws2', 'frame-3')
+
+
+def main():
+    for test in (test_first_arrival_wins, test_repeated_content_on_one_connection, test_seq_id_key,
+                 test_content_digest_key, test_expiry):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
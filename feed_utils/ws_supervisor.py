@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebSocket连接守护与多连接去重
+
+WSSupervisor在独立线程中维持一个WebSocket连接：断开后按指数退避（带抖动）无限重连，连接稳定一段时间后
+退避时间重置。每个连接有自己的SubscriptionManager，连接建立时订阅全部频道，由守护线程每秒检查订阅和ping/pong。
+
+同时开启两个连接订阅相同频道时，同一条推送会从两个连接各到达一次，FrameDeduplicator对消息去重：
+带seqId的推送按 (频道参数, seqId) 识别，两个连接上字段顺序或空白不同也能识别为同一条；不带seqId的消息
+按内容的SHA-256摘要识别。每条消息记录各连接已收到的次数，某个连接第n次收到该消息、且其他连接都还没有
+收到第n次时才交给处理函数，因此同一连接上内容相同的连续推送不会被误去重，任一连接断开时另一连接的推送不受影响。
+
+使用示例:
+    >>> dedup = FrameDeduplicator(window=10)
+    >>> def on_message(name, message):
+    ...     if dedup.accept(name, message):
+    ...         router.dispatch(message)
+    >>> supervisors = [WSSupervisor(f'ws{i}', url, make_subscriptions(), on_message).start() for i in range(2)]
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import deque
+
+import websocket
+
+
+SEQ_ID_KEY = '"seqId"'
+
+
+def frame_key(message):
+    """消息的去重键：带seqId时为 (频道参数, seqId)，否则为内容的SHA-256摘要
+
+    只有文本中出现seqId字段时才解析JSON，其余消息直接计算摘要。
+    """
+    if isinstance(message, str):
+        if SEQ_ID_KEY in message:
+            try:
+                frame = json.loads(message)
+            except ValueError:
+                frame = None
+            if isinstance(frame, dict):
+                seq_id = frame.get('seqId')
+                data = frame.get('data')
+                if seq_id is None and isinstance(data, list) and data and isinstance(data[0], dict):
+                    seq_id = data[0].get('seqId')
+                arg = frame.get('arg')
+                if seq_id is not None and isinstance(arg, dict):
+                    return 'seq', json.dumps(arg, sort_keys=True), seq_id
+        message = message.encode()
+    return hashlib.sha256(message).digest()
+
+
+class FrameDeduplicator:
+    """对多个连接收到的消息去重
+
+    Attributes:
+        stats (dict): accepted / duplicates / first（各连接最先送达的消息数）
+    """
+
+    def __init__(self, window=10, max_entries=100000):
+        """
+        初始化去重
+
+        Args:
+            window (float): 同一消息在不同连接之间的最大到达时间差（秒），超过后不再视为重复
+            max_entries (int): 最多记录的消息数
+        """
+        self.window = window
+        self.max_entries = max_entries
+        # 去重键 -> {'time': 首次到达时间, 'counts': {连接: 收到次数}}
+        self.entries = {}
+        self.order = deque()
+        self.stats = {'accepted': 0, 'duplicates': 0, 'first': {}}
+        self.lock = threading.Lock()
+
+    def _expire(self, now):
+        order, entries = self.order, self.entries
+        while order and (now - order[0][0] > self.window or len(entries) > self.max_entries):
+            timestamp, key = order.popleft()
+            entry = entries.get(key)
+            if entry is not None and entry['time'] == timestamp:
+                del entries[key]
+
+    def accept(self, source, message):
+        """返回消息是否为首次到达（需要处理）"""
+        key = frame_key(message)
+        now = time.time()
+        with self.lock:
+            self._expire(now)
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {'time': now, 'counts': {}}
+                self.order.append((now, key))
+            counts = entry['counts']
+            count = counts.get(source, 0) + 1
+            counts[source] = count
+            if any(other >= count for name, other in counts.items() if name != source):
+                self.stats['duplicates'] += 1
+                return False
+            self.stats['accepted'] += 1
+            self.stats['first'][source] = self.stats['first'].get(source, 0) + 1
+            return True
+
+    def format_stats(self):
+        """格式化统计，用于探活消息"""
+        with self.lock:
+            first = ' '.join(f'{name} {count}' for name, count in sorted(self.stats['first'].items()))
+            return f"去重: 处理 {self.stats['accepted']} 重复 {self.stats['duplicates']} 最先送达 {first or '-'}"
+
+
+class WSSupervisor:
+    """维持一个WebSocket连接并无限重连
+
+    Attributes:
+        connected (bool): 当前是否已连接
+        stats (dict): connects / disconnects / messages
+    """
+
+    def __init__(self, name, url, subscriptions, on_message, sslopt=None, backoff=1, max_backoff=60,
+                 stable_after=60, check_interval=1, recorder=None):
+        """
+        初始化连接守护
+
+        Args:
+            name (str): 连接名称，用于日志和去重
+            url (str): WebSocket地址
+            subscriptions (SubscriptionManager): 该连接的订阅管理
+            on_message (callable): 数据消息回调 on_message(name, message)，pong和订阅确认不回调
+            sslopt (dict): 传给run_forever的SSL选项
+            backoff (float): 首次重连等待时间（秒），连续失败时翻倍
+            max_backoff (float): 重连等待时间上限（秒）
+            stable_after (float): 连接保持超过该时间（秒）后断开时，重连等待时间重置
+            check_interval (float): 检查订阅和ping/pong的间隔（秒）
+            recorder (FrameRecorder): 原始消息录制，收到的每条消息（含pong和订阅确认）先交给它
+        """
+        self.name = name
+        self.url = url
+        self.subscriptions = subscriptions
+        self.on_message = on_message
+        self.sslopt = sslopt
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.check_interval = check_interval
+        self.recorder = recorder
+        self.ws = None
+        self.connected = False
+        self.connected_at = None
+        self.stats = {'connects': 0, 'disconnects': 0, 'messages': 0}
+        self.running = False
+        self.threads = []
+
+    def _on_open(self, ws):
+        print(f'【BR】WebSocket连接已建立 ({self.name})')
+        self.subscriptions.set_sender(ws.send)
+        self.subscriptions.subscribe_all()
+        self.connected = True
+        self.connected_at = time.time()
+        self.stats['connects'] += 1
+
+    def _on_message(self, ws, message):
+        self.stats['messages'] += 1
+        if self.recorder:
+            self.recorder.record(message, self.name)
+        # pong和订阅确认由订阅管理处理
+        if self.subscriptions.observe(message):
+            return
+        self.on_message(self.name, message)
+
+    def _on_error(self, ws, error):
+        print(f'【BR】WebSocket Error ({self.name}): {error}')
+
+    def _on_close(self, ws, close_status_code, close_msg):
+        print(f'【BR】WebSocket连接关闭 ({self.name}): {close_status_code} - {close_msg}')
+
+    def _run(self):
+        """连接循环：断开后按指数退避重连，不限次数"""
+        attempt = 0
+        while self.running:
+            self.ws = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close
+            )
+            try:
+                self.ws.run_forever(sslopt=self.sslopt)
+            except Exception as e:
+                print(f'【BR】WebSocket连接异常 ({self.name}): {e}')
+            if self.connected:
+                self.stats['disconnects'] += 1
+                if time.time() - self.connected_at >= self.stable_after:
+                    attempt = 0
+            self.connected = False
+            if not self.running:
+                break
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(1, 1.5)
+            attempt += 1
+            print(f'【BR】{self.name} 将在 {delay:.2f} 秒后重新连接 (第 {attempt} 次)')
+            time.sleep(delay)
+
+    def _keep(self):
+        """检查订阅状态，pong超时时关闭连接触发重连"""
+        while self.running:
+            time.sleep(self.check_interval)
+            if not self.connected:
+                continue
+            try:
+                if not self.subscriptions.check():
+                    print(f'【BR】⚠️ {self.name} 未收到pong，关闭连接重新连接')
+                    self.ws.close()
+            except Exception as e:
+                print(f'【BR】{self.name} 订阅检查失败: {e}')
+
+    def start(self):
+        """启动连接线程和订阅检查线程"""
+        if self.running:
+            return self
+        self.running = True
+        for target, suffix in ((self._run, 'run'), (self._keep, 'keep')):
+            thread = threading.Thread(target=target, name=f'{self.name}-{suffix}')
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self):
+        """停止重连并关闭连接"""
+        self.running = False
+        if self.ws:
+            self.ws.close()
+
+    def format_status(self):
+        """格式化连接和订阅状态，用于探活消息"""
+        state = '已连接' if self.connected else '重连中'
+        header = (f"{self.name}: {state} 连接 {self.stats['connects']} 次 断开 {self.stats['disconnects']} 次 "
+                  f"消息 {self.stats['messages']}")
+        return f"{header}\n{self.subscriptions.format_status()}"
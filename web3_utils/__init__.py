@@ -1,4 +1,5 @@
 # Web3 utilities package
 from .web3_manager import Web3Manager
+from .async_web3_manager import AsyncWeb3Manager
 
-__all__ = ['Web3Manager']
+__all__ = ['Web3Manager', 'AsyncWeb3Manager']
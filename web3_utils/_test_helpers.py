@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试公共工具 - 连接本地JSON-RPC节点的Web3Manager配置，以及常用合约只读调用的模拟
+
+各测试脚本只从这里导入公共工具，测试脚本之间互不导入。
+
+使用示例:
+    >>> node = LocalRPCNode().start()
+    >>> manager = create_manager(node, batch_exit=True)
+"""
+
+from eth_abi import decode as abi_decode, encode as abi_encode
+from eth_account import Account
+from eth_utils import keccak
+from web3_utils.local_node import RPCError
+from web3_utils.web3_manager import Web3Manager, POSITION_OUTPUT_TYPES
+
+USDT = '0x55d398326f99059fF775485246999027B3197955'
+BR = '0xFf7d6A96ae471BbCD7713aF9CB1fEeB16cf56B41'
+POSITION_MANAGER = '0x46A15B0b27311cedF172AB29E4f4766fbE7F4364'
+POOL = '0x00000000000000000000000000000000000000aa'
+UNIT = 10 ** 18
+
+
+def selector(signature):
+    """函数选择器，带0x前缀"""
+    return '0x' + keccak(text=signature)[:4].hex()
+
+
+def create_config(node, **web3_config):
+    """连接到本地节点、使用新钱包的配置，web3_config中的字段覆盖默认值"""
+    account = Account.create()
+    return {
+        'web3_config': {
+            'rpc_url': node.url,
+            'private_key': account.key.hex(),
+            'wallet_address': account.address,
+            'gas_price_gwei': 1,
+            'gas_limit': 400000,
+            'usdt': USDT,
+            'br': BR,
+            'position_manager': POSITION_MANAGER,
+            **web3_config
+        },
+        'proxy_config': {'enabled': False},
+    }
+
+
+def create_manager(node, **web3_config):
+    """创建已连接到本地节点的Web3Manager"""
+    manager = Web3Manager(create_config(node, **web3_config))
+    assert manager.connect()
+    return manager
+
+
+def positions(count):
+    """token_id从1开始、流动性为1的头寸列表"""
+    return [{'token_id': i + 1, 'liquidity': 1} for i in range(count)]
+
+
+def register_positions(node, wallet, chain_positions, failing=()):
+    """模拟Position Manager的balanceOf / tokenOfOwnerByIndex / positions
+
+    Args:
+        chain_positions (dict): token_id -> 流动性，或 token_id -> (token0, token1, 流动性)；
+            调用时读取，测试中修改后立即生效
+        failing: 查询详情时revert的token_id
+    """
+    def position(token_id):
+        value = chain_positions[token_id]
+        return value if isinstance(value, tuple) else (USDT, BR, value)
+
+    def positions_call(data):
+        (token_id,) = abi_decode(['uint256'], data[4:])
+        if token_id in failing:
+            raise RPCError('execution reverted')
+        token0, token1, liquidity = position(token_id)
+        return abi_encode(POSITION_OUTPUT_TYPES, [0, wallet, token0, token1, 2500, -100, 100, liquidity, 0, 0, 0, 0])
+
+    def token_of_owner(data):
+        index = abi_decode(['address', 'uint256'], data[4:])[1]
+        return abi_encode(['uint256'], [sorted(chain_positions)[index]])
+
+    node.register_call(POSITION_MANAGER, selector('balanceOf(address)'),
+                       lambda data: abi_encode(['uint256'], [len(chain_positions)]))
+    node.register_call(POSITION_MANAGER, selector('tokenOfOwnerByIndex(address,uint256)'), token_of_owner)
+    node.register_call(POSITION_MANAGER, selector('positions(uint256)'), positions_call)
+
+
+def register_pool(node, quote_balance, base_balance):
+    """模拟USDT-BR池子与代币的只读调用：价格为1，USDT为token0"""
+    node.register_call(USDT, selector('decimals()'), lambda data: abi_encode(['uint8'], [18]))
+    node.register_call(BR, selector('decimals()'), lambda data: abi_encode(['uint8'], [18]))
+    node.register_call(POOL, selector('slot0()'),
+                       lambda data: abi_encode(['uint160', 'int24', 'uint16', 'uint16', 'uint16', 'uint32', 'bool'],
+                                               [2 ** 96, 0, 0, 1, 1, 0, True]))
+    node.register_call(POOL, selector('liquidity()'), lambda data: abi_encode(['uint128'], [10 ** 20]))
+    node.register_call(POOL, selector('fee()'), lambda data: abi_encode(['uint24'], [2500]))
+    node.register_call(USDT, selector('balanceOf(address)'), lambda data: abi_encode(['uint256'], [quote_balance]))
+    node.register_call(BR, selector('balanceOf(address)'), lambda data: abi_encode(['uint256'], [base_balance]))
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预签名退出交易 - 为缓存头寸提前构建并签名移除交易，触发时只需一次send_raw_transaction
+
+后台线程定期检查nonce、gas价格、gas上限和头寸，任一变化时重新签名；交易中的deadline临近过期时也会重新签名。
+交易分组与Web3Manager.build_exit_transactions一致（batch_exit开启时合并为一笔），
+多笔交易按顺序占用连续的nonce，触发时按nonce顺序依次广播。
+
+使用示例:
+    >>> armed = web3_manager.start_armed_exit()
+    >>> if armed.covers(positions):
+    ...     fired = armed.fire()
+"""
+
+import threading
+import time
+from web3 import Web3
+
+
+class ArmedExit:
+    """维护可直接广播的预签名移除交易
+
+    Attributes:
+        armed (list): 已签名交易列表，每项包含 positions / nonce / gas_price / deadline / raw
+        last_fire_ms (float): 最近一次触发的广播耗时（毫秒）
+    """
+
+    # 交易deadline有效期及提前重签的余量（秒）
+    DEADLINE_TTL = 3600
+    DEADLINE_MARGIN = 600
+
+    def __init__(self, web3_manager, refresh_interval=3):
+        """
+        初始化预签名退出
+
+        Args:
+            web3_manager (Web3Manager): 已连接的Web3Manager实例
+            refresh_interval (float): 后台检查nonce/gas价格/头寸的间隔（秒）
+        """
+        self.web3_manager = web3_manager
+        self.refresh_interval = refresh_interval
+        self.armed = []
+        self.armed_key = None
+        self.last_fire_ms = None
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+    def _arm_key(self, positions, nonce, gas_price):
+        """签名依赖的状态，任一变化都需要重新签名（包括预模拟得到的gas上限）"""
+        gas_limits = tuple(self.web3_manager.get_exit_gas_limit(group)
+                           for group in self.web3_manager.group_exit_positions(positions))
+        return (tuple((p['token_id'], p['liquidity']) for p in positions), nonce, gas_price, gas_limits)
+
+    def refresh(self):
+        """检查状态变化并在需要时重新签名，返回是否重新签名"""
+        positions = list(self.web3_manager.get_current_positions())
+        # 空闲时与链上同步nonce，感知钱包在其他地方发出的交易
+        nonce = self.web3_manager.nonce_manager.sync_if_idle()
+        gas_price = self.web3_manager.get_gas_price()
+        key = self._arm_key(positions, nonce, gas_price)
+
+        with self.lock:
+            expiring = self.armed and self.armed[0]['deadline'] - time.time() < self.DEADLINE_MARGIN
+            if key == self.armed_key and not expiring:
+                return False
+
+            deadline = int(time.time()) + self.DEADLINE_TTL
+            armed = []
+            for group, txn in self.web3_manager.build_exit_transactions(positions, nonce, gas_price, deadline):
+                armed.append({
+                    'positions': group,
+                    'nonce': txn['nonce'],
+                    'gas_price': gas_price,
+                    'deadline': deadline,
+                    'raw': self.web3_manager.sign_transaction(txn)
+                })
+            self.armed = armed
+            self.armed_key = key
+
+        if armed:
+            print(f'【BR】🔫 已预签名 {len(armed)} 笔移除交易，nonce {nonce}，gas {Web3.from_wei(gas_price, "gwei")} gwei')
+        return True
+
+    def covers(self, positions):
+        """判断已签名交易是否恰好覆盖给定头寸"""
+        with self.lock:
+            armed = {(p['token_id'], p['liquidity']) for a in self.armed for p in a['positions']}
+        return bool(armed) and armed == {(p['token_id'], p['liquidity']) for p in positions}
+
+    def fire(self):
+        """按nonce顺序广播全部预签名交易
+
+        Returns:
+            list: (头寸列表, tx_hash) 列表，广播失败的交易不包含在内
+        """
+        nonce_manager = self.web3_manager.nonce_manager
+        with self.lock:
+            armed, self.armed = self.armed, []
+            self.armed_key = None
+            if not armed:
+                return []
+            # 预留签名时使用的nonce，期间若有其他交易占用则预签名交易已失效
+            first = nonce_manager.reserve(len(armed))
+            if first != armed[0]['nonce']:
+                for nonce in range(first + len(armed) - 1, first - 1, -1):
+                    nonce_manager.release(nonce)
+                print(f"【BR】⚠️ 预签名交易nonce已失效 ({armed[0]['nonce']} != {first})")
+                return []
+
+        started = time.perf_counter()
+        fired = []
+        for i, item in enumerate(armed):
+            try:
+                tx_hash = self.web3_manager.send_raw_transaction(item['raw'])
+                nonce_manager.confirm(item['nonce'])
+                self.web3_manager.record_exit(tx_hash, item['positions'], item['nonce'], item['gas_price'])
+                fired.append((item['positions'], tx_hash))
+            except Exception as e:
+                print(f"【BR】预签名交易广播失败 nonce {item['nonce']}: {e}")
+                for rest in reversed(armed[i:]):
+                    nonce_manager.release(rest['nonce'], e)
+                break
+        self.last_fire_ms = (time.perf_counter() - started) * 1000
+
+        for group, tx_hash in fired:
+            print(f"【BR】🚀 预签名移除交易已广播 ({len(group)} 个头寸): {tx_hash.hex()}")
+        print(f'【BR】⚡ 预签名交易广播耗时 {self.last_fire_ms:.1f}ms')
+        return fired
+
+    def start(self):
+        """启动后台刷新线程"""
+        if self.running:
+            return
+        self.running = True
+
+        def loop():
+            while self.running:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f'【BR】预签名交易刷新失败: {e}')
+                time.sleep(self.refresh_interval)
+
+        self.thread = threading.Thread(target=loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """停止后台刷新线程"""
+        self.running = False
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=self.refresh_interval + 1)
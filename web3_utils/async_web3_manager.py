@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步Web3操作管理类 - 基于AsyncWeb3，头寸查询和交易广播在同一事件循环中并发执行
+
+接口与Web3Manager一致（connect / get_v3_positions / execute_multicall / get_current_positions），
+其中涉及RPC的方法为协程。全部请求复用同一个aiohttp会话，无需为每个操作创建线程。
+交易编码、分组和签名等不涉及RPC的逻辑来自共用的Web3ManagerBase；不继承Web3Manager的同步RPC方法，
+避免同步代码调用到被覆盖为协程的方法。
+
+使用示例:
+    >>> manager = AsyncWeb3Manager(config)
+    >>> await manager.connect()
+    >>> positions = await manager.get_v3_positions()
+    >>> success = await manager.execute_batch_multicall(positions)
+    >>> await manager.close()
+"""
+
+import asyncio
+import time
+import aiohttp
+from web3 import AsyncWeb3, Web3
+from .nonce_manager import AsyncNonceManager
+from .web3_manager import Web3ManagerBase, POSITION_OUTPUT_TYPES, _encode_function_call
+
+# 兼容不同版本的web3.py库
+try:
+    from web3.middleware import ExtraDataToPOAMiddleware as async_poa_middleware
+except ImportError:
+    try:
+        from web3.middleware import async_geth_poa_middleware as async_poa_middleware
+    except ImportError:
+        async_poa_middleware = None
+
+
+class AsyncWeb3Manager(Web3ManagerBase):
+    """基于AsyncWeb3的Web3Manager"""
+
+    def __init__(self, config):
+        """
+        初始化AsyncWeb3Manager
+
+        Args:
+            config (dict): 包含web3配置的字典
+        """
+        super().__init__(config)
+        # 全部请求共用的aiohttp会话，connect时创建
+        self.session = None
+
+    async def connect(self):
+        """创建异步Web3连接，并缓存链ID和区块gas上限"""
+        try:
+            request_kwargs = {'timeout': aiohttp.ClientTimeout(total=30)}
+            if self.config['proxy_config']['enabled']:
+                request_kwargs['proxy'] = self.config['proxy_config']['https_proxy'] or self.config['proxy_config']['http_proxy']
+
+            provider = AsyncWeb3.AsyncHTTPProvider(self.config['web3_config']['rpc_url'], request_kwargs=request_kwargs)
+            if self.session is None or self.session.closed:
+                self.session = aiohttp.ClientSession()
+            await provider.cache_async_session(self.session)
+            self.web3 = AsyncWeb3(provider)
+
+            # 安全注入POA中间件
+            if async_poa_middleware is not None:
+                try:
+                    self.web3.middleware_onion.inject(async_poa_middleware, layer=0)
+                except Exception as e:
+                    print(f'【BR】注入POA中间件失败: {e}')
+
+            if await self.web3.is_connected():
+                self.chain_id, block = await asyncio.gather(
+                    self.web3.eth.chain_id,
+                    self.web3.eth.get_block('latest')
+                )
+                # 交易分组在同步代码中读取区块gas上限，这里提前缓存
+                self.block_gas_limit = block['gasLimit']
+                if self.config['web3_config'].get('wallet_address'):
+                    wallet = Web3.to_checksum_address(self.config['web3_config']['wallet_address'])
+                    self.nonce_manager = AsyncNonceManager(self.web3, wallet)
+                self.connected = True
+                print("【BR】✅ BSC网络连接成功（异步）")
+                return True
+            else:
+                self.connected = False
+                print("【BR】❌ BSC网络连接失败")
+                return False
+        except Exception as e:
+            self.connected = False
+            print(f'【BR】Web3连接失败: {e}')
+            return False
+
+    async def is_connected(self, probe=False):
+        """检查Web3连接状态，默认返回缓存状态；probe为True时发送请求实时检查"""
+        if self.web3 is None:
+            return False
+        if probe:
+            self.connected = await self.web3.is_connected()
+        return self.connected
+
+    async def close(self):
+        """关闭共享的aiohttp会话"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def aggregate_calls(self, calls, block_identifier='latest'):
+        """通过Multicall3批量执行只读调用，各分块并发请求
+
+        Returns:
+            list: 与calls一一对应的 (success, returnData) 列表
+        """
+        multicall = self._get_multicall3()
+        chunk_size = max(1, int(self.config['web3_config'].get('discovery_chunk_size', 200)))
+        chunks = [
+            [(Web3.to_checksum_address(target), True, data) for target, data in calls[start:start + chunk_size]]
+            for start in range(0, len(calls), chunk_size)
+        ]
+        results = await asyncio.gather(*[
+            multicall.functions.aggregate3(chunk).call(block_identifier=block_identifier) for chunk in chunks
+        ])
+        return [item for chunk in results for item in chunk]
+
+    async def read_positions(self, token_ids, block_identifier='latest'):
+        """通过Multicall3批量读取头寸详情
+
+        Returns:
+            dict: token_id -> {'token_id', 'token0', 'token1', 'liquidity'}，查询失败的token_id不包含在内
+        """
+        position_manager = self._get_position_manager()
+        calls = [
+            (position_manager.address, _encode_function_call(position_manager, 'positions', [token_id]))
+            for token_id in token_ids
+        ]
+        result = {}
+        for token_id, (success, data) in zip(token_ids, await self.aggregate_calls(calls, block_identifier)):
+            if not success:
+                print(f"【BR】查询头寸 #{token_id} 详情失败，跳过")
+                continue
+            fields = self.web3.codec.decode(POSITION_OUTPUT_TYPES, data)
+            result[token_id] = {
+                'token_id': token_id,
+                'token0': Web3.to_checksum_address(fields[2]),
+                'token1': Web3.to_checksum_address(fields[3]),
+                'liquidity': fields[7]
+            }
+        return result
+
+    async def enumerate_positions(self):
+        """通过Multicall3枚举钱包持有的全部USDT-BR头寸（包含流动性为0的头寸）
+
+        Returns:
+            tuple: (查询所基于的区块高度, 头寸详情列表)，列表按token_id从新到旧排列
+        """
+        position_manager = self._get_position_manager()
+        wallet = Web3.to_checksum_address(self.config['web3_config']['wallet_address'])
+
+        # 固定在同一区块查询，避免枚举过程中头寸变化导致数据不一致
+        block = await self.web3.eth.block_number
+        balance = await position_manager.functions.balanceOf(wallet).call(block_identifier=block)
+        self.last_discovery_block = block
+        if balance == 0:
+            return block, []
+
+        print(f"【BR】开始批量查询头寸，总数: {balance}，区块: {block}")
+
+        index_calls = [
+            (position_manager.address, _encode_function_call(position_manager, 'tokenOfOwnerByIndex', [wallet, i]))
+            for i in range(balance - 1, -1, -1)
+        ]
+        token_ids = []
+        for i, (success, data) in enumerate(await self.aggregate_calls(index_calls, block)):
+            if not success:
+                print(f"【BR】查询头寸索引 {balance - 1 - i} 失败，跳过")
+                continue
+            token_ids.append(self.web3.codec.decode(['uint256'], data)[0])
+
+        details = await self.read_positions(token_ids, block)
+        return block, [
+            details[token_id] for token_id in token_ids
+            if token_id in details and self._is_usdt_br_pair(details[token_id]['token0'], details[token_id]['token1'])
+        ]
+
+    async def _get_v3_positions_concurrent(self):
+        """逐个查询头寸 - 不依赖Multicall3，全部头寸的查询在事件循环中并发执行"""
+        position_manager = self._get_position_manager()
+        wallet = Web3.to_checksum_address(self.config['web3_config']['wallet_address'])
+        block = await self.web3.eth.block_number
+        balance = await position_manager.functions.balanceOf(wallet).call(block_identifier=block)
+
+        token_ids = await asyncio.gather(*[
+            position_manager.functions.tokenOfOwnerByIndex(wallet, i).call(block_identifier=block)
+            for i in range(balance - 1, -1, -1)
+        ])
+        details = await asyncio.gather(*[
+            position_manager.functions.positions(token_id).call(block_identifier=block) for token_id in token_ids
+        ])
+        self.last_discovery_block = block
+        return block, [
+            {'token_id': token_id, 'token0': data[2], 'token1': data[3], 'liquidity': data[7]}
+            for token_id, data in zip(token_ids, details) if self._is_usdt_br_pair(data[2], data[3])
+        ]
+
+    async def get_v3_positions(self, batch=None):
+        """获取USDT-BR活跃头寸
+
+        Args:
+            batch (bool): 是否使用Multicall3批量查询，默认读取 web3_config.batch_discovery（默认开启）。
+                失败时回退到并发逐个查询。
+        """
+        if not await self.is_connected():
+            print("【BR】❌ Web3未连接")
+            return []
+
+        if batch is None:
+            batch = self.config['web3_config'].get('batch_discovery', True)
+
+        started = time.time()
+        try:
+            if batch:
+                try:
+                    block, details = await self.enumerate_positions()
+                except Exception as e:
+                    print(f'【BR】批量查询头寸失败，回退到并发查询: {e}')
+                    block, details = await self._get_v3_positions_concurrent()
+            else:
+                block, details = await self._get_v3_positions_concurrent()
+        except Exception as e:
+            print(f'【BR】获取头寸失败: {e}')
+            self.current_positions = []
+            return []
+
+        positions = []
+        for detail in details:
+            if detail['liquidity'] > 0:
+                positions.append({'token_id': detail['token_id'], 'liquidity': detail['liquidity']})
+                print(f"【BR】✅ 找到USDT-BR头寸 #{detail['token_id']}，流动性: {detail['liquidity']}")
+
+        print(f"【BR】🚀 头寸查询完成，区块 {block}，USDT-BR头寸 {len(positions)} 个，耗时 {time.time() - started:.2f}s")
+        if not positions:
+            print("【BR】❌ 未找到USDT-BR头寸")
+        self.current_positions = positions
+        return positions
+
+    async def refresh_positions(self):
+        """刷新头寸缓存（异步版本不使用本地头寸索引，直接完整查询）"""
+        return await self.get_v3_positions()
+
+    async def send_raw_transaction(self, raw_transaction):
+        """广播已签名的原始交易，返回交易哈希"""
+        return await self.web3.eth.send_raw_transaction(raw_transaction)
+
+    async def wait_for_exit(self, tx_hash, positions=None):
+        """等待移除交易上链，返回是否成功"""
+        if positions is not None and isinstance(positions, dict):
+            positions = [positions]
+        try:
+            receipt = await self.web3.eth.wait_for_transaction_receipt(
+                tx_hash,
+                timeout=self.config['web3_config'].get('receipt_timeout', 120),
+                poll_latency=self.config['web3_config'].get('receipt_poll_interval', 0.5)
+            )
+        except Exception as e:
+            print(f'【BR】等待交易回执失败 {tx_hash.hex()}: {e}')
+            return False
+
+        ids = ', '.join(f"#{p['token_id']}" for p in positions or [])
+        if receipt.status == 1:
+            print(f'【BR】✅ 头寸 {ids} 移除成功！交易哈希: {tx_hash.hex()}')
+            return True
+        print(f'【BR】❌ 头寸 {ids} 移除交易失败: {tx_hash.hex()}')
+        return False
+
+    async def submit_exits(self, positions, gas_price=None):
+        """构建、签名并并发广播全部头寸的移除交易，不等待上链
+
+        交易分组与Web3Manager.build_exit_transactions一致，各笔交易占用连续的nonce。
+
+        Returns:
+            list: (头寸列表, tx_hash) 列表，广播失败的交易不包含在内
+        """
+        gas_price = gas_price or self.get_gas_price()
+        groups = self.group_exit_positions(positions)
+        if not groups:
+            return []
+        first = await self.nonce_manager.reserve_async(len(groups))
+        signed = []
+        for i, group in enumerate(groups):
+            txn = self.build_exit_transaction(group, first + i, gas_price)
+            signed.append((group, txn['nonce'], self.sign_transaction(txn)))
+
+        results = await asyncio.gather(
+            *[self.send_raw_transaction(raw) for _, _, raw in signed],
+            return_exceptions=True
+        )
+        submitted = []
+        # 倒序归还失败的nonce，使最后预留的nonce可以直接回退
+        for (group, nonce, _), result in reversed(list(zip(signed, results))):
+            if isinstance(result, Exception):
+                print(f'【BR】移除交易广播失败 nonce {nonce}: {result}')
+                self.nonce_manager.release(nonce, result)
+            else:
+                self.nonce_manager.confirm(nonce)
+                print(f"【BR】🚀 移除交易已广播 ({len(group)} 个头寸): {result.hex()}")
+                submitted.append((group, result))
+        return list(reversed(submitted))
+
+    async def execute_multicall(self, position):
+        """执行单个头寸的Multicall移除操作并等待上链"""
+        try:
+            submitted = await self.submit_exits([position])
+            if not submitted:
+                return False
+            group, tx_hash = submitted[0]
+            return await self.wait_for_exit(tx_hash, group)
+        except Exception as e:
+            print(f'【BR】Multicall执行失败: {e}')
+            return False
+
+    async def execute_batch_multicall(self, positions):
+        """移除全部头寸：并发广播后并发等待上链
+
+        Returns:
+            int: 成功移除的头寸数量
+        """
+        try:
+            submitted = await self.submit_exits(positions)
+            results = await asyncio.gather(*[self.wait_for_exit(tx_hash, group) for group, tx_hash in submitted])
+            return sum(len(group) for (group, _), ok in zip(submitted, results) if ok)
+        except Exception as e:
+            print(f'【BR】批量移除失败: {e}')
+            return 0
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+移除交易预模拟 - 每个新区块对缓存头寸的移除交易执行eth_estimateGas并缓存结果
+
+触发移除时直接读取最近一次模拟结果：交易是否会回滚、回滚原因以及每笔交易的gas估算，
+无需在关键路径上再发送模拟请求。全部交易的模拟合并为一次JSON-RPC批量请求。
+
+使用示例:
+    >>> simulator = web3_manager.start_exit_simulator()
+    >>> result = simulator.result_for(positions)
+    >>> if result and not result['ok']:
+    ...     print(result['errors'])
+"""
+
+import threading
+import time
+from web3 import Web3
+
+
+class ExitSimulator:
+    """按区块模拟移除交易的后台服务
+
+    Attributes:
+        result (dict): 最近一次模拟结果，包含 block / key / ok / gas / errors / time
+        last_block (int): 最近一次模拟的区块高度
+    """
+
+    def __init__(self, web3_manager, poll_interval=1):
+        """
+        初始化移除交易预模拟
+
+        Args:
+            web3_manager (Web3Manager): 已连接的Web3Manager实例
+            poll_interval (float): 检查新区块的间隔（秒）
+        """
+        self.web3_manager = web3_manager
+        self.poll_interval = poll_interval
+        self.result = None
+        self.last_block = None
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+    @staticmethod
+    def positions_key(positions):
+        """模拟结果对应的头寸状态"""
+        return tuple(sorted((p['token_id'], p['liquidity']) for p in positions))
+
+    def simulate(self, positions, block=None):
+        """模拟给定头寸的全部移除交易
+
+        交易分组与Web3Manager.group_exit_positions一致，每组交易一次eth_estimateGas，合并为一次批量请求。
+
+        Returns:
+            dict: 模拟结果，gas为每组交易的gas估算（回滚的组为None），errors为回滚原因列表
+        """
+        manager = self.web3_manager
+        wallet = Web3.to_checksum_address(manager.config['web3_config']['wallet_address'])
+        groups = manager.group_exit_positions(positions)
+        requests = []
+        for group in groups:
+            txn = manager.build_exit_transaction(group, 0, manager.get_gas_price())
+            requests.append(('eth_estimateGas', [{
+                'from': wallet,
+                'to': txn['to'],
+                'data': txn['data'],
+                'value': '0x0'
+            }]))
+
+        responses = manager.batch_rpc_responses(requests)
+        gas, errors = [], []
+        for group, response in zip(groups, responses):
+            if 'error' in response:
+                gas.append(None)
+                ids = ', '.join(f"#{p['token_id']}" for p in group)
+                errors.append(f"{ids}: {response['error'].get('message', response['error'])}")
+            else:
+                gas.append(int(response['result'], 16))
+
+        result = {
+            'block': block,
+            'key': self.positions_key(positions),
+            'groups': [self.positions_key(group) for group in groups],
+            'ok': not errors,
+            'gas': gas,
+            'errors': errors,
+            'time': time.time()
+        }
+        with self.lock:
+            previous, self.result = self.result, result
+        if errors and (previous is None or previous['errors'] != errors):
+            print(f"【BR】⚠️ 移除交易模拟回滚: {'; '.join(errors)}")
+        return result
+
+    def result_for(self, positions):
+        """获取与给定头寸一致的最近一次模拟结果，头寸已变化时返回None"""
+        with self.lock:
+            result = self.result
+        if result is None or result['key'] != self.positions_key(positions):
+            return None
+        return result
+
+    def gas_for(self, group):
+        """获取一组头寸最近一次模拟的gas估算，没有对应结果时返回None"""
+        with self.lock:
+            result = self.result
+        if result is None:
+            return None
+        key = self.positions_key(group)
+        for group_key, gas in zip(result['groups'], result['gas']):
+            if group_key == key:
+                return gas
+        return None
+
+    def poll(self):
+        """有新区块时模拟当前缓存头寸的移除交易"""
+        positions = list(self.web3_manager.get_current_positions())
+        if not positions:
+            return
+        block = self.web3_manager.web3.eth.block_number
+        with self.lock:
+            unchanged = self.result is not None and self.result['key'] == self.positions_key(positions)
+        if block == self.last_block and unchanged:
+            return
+        self.last_block = block
+        self.simulate(positions, block)
+
+    def start(self):
+        """启动后台模拟线程"""
+        if self.running:
+            return
+        self.running = True
+
+        def loop():
+            while self.running:
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f'【BR】移除交易模拟失败: {e}')
+                time.sleep(self.poll_interval)
+
+        self.thread = threading.Thread(target=loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """停止后台模拟线程"""
+        self.running = False
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+独立的移除交易执行进程 - 与监控进程隔离，避免消息解析、日志和告警占用GIL延迟移除交易
+
+工作进程启动时创建自己的Web3Manager（独立的RPC连接和私钥），完成连接、nonce同步并按配置启动
+预签名/gas预言机/预模拟，之后阻塞等待触发。监控进程通过Pipe发送触发命令，工作进程广播交易后
+立即返回交易哈希和耗时，交易上链后再返回回执结果。
+
+监控进程只负责维护头寸缓存并通过update_positions同步给工作进程，不再自己发送交易，
+避免两个进程使用同一钱包时nonce冲突。工作进程未能及时报告广播结果时，监控进程终止工作进程，
+通过remaining_exit_positions确认其已广播的交易上链后，只在本进程移除仍有流动性的头寸。
+
+使用示例:
+    >>> worker = ExitWorker(config).start()
+    >>> worker.update_positions(positions)
+    >>> request = worker.trigger()
+    >>> submitted = request['submitted'].result(timeout=10)
+    >>> result = request['result'].result(timeout=180)
+"""
+
+import itertools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, as_completed
+from web3 import Web3
+
+
+def _worker_main(config, conn):
+    """工作进程入口"""
+    from .web3_manager import Web3Manager
+
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    # 头寸由监控进程同步，工作进程不使用本地头寸索引，避免两个进程同时写入同一个数据库
+    config = dict(config, web3_config=dict(config['web3_config'], position_index_path=''))
+    manager = Web3Manager(config)
+    if not manager.connect():
+        send({'type': 'ready', 'ok': False})
+        return
+    manager.start_health_monitor()
+    web3_config = config['web3_config']
+    if web3_config.get('gas_oracle', {}).get('enabled', False):
+        try:
+            manager.start_gas_oracle()
+        except Exception as e:
+            print(f'【BR】❌ gas价格预言机启动失败，使用固定gas价格: {e}')
+    if web3_config.get('simulate_exit', False):
+        manager.start_exit_simulator()
+    if web3_config.get('armed_exit', False):
+        manager.start_armed_exit()
+    # 提前同步nonce，触发时无需查询
+    if manager.nonce_manager:
+        manager.nonce_manager.peek()
+    send({'type': 'ready', 'ok': True, 'pid': multiprocessing.current_process().pid})
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        command = message.get('cmd')
+        if command == 'stop':
+            break
+        elif command == 'ping':
+            send({'type': 'pong', 'id': message['id'], 'sent_at': message['sent_at'], 'received_at': time.time()})
+        elif command == 'positions':
+            manager.current_positions = message['positions']
+        elif command == 'exit':
+            _handle_exit(manager, message, send)
+
+
+def _handle_exit(manager, message, send):
+    """广播移除交易，立即返回交易哈希；回执在后台线程中等待后返回"""
+    received_at = time.time()
+    positions = message.get('positions') or manager.get_current_positions()
+    if not positions:
+        positions = manager.get_v3_positions()
+
+    try:
+        sent = manager.submit_exits(positions) if positions else []
+        error = None
+    except Exception as e:
+        sent, error = [], str(e)
+    submitted_at = time.time()
+
+    txs = [{'token_ids': [p['token_id'] for p in group], 'tx_hash': Web3.to_hex(tx_hash)} for group, tx_hash in sent]
+    timings = {
+        'ipc_ms': (received_at - message['sent_at']) * 1000,
+        'submit_ms': (submitted_at - received_at) * 1000,
+        'trigger_to_submit_ms': (submitted_at - message['sent_at']) * 1000
+    }
+    send({'type': 'submitted', 'id': message['id'], 'txs': txs, 'positions': len(positions), 'error': error,
+          'timings': timings})
+
+    def wait():
+        futures = {manager.watch_exit(tx_hash, group): (group, item) for (group, tx_hash), item in zip(sent, txs)}
+        success_count = 0
+        for future in as_completed(futures):
+            group, item = futures[future]
+            try:
+                receipt = future.result()
+                item.update({
+                    'status': receipt.status,
+                    'block_number': receipt.blockNumber,
+                    'gas_used': receipt.gasUsed,
+                    # 提价重发后上链的可能是替换交易
+                    'mined_hash': Web3.to_hex(receipt.transactionHash)
+                })
+                if receipt.status == 1:
+                    success_count += len(group)
+            except Exception as e:
+                item.update({'status': None, 'error': str(e)})
+            item['confirm_ms'] = (time.time() - received_at) * 1000
+        send({'type': 'result', 'id': message['id'], 'success_count': success_count, 'positions': len(positions),
+              'txs': txs, 'error': error, 'timings': dict(timings, total_ms=(time.time() - message['sent_at']) * 1000)})
+
+    threading.Thread(target=wait, daemon=True).start()
+
+
+def remaining_exit_positions(manager, positions, timeout=120, poll_interval=1):
+    """工作进程失去响应后，找出仍需在本进程移除的头寸
+
+    工作进程可能已用同一钱包广播了部分移除交易。先等待钱包的pending交易全部上链（latest nonce
+    追上pending nonce），再与链上nonce同步并读取头寸流动性，只返回仍有流动性的头寸，
+    避免重复移除或使用冲突的nonce。应在工作进程终止后调用。
+
+    Args:
+        manager (Web3Manager): 本进程的Web3Manager
+        positions (list): 触发移除的头寸
+        timeout (float): 等待pending交易上链的最长时间（秒），超时后按当前链上状态处理
+        poll_interval (float): 查询nonce的间隔（秒）
+
+    Returns:
+        list: 仍需移除的头寸；读取失败的头寸视为仍需移除
+    """
+    wallet = Web3.to_checksum_address(manager.config['web3_config']['wallet_address'])
+    deadline = time.time() + timeout
+    while manager.web3.eth.get_transaction_count(wallet, 'latest') < manager.web3.eth.get_transaction_count(wallet, 'pending'):
+        if time.time() >= deadline:
+            print('【BR】⚠️ 等待工作进程的交易上链超时，按当前链上状态移除')
+            break
+        time.sleep(poll_interval)
+
+    if manager.nonce_manager:
+        manager.nonce_manager.sync()
+    try:
+        details = manager.read_positions([p['token_id'] for p in positions])
+    except Exception as e:
+        print(f'【BR】读取头寸流动性失败: {e}')
+        return list(positions)
+    return [p for p in positions if p['token_id'] not in details or details[p['token_id']]['liquidity'] > 0]
+
+
+class ExitWorker:
+    """监控进程中的工作进程句柄"""
+
+    def __init__(self, config, start_timeout=60):
+        """
+        初始化工作进程句柄
+
+        Args:
+            config (dict): 完整配置，需包含web3_config和proxy_config
+            start_timeout (float): 等待工作进程完成连接的最长时间（秒）
+        """
+        self.config = {'web3_config': config['web3_config'], 'proxy_config': config['proxy_config']}
+        self.start_timeout = start_timeout
+        self.process = None
+        self.conn = None
+        self.requests = {}
+        self.ids = itertools.count(1)
+        self.send_lock = threading.Lock()
+        self.reader = None
+
+    def start(self):
+        """启动工作进程并等待其完成连接和预热"""
+        # spawn方式启动，避免fork复制监控进程中的线程和锁
+        context = multiprocessing.get_context('spawn')
+        self.conn, child_conn = context.Pipe(duplex=True)
+        self.process = context.Process(target=_worker_main, args=(self.config, child_conn), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+        if not self.conn.poll(self.start_timeout):
+            raise TimeoutError('移除交易工作进程启动超时')
+        ready = self.conn.recv()
+        if not ready.get('ok'):
+            raise ConnectionError('移除交易工作进程连接Web3失败')
+        print(f"【BR】🧵 移除交易工作进程已就绪 (pid {ready['pid']})")
+
+        self.reader = threading.Thread(target=self._read_loop, daemon=True)
+        self.reader.start()
+        return self
+
+    def _send(self, message):
+        with self.send_lock:
+            self.conn.send(message)
+
+    def _read_loop(self):
+        """接收工作进程返回的消息并完成对应的Future"""
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            request = self.requests.get(message.get('id'))
+            if request is None:
+                continue
+            if message['type'] == 'pong':
+                request['result'].set_result((time.time() - message['sent_at']) * 1000)
+                self.requests.pop(message['id'], None)
+            elif message['type'] == 'submitted':
+                request['submitted'].set_result(message)
+            elif message['type'] == 'result':
+                request['result'].set_result(message)
+                self.requests.pop(message['id'], None)
+
+        # 工作进程退出，未完成的请求全部失败
+        for request in self.requests.values():
+            for future in (request['submitted'], request['result']):
+                if not future.done():
+                    future.set_exception(ConnectionError('移除交易工作进程已退出'))
+        self.requests.clear()
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def update_positions(self, positions):
+        """同步监控进程的头寸缓存，预签名模式据此重新签名"""
+        self._send({'cmd': 'positions', 'positions': [dict(p) for p in positions]})
+
+    def trigger(self, positions=None):
+        """触发移除
+
+        Args:
+            positions (list): 可选，要移除的头寸；默认使用最近一次同步的头寸
+
+        Returns:
+            dict: {'id', 'submitted': Future, 'result': Future}，
+                submitted结果为交易哈希和广播耗时，result结果为回执和总耗时
+        """
+        request_id = next(self.ids)
+        request = {'id': request_id, 'submitted': Future(), 'result': Future()}
+        self.requests[request_id] = request
+        message = {'cmd': 'exit', 'id': request_id, 'sent_at': time.time()}
+        if positions:
+            message['positions'] = [dict(p) for p in positions]
+        self._send(message)
+        return request
+
+    def ping(self, timeout=5):
+        """测量与工作进程的往返延迟（毫秒）"""
+        request_id = next(self.ids)
+        request = {'id': request_id, 'submitted': Future(), 'result': Future()}
+        self.requests[request_id] = request
+        self._send({'cmd': 'ping', 'id': request_id, 'sent_at': time.time()})
+        return request['result'].result(timeout=timeout)
+
+    def stop(self, timeout=5):
+        """停止工作进程，超时未退出时强制终止；返回时进程已退出，未完成的请求均已失败"""
+        if self.is_alive():
+            try:
+                self._send({'cmd': 'stop'})
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
+        if self.reader:
+            self.reader.join(timeout=1)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+移除交易自动提价 - 交易连续N个区块未上链时，用同一nonce以更高gas价格重新签名并广播
+
+ReceiptWatcher的区块回调只判断是否需要提价，重新签名和广播交给独立的线程池执行，
+不阻塞其他待确认交易的回执查询。替换交易的哈希登记到原来的Future上，
+原交易或任一替换交易上链即完成。gas价格不超过配置的上限，达到上限后不再提价。
+
+使用示例:
+    >>> bumper = FeeBumper(web3_manager, bump_blocks=3, bump_ratio=1.2, max_gas_price_gwei=5)
+    >>> future = watcher.watch(tx_hash, on_block=bumper.tracker(tx_hash, positions, nonce, gas_price))
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from web3 import Web3
+
+# 节点接受替换交易要求的最低提价比例（geth默认10%）
+MIN_REPLACEMENT_RATIO = 1.1
+
+
+class FeeBumper:
+    """为未上链的移除交易按区块提价"""
+
+    def __init__(self, web3_manager, bump_blocks=3, bump_ratio=1.2, max_gas_price_gwei=5, workers=2):
+        """
+        初始化自动提价
+
+        Args:
+            web3_manager (Web3Manager): 已连接的Web3Manager实例
+            bump_blocks (int): 连续多少个区块未上链时提价
+            bump_ratio (float): 每次提价的倍数，不低于1.1（节点接受替换交易的最低要求）
+            max_gas_price_gwei (float): gas价格上限（gwei）
+            workers (int): 执行重新签名和广播的线程数
+        """
+        self.web3_manager = web3_manager
+        self.bump_blocks = bump_blocks
+        self.bump_ratio = max(bump_ratio, MIN_REPLACEMENT_RATIO)
+        self.max_gas_price = Web3.to_wei(max_gas_price_gwei, 'gwei')
+        self.workers = workers
+        # 首次提价时创建
+        self.executor = None
+
+    def tracker(self, tx_hash, positions, nonce, gas_price):
+        """创建一笔交易的区块回调，用作ReceiptWatcher.watch的on_block参数"""
+        state = {
+            'tx_hash': tx_hash,
+            'positions': positions,
+            'nonce': nonce,
+            'gas_price': gas_price,
+            'sent_block': None,
+            'bumps': 0,
+            'bumping': False,
+            'done': False
+        }
+        return lambda block: self.on_block(state, block)
+
+    def next_gas_price(self, gas_price):
+        """计算下一次提价后的gas价格，不低于当前建议价格，不超过上限"""
+        bumped = int(gas_price * self.bump_ratio)
+        bumped = max(bumped, self.web3_manager.get_gas_price())
+        return min(bumped, self.max_gas_price)
+
+    def on_block(self, state, block):
+        """新区块回调：交易已等待bump_blocks个区块时提交提价任务，不等待广播完成"""
+        if state['done'] or state['bumping']:
+            return
+        if state['sent_block'] is None:
+            state['sent_block'] = block
+            return
+        if block - state['sent_block'] < self.bump_blocks:
+            return
+
+        gas_price = self.next_gas_price(state['gas_price'])
+        if gas_price < state['gas_price'] * MIN_REPLACEMENT_RATIO:
+            # 已达到上限，节点不会接受提价幅度不足的替换交易
+            print(f"【BR】⚠️ nonce {state['nonce']} 已达到gas价格上限 {Web3.from_wei(state['gas_price'], 'gwei')} gwei，停止提价")
+            state['done'] = True
+            return
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='fee-bump')
+        state['bumping'] = True
+        self.executor.submit(self._bump, state, block, gas_price)
+
+    def _bump(self, state, block, gas_price):
+        """以新的gas价格重新签名并广播（在提价线程池中执行）"""
+        try:
+            self._send_replacement(state, block, gas_price)
+        except Exception as e:
+            print(f"【BR】nonce {state['nonce']} 提价重发失败: {e}")
+        finally:
+            state['bumping'] = False
+
+    def _send_replacement(self, state, block, gas_price):
+        """签名并广播替换交易，成功后将新哈希登记到ReceiptWatcher"""
+        manager = self.web3_manager
+        txn = manager.build_exit_transaction(state['positions'], state['nonce'], gas_price)
+        try:
+            new_hash = manager.send_raw_transaction(manager.sign_transaction(txn))
+        except Exception as e:
+            message = str(e).lower()
+            if 'nonce too low' in message:
+                # 原交易已上链，回执会在下一次轮询中返回
+                state['done'] = True
+            elif 'underpriced' in message:
+                # 节点要求更高的提价幅度，下一个区块在此基础上继续提价
+                state['gas_price'] = gas_price
+            else:
+                print(f"【BR】nonce {state['nonce']} 提价重发失败: {e}")
+            return
+
+        state['bumps'] += 1
+        state['gas_price'] = gas_price
+        state['sent_block'] = block
+        manager.get_receipt_watcher().add_hash(state['tx_hash'], new_hash)
+        print(f"【BR】⏫ nonce {state['nonce']} 已等待 {self.bump_blocks} 个区块未上链，"
+              f"提价至 {Web3.from_wei(gas_price, 'gwei')} gwei 重新广播 (第{state['bumps']}次): {new_hash.hex()}")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台gas价格预言机 - 每个新区块采样近期区块的实际成交价格和节点的pending价格，维护建议gas价格
+
+建议价格 = max(近期区块指定分位的有效gas价格中位数, eth_gasPrice) × 激进系数，并限制在下限/上限之间。
+近期区块价格通过eth_feeHistory获取（baseFee + 分位小费），与eth_gasPrice合并为一次批量请求；
+节点不支持eth_feeHistory（返回method not found，或连续多次失败）时只使用eth_gasPrice。
+
+使用示例:
+    >>> oracle = GasOracle(web3_manager, multiplier=1.2, floor_gwei=0.1, cap_gwei=5)
+    >>> oracle.start()
+    >>> gas_price = oracle.get_price()
+"""
+
+import statistics
+import threading
+import time
+from web3 import Web3
+
+# JSON-RPC规范中方法不存在的错误码
+METHOD_NOT_FOUND = -32601
+
+
+class GasOracle:
+    """维护建议gas价格的后台服务
+
+    Attributes:
+        price (int): 当前建议gas价格（wei），首次采样前为None
+        last_block (int): 最近一次采样的区块高度
+        last_sample (dict): 最近一次采样的原始数据，用于日志和排查
+    """
+
+    def __init__(self, web3_manager, sample_blocks=20, percentile=60, multiplier=1.2,
+                 floor_gwei=0.1, cap_gwei=5, poll_interval=1, max_fee_history_failures=5):
+        """
+        初始化gas价格预言机
+
+        Args:
+            web3_manager (Web3Manager): 已连接的Web3Manager实例
+            sample_blocks (int): 采样的近期区块数
+            percentile (float): 区块内交易小费的采样分位（0-100），越高越激进
+            multiplier (float): 激进系数，在采样价格基础上的倍数
+            floor_gwei (float): 建议价格下限（gwei）
+            cap_gwei (float): 建议价格上限（gwei）
+            poll_interval (float): 检查新区块的间隔（秒）
+            max_fee_history_failures (int): eth_feeHistory连续失败多少次后停止使用
+        """
+        if floor_gwei > cap_gwei:
+            raise ValueError(f'gas价格下限 {floor_gwei} gwei 高于上限 {cap_gwei} gwei')
+        self.web3_manager = web3_manager
+        self.sample_blocks = sample_blocks
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.floor = Web3.to_wei(floor_gwei, 'gwei')
+        self.cap = Web3.to_wei(cap_gwei, 'gwei')
+        self.poll_interval = poll_interval
+        self.price = None
+        self.last_block = None
+        self.last_sample = None
+        self.fee_history_supported = True
+        self.fee_history_failures = 0
+        self.max_fee_history_failures = max_fee_history_failures
+        self.running = False
+        self.thread = None
+
+    def _sample(self):
+        """批量查询近期区块价格和节点建议价格，返回 (区块价格列表, eth_gasPrice)"""
+        requests = [('eth_gasPrice', [])]
+        if self.fee_history_supported:
+            requests.append(('eth_feeHistory', [hex(self.sample_blocks), 'latest', [self.percentile]]))
+        responses = self.web3_manager.batch_rpc_responses(requests)
+
+        node_price = responses[0].get('result')
+        node_price = int(node_price, 16) if node_price else None
+        block_prices = []
+        if self.fee_history_supported:
+            history = responses[1].get('result')
+            if not history:
+                # 偶发的超时或空结果不代表节点不支持，只有method not found或连续多次失败才停止使用
+                error = responses[1].get('error') or {}
+                self.fee_history_failures += 1
+                if error.get('code') == METHOD_NOT_FOUND or self.fee_history_failures >= self.max_fee_history_failures:
+                    print(f'【BR】节点不支持eth_feeHistory，之后只使用eth_gasPrice: {error.get("message")}')
+                    self.fee_history_supported = False
+            else:
+                self.fee_history_failures = 0
+                base_fees = history.get('baseFeePerGas') or []
+                for i, rewards in enumerate(history.get('reward') or []):
+                    base_fee = int(base_fees[i], 16) if i < len(base_fees) else 0
+                    block_prices.append(base_fee + int(rewards[0], 16))
+        return block_prices, node_price
+
+    def update(self):
+        """采样并重新计算建议价格，返回新的建议价格（wei）"""
+        block_prices, node_price = self._sample()
+        candidates = []
+        if block_prices:
+            candidates.append(int(statistics.median(block_prices)))
+        if node_price:
+            candidates.append(node_price)
+        if not candidates:
+            return self.price
+
+        price = int(max(candidates) * self.multiplier)
+        price = min(max(price, self.floor), self.cap)
+        if price != self.price:
+            print(f'【BR】⛽ 建议gas价格: {Web3.from_wei(price, "gwei")} gwei')
+        self.price = price
+        self.last_sample = {
+            'block_median': candidates[0] if block_prices else None,
+            'node_price': node_price,
+            'price': price,
+            'time': time.time()
+        }
+        return price
+
+    def get_price(self):
+        """获取当前建议gas价格（wei），尚未采样时返回None"""
+        return self.price
+
+    def poll(self):
+        """有新区块时重新采样"""
+        block = self.web3_manager.web3.eth.block_number
+        if block == self.last_block:
+            return
+        self.last_block = block
+        self.update()
+
+    def start(self):
+        """启动后台采样线程（首次采样同步完成，启动后即可获取价格）"""
+        if self.running:
+            return
+        self.running = True
+        try:
+            self.poll()
+        except Exception as e:
+            print(f'【BR】gas价格采样失败: {e}')
+
+        def loop():
+            while self.running:
+                time.sleep(self.poll_interval)
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f'【BR】gas价格采样失败: {e}')
+
+        self.thread = threading.Thread(target=loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """停止后台采样线程"""
+        self.running = False
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地JSON-RPC测试节点 - 在本机模拟BSC节点的最小子集，用于并发与回放测试
+
+使用示例:
+    >>> from web3_utils.local_node import LocalRPCNode
+    >>> node = LocalRPCNode()
+    >>> node.start()
+    >>> config['web3_config']['rpc_url'] = node.url
+    >>> node.mine()
+    >>> node.stop()
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import rlp
+from eth_abi import decode as abi_decode, encode as abi_encode
+from eth_account import Account
+from eth_utils import keccak, to_checksum_address
+
+# Multicall3 aggregate3((address,bool,bytes)[]) 的函数选择器
+AGGREGATE3_SELECTOR = '0x82ad56cb'
+MULTICALL3_ADDRESS = '0xca11bde05977b3631167028862be2a173976ca11'
+
+
+class RPCError(Exception):
+    """本地节点返回的JSON-RPC错误"""
+
+    def __init__(self, message, code=-32000):
+        super().__init__(message)
+        self.code = code
+
+
+class LocalRPCNode:
+    """线程安全的本地JSON-RPC节点
+
+    Attributes:
+        url (str): 节点HTTP地址，启动后可用
+        block_number (int): 当前区块高度
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, chain_id=56, gas_price=1_000_000_000, block_gas_limit=140_000_000):
+        self.host = host
+        self.port = port
+        self.chain_id = chain_id
+        self.gas_price = gas_price
+        self.block_gas_limit = block_gas_limit
+        self.block_number = 1
+        self.url = None
+        self.lock = threading.RLock()
+        self.request_count = 0
+        self.method_counts = {}
+        # 状态
+        self.nonces = {}  # 已上链的nonce
+        self.mempool = {}  # tx_hash -> tx
+        self.transactions = {}  # tx_hash -> tx
+        self.receipts = {}  # tx_hash -> receipt
+        self.logs = []
+        self.filters = {}
+        self.call_handlers = {}
+        self.receipt_status = lambda tx: 1
+        # 模拟拥堵：gas价格低于该值的交易不会被打包
+        self.min_gas_price = 0
+        self._server = None
+        self._thread = None
+
+    # ---------------------- 生命周期 ----------------------
+    def start(self):
+        """在后台线程启动HTTP服务"""
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'null')
+                if isinstance(body, list):
+                    response = [node.handle(item) for item in body]
+                else:
+                    response = node.handle(body)
+                payload = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self.url = f'http://{self.host}:{self.port}'
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止HTTP服务"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    # ---------------------- 状态控制 ----------------------
+    def register_call(self, address, selector, handler):
+        """注册eth_call处理函数
+
+        Args:
+            address (str): 合约地址
+            selector (str): 4字节函数选择器，如 '0x70a08231'
+            handler (callable): handler(calldata: bytes) -> bytes
+        """
+        with self.lock:
+            self.call_handlers[(address.lower(), selector.lower())] = handler
+
+    def add_log(self, address, topics, data=b'', block_number=None, tx_hash=None):
+        """写入一条日志（默认写入下一个区块）"""
+        with self.lock:
+            block = self.block_number + 1 if block_number is None else block_number
+            log = {
+                'address': to_checksum_address(address),
+                'topics': [_hex32(t) for t in topics],
+                'data': '0x' + bytes(data).hex(),
+                'blockNumber': hex(block),
+                'blockHash': _hex32(keccak(text=f'block-{block}')),
+                'transactionHash': tx_hash or _hex32(keccak(text=f'log-{len(self.logs)}')),
+                'transactionIndex': '0x0',
+                'logIndex': hex(len(self.logs)),
+                'removed': False,
+            }
+            self.logs.append(log)
+            return log
+
+    def replay_logs(self, logs):
+        """回放录制的eth_getLogs结果：按原区块的先后顺序写入之后的区块，返回写入的最后一个区块高度
+
+        原日志的第一个区块对应下一个区块，区块间隔保持不变，之后通过mine()逐块出块即可按原顺序产出事件。
+        """
+        with self.lock:
+            if not logs:
+                return self.block_number
+            first = min(int(log['blockNumber'], 16) for log in logs)
+            last = self.block_number
+            for log in sorted(logs, key=lambda log: (int(log['blockNumber'], 16), int(log['logIndex'], 16))):
+                block = self.block_number + 1 + int(log['blockNumber'], 16) - first
+                data = log['data']
+                self.add_log(log['address'], log['topics'], bytes.fromhex(data[2:]) if isinstance(data, str) else data,
+                             block_number=block, tx_hash=log.get('transactionHash'))
+                last = block
+            return last
+
+    def mine(self, count=1):
+        """出块：打包内存池中nonce连续的交易，同nonce优先打包gas价格最高的交易"""
+        with self.lock:
+            for _ in range(count):
+                self.block_number += 1
+                for tx_hash, tx in sorted(self.mempool.items(), key=lambda item: (item[1]['nonce'], -item[1]['gasPrice'])):
+                    sender = tx['from']
+                    if tx['nonce'] != self.nonces.get(sender, 0) or tx['gasPrice'] < self.min_gas_price:
+                        continue
+                    self.nonces[sender] = tx['nonce'] + 1
+                    del self.mempool[tx_hash]
+                    # 同nonce的其他交易（被替换的）一并移除
+                    for other_hash, other in list(self.mempool.items()):
+                        if other['from'] == sender and other['nonce'] == tx['nonce']:
+                            del self.mempool[other_hash]
+                    tx['blockNumber'] = hex(self.block_number)
+                    self.receipts[tx_hash] = {
+                        'transactionHash': tx_hash,
+                        'blockNumber': hex(self.block_number),
+                        'blockHash': _hex32(keccak(text=f'block-{self.block_number}')),
+                        'transactionIndex': '0x0',
+                        'from': sender,
+                        'to': tx['to'],
+                        'gasUsed': hex(min(tx['gas'], 200000)),
+                        'cumulativeGasUsed': hex(min(tx['gas'], 200000)),
+                        'effectiveGasPrice': hex(tx['gasPrice']),
+                        'contractAddress': None,
+                        'logs': [],
+                        'logsBloom': '0x' + '00' * 256,
+                        'status': hex(self.receipt_status(tx)),
+                        'type': '0x0',
+                    }
+            return self.block_number
+
+    # ---------------------- 请求处理 ----------------------
+    def handle(self, request):
+        """处理单个JSON-RPC请求"""
+        method = request.get('method')
+        params = request.get('params') or []
+        with self.lock:
+            self.request_count += 1
+            self.method_counts[method] = self.method_counts.get(method, 0) + 1
+        try:
+            handler = getattr(self, 'rpc_' + method, None)
+            if handler is None:
+                raise RPCError(f'the method {method} does not exist/is not available', -32601)
+            with self.lock:
+                result = handler(*params)
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': result}
+        except RPCError as e:
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': {'code': e.code, 'message': str(e)}}
+
+    def rpc_web3_clientVersion(self):
+        return 'LocalRPCNode/v1'
+
+    def rpc_eth_chainId(self):
+        return hex(self.chain_id)
+
+    def rpc_net_version(self):
+        return str(self.chain_id)
+
+    def rpc_eth_blockNumber(self):
+        return hex(self.block_number)
+
+    def rpc_eth_gasPrice(self):
+        return hex(self.gas_price)
+
+    def rpc_eth_feeHistory(self, block_count, newest_block, reward_percentiles=None):
+        """无EIP-1559的链：baseFee为0，各分位小费均为当前gas价格"""
+        count = min(int(block_count, 16) if isinstance(block_count, str) else block_count, self.block_number)
+        newest = _block_arg(newest_block, self.block_number)
+        return {
+            'oldestBlock': hex(newest - count + 1),
+            'baseFeePerGas': ['0x0'] * (count + 1),
+            'gasUsedRatio': [0.5] * count,
+            'reward': [[hex(self.gas_price)] * len(reward_percentiles or [])] * count,
+        }
+
+    def rpc_eth_getBlockByNumber(self, tag, full=False):
+        number = self.block_number if tag in ('latest', 'pending', 'safe', 'finalized') else int(tag, 16)
+        hashes = [h for h, r in self.receipts.items() if int(r['blockNumber'], 16) == number]
+        return {
+            'number': hex(number),
+            'hash': _hex32(keccak(text=f'block-{number}')),
+            'parentHash': _hex32(keccak(text=f'block-{number - 1}')),
+            'timestamp': hex(1_700_000_000 + number * 3),
+            'gasLimit': hex(self.block_gas_limit),
+            'gasUsed': '0x0',
+            'extraData': '0x',
+            'miner': '0x' + '00' * 20,
+            'transactions': [self.transactions[h] for h in hashes] if full else hashes,
+        }
+
+    def rpc_eth_getTransactionCount(self, address, tag='latest'):
+        address = to_checksum_address(address)
+        nonce = self.nonces.get(address, 0)
+        if tag == 'pending':
+            pending = sorted(tx['nonce'] for tx in self.mempool.values() if tx['from'] == address)
+            for value in pending:
+                if value == nonce:
+                    nonce += 1
+        return hex(nonce)
+
+    def rpc_eth_sendRawTransaction(self, raw):
+        raw_bytes = bytes.fromhex(raw[2:] if raw.startswith('0x') else raw)
+        tx_hash = _hex32(keccak(raw_bytes))
+        if tx_hash in self.mempool or tx_hash in self.receipts:
+            raise RPCError('already known')
+        nonce, gas_price, gas, to, value, data, _, _, _ = rlp.decode(raw_bytes)
+        sender = Account.recover_transaction(raw_bytes)
+        nonce = int.from_bytes(nonce, 'big')
+        gas_price = int.from_bytes(gas_price, 'big')
+        if nonce < self.nonces.get(sender, 0):
+            raise RPCError('nonce too low')
+        for other in self.mempool.values():
+            if other['from'] == sender and other['nonce'] == nonce and gas_price < other['gasPrice'] * 11 // 10:
+                raise RPCError('replacement transaction underpriced')
+        tx = {
+            'hash': tx_hash,
+            'from': sender,
+            'to': to_checksum_address(to) if to else None,
+            'nonce': nonce,
+            'gasPrice': gas_price,
+            'gas': int.from_bytes(gas, 'big'),
+            'value': int.from_bytes(value, 'big'),
+            'input': '0x' + data.hex(),
+            'raw': raw,
+        }
+        self.mempool[tx_hash] = tx
+        self.transactions[tx_hash] = tx
+        for filter_state in self.filters.values():
+            if filter_state['type'] == 'pending':
+                filter_state['changes'].append(tx_hash)
+        return tx_hash
+
+    def rpc_eth_getTransactionReceipt(self, tx_hash):
+        return self.receipts.get(tx_hash)
+
+    def rpc_eth_getTransactionByHash(self, tx_hash):
+        tx = self.transactions.get(tx_hash)
+        if tx is None:
+            return None
+        return {
+            'hash': tx['hash'],
+            'from': tx['from'],
+            'to': tx['to'],
+            'nonce': hex(tx['nonce']),
+            'gas': hex(tx['gas']),
+            'gasPrice': hex(tx['gasPrice']),
+            'value': hex(tx['value']),
+            'input': tx['input'],
+            'blockNumber': tx.get('blockNumber'),
+            'blockHash': None,
+            'transactionIndex': None,
+            'type': '0x0',
+            'v': '0x0', 'r': '0x0', 's': '0x0',
+        }
+
+    def rpc_eth_estimateGas(self, tx, tag='latest'):
+        self.rpc_eth_call(tx, tag)
+        return hex(150000)
+
+    def rpc_eth_call(self, tx, tag='latest'):
+        to = (tx.get('to') or '').lower()
+        data = tx.get('data') or tx.get('input') or '0x'
+        return '0x' + self._call(to, bytes.fromhex(data[2:])).hex()
+
+    def _call(self, to, data):
+        selector = '0x' + data[:4].hex()
+        if to == MULTICALL3_ADDRESS and selector == AGGREGATE3_SELECTOR:
+            (calls,) = abi_decode(['(address,bool,bytes)[]'], data[4:])
+            results = []
+            for target, allow_failure, call_data in calls:
+                try:
+                    results.append((True, self._call(target.lower(), call_data)))
+                except RPCError:
+                    if not allow_failure:
+                        raise
+                    results.append((False, b''))
+            return abi_encode(['(bool,bytes)[]'], [results])
+        handler = self.call_handlers.get((to, selector))
+        if handler is None:
+            raise RPCError('execution reverted')
+        return handler(data)
+
+    def rpc_eth_getLogs(self, criteria):
+        from_block = _block_arg(criteria.get('fromBlock', 'latest'), self.block_number)
+        to_block = _block_arg(criteria.get('toBlock', 'latest'), self.block_number)
+        addresses = criteria.get('address')
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        addresses = {a.lower() for a in addresses} if addresses else None
+        topics = criteria.get('topics') or []
+        matched = []
+        for log in self.logs:
+            number = int(log['blockNumber'], 16)
+            if number < from_block or number > to_block:
+                continue
+            if addresses and log['address'].lower() not in addresses:
+                continue
+            if not _topics_match(log['topics'], topics):
+                continue
+            matched.append(log)
+        return matched
+
+    def rpc_eth_newPendingTransactionFilter(self):
+        filter_id = hex(len(self.filters) + 1)
+        self.filters[filter_id] = {'type': 'pending', 'changes': []}
+        return filter_id
+
+    def rpc_eth_getFilterChanges(self, filter_id):
+        state = self.filters.get(filter_id)
+        if state is None:
+            raise RPCError('filter not found')
+        changes, state['changes'] = state['changes'], []
+        return changes
+
+    def rpc_eth_uninstallFilter(self, filter_id):
+        return self.filters.pop(filter_id, None) is not None
+
+
+def _hex32(value):
+    """转换为32字节十六进制字符串"""
+    if isinstance(value, (bytes, bytearray)):
+        return '0x' + bytes(value).rjust(32, b'\0').hex()
+    if isinstance(value, int):
+        return '0x' + value.to_bytes(32, 'big').hex()
+    return '0x' + value[2:].lower().rjust(64, '0')
+
+
+def _block_arg(value, latest):
+    if value in ('latest', 'pending', 'safe', 'finalized'):
+        return latest
+    if value == 'earliest':
+        return 0
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def _topics_match(log_topics, filter_topics):
+    for i, expected in enumerate(filter_topics):
+        if expected is None:
+            continue
+        if i >= len(log_topics):
+            return False
+        options = expected if isinstance(expected, list) else [expected]
+        if log_topics[i].lower() not in {_hex32(o).lower() for o in options}:
+            return False
+    return True
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存池监听 - 在交易上链之前发现针对USDT-BR池子的撤池和大额卖出
+
+通过eth_newPendingTransactionFilter轮询新的pending交易哈希，批量获取交易内容后按预先计算的
+函数选择器解码：
+
+- Position Manager的decreaseLiquidity / burn(tokenId) / multicall（递归解码其中的调用）
+- 池子合约的burn(tickLower, tickUpper, amount)
+- 路由合约的exactInputSingle（卖出BR）
+- kk_address发出的任意交易
+
+撤池交易按池子当前价格估算移除的流动性（美元），达到触发阈值时回调，监控进程据此提前触发自动移除，
+争取与撤池交易在同一区块甚至更早上链。价格和池子信息来自PoolLiquidityFeed。
+
+使用示例:
+    >>> watcher = MempoolWatcher(web3_manager, pool_feed, trigger_usd=1_000_000, on_event=print)
+    >>> watcher.start()
+"""
+
+import threading
+import time
+from web3 import Web3
+
+
+def _selector(signature):
+    return Web3.to_hex(Web3.keccak(text=signature)[:4])
+
+
+DECREASE_LIQUIDITY_SELECTOR = _selector('decreaseLiquidity((uint256,uint128,uint256,uint256,uint256))')  # 0x0c49ccbe
+BURN_POSITION_SELECTOR = _selector('burn(uint256)')  # 0x42966c68
+MULTICALL_SELECTOR = _selector('multicall(bytes[])')  # 0xac9650d8
+MULTICALL_DEADLINE_SELECTOR = _selector('multicall(uint256,bytes[])')  # 0x5ae401dc
+POOL_BURN_SELECTOR = _selector('burn(int24,int24,uint128)')  # 0xa34123a7
+# SwapRouter02/SmartRouter（无deadline）与SwapRouter（带deadline）的exactInputSingle
+EXACT_INPUT_SINGLE_SELECTOR = _selector('exactInputSingle((address,address,uint24,address,uint256,uint256,uint160))')
+EXACT_INPUT_SINGLE_DEADLINE_SELECTOR = _selector(
+    'exactInputSingle((address,address,uint24,address,uint256,uint256,uint256,uint160))')
+
+POSITION_OUTPUT_TYPES = ['uint96', 'address', 'address', 'address', 'uint24', 'int24', 'int24', 'uint128']
+
+
+class MempoolWatcher:
+    """轮询pending交易并识别撤池/大额卖出的后台服务
+
+    Attributes:
+        events (list): 最近识别出的事件（最多保留max_events条）
+        seen (int): 已检查的pending交易数
+    """
+
+    def __init__(self, web3_manager, pool_feed, trigger_usd=1_000_000, large_swap_usd=10_000,
+                 kk_address=None, poll_interval=0.2, max_batch=500, on_event=None, max_events=100):
+        """
+        初始化内存池监听
+
+        Args:
+            web3_manager (Web3Manager): 已连接的Web3Manager实例
+            pool_feed (PoolLiquidityFeed): 已启动的链上池子数据源，提供池子地址、费率和价格
+            trigger_usd (float): 移除流动性估算值达到该值（美元）时触发
+            large_swap_usd (float): 卖出BR估算值达到该值（美元）时记为大额卖出
+            kk_address (str): 特殊监控地址，其发出的任意交易都会上报
+            poll_interval (float): 轮询间隔（秒）
+            max_batch (int): 每次最多获取的pending交易数
+            on_event (callable): 识别出事件时的回调 on_event(event)，在后台线程中执行
+            max_events (int): 保留的最近事件数
+        """
+        self.web3_manager = web3_manager
+        self.pool_feed = pool_feed
+        web3_config = web3_manager.config['web3_config']
+        self.position_manager = Web3.to_checksum_address(web3_config['position_manager'])
+        self.wallet = Web3.to_checksum_address(web3_config['wallet_address']) if web3_config.get('wallet_address') else None
+        self.trigger_usd = trigger_usd
+        self.large_swap_usd = large_swap_usd
+        self.kk_address = Web3.to_checksum_address(kk_address) if kk_address else None
+        self.poll_interval = poll_interval
+        self.max_batch = max_batch
+        self.on_event = on_event
+        self.max_events = max_events
+        self.filter_id = None
+        self.position_cache = {}
+        self.events = []
+        self.seen = 0
+        self.running = False
+        self.thread = None
+
+    def _create_filter(self):
+        self.filter_id = self.web3_manager.batch_rpc([('eth_newPendingTransactionFilter', [])])[0]
+        if self.filter_id is None:
+            raise ValueError('节点不支持pending交易过滤器')
+
+    def decode_calls(self, to, data):
+        """按选择器解码交易调用，multicall递归展开
+
+        Returns:
+            list: (类型, 参数) 列表，类型为 decrease / burn_position / pool_burn / swap
+        """
+        codec = self.web3_manager.web3.codec
+        if len(data) < 4:
+            return []
+        selector, args = Web3.to_hex(data[:4]), data[4:]
+        try:
+            if selector == MULTICALL_SELECTOR:
+                (calls,) = codec.decode(['bytes[]'], args)
+                return [call for inner in calls for call in self.decode_calls(to, inner)]
+            if selector == MULTICALL_DEADLINE_SELECTOR:
+                _, calls = codec.decode(['uint256', 'bytes[]'], args)
+                return [call for inner in calls for call in self.decode_calls(to, inner)]
+            if selector == DECREASE_LIQUIDITY_SELECTOR and to == self.position_manager:
+                ((token_id, liquidity, _, _, _),) = codec.decode(['(uint256,uint128,uint256,uint256,uint256)'], args)
+                return [('decrease', {'token_id': token_id, 'liquidity': liquidity})]
+            if selector == BURN_POSITION_SELECTOR and to == self.position_manager:
+                (token_id,) = codec.decode(['uint256'], args)
+                return [('burn_position', {'token_id': token_id})]
+            if selector == POOL_BURN_SELECTOR and to in self.pool_feed.pools:
+                tick_lower, tick_upper, amount = codec.decode(['int24', 'int24', 'uint128'], args)
+                return [('pool_burn', {'pool': to, 'tick_lower': tick_lower, 'tick_upper': tick_upper,
+                                       'liquidity': amount})]
+            if selector == EXACT_INPUT_SINGLE_SELECTOR:
+                ((token_in, token_out, fee, _, amount_in, _, _),) = codec.decode(
+                    ['(address,address,uint24,address,uint256,uint256,uint160)'], args)
+                return [('swap', {'token_in': token_in, 'token_out': token_out, 'fee': fee, 'amount_in': amount_in})]
+            if selector == EXACT_INPUT_SINGLE_DEADLINE_SELECTOR:
+                ((token_in, token_out, fee, _, _, amount_in, _, _),) = codec.decode(
+                    ['(address,address,uint24,address,uint256,uint256,uint256,uint160)'], args)
+                return [('swap', {'token_in': token_in, 'token_out': token_out, 'fee': fee, 'amount_in': amount_in})]
+        except Exception:
+            # 选择器碰撞或参数不完整，按无关交易处理
+            return []
+        return []
+
+    def _load_positions(self, token_ids):
+        """批量读取头寸的代币、费率和价格区间（不可变字段，按token_id缓存）"""
+        missing = [token_id for token_id in token_ids if token_id not in self.position_cache]
+        if missing:
+            codec = self.web3_manager.web3.codec
+            selector = Web3.keccak(text='positions(uint256)')[:4]
+            calls = [(self.position_manager, selector + codec.encode(['uint256'], [token_id])) for token_id in missing]
+            for token_id, (success, data) in zip(missing, self.web3_manager.aggregate_calls(calls)):
+                if not success:
+                    continue
+                fields = codec.decode(POSITION_OUTPUT_TYPES, data)
+                self.position_cache[token_id] = {
+                    'token0': Web3.to_checksum_address(fields[2]),
+                    'token1': Web3.to_checksum_address(fields[3]),
+                    'fee': fields[4],
+                    'tick_lower': fields[5],
+                    'tick_upper': fields[6]
+                }
+        return {token_id: self.position_cache.get(token_id) for token_id in token_ids}
+
+    def inspect(self, tx):
+        """识别一笔pending交易，返回事件或None"""
+        sender = Web3.to_checksum_address(tx['from'])
+        if sender == self.wallet:
+            # 自己的移除交易
+            return None
+        to = Web3.to_checksum_address(tx['to']) if tx.get('to') else None
+        data = Web3.to_bytes(hexstr=tx.get('input') or '0x')
+        calls = self.decode_calls(to, data) if to else []
+        is_kk = sender == self.kk_address
+        if not calls and not is_kk:
+            return None
+
+        feed = self.pool_feed
+        tokens = {feed.quote_token, feed.base_token}
+        removed_usd, swap_usd, token_ids = 0, 0, []
+        decreases = [args for kind, args in calls if kind == 'decrease']
+        positions = self._load_positions([args['token_id'] for args in decreases]) if decreases else {}
+        for kind, args in calls:
+            if kind == 'decrease':
+                position = positions.get(args['token_id'])
+                if not position or {position['token0'], position['token1']} != tokens:
+                    continue
+                pool, _ = feed.pool_for_fee(position['fee'])
+                value = feed.position_value(pool, position['tick_lower'], position['tick_upper'],
+                                            args['liquidity']) if pool else None
+                token_ids.append(args['token_id'])
+                removed_usd += value['liquidity_usd'] if value else 0
+            elif kind == 'pool_burn':
+                value = feed.position_value(args['pool'], args['tick_lower'], args['tick_upper'], args['liquidity'])
+                removed_usd += value['liquidity_usd'] if value else 0
+            elif kind == 'swap' and Web3.to_checksum_address(args['token_in']) == feed.base_token \
+                    and Web3.to_checksum_address(args['token_out']) == feed.quote_token:
+                pool, state = feed.pool_for_fee(args['fee'])
+                price = feed.price(state) if state else 0
+                swap_usd += args['amount_in'] / 10 ** feed.decimals[feed.base_token] * price
+
+        if not is_kk and not removed_usd and swap_usd < self.large_swap_usd:
+            return None
+        kinds = sorted({kind for kind, _ in calls})
+        return {
+            'hash': tx['hash'],
+            'from': sender,
+            'to': to,
+            'kinds': kinds,
+            'token_ids': token_ids,
+            'removed_usd': removed_usd,
+            'swap_usd': swap_usd,
+            'gas_price': int(tx['gasPrice'], 16) if tx.get('gasPrice') else None,
+            'kk': is_kk,
+            'trigger': removed_usd >= self.trigger_usd,
+            'time': time.time()
+        }
+
+    def poll(self):
+        """获取新的pending交易并识别，返回本次识别出的事件列表"""
+        if self.filter_id is None:
+            self._create_filter()
+        responses = self.web3_manager.batch_rpc_responses([('eth_getFilterChanges', [self.filter_id])])
+        if 'error' in responses[0]:
+            # 过滤器过期（节点重启或长时间未轮询），重新创建
+            self.filter_id = None
+            return []
+        hashes = (responses[0].get('result') or [])[:self.max_batch]
+        if not hashes:
+            return []
+        self.seen += len(hashes)
+
+        events = []
+        txs = self.web3_manager.batch_rpc([('eth_getTransactionByHash', [tx_hash]) for tx_hash in hashes])
+        for tx in txs:
+            if not tx:
+                continue
+            event = self.inspect(tx)
+            if event is None:
+                continue
+            events.append(event)
+            self.events = (self.events + [event])[-self.max_events:]
+            if self.on_event:
+                self.on_event(event)
+        return events
+
+    def start(self):
+        """创建pending交易过滤器并启动后台线程"""
+        if self.running:
+            return self
+        self._create_filter()
+        self.running = True
+
+        def loop():
+            while self.running:
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f'【BR】内存池监听失败: {e}')
+                time.sleep(self.poll_interval)
+
+        self.thread = threading.Thread(target=loop)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """停止后台线程"""
+        self.running = False
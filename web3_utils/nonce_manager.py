@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地nonce管理 - 线程安全地分配交易nonce，避免每次发送前查询链上nonce
+
+nonce在本地预留后即可签名广播，多笔交易无需等待上一笔上链即可连续发送。
+广播失败或出现nonce冲突时，与链上pending nonce重新同步。
+
+使用示例:
+    >>> nonce_manager = NonceManager(web3, wallet)
+    >>> nonce = nonce_manager.reserve()
+    >>> try:
+    ...     tx_hash = web3.eth.send_raw_transaction(sign(build(nonce)))
+    ...     nonce_manager.confirm(nonce)
+    ... except Exception as e:
+    ...     nonce_manager.release(nonce, e)
+"""
+
+import threading
+
+# 这些错误说明本地nonce与链上状态不一致，需要重新同步
+NONCE_RESYNC_ERRORS = (
+    'nonce too low',
+    'already known',
+    'known transaction',
+    'replacement transaction underpriced',
+    'nonce too high',
+)
+
+
+class NonceManager:
+    """线程安全的本地nonce分配器
+
+    Attributes:
+        next_nonce (int): 下一个可分配的nonce，首次分配时从链上同步
+        outstanding (set): 已预留但尚未确认广播的nonce
+    """
+
+    def __init__(self, web3, address):
+        """
+        初始化nonce管理器
+
+        Args:
+            web3 (Web3): Web3实例
+            address (str): 发送交易的钱包地址
+        """
+        self.web3 = web3
+        self.address = address
+        self.next_nonce = None
+        self.outstanding = set()
+        self.lock = threading.Lock()
+
+    def _sync_locked(self):
+        """与链上pending nonce同步，保留仍在广播中的nonce（需持有锁）"""
+        chain_nonce = self.web3.eth.get_transaction_count(self.address, 'pending')
+        if self.outstanding:
+            chain_nonce = max(chain_nonce, max(self.outstanding) + 1)
+        if self.next_nonce is not None and chain_nonce != self.next_nonce:
+            print(f'【BR】🔄 nonce重新同步: {self.next_nonce} -> {chain_nonce}')
+        self.next_nonce = chain_nonce
+
+    def sync(self):
+        """强制与链上重新同步"""
+        with self.lock:
+            self._sync_locked()
+            return self.next_nonce
+
+    def sync_if_idle(self):
+        """没有广播中的交易时与链上同步，用于感知钱包在其他地方发出的交易"""
+        with self.lock:
+            if not self.outstanding:
+                self._sync_locked()
+            return self.next_nonce
+
+    def peek(self):
+        """查看下一个将被分配的nonce（不预留）"""
+        with self.lock:
+            if self.next_nonce is None:
+                self._sync_locked()
+            return self.next_nonce
+
+    def reserve(self, count=1):
+        """预留连续的count个nonce，返回第一个"""
+        with self.lock:
+            if self.next_nonce is None:
+                self._sync_locked()
+            nonce = self.next_nonce
+            self.next_nonce += count
+            self.outstanding.update(range(nonce, nonce + count))
+            return nonce
+
+    def confirm(self, nonce):
+        """交易已被节点接受"""
+        with self.lock:
+            self.outstanding.discard(nonce)
+
+    def release(self, nonce, error=None):
+        """交易未能广播，归还nonce
+
+        只有最后预留的nonce可以直接回退；否则会留下空洞，需要与链上重新同步。
+        """
+        with self.lock:
+            self.outstanding.discard(nonce)
+            message = str(error).lower() if error else ''
+            if any(reason in message for reason in NONCE_RESYNC_ERRORS):
+                self._sync_locked()
+            elif self.next_nonce is not None and nonce == self.next_nonce - 1:
+                self.next_nonce = nonce
+            else:
+                self._sync_locked()
+
+
+class AsyncNonceManager(NonceManager):
+    """配合AsyncWeb3使用的nonce分配器
+
+    需要与链上同步时只标记为未同步，下一次reserve_async时在事件循环中异步查询链上nonce，
+    分配与回退逻辑与NonceManager一致。
+    """
+
+    def _sync_locked(self):
+        """标记为需要重新同步（需持有锁），实际查询在reserve_async中进行"""
+        self.next_nonce = None
+
+    async def sync_async(self):
+        """异步查询链上pending nonce并同步"""
+        chain_nonce = await self.web3.eth.get_transaction_count(self.address, 'pending')
+        with self.lock:
+            if self.outstanding:
+                chain_nonce = max(chain_nonce, max(self.outstanding) + 1)
+            if self.next_nonce is not None and chain_nonce != self.next_nonce:
+                print(f'【BR】🔄 nonce重新同步: {self.next_nonce} -> {chain_nonce}')
+            self.next_nonce = chain_nonce
+            return self.next_nonce
+
+    async def reserve_async(self, count=1):
+        """预留连续的count个nonce，返回第一个；未同步时先异步查询链上nonce"""
+        if self.next_nonce is None:
+            await self.sync_async()
+        with self.lock:
+            nonce = self.next_nonce
+            self.next_nonce += count
+            self.outstanding.update(range(nonce, nonce + count))
+            return nonce
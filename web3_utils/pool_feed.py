@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+链上池子流动性数据源 - 直接从BSC节点读取USDT-BR池子的事件和状态，在本地计算池子流动性（美元）
+
+OKX的topPool推送是聚合数据，可能比链上晚数秒。本数据源每个新区块通过一次批量请求
+（eth_blockNumber + eth_getLogs）获取池子的Mint/Burn/Collect/Swap事件，在本地更新池子储备和价格：
+
+- Mint: 储备增加
+- Burn: 储备减少（代币记为待领取，随后的Collect不再重复扣减）
+- Collect: 扣减超出待领取部分（手续费）
+- Swap: 按amount0/amount1增减储备，并更新sqrtPriceX96（兼容PancakeV3带protocolFees字段的Swap事件）
+
+每resync_blocks个区块通过Multicall3读取一次slot0/liquidity和池子代币余额校正本地状态。
+落后较多时每次轮询最多查询max_log_blocks个区块的事件，分多次追赶；落后超过max_gap_blocks个区块时
+不再回放事件，直接按最新区块的链上状态校正。
+流动性 = 计价代币(USDT)储备 + 目标代币(BR)储备 × 池子价格，与OKX推送的流动性口径一致。
+
+使用示例:
+    >>> feed = PoolLiquidityFeed(web3_manager, on_update=lambda snapshot: print(snapshot['liquidity_usd']))
+    >>> feed.start()
+"""
+
+import threading
+import time
+from web3 import Web3
+
+# PancakeSwap V3 Factory (BSC)
+PANCAKE_V3_FACTORY = '0x0BFbCF9fa4f9C56B0F40a671Ad40E0805A091865'
+# 未配置池子地址时，通过Factory查找以下费率档位的USDT-BR池子
+FEE_TIERS = (100, 500, 2500, 10000)
+
+MINT_TOPIC = Web3.to_hex(Web3.keccak(text='Mint(address,address,int24,int24,uint128,uint256,uint256)'))
+BURN_TOPIC = Web3.to_hex(Web3.keccak(text='Burn(address,int24,int24,uint128,uint256,uint256)'))
+COLLECT_TOPIC = Web3.to_hex(Web3.keccak(text='Collect(address,address,int24,int24,uint128,uint128)'))
+SWAP_TOPIC = Web3.to_hex(Web3.keccak(text='Swap(address,address,int256,int256,uint160,uint128,int24)'))
+# PancakeV3的Swap事件额外带有protocolFeesToken0/protocolFeesToken1
+PANCAKE_SWAP_TOPIC = Web3.to_hex(Web3.keccak(
+    text='Swap(address,address,int256,int256,uint160,uint128,int24,uint128,uint128)'))
+POOL_TOPICS = [MINT_TOPIC, BURN_TOPIC, COLLECT_TOPIC, SWAP_TOPIC, PANCAKE_SWAP_TOPIC]
+
+
+def _selector(signature):
+    return Web3.keccak(text=signature)[:4]
+
+
+def _topic_hex(value):
+    """统一topic为带0x前缀的小写十六进制字符串"""
+    return (value if isinstance(value, str) else Web3.to_hex(value)).lower()
+
+
+class PoolLiquidityFeed:
+    """按区块在本地维护USDT-BR池子流动性的后台服务
+
+    Attributes:
+        pools (dict): 池子地址 -> 池子状态（token0、储备、sqrtPriceX96、liquidity等）
+        snapshot (dict): 最近一次计算的流动性，包含 block / liquidity_usd / pools / time
+        last_block (int): 已处理到的区块高度
+    """
+
+    def __init__(self, web3_manager, pools=None, poll_interval=1, resync_blocks=20, on_update=None,
+                 factory=PANCAKE_V3_FACTORY, max_log_blocks=500, max_gap_blocks=5000):
+        """
+        初始化链上池子数据源
+
+        Args:
+            web3_manager (Web3Manager): 已连接的Web3Manager实例
+            pools (list): 池子地址列表，默认通过Factory查找全部费率档位的USDT-BR池子
+            poll_interval (float): 检查新区块的间隔（秒）
+            resync_blocks (int): 每隔多少个区块从链上状态校正一次本地储备
+            on_update (callable): 流动性变化时的回调 on_update(snapshot)，在后台线程中执行
+            factory (str): V3 Factory地址，用于查找池子
+            max_log_blocks (int): 每次eth_getLogs最多查询的区块数
+            max_gap_blocks (int): 落后超过该区块数时不再回放事件，直接从链上状态校正
+        """
+        self.web3_manager = web3_manager
+        web3_config = web3_manager.config['web3_config']
+        self.quote_token = Web3.to_checksum_address(web3_config['usdt'])
+        self.base_token = Web3.to_checksum_address(web3_config['br'])
+        self.pool_addresses = [Web3.to_checksum_address(pool) for pool in pools] if pools else None
+        self.poll_interval = poll_interval
+        self.resync_blocks = resync_blocks
+        self.on_update = on_update
+        self.factory = Web3.to_checksum_address(factory)
+        self.max_log_blocks = max_log_blocks
+        self.max_gap_blocks = max_gap_blocks
+        self.pools = {}
+        self.decimals = {}
+        self.snapshot = None
+        self.last_block = None
+        self.last_resync_block = None
+        # 最近一次轮询得到的最新区块，用于决定下一次查询的区间；轮询失败时为None
+        self.head = None
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+    def _call(self, calls, block_identifier='latest'):
+        """通过Multicall3批量执行只读调用，返回每个调用的返回数据（失败为None）"""
+        results = self.web3_manager.aggregate_calls(calls, block_identifier)
+        return [data if success else None for success, data in results]
+
+    def discover_pools(self):
+        """通过Factory查找USDT-BR池子，返回池子地址列表"""
+        codec = self.web3_manager.web3.codec
+        selector = _selector('getPool(address,address,uint24)')
+        calls = [(self.factory, selector + codec.encode(['address', 'address', 'uint24'],
+                                                        [self.quote_token, self.base_token, fee]))
+                 for fee in FEE_TIERS]
+        pools = []
+        for data in self._call(calls):
+            if not data:
+                continue
+            pool = Web3.to_checksum_address(codec.decode(['address'], data)[0])
+            if int(pool, 16):
+                pools.append(pool)
+        return pools
+
+    def _load_decimals(self):
+        codec = self.web3_manager.web3.codec
+        tokens = [self.quote_token, self.base_token]
+        results = self._call([(token, _selector('decimals()')) for token in tokens])
+        for token, data in zip(tokens, results):
+            self.decimals[token] = codec.decode(['uint8'], data)[0] if data else 18
+
+    def resync(self, block_identifier='latest'):
+        """从链上读取池子的slot0/liquidity和代币余额，校正本地储备"""
+        codec = self.web3_manager.web3.codec
+        balance_of = _selector('balanceOf(address)')
+        calls = []
+        for pool in self.pool_addresses:
+            calls.extend([
+                (pool, _selector('slot0()')),
+                (pool, _selector('liquidity()')),
+                (pool, _selector('fee()')),
+                (self.quote_token, balance_of + codec.encode(['address'], [pool])),
+                (self.base_token, balance_of + codec.encode(['address'], [pool]))
+            ])
+        results = self._call(calls, block_identifier)
+
+        with self.lock:
+            for i, pool in enumerate(self.pool_addresses):
+                slot0, liquidity, fee, quote_balance, base_balance = results[i * 5:i * 5 + 5]
+                if slot0 is None or quote_balance is None or base_balance is None:
+                    print(f'【BR】读取池子 {pool} 状态失败，跳过')
+                    continue
+                # 只解码slot0的前两个字段，PancakeV3与UniswapV3的feeProtocol字段类型不同
+                sqrt_price_x96, tick = codec.decode(['uint160', 'int24'], slot0[:64])
+                state = self.pools.setdefault(pool, {
+                    'token0': min(self.quote_token, self.base_token, key=lambda token: int(token, 16)),
+                    'owed': {}
+                })
+                owed_quote = sum(amounts[self.quote_token] for amounts in state['owed'].values())
+                owed_base = sum(amounts[self.base_token] for amounts in state['owed'].values())
+                state.update({
+                    'sqrt_price_x96': sqrt_price_x96,
+                    'tick': tick,
+                    'liquidity': codec.decode(['uint128'], liquidity)[0] if liquidity else 0,
+                    'fee': codec.decode(['uint24'], fee)[0] if fee else None,
+                    # 已Burn未Collect的代币仍在池子余额中，但不再属于流动性
+                    self.quote_token: codec.decode(['uint256'], quote_balance)[0] - owed_quote,
+                    self.base_token: codec.decode(['uint256'], base_balance)[0] - owed_base
+                })
+
+    def _token_amounts(self, state, amount0, amount1):
+        """(amount0, amount1) 转换为 {代币地址: 数量}"""
+        if state['token0'] == self.quote_token:
+            return {self.quote_token: amount0, self.base_token: amount1}
+        return {self.quote_token: amount1, self.base_token: amount0}
+
+    def apply_log(self, log):
+        """按一条池子事件更新本地储备和价格，返回是否更新"""
+        codec = self.web3_manager.web3.codec
+        pool = Web3.to_checksum_address(log['address'])
+        state = self.pools.get(pool)
+        if state is None or not log['topics']:
+            return False
+        topics = [_topic_hex(t) for t in log['topics']]
+        data = Web3.to_bytes(hexstr=log['data']) if isinstance(log['data'], str) else bytes(log['data'])
+
+        if topics[0] == MINT_TOPIC:
+            _, _, amount0, amount1 = codec.decode(['address', 'uint128', 'uint256', 'uint256'], data)
+            for token, amount in self._token_amounts(state, amount0, amount1).items():
+                state[token] += amount
+        elif topics[0] == BURN_TOPIC:
+            _, amount0, amount1 = codec.decode(['uint128', 'uint256', 'uint256'], data)
+            # Burn时代币仍留在池子中等待Collect，按持有人和价格区间记为待领取
+            key = (topics[1], topics[2], topics[3])
+            owed = state['owed'].setdefault(key, {self.quote_token: 0, self.base_token: 0})
+            for token, amount in self._token_amounts(state, amount0, amount1).items():
+                state[token] -= amount
+                owed[token] += amount
+        elif topics[0] == COLLECT_TOPIC:
+            _, amount0, amount1 = codec.decode(['address', 'uint128', 'uint128'], data)
+            key = (topics[1], topics[2], topics[3])
+            owed = state['owed'].get(key, {self.quote_token: 0, self.base_token: 0})
+            for token, amount in self._token_amounts(state, amount0, amount1).items():
+                principal = min(amount, owed[token])
+                owed[token] -= principal
+                # 超出待领取的部分为手续费，从储备中扣减
+                state[token] -= amount - principal
+            if key in state['owed'] and not any(owed.values()):
+                del state['owed'][key]
+        elif topics[0] in (SWAP_TOPIC, PANCAKE_SWAP_TOPIC):
+            amount0, amount1, sqrt_price_x96, liquidity, tick = codec.decode(
+                ['int256', 'int256', 'uint160', 'uint128', 'int24'], data[:160])
+            for token, amount in self._token_amounts(state, amount0, amount1).items():
+                state[token] += amount
+            state.update({'sqrt_price_x96': sqrt_price_x96, 'liquidity': liquidity, 'tick': tick})
+        else:
+            return False
+        return True
+
+    def price(self, state):
+        """池子中BR的USDT价格"""
+        raw = (state['sqrt_price_x96'] / 2 ** 96) ** 2
+        token0, token1 = (self.quote_token, self.base_token) if state['token0'] == self.quote_token \
+            else (self.base_token, self.quote_token)
+        # 每个token0可兑换的token1数量
+        token1_per_token0 = raw * 10 ** (self.decimals[token0] - self.decimals[token1])
+        if token0 == self.quote_token:
+            return 1 / token1_per_token0 if token1_per_token0 else 0
+        return token1_per_token0
+
+    def pool_for_fee(self, fee):
+        """按费率查找已跟踪的池子，返回 (池子地址, 池子状态)，未找到时返回 (None, None)"""
+        with self.lock:
+            for pool, state in self.pools.items():
+                if state.get('fee') == fee:
+                    return pool, state
+        return None, None
+
+    def position_value(self, pool, tick_lower, tick_upper, liquidity):
+        """按池子当前价格估算一段区间流动性对应的代币数量和美元价值
+
+        Returns:
+            dict: {'quote_amount', 'base_amount', 'liquidity_usd'}，池子未跟踪时返回None
+        """
+        with self.lock:
+            state = self.pools.get(Web3.to_checksum_address(pool))
+            if state is None:
+                return None
+            sqrt_price = state['sqrt_price_x96'] / 2 ** 96
+            price = self.price(state)
+            token0 = state['token0']
+        # V3区间流动性对应的token0/token1数量（原始单位）
+        sqrt_lower = 1.0001 ** (tick_lower / 2)
+        sqrt_upper = 1.0001 ** (tick_upper / 2)
+        if sqrt_price <= sqrt_lower:
+            amount0, amount1 = liquidity * (sqrt_upper - sqrt_lower) / (sqrt_lower * sqrt_upper), 0
+        elif sqrt_price >= sqrt_upper:
+            amount0, amount1 = 0, liquidity * (sqrt_upper - sqrt_lower)
+        else:
+            amount0 = liquidity * (sqrt_upper - sqrt_price) / (sqrt_price * sqrt_upper)
+            amount1 = liquidity * (sqrt_price - sqrt_lower)
+        if token0 != self.quote_token:
+            amount0, amount1 = amount1, amount0
+        quote_amount = amount0 / 10 ** self.decimals[self.quote_token]
+        base_amount = amount1 / 10 ** self.decimals[self.base_token]
+        return {'quote_amount': quote_amount, 'base_amount': base_amount,
+                'liquidity_usd': quote_amount + base_amount * price}
+
+    def compute_snapshot(self, block):
+        """按本地储备计算全部池子的美元流动性"""
+        quote_unit = 10 ** self.decimals[self.quote_token]
+        base_unit = 10 ** self.decimals[self.base_token]
+        pools = {}
+        total = 0
+        with self.lock:
+            for pool, state in self.pools.items():
+                price = self.price(state)
+                quote_amount = state[self.quote_token] / quote_unit
+                base_amount = state[self.base_token] / base_unit
+                liquidity_usd = quote_amount + base_amount * price
+                total += liquidity_usd
+                pools[pool] = {
+                    'quote_amount': quote_amount,
+                    'base_amount': base_amount,
+                    'price': price,
+                    'liquidity': state['liquidity'],
+                    'tick': state['tick'],
+                    'liquidity_usd': liquidity_usd
+                }
+        self.snapshot = {'source': 'chain', 'block': block, 'liquidity_usd': total, 'pools': pools, 'time': time.time()}
+        return self.snapshot
+
+    def poll(self):
+        """一次批量请求获取最新区块和新事件，有变化时回调
+
+        Returns:
+            dict: 流动性有变化时返回新的快照，否则返回None
+        """
+        if self.head is None:
+            # 上次轮询失败，先确认最新区块再决定查询区间，避免恢复后一次查询过大的区间
+            self.head = self.web3_manager.web3.eth.block_number
+        # 已知落后不超过max_log_blocks时查询到latest（期间新出的区块只有一次轮询间隔内的几个），否则分段追赶
+        to_block = self.last_block + self.max_log_blocks
+        capped = self.head > to_block
+        criteria = {
+            'address': self.pool_addresses,
+            'topics': [POOL_TOPICS],
+            'fromBlock': hex(self.last_block + 1),
+            'toBlock': hex(to_block) if capped else 'latest'
+        }
+        self.head = None
+        block_response, logs_response = self.web3_manager.batch_rpc_responses(
+            [('eth_blockNumber', []), ('eth_getLogs', [criteria])])
+        if block_response.get('result') is None:
+            print(f"【BR】链上池子区块查询失败: {block_response.get('error')}")
+            return None
+        self.head = int(block_response['result'], 16)
+
+        if self.head - self.last_block > self.max_gap_blocks:
+            print(f'【BR】⚠️ 链上池子数据落后 {self.head - self.last_block} 个区块，直接从链上状态校正')
+            return self._resync_to(self.head)
+
+        logs = logs_response.get('result')
+        # getLogs出错（如节点限流、区间过大）时不推进last_block，下次轮询重新查询同一区间，避免漏掉事件
+        if logs is None:
+            print(f"【BR】链上池子事件查询失败 (区块 {criteria['fromBlock']} - {criteria['toBlock']}): "
+                  f"{logs_response.get('error')}")
+            return None
+        block = to_block if capped else self.head
+        if block <= self.last_block and not logs:
+            return None
+
+        logs.sort(key=lambda log: (int(log['blockNumber'], 16), int(log['logIndex'], 16)))
+        with self.lock:
+            changed = sum(self.apply_log(log) for log in logs) > 0
+        # getLogs可能比eth_blockNumber多看到一个区块，已处理的区块不再重复查询
+        if logs:
+            block = max(block, int(logs[-1]['blockNumber'], 16))
+        self.last_block = block
+
+        if block - self.last_resync_block >= self.resync_blocks:
+            return self._resync_to(block)
+        if not changed:
+            return None
+
+        snapshot = self.compute_snapshot(block)
+        if self.on_update:
+            self.on_update(snapshot)
+        return snapshot
+
+    def _resync_to(self, block):
+        """按指定区块的链上状态校正本地储备并回调，返回新的快照"""
+        self.resync(block)
+        self.last_block = self.last_resync_block = block
+        snapshot = self.compute_snapshot(block)
+        if self.on_update:
+            self.on_update(snapshot)
+        return snapshot
+
+    def start(self):
+        """查找池子并读取初始状态，然后启动后台线程"""
+        if self.running:
+            return self
+        if not self.pool_addresses:
+            self.pool_addresses = self.discover_pools()
+        if not self.pool_addresses:
+            raise ValueError('未找到USDT-BR池子')
+        self._load_decimals()
+        block = self.web3_manager.web3.eth.block_number
+        self.resync(block)
+        self.last_block = self.last_resync_block = self.head = block
+        self.compute_snapshot(block)
+        self.running = True
+
+        def loop():
+            while self.running:
+                time.sleep(self.poll_interval)
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f'【BR】链上池子数据更新失败: {e}')
+
+        self.thread = threading.Thread(target=loop)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """停止后台线程"""
+        self.running = False
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地头寸索引 - 基于SQLite持久化钱包的USDT-BR头寸，通过Position Manager事件日志增量更新
+
+首次使用时通过Multicall3完整枚举一次头寸，之后每次刷新只查询自上次处理区块以来的
+Transfer / IncreaseLiquidity / DecreaseLiquidity 日志，重启后也无需重新枚举。
+
+数据库只保存到 最新区块 - confirmations 的已确认状态，链重组不会写坏索引；最近未确认区块的日志
+每次同步时重新拉取，只应用到内存中的副本，返回的头寸仍与最新区块一致。
+
+使用示例:
+    >>> from web3_utils.position_index import PositionIndex
+    >>> index = PositionIndex(web3_manager, 'br-auto/position_index.db')
+    >>> positions = index.sync()
+"""
+
+import sqlite3
+import threading
+from web3 import Web3
+
+# Position Manager事件签名
+TRANSFER_TOPIC = Web3.to_hex(Web3.keccak(text='Transfer(address,address,uint256)'))
+INCREASE_LIQUIDITY_TOPIC = Web3.to_hex(Web3.keccak(text='IncreaseLiquidity(uint256,uint128,uint256,uint256)'))
+DECREASE_LIQUIDITY_TOPIC = Web3.to_hex(Web3.keccak(text='DecreaseLiquidity(uint256,uint128,uint256,uint256)'))
+
+
+def _topic_hex(value):
+    """统一topic为带0x前缀的小写十六进制字符串"""
+    if isinstance(value, (bytes, bytearray)):
+        value = bytes(value).hex()
+    value = value.lower()
+    return value if value.startswith('0x') else '0x' + value
+
+
+def _address_topic(address):
+    """地址转换为32字节topic"""
+    return '0x' + address.lower()[2:].rjust(64, '0')
+
+
+def _int_topic(value):
+    """整数转换为32字节topic"""
+    return '0x' + hex(value)[2:].rjust(64, '0')
+
+
+class PositionIndex:
+    """基于SQLite的本地头寸索引
+
+    Attributes:
+        last_block (int): 已处理到的区块高度
+        positions (dict): token_id -> 头寸详情（包含流动性为0但仍持有的USDT-BR头寸）
+    """
+
+    def __init__(self, web3_manager, path):
+        """
+        初始化头寸索引
+
+        Args:
+            web3_manager (Web3Manager): 已连接的Web3Manager实例
+            path (str): SQLite数据库文件路径
+        """
+        self.web3_manager = web3_manager
+        self.path = path
+        web3_config = web3_manager.config['web3_config']
+        self.wallet = Web3.to_checksum_address(web3_config['wallet_address'])
+        self.position_manager = Web3.to_checksum_address(web3_config['position_manager'])
+        # 单次eth_getLogs查询的最大区块跨度（公共节点通常限制在5000以内）
+        self.log_range_size = int(web3_config.get('log_range_size', 5000))
+        # 落后区块数超过该值时直接重新枚举，比分段拉取日志更快
+        self.max_sync_blocks = int(web3_config.get('max_sync_blocks', 100000))
+        # 写入数据库前要求的确认区块数，更近的区块可能被重组
+        self.confirmations = int(web3_config.get('position_confirmations', 15))
+        self.last_block = None
+        self.positions = {}
+        # 最近一次sync返回的活跃头寸（包含未确认区块的变化）
+        self.last_active = None
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self._init_db()
+        self._load()
+
+    def _init_db(self):
+        """创建数据表"""
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            # liquidity为uint128，超出SQLite整数范围，按文本保存
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS positions ('
+                'token_id INTEGER PRIMARY KEY, token0 TEXT, token1 TEXT, liquidity TEXT)'
+            )
+
+    def _load(self):
+        """从数据库加载索引，钱包或合约地址不一致时视为无效"""
+        meta = dict(self.db.execute('SELECT key, value FROM meta').fetchall())
+        if meta.get('wallet') != self.wallet or meta.get('position_manager') != self.position_manager:
+            return
+        if meta.get('last_block') is None:
+            return
+        self.last_block = int(meta['last_block'])
+        self.positions = {
+            token_id: {'token_id': token_id, 'token0': token0, 'token1': token1, 'liquidity': int(liquidity)}
+            for token_id, token0, token1, liquidity in self.db.execute(
+                'SELECT token_id, token0, token1, liquidity FROM positions'
+            )
+        }
+        print(f'【BR】📂 已加载本地头寸索引，区块 {self.last_block}，头寸 {len(self.positions)} 个')
+
+    def _save(self):
+        """将索引写回数据库"""
+        with self.db:
+            self.db.execute('DELETE FROM positions')
+            self.db.executemany(
+                'INSERT INTO positions (token_id, token0, token1, liquidity) VALUES (?, ?, ?, ?)',
+                [(p['token_id'], p['token0'], p['token1'], str(p['liquidity'])) for p in self.positions.values()]
+            )
+            self.db.executemany(
+                'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                [('wallet', self.wallet), ('position_manager', self.position_manager), ('last_block', str(self.last_block))]
+            )
+
+    def active_positions(self, positions=None):
+        """返回流动性大于0的头寸，格式与Web3Manager.get_current_positions一致
+
+        Args:
+            positions (dict): token_id -> 头寸详情，默认为已确认的索引
+        """
+        positions = self.positions if positions is None else positions
+        return [
+            {'token_id': p['token_id'], 'liquidity': p['liquidity']}
+            for p in sorted(positions.values(), key=lambda p: p['token_id'], reverse=True)
+            if p['liquidity'] > 0
+        ]
+
+    def build(self, block=None):
+        """通过完整枚举重建索引，默认基于最新的已确认区块"""
+        if block is None:
+            block = max(0, self.web3_manager.web3.eth.block_number - self.confirmations)
+        block, details = self.web3_manager.enumerate_positions(block)
+        with self.lock:
+            self.positions = {d['token_id']: d for d in details}
+            self.last_block = block
+            self._save()
+        print(f'【BR】🗂️ 头寸索引已重建，区块 {block}，USDT-BR头寸 {len(details)} 个')
+        return self.active_positions()
+
+    def sync(self):
+        """增量同步到最新区块，返回当前活跃头寸
+
+        已确认的区块写入数据库；未确认的区块只应用到内存副本，下次同步时重新拉取。
+        """
+        web3 = self.web3_manager.web3
+        head = web3.eth.block_number
+        confirmed = max(0, head - self.confirmations)
+        if self.last_block is None or confirmed - self.last_block > self.max_sync_blocks:
+            self.build(confirmed)
+
+        with self.lock:
+            changed = False
+            if confirmed > self.last_block:
+                changed = self._apply_blocks(self.positions, self.last_block + 1, confirmed)
+                self.last_block = confirmed
+                self._save()
+            positions = {token_id: dict(p) for token_id, p in self.positions.items()}
+            if head > self.last_block:
+                changed |= self._apply_blocks(positions, self.last_block + 1, head)
+            active = self.active_positions(positions)
+            # 未确认区块每次重新应用，只在结果变化时输出
+            if changed and active != self.last_active:
+                print(f'【BR】🔄 头寸索引已同步至区块 {head}（已确认 {self.last_block}），活跃头寸 {len(active)} 个')
+            self.last_active = active
+            return active
+
+    def _apply_blocks(self, positions, from_block, to_block):
+        """按log_range_size分段应用区块区间内的日志，返回头寸是否发生变化"""
+        changed = False
+        while from_block <= to_block:
+            end = min(to_block, from_block + self.log_range_size - 1)
+            changed |= self._apply_range(positions, from_block, end)
+            from_block = end + 1
+        return changed
+
+    def _apply_range(self, positions, from_block, to_block):
+        """拉取一个区块区间内的日志并应用到positions，返回头寸是否发生变化"""
+        web3 = self.web3_manager.web3
+        wallet_topic = _address_topic(self.wallet)
+        base = {'address': self.position_manager, 'fromBlock': from_block, 'toBlock': to_block}
+        filters = [
+            {**base, 'topics': [TRANSFER_TOPIC, None, wallet_topic]},  # 转入
+            {**base, 'topics': [TRANSFER_TOPIC, wallet_topic]},  # 转出/销毁
+        ]
+        if positions:
+            # 不按token_id过滤：持有的头寸（包括流动性为0的）只增不减，topic OR列表会无限增长，
+            # 改为拉取区间内全部增减流动性日志，在下面只应用索引中的头寸
+            filters.append({**base, 'topics': [[INCREASE_LIQUIDITY_TOPIC, DECREASE_LIQUIDITY_TOPIC]]})
+
+        # 自转账会同时出现在转入和转出查询中，按 (交易哈希, 日志序号) 去重
+        logs = {
+            (bytes(log['transactionHash']), log['logIndex']): log
+            for result in self.web3_manager.batch_call(web3.eth.get_logs, [(f,) for f in filters])
+            for log in result
+        }
+        if not logs:
+            return False
+        logs = sorted(logs.values(), key=lambda log: (log['blockNumber'], log['logIndex']))
+
+        received = set()
+        for log in logs:
+            topics = [_topic_hex(t) for t in log['topics']]
+            if topics[0] == TRANSFER_TOPIC:
+                token_id = int(topics[3], 16)
+                if topics[2] == wallet_topic:
+                    received.add(token_id)
+                else:
+                    received.discard(token_id)
+                    positions.pop(token_id, None)
+            else:
+                token_id = int(topics[1], 16)
+                position = positions.get(token_id)
+                if position is None or token_id in received:
+                    continue
+                data = log['data']
+                data = bytes(data) if isinstance(data, (bytes, bytearray)) else bytes.fromhex(data[2:])
+                delta = int.from_bytes(data[:32], 'big')
+                if topics[0] == INCREASE_LIQUIDITY_TOPIC:
+                    position['liquidity'] += delta
+                else:
+                    position['liquidity'] = max(0, position['liquidity'] - delta)
+
+        # 区间内新转入的头寸以区间末尾的链上状态为准
+        if received:
+            details = self.web3_manager.read_positions(sorted(received), to_block)
+            for token_id, detail in details.items():
+                if self.web3_manager._is_usdt_br_pair(detail['token0'], detail['token1']):
+                    positions[token_id] = detail
+        return True
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+交易回执监听 - 每个新区块用一次JSON-RPC批量请求查询全部待确认交易的回执
+
+调用方通过Future或回调获取结果，广播交易的线程无需阻塞轮询；
+无论同时有多少笔交易在等待，RPC负载都只有每区块一次批量请求。
+同一笔交易被提价替换后，可将新哈希登记到原来的Future上，任一哈希上链即完成；
+on_block回调在每个新区块查询回执后调用，用于按区块跟踪未上链的交易。
+
+使用示例:
+    >>> watcher = web3_manager.get_receipt_watcher()
+    >>> future = watcher.watch(tx_hash, callback=lambda f: print(f.result().status))
+    >>> receipt = future.result(timeout=120)
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+
+# 回执中需要从十六进制转换为整数的字段
+RECEIPT_INT_FIELDS = ('status', 'blockNumber', 'gasUsed', 'cumulativeGasUsed', 'effectiveGasPrice', 'transactionIndex', 'type')
+
+
+def _format_receipt(raw):
+    """将原始JSON-RPC回执转换为与web3返回值一致的常用字段格式"""
+    receipt = dict(raw)
+    for field in RECEIPT_INT_FIELDS:
+        if isinstance(receipt.get(field), str):
+            receipt[field] = int(receipt[field], 16)
+    for field in ('transactionHash', 'blockHash'):
+        if receipt.get(field):
+            receipt[field] = HexBytes(receipt[field])
+    return AttributeDict(receipt)
+
+
+def _hash_hex(tx_hash):
+    """统一交易哈希为带0x前缀的小写字符串"""
+    if isinstance(tx_hash, (bytes, bytearray)):
+        return '0x' + bytes(tx_hash).hex()
+    tx_hash = tx_hash.lower()
+    return tx_hash if tx_hash.startswith('0x') else '0x' + tx_hash
+
+
+class ReceiptWatcher:
+    """批量轮询交易回执的后台服务
+
+    Attributes:
+        pending (dict): 首个交易哈希 -> {'future', 'deadline', 'hashes', 'checked', 'on_block'}
+        last_block (int): 最近一次查询回执时的区块高度
+    """
+
+    def __init__(self, web3_manager, poll_interval=0.5, timeout=120):
+        """
+        初始化回执监听
+
+        Args:
+            web3_manager (Web3Manager): 已连接的Web3Manager实例
+            poll_interval (float): 检查新区块的间隔（秒）
+            timeout (float): 默认等待超时（秒），超时后Future以TimeoutError结束
+        """
+        self.web3_manager = web3_manager
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.pending = {}
+        self.last_block = None
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+    def watch(self, tx_hash, callback=None, timeout=None, on_block=None):
+        """登记待确认交易
+
+        Args:
+            tx_hash: 交易哈希
+            callback (callable): 可选，完成后以Future为参数回调
+            timeout (float): 可选，覆盖默认超时
+            on_block (callable): 可选，每个新区块仍未上链时以区块高度为参数回调
+
+        Returns:
+            Future: 结果为交易回执
+        """
+        key = _hash_hex(tx_hash)
+        with self.lock:
+            entry = self.pending.get(key)
+            if entry is None:
+                entry = {
+                    'future': Future(),
+                    'deadline': time.time() + (timeout or self.timeout),
+                    'hashes': [key],
+                    'checked': False,
+                    'on_block': on_block
+                }
+                self.pending[key] = entry
+        if callback:
+            entry['future'].add_done_callback(callback)
+        self.start()
+        return entry['future']
+
+    def add_hash(self, tx_hash, replacement_hash):
+        """为待确认交易登记替换交易的哈希（同一nonce），任一哈希上链即完成"""
+        replacement = _hash_hex(replacement_hash)
+        with self.lock:
+            entry = self.pending.get(_hash_hex(tx_hash))
+            if entry is not None and replacement not in entry['hashes']:
+                entry['hashes'].append(replacement)
+                entry['checked'] = False
+
+    def poll(self):
+        """检查新区块，有新区块时批量查询全部待确认交易的回执"""
+        with self.lock:
+            if not self.pending:
+                return
+
+        block = self.web3_manager.web3.eth.block_number
+        new_block = block != self.last_block
+        with self.lock:
+            # 新区块时查询全部交易；同一区块内只查询新登记、尚未查询过的交易
+            queries = [
+                (key, tx_hash)
+                for key, entry in self.pending.items() if new_block or not entry['checked']
+                for tx_hash in entry['hashes']
+            ]
+            for key, _ in queries:
+                self.pending[key]['checked'] = True
+        self.last_block = block
+
+        if queries:
+            results = self.web3_manager.batch_rpc([('eth_getTransactionReceipt', [h]) for _, h in queries])
+            for (key, _), raw in zip(queries, results):
+                if raw:
+                    self._resolve(key, result=_format_receipt(raw))
+
+        if new_block:
+            with self.lock:
+                hooks = [entry['on_block'] for entry in self.pending.values() if entry['on_block']]
+            for on_block in hooks:
+                try:
+                    on_block(block)
+                except Exception as e:
+                    print(f'【BR】区块回调执行失败: {e}')
+
+        now = time.time()
+        with self.lock:
+            expired = [h for h, entry in self.pending.items() if entry['deadline'] < now]
+        for tx_hash in expired:
+            self._resolve(tx_hash, error=TimeoutError(f'交易 {tx_hash} 等待回执超时'))
+
+    def _resolve(self, tx_hash, result=None, error=None):
+        """结束Future并移出待确认列表"""
+        with self.lock:
+            entry = self.pending.pop(tx_hash, None)
+        if entry is None:
+            return
+        if error is not None:
+            entry['future'].set_exception(error)
+        else:
+            entry['future'].set_result(result)
+
+    def start(self):
+        """启动后台轮询线程"""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+
+        def loop():
+            while self.running:
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f'【BR】查询交易回执失败: {e}')
+                time.sleep(self.poll_interval)
+
+        self.thread = threading.Thread(target=loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """停止后台轮询线程"""
+        self.running = False
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=self.poll_interval + 1)
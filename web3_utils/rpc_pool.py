@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多节点RPC连接池 - 按延迟选择最快的健康节点，自动剔除并重新探测故障节点
+
+每个节点在滚动窗口内记录请求延迟和错误，请求总是发往平均延迟最低的健康节点，
+失败时依次切换到下一个节点。错误率过高或连续失败的节点会被剔除，剔除期满后由后台探测线程
+用eth_blockNumber探测，探测成功才重新加入，失败则继续剔除；探测同时刷新全部节点的延迟和区块高度。
+
+读请求优先发往区块高度最高的节点，eth_blockNumber的返回值不会低于此前已知的最高区块：
+落后的节点返回更低的高度时改用下一个节点，调用方不会先看到区块N再看到N-1。
+广播交易时可同时发往全部节点（对冲广播），以最先接受的节点为准。
+
+使用示例:
+    >>> provider = RPCPoolProvider(['https://bsc-dataseed1.binance.org/', 'https://bsc-dataseed2.binance.org/'])
+    >>> web3 = Web3(provider)
+    >>> provider.stats()
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.providers.base import JSONBaseProvider
+
+# 节点限流时返回的错误，计入节点健康统计
+RATE_LIMIT_ERRORS = ('rate limit', 'limit exceeded', 'too many requests', 'capacity')
+
+# 对冲广播时交易已在该节点交易池中，等同于接受
+KNOWN_TX_ERRORS = ('already known', 'known transaction')
+# 对冲广播时其他节点的重复回复：同一nonce的交易已被打包
+DUPLICATE_TX_ERRORS = ('nonce too low',)
+
+
+class RPCEndpointState:
+    """单个RPC节点的状态与滚动统计"""
+
+    def __init__(self, url, request_kwargs=None, window=50):
+        self.url = url
+        self.provider = Web3.HTTPProvider(url, request_kwargs=request_kwargs or {})
+        self.samples = deque(maxlen=window)  # (延迟秒, 是否成功)
+        self.consecutive_errors = 0
+        self.ejected = False
+        self.ejected_until = 0  # 剔除期结束时间，之后才重新探测
+        self.requests = 0
+        self.errors = 0
+        self.selected = 0
+        self.block_number = None
+
+    def record(self, latency, ok):
+        """记录一次请求结果"""
+        self.samples.append((latency, ok))
+        self.requests += 1
+        if ok:
+            self.consecutive_errors = 0
+        else:
+            self.errors += 1
+            self.consecutive_errors += 1
+
+    def avg_latency(self):
+        """窗口内成功请求的平均延迟（秒），无数据时返回None"""
+        latencies = [latency for latency, ok in self.samples if ok]
+        return sum(latencies) / len(latencies) if latencies else None
+
+    def error_rate(self):
+        """窗口内错误率"""
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def is_ejected(self):
+        """是否已剔除（剔除期满后仍需探测成功才恢复）"""
+        return self.ejected
+
+
+class RPCPoolProvider(JSONBaseProvider):
+    """按延迟路由的多节点HTTP Provider"""
+
+    def __init__(self, urls, request_kwargs=None, window=50, max_error_rate=0.5, max_consecutive_errors=3,
+                 eject_seconds=30, probe_interval=10, max_block_lag=5):
+        """
+        初始化RPC连接池
+
+        Args:
+            urls (list): RPC节点地址列表
+            request_kwargs (dict): 传递给每个HTTPProvider的请求参数（代理、超时等）
+            window (int): 滚动统计窗口的请求数
+            max_error_rate (float): 窗口内错误率超过该值时剔除节点
+            max_consecutive_errors (int): 连续失败达到该次数时剔除节点
+            eject_seconds (float): 剔除时长（秒），到期后由探测线程重新探测，探测成功才恢复
+            probe_interval (float): 后台探测全部节点的间隔（秒）
+            max_block_lag (int): 区块高度落后最高节点超过该值时视为不健康
+        """
+        super().__init__()
+        if not urls:
+            raise ValueError('RPC节点列表不能为空')
+        self.endpoints = [RPCEndpointState(url, request_kwargs, window) for url in urls]
+        self.max_error_rate = max_error_rate
+        self.max_consecutive_errors = max_consecutive_errors
+        self.eject_seconds = eject_seconds
+        self.probe_interval = probe_interval
+        self.max_block_lag = max_block_lag
+        # 已知的最高区块（探测和eth_blockNumber返回值），eth_blockNumber不会返回更低的高度
+        self.head = None
+        self.lock = threading.Lock()
+        self.probe_running = False
+        self.probe_thread = None
+        self.broadcast_executor = None
+        self.last_broadcast = None
+
+    def __str__(self):
+        return f"RPC pool {', '.join(e.url for e in self.endpoints)}"
+
+    # ---------------------- 路由 ----------------------
+    def _is_healthy(self, endpoint, best_block):
+        if endpoint.is_ejected():
+            return False
+        if best_block is not None and endpoint.block_number is not None:
+            return best_block - endpoint.block_number <= self.max_block_lag
+        return True
+
+    def _update_block(self, endpoint, block_number):
+        """记录节点的区块高度，返回是否不低于已知的最高区块（调用方需持有锁）"""
+        endpoint.block_number = block_number
+        if self.head is not None and block_number < self.head:
+            return False
+        self.head = block_number
+        return True
+
+    def ranked_endpoints(self):
+        """按优先级排列的节点：健康节点中处于最高区块的优先，同等情况下按平均延迟升序，其后是不健康节点"""
+        with self.lock:
+            best_block = self.head
+            healthy = [e for e in self.endpoints if self._is_healthy(e, best_block)]
+            unhealthy = [e for e in self.endpoints if e not in healthy]
+        # 已知落后于最高区块的节点排在后面；没有延迟数据的节点排在有数据的节点之后，保证先用已知快的节点
+        healthy.sort(key=lambda e: (best_block is not None and e.block_number is not None and e.block_number < best_block,
+                                    e.avg_latency() is None, e.avg_latency() or 0))
+        unhealthy.sort(key=lambda e: e.ejected_until)
+        return healthy + unhealthy
+
+    def _record(self, endpoint, latency, ok):
+        """记录结果，必要时剔除节点"""
+        with self.lock:
+            endpoint.record(latency, ok)
+            if ok or endpoint.is_ejected():
+                return
+            too_many = endpoint.consecutive_errors >= self.max_consecutive_errors
+            too_often = len(endpoint.samples) >= 5 and endpoint.error_rate() > self.max_error_rate
+            if too_many or too_often:
+                endpoint.ejected = True
+                endpoint.ejected_until = time.time() + self.eject_seconds
+                print(f'【BR】⚠️ RPC节点已剔除 {self.eject_seconds}s: {endpoint.url} (错误率 {endpoint.error_rate():.0%})')
+
+    @staticmethod
+    def _is_endpoint_error(response):
+        """节点本身的问题（限流等），区别于execution reverted这类正常的业务错误"""
+        if not isinstance(response, dict) or 'error' not in response:
+            return False
+        message = str(response['error']).lower()
+        return any(reason in message for reason in RATE_LIMIT_ERRORS)
+
+    def _accept_block_number(self, endpoint, response):
+        """eth_blockNumber的返回值不低于已知的最高区块时接受，否则视为该节点落后"""
+        if 'result' not in response:
+            return True
+        with self.lock:
+            return self._update_block(endpoint, int(response['result'], 16))
+
+    def _route(self, send, accept=None):
+        """按优先级依次尝试节点，直到某个节点成功返回
+
+        Args:
+            send (callable): send(provider) 发送请求并返回响应
+            accept (callable): accept(endpoint, response) 返回False时改用下一个节点；
+                全部节点都不被接受时返回区块高度为已知最高区块的响应
+        """
+        last_error = None
+        lagging = None
+        for endpoint in self.ranked_endpoints():
+            started = time.perf_counter()
+            try:
+                response = send(endpoint.provider)
+            except Exception as e:
+                self._record(endpoint, time.perf_counter() - started, False)
+                last_error = e
+                continue
+            failed = self._is_endpoint_error(response)
+            self._record(endpoint, time.perf_counter() - started, not failed)
+            if failed:
+                last_error = ValueError(response['error'])
+                continue
+            if accept and not accept(endpoint, response):
+                lagging = response
+                continue
+            with self.lock:
+                endpoint.selected += 1
+            return response
+        if lagging is not None:
+            return {**lagging, 'result': hex(self.head)}
+        raise last_error or ConnectionError('没有可用的RPC节点')
+
+    def make_request(self, method, params):
+        self.start_probe()
+        accept = self._accept_block_number if method == 'eth_blockNumber' else None
+        return self._route(lambda provider: provider.make_request(method, params), accept)
+
+    def make_batch_request(self, requests):
+        self.start_probe()
+        return self._route(lambda provider: provider.make_batch_request(requests))
+
+    def is_connected(self, show_traceback=False):
+        return any(endpoint.provider.is_connected() for endpoint in self.ranked_endpoints())
+
+    # ---------------------- 对冲广播 ----------------------
+    def broadcast_raw_transaction(self, raw_transaction, timeout=10):
+        """同时向全部节点广播已签名交易，最先接受的节点返回后立即返回
+
+        其他节点返回的already known / nonce too low视为重复回复；
+        只有没有任何节点接受时才抛出异常。
+
+        Args:
+            raw_transaction (bytes): 已签名的原始交易
+            timeout (float): 等待首个节点接受的最长时间（秒）
+
+        Returns:
+            HexBytes: 交易哈希（本地计算，与节点返回值一致）
+        """
+        if self.broadcast_executor is None:
+            self.broadcast_executor = ThreadPoolExecutor(max_workers=len(self.endpoints) * 2,
+                                                         thread_name_prefix='rpc-broadcast')
+        tx_hash = HexBytes(Web3.keccak(HexBytes(raw_transaction)))
+        params = [Web3.to_hex(HexBytes(raw_transaction))]
+        started = time.perf_counter()
+
+        def send(endpoint):
+            try:
+                response = endpoint.provider.make_request('eth_sendRawTransaction', params)
+            except Exception as e:
+                response = e
+            return endpoint, time.perf_counter() - started, response
+
+        pending = {self.broadcast_executor.submit(send, endpoint) for endpoint in self.endpoints}
+        replies = []
+        accepted = None
+        deadline = time.time() + timeout
+        while pending and accepted is None:
+            done, pending = wait(pending, timeout=max(deadline - time.time(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                reply = self._broadcast_reply(future)
+                replies.append(reply)
+                if reply['status'] == 'accepted' and accepted is None:
+                    accepted = reply
+
+        # 其余节点的回复在后台统计，不阻塞返回
+        for future in pending:
+            future.add_done_callback(lambda f: replies.append(self._broadcast_reply(f)))
+        self.last_broadcast = {'tx_hash': Web3.to_hex(tx_hash), 'replies': replies}
+
+        if accepted is not None:
+            with self.lock:
+                accepted['endpoint'].selected += 1
+            print(f"【BR】📡 交易已由 {accepted['endpoint'].url} 接受 ({accepted['latency'] * 1000:.1f}ms)")
+            return tx_hash
+        if not replies:
+            raise TimeoutError(f'交易广播超时，{timeout}s内没有节点回复')
+        # 没有节点接受时优先抛出节点返回的错误（nonce too low等需要nonce重新同步），其次才是连接异常
+        reply = min(replies, key=lambda r: (isinstance(r['error'], Exception), r['status'] == 'duplicate'))
+        raise reply['error'] if isinstance(reply['error'], Exception) else ValueError(reply['error'])
+
+    def _broadcast_reply(self, future):
+        """解析单个节点的广播结果，并记录到节点统计"""
+        endpoint, latency, response = future.result()
+        if isinstance(response, Exception):
+            self._record(endpoint, latency, False)
+            return {'endpoint': endpoint, 'latency': latency, 'status': 'error', 'error': response}
+
+        error = response.get('error')
+        message = str(error).lower()
+        if error is None or any(reason in message for reason in KNOWN_TX_ERRORS):
+            status = 'accepted'
+        elif any(reason in message for reason in DUPLICATE_TX_ERRORS):
+            status = 'duplicate'
+        else:
+            status = 'error'
+        self._record(endpoint, latency, not self._is_endpoint_error(response))
+        return {'endpoint': endpoint, 'latency': latency, 'status': status, 'error': error}
+
+    # ---------------------- 探测 ----------------------
+    def probe(self):
+        """探测全部节点：记录延迟和区块高度；剔除期满的节点探测成功后恢复，失败则继续剔除"""
+        now = time.time()
+        for endpoint in self.endpoints:
+            # 仍在剔除期内的节点不探测，避免给故障节点增加压力
+            if endpoint.is_ejected() and now < endpoint.ejected_until:
+                continue
+            started = time.perf_counter()
+            try:
+                response = endpoint.provider.make_request('eth_blockNumber', [])
+                ok = 'result' in response
+                if ok:
+                    with self.lock:
+                        self._update_block(endpoint, int(response['result'], 16))
+            except Exception:
+                ok = False
+            latency = time.perf_counter() - started
+            was_ejected = endpoint.is_ejected()
+            self._record(endpoint, latency, ok)
+            if not was_ejected:
+                continue
+            with self.lock:
+                if not ok:
+                    endpoint.ejected_until = time.time() + self.eject_seconds
+                    continue
+                endpoint.ejected = False
+                endpoint.ejected_until = 0
+                endpoint.samples.clear()
+                endpoint.samples.append((latency, True))
+            print(f'【BR】✅ RPC节点恢复: {endpoint.url}')
+
+    def start_probe(self):
+        """启动后台探测线程（首次请求时自动启动）"""
+        if self.probe_running or len(self.endpoints) < 2:
+            return
+        self.probe_running = True
+
+        def loop():
+            while self.probe_running:
+                try:
+                    self.probe()
+                except Exception as e:
+                    print(f'【BR】RPC节点探测失败: {e}')
+                time.sleep(self.probe_interval)
+
+        self.probe_thread = threading.Thread(target=loop)
+        self.probe_thread.daemon = True
+        self.probe_thread.start()
+
+    def stop_probe(self):
+        """停止后台探测线程"""
+        self.probe_running = False
+
+    # ---------------------- 统计 ----------------------
+    def stats(self):
+        """返回每个节点的路由统计，按当前优先级排列"""
+        result = []
+        for rank, endpoint in enumerate(self.ranked_endpoints()):
+            latency = endpoint.avg_latency()
+            result.append({
+                'url': endpoint.url,
+                'rank': rank,
+                'ejected': endpoint.is_ejected(),
+                'avg_latency_ms': round(latency * 1000, 1) if latency is not None else None,
+                'error_rate': round(endpoint.error_rate(), 3),
+                'requests': endpoint.requests,
+                'errors': endpoint.errors,
+                'selected': endpoint.selected,
+                'block_number': endpoint.block_number,
+            })
+        return result
+
+    def format_stats(self):
+        """格式化统计信息，用于日志和探活消息"""
+        lines = []
+        for item in self.stats():
+            status = '剔除' if item['ejected'] else '正常'
+            latency = f"{item['avg_latency_ms']}ms" if item['avg_latency_ms'] is not None else 'N/A'
+            lines.append(f"{item['url']} [{status}] 延迟 {latency} 错误率 {item['error_rate']:.0%} 选中 {item['selected']}")
+        return '\n'.join(lines)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预签名退出测试脚本 - 基于本地JSON-RPC节点验证状态变化时重新签名、头寸覆盖判断、
+触发时直接广播预签名交易，以及nonce失效时不广播过期交易
+"""
+
+from web3 import Web3
+from web3_utils._test_helpers import create_config, create_manager
+from web3_utils.armed_exit import ArmedExit
+from web3_utils.local_node import LocalRPCNode
+from web3_utils.web3_manager import Web3Manager
+
+POSITIONS = [{'token_id': 1, 'liquidity': 100}, {'token_id': 2, 'liquidity': 200}]
+
+
+def create_armed(manager, positions=POSITIONS):
+    """为给定缓存头寸创建预签名退出；测试中手动调用refresh，不启动后台线程"""
+    manager.current_positions = list(positions)
+    manager.armed_exit = ArmedExit(manager)
+    return manager.armed_exit
+
+
+def test_refresh_resigns_on_state_change():
+    """状态不变时不重新签名；gas价格、头寸或链上nonce变化时重新签名"""
+    node = LocalRPCNode().start()
+    try:
+        config = create_config(node)
+        manager = Web3Manager(config)
+        assert manager.connect()
+        armed = create_armed(manager)
+
+        assert armed.refresh()
+        assert [item['nonce'] for item in armed.armed] == [0, 1]
+        raw = [item['raw'] for item in armed.armed]
+        assert not armed.refresh()
+
+        manager.config['web3_config']['gas_price_gwei'] = 2
+        assert armed.refresh()
+        assert all(item['gas_price'] == Web3.to_wei(2, 'gwei') for item in armed.armed)
+        assert [item['raw'] for item in armed.armed] != raw
+
+        manager.current_positions = POSITIONS[:1]
+        assert armed.refresh()
+        assert [item['positions'] for item in armed.armed] == [POSITIONS[:1]]
+
+        # 钱包在其他地方发出交易后，空闲时与链上同步nonce并重新签名
+        other = Web3Manager(config)
+        assert other.connect()
+        other.submit_exit(POSITIONS[1:])
+        assert armed.refresh()
+        assert [item['nonce'] for item in armed.armed] == [1]
+    finally:
+        node.stop()
+
+
+def test_covers_follows_position_changes():
+    """已签名交易恰好覆盖头寸时才可直接广播，头寸集合或流动性变化后需重新签名才覆盖"""
+    node = LocalRPCNode().start()
+    try:
+        manager = create_manager(node)
+        armed = create_armed(manager)
+        assert not armed.covers(POSITIONS)
+
+        armed.refresh()
+        assert armed.covers(POSITIONS)
+        assert not armed.covers(POSITIONS[:1])
+
+        changed = [POSITIONS[0], {'token_id': 2, 'liquidity': 150}, {'token_id': 3, 'liquidity': 50}]
+        manager.current_positions = changed
+        assert not armed.covers(changed)
+        armed.refresh()
+        assert armed.covers(changed) and not armed.covers(POSITIONS)
+    finally:
+        node.stop()
+
+
+def test_fire_broadcasts_presigned_transactions():
+    """触发时按nonce顺序广播预签名的原始交易，不再构建和签名"""
+    node = LocalRPCNode().start()
+    try:
+        manager = create_manager(node)
+        armed = create_armed(manager)
+        armed.refresh()
+        raw = [Web3.to_hex(item['raw']) for item in armed.armed]
+
+        fired = manager.submit_exits(POSITIONS)
+        assert [group for group, _ in fired] == [POSITIONS[:1], POSITIONS[1:]]
+        assert [node.mempool[Web3.to_hex(tx_hash)]['raw'] for _, tx_hash in fired] == raw
+        assert [node.mempool[Web3.to_hex(tx_hash)]['nonce'] for _, tx_hash in fired] == [0, 1]
+        assert manager.nonce_manager.peek() == 2
+        assert armed.armed == [] and armed.last_fire_ms is not None
+    finally:
+        node.stop()
+
+
+def test_stale_nonce_resigns_instead_of_broadcasting():
+    """预签名后nonce被其他交易占用：不广播过期交易，改为按新nonce签名发送"""
+    node = LocalRPCNode().start()
+    try:
+        manager = create_manager(node)
+        armed = create_armed(manager, POSITIONS[:1])
+        armed.refresh()
+        stale = Web3.to_hex(armed.armed[0]['raw'])
+
+        # 本进程的其他交易占用了预签名时的nonce 0
+        manager.submit_exit(POSITIONS[1:])
+        assert armed.fire() == []
+        assert all(tx['raw'] != stale for tx in node.mempool.values())
+        assert manager.nonce_manager.peek() == 1
+
+        # 失效后下一次刷新按新nonce重新签名，触发时广播新交易
+        assert armed.refresh()
+        assert armed.armed[0]['nonce'] == 1
+        fired = manager.submit_exits(POSITIONS[:1])
+        assert [node.mempool[Web3.to_hex(tx_hash)]['nonce'] for _, tx_hash in fired] == [1]
+        assert all(tx['raw'] != stale for tx in node.mempool.values())
+    finally:
+        node.stop()
+
+
+def main():
+    for test in (test_refresh_resigns_on_state_change, test_covers_follows_position_changes,
+                 test_fire_broadcasts_presigned_transactions, test_stale_nonce_resigns_instead_of_broadcasting):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AsyncWeb3Manager测试脚本 - 基于本地JSON-RPC节点验证异步连接和并发广播
+"""
+
+import asyncio
+from web3_utils._test_helpers import create_config, positions
+from web3_utils.async_web3_manager import AsyncWeb3Manager
+from web3_utils.local_node import LocalRPCNode
+from web3_utils.web3_manager import Web3Manager
+
+
+def test_no_sync_rpc_methods_inherited():
+    """不继承Web3Manager的同步RPC方法，避免同步代码拿到未await的协程"""
+    assert not issubclass(AsyncWeb3Manager, Web3Manager)
+    for name in ('check_health', 'start_health_monitor', 'submit_exit', 'submit_batch_exits', 'watch_exit'):
+        assert not hasattr(AsyncWeb3Manager, name)
+
+
+def test_submit_exits():
+    """连接后并发广播移除交易，nonce连续，上链后等待结果"""
+    node = LocalRPCNode().start()
+
+    async def run():
+        manager = AsyncWeb3Manager(create_config(node, batch_exit=False))
+        try:
+            assert await manager.connect()
+            assert await manager.is_connected() is True
+            assert manager.get_block_gas_limit() == node.block_gas_limit
+
+            exits = positions(3)
+            submitted = await manager.submit_exits(exits)
+            assert [group for group, _ in submitted] == [[p] for p in exits]
+            assert sorted(tx['nonce'] for tx in node.mempool.values()) == [0, 1, 2]
+
+            node.mine()
+            results = await asyncio.gather(*[manager.wait_for_exit(tx_hash, group) for group, tx_hash in submitted])
+            assert all(results)
+        finally:
+            await manager.close()
+
+    try:
+        asyncio.run(run())
+    finally:
+        node.stop()
+
+
+def main():
+    for test in (test_no_sync_rpc_methods_inherited, test_submit_exits):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合并移除测试脚本 - 基于本地JSON-RPC节点验证multicall分组与超出gas上限时的拆分
+"""
+
+import rlp
+from web3_utils._test_helpers import create_manager, positions
+from web3_utils.local_node import LocalRPCNode, RPCError
+from web3_utils.web3_manager import ExitGasLimitError
+
+# 开启合并移除，每个头寸按200000 gas估算
+BATCH_CONFIG = {'gas_limit': 200000, 'batch_exit': True}
+
+
+class FixedSimulator:
+    """按每个头寸固定gas返回估算值的预模拟结果"""
+
+    def __init__(self, per_position):
+        self.per_position = per_position
+
+    def gas_for(self, group):
+        return self.per_position * len(group)
+
+
+
+def test_split_uses_transaction_gas():
+    """分组按构建交易时实际使用的gas校验：预模拟估算 × gas_margin 超出上限的组继续拆分"""
+    node = LocalRPCNode(block_gas_limit=2_000_000).start()
+    try:
+        manager = create_manager(node, **BATCH_CONFIG)
+        assert [len(g) for g in manager.split_exit_batches(positions(10))] == [5, 5]
+
+        manager.exit_simulator = FixedSimulator(300_000)
+        batches = manager.split_exit_batches(positions(10))
+        assert [p for group in batches for p in group] == positions(10)
+        assert all(manager.get_exit_gas_limit(group) <= 1_000_000 for group in batches)
+        assert [len(g) for g in batches] == [2, 1, 2, 2, 1, 2]
+    finally:
+        node.stop()
+
+
+def test_build_rejects_gas_above_block_limit():
+    """移除交易的gas超过区块gas上限时在本地报错，不发送请求"""
+    node = LocalRPCNode(block_gas_limit=500_000).start()
+    try:
+        manager = create_manager(node, **BATCH_CONFIG)
+        manager.get_block_gas_limit()
+        try:
+            manager.build_exit_transaction(positions(3), 0, 10 ** 9)
+            assert False, '应当抛出ExitGasLimitError'
+        except ExitGasLimitError as e:
+            assert e.gas == 600_000 and e.block_gas_limit == 500_000
+    finally:
+        node.stop()
+
+
+def test_submit_splits_on_limit_exceeded():
+    """节点返回limit exceeded错误码时对半拆分重试，nonce保持连续"""
+    node = LocalRPCNode().start()
+    try:
+        manager = create_manager(node, **BATCH_CONFIG)
+        send = node.rpc_eth_sendRawTransaction
+
+        def limited(raw):
+            gas = int.from_bytes(rlp.decode(bytes.fromhex(raw[2:]))[2], 'big')
+            if gas > 500_000:
+                raise RPCError('exceeds block gas limit', -32005)
+            return send(raw)
+
+        node.rpc_eth_sendRawTransaction = limited
+        sent = manager.submit_batch_exits(positions(4))
+        assert [[p['token_id'] for p in group] for group, _ in sent] == [[1, 2], [3, 4]]
+        assert sorted(tx['nonce'] for tx in node.mempool.values()) == [0, 1]
+    finally:
+        node.stop()
+
+
+def test_submit_does_not_split_on_other_errors():
+    """其他错误即使消息中包含gas limit也不拆分"""
+    node = LocalRPCNode().start()
+    try:
+        manager = create_manager(node, **BATCH_CONFIG)
+
+        def rejected(raw):
+            raise RPCError('intrinsic gas too low: gas limit', -32000)
+
+        node.rpc_eth_sendRawTransaction = rejected
+        try:
+            manager.submit_batch_exits(positions(4))
+            assert False, '应当抛出节点错误'
+        except Exception as e:
+            assert not isinstance(e, ExitGasLimitError)
+        assert node.method_counts['eth_sendRawTransaction'] == 1
+    finally:
+        node.stop()
+
+
+def main():
+    for test in (test_split_uses_transaction_gas, test_build_rejects_gas_above_block_limit,
+                 test_submit_splits_on_limit_exceeded, test_submit_does_not_split_on_other_errors):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+移除交易工作进程测试脚本 - 基于本地JSON-RPC节点启动真实的工作进程，验证Pipe通信、
+广播结果的返回，以及工作进程退出或超时后本进程接管时不重复移除
+"""
+
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from web3_utils._test_helpers import create_config, register_positions
+from web3_utils.exit_worker import ExitWorker, remaining_exit_positions
+from web3_utils.local_node import LocalRPCNode
+from web3_utils.web3_manager import Web3Manager
+
+# 关闭本地头寸索引，合并为一笔交易发送
+WORKER_CONFIG = {'position_index_path': '', 'batch_exit': True}
+
+
+def create_worker_and_manager(node):
+    """启动工作进程，并创建本进程中使用同一钱包的Web3Manager"""
+    config = create_config(node, **WORKER_CONFIG)
+    manager = Web3Manager(config)
+    assert manager.connect()
+    return ExitWorker(config, start_timeout=30).start(), manager
+
+
+def clear_liquidity_when_mined(node, chain_positions):
+    """模拟移除交易上链后头寸流动性归零"""
+    def status(tx):
+        for token_id in chain_positions:
+            chain_positions[token_id] = 0
+        return 1
+    node.receipt_status = status
+
+
+def test_trigger_reports_submitted_and_result():
+    """同步头寸后触发：工作进程广播交易后立即返回交易哈希，上链后返回回执结果"""
+    node = LocalRPCNode().start()
+    worker = None
+    try:
+        worker, manager = create_worker_and_manager(node)
+        assert worker.ping() >= 0
+
+        worker.update_positions([{'token_id': 1, 'liquidity': 100}, {'token_id': 2, 'liquidity': 200}])
+        request = worker.trigger()
+        submitted = request['submitted'].result(timeout=10)
+        assert submitted['error'] is None and submitted['positions'] == 2
+        assert [tx['token_ids'] for tx in submitted['txs']] == [[1, 2]]
+        assert submitted['txs'][0]['tx_hash'] in node.mempool
+        assert submitted['timings']['trigger_to_submit_ms'] >= submitted['timings']['ipc_ms']
+
+        node.mine()
+        result = request['result'].result(timeout=10)
+        assert result['success_count'] == 2
+        assert result['txs'][0]['status'] == 1
+    finally:
+        if worker:
+            worker.stop()
+        node.stop()
+
+
+def test_dead_worker_fails_pending_requests():
+    """工作进程退出后未完成的请求以ConnectionError失败，本进程按链上状态移除全部头寸"""
+    node = LocalRPCNode().start()
+    worker = None
+    try:
+        worker, manager = create_worker_and_manager(node)
+        chain_positions = {1: 100, 2: 200}
+        register_positions(node, manager.config['web3_config']['wallet_address'], chain_positions)
+
+        # 工作进程在收到触发前退出
+        worker.process.terminate()
+        worker.process.join()
+        try:
+            worker.trigger()['submitted'].result(timeout=5)
+            assert False, '应当抛出ConnectionError'
+        except (ConnectionError, OSError):
+            pass
+        worker.stop()
+        assert not worker.is_alive() and not worker.reader.is_alive()
+
+        positions = [{'token_id': 1, 'liquidity': 100}, {'token_id': 2, 'liquidity': 200}]
+        assert remaining_exit_positions(manager, positions, timeout=1, poll_interval=0.05) == positions
+        assert not node.mempool
+    finally:
+        if worker:
+            worker.stop()
+        node.stop()
+
+
+def test_timeout_does_not_resend_broadcast_exits():
+    """工作进程广播慢于等待时间：终止工作进程后等待其交易上链，不重复移除已移除的头寸"""
+    node = LocalRPCNode().start()
+    worker = None
+    mining = threading.Event()
+    try:
+        worker, manager = create_worker_and_manager(node)
+        chain_positions = {1: 100, 2: 200}
+        register_positions(node, manager.config['web3_config']['wallet_address'], chain_positions)
+        clear_liquidity_when_mined(node, chain_positions)
+
+        send = node.rpc_eth_sendRawTransaction
+
+        def slow_send(raw):
+            time.sleep(1)
+            return send(raw)
+
+        node.rpc_eth_sendRawTransaction = slow_send
+        positions = [{'token_id': 1, 'liquidity': 100}, {'token_id': 2, 'liquidity': 200}]
+        request = worker.trigger(positions)
+        try:
+            request['submitted'].result(timeout=0.3)
+            assert False, '应当等待超时'
+        except FutureTimeoutError:
+            pass
+        worker.stop(timeout=0)
+
+        def miner():
+            while not mining.wait(0.1):
+                node.mine()
+
+        threading.Thread(target=miner, daemon=True).start()
+        assert remaining_exit_positions(manager, positions, timeout=10, poll_interval=0.05) == []
+        # 工作进程的交易已占用nonce 0，本进程后续交易从1开始
+        assert manager.nonce_manager.peek() == 1
+        assert len(node.receipts) == 1
+    finally:
+        mining.set()
+        if worker:
+            worker.stop()
+        node.stop()
+
+
+def test_remaining_positions_after_partial_broadcast():
+    """工作进程只移除了部分头寸：等待pending交易上链后只返回仍有流动性的头寸，nonce与链上同步"""
+    node = LocalRPCNode().start()
+    mining = threading.Event()
+    try:
+        config = create_config(node, **WORKER_CONFIG)
+        chain_positions = {1: 100, 2: 200}
+        register_positions(node, config['web3_config']['wallet_address'], chain_positions)
+
+        # 模拟工作进程：使用同一钱包的另一个Web3Manager只广播了头寸1
+        worker_manager = Web3Manager(config)
+        assert worker_manager.connect()
+        worker_manager.submit_exits([{'token_id': 1, 'liquidity': 100}])
+
+        def status(tx):
+            chain_positions[1] = 0
+            return 1
+
+        node.receipt_status = status
+        manager = Web3Manager(config)
+        assert manager.connect()
+
+        def miner():
+            mining.wait(0.3)
+            node.mine()
+
+        threading.Thread(target=miner, daemon=True).start()
+        positions = [{'token_id': 1, 'liquidity': 100}, {'token_id': 2, 'liquidity': 200}]
+        assert remaining_exit_positions(manager, positions, timeout=10, poll_interval=0.05) == positions[1:]
+        assert manager.nonce_manager.peek() == 1
+    finally:
+        mining.set()
+        node.stop()
+
+
+def main():
+    for test in (test_trigger_reports_submitted_and_result, test_dead_worker_fails_pending_requests,
+                 test_timeout_does_not_resend_broadcast_exits, test_remaining_positions_after_partial_broadcast):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
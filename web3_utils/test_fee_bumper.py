@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FeeBumper测试脚本 - 基于本地JSON-RPC节点模拟拥堵，验证未上链交易自动提价后被打包
+"""
+
+import time
+from web3 import Web3
+from web3_utils._test_helpers import create_manager
+from web3_utils.local_node import LocalRPCNode
+
+# 每个区块都检查提价
+FEE_BUMP = {'bump_blocks': 1, 'bump_ratio': 2, 'max_gas_price_gwei': 5}
+
+
+def test_underpriced_exit_bumped_and_mined():
+    """gas价格低于节点打包门槛的交易被提价重发，替换交易上链后Future完成"""
+    node = LocalRPCNode().start()
+    node.min_gas_price = Web3.to_wei(2, 'gwei')
+    try:
+        manager = create_manager(node, receipt_poll_interval=0.05, fee_bump=FEE_BUMP)
+        position = {'token_id': 1, 'liquidity': 1}
+        tx_hash = manager.submit_exit(position)
+        future = manager.watch_exit(tx_hash, position)
+
+        for _ in range(100):
+            node.mine()
+            time.sleep(0.1)
+            if future.done():
+                break
+        receipt = future.result(timeout=1)
+        assert receipt.status == 1
+        assert receipt.transactionHash != tx_hash
+        assert receipt.effectiveGasPrice == Web3.to_wei(2, 'gwei')
+        assert manager.nonce_manager.peek() == 1
+    finally:
+        manager.get_receipt_watcher().stop()
+        node.stop()
+
+
+def test_bump_does_not_block_receipt_thread():
+    """提价回调立即返回，重新签名和广播在提价线程池中执行"""
+    node = LocalRPCNode().start()
+    try:
+        manager = create_manager(node, fee_bump=FEE_BUMP)
+        bumper = manager.get_fee_bumper()
+        send = manager.send_raw_transaction
+
+        def slow_send(raw):
+            time.sleep(1)
+            return send(raw)
+
+        manager.send_raw_transaction = slow_send
+        on_block = bumper.tracker(b'\x01' * 32, [{'token_id': 1, 'liquidity': 1}], 0, Web3.to_wei(1, 'gwei'))
+        on_block(10)
+        started = time.time()
+        on_block(11)
+        on_block(12)
+        assert time.time() - started < 0.5
+        time.sleep(1.5)
+        assert len(node.mempool) == 1
+    finally:
+        node.stop()
+
+
+def main():
+    for test in (test_underpriced_exit_bumped_and_mined, test_bump_does_not_block_receipt_thread):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
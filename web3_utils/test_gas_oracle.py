@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GasOracle测试脚本 - 基于本地JSON-RPC节点验证建议价格计算和eth_feeHistory失败处理
+"""
+
+from web3 import Web3
+from web3_utils._test_helpers import create_manager
+from web3_utils.gas_oracle import GasOracle
+from web3_utils.local_node import LocalRPCNode, RPCError
+
+
+def test_price_within_floor_and_cap():
+    """建议价格 = 采样价格 × 激进系数，限制在下限/上限之间"""
+    node = LocalRPCNode(gas_price=Web3.to_wei(1, 'gwei')).start()
+    try:
+        node.mine(30)
+        manager = create_manager(node)
+        oracle = GasOracle(manager, multiplier=1.5, floor_gwei=0.1, cap_gwei=5)
+        assert oracle.update() == Web3.to_wei(1.5, 'gwei')
+
+        node.gas_price = Web3.to_wei(10, 'gwei')
+        assert oracle.update() == Web3.to_wei(5, 'gwei')
+
+        try:
+            GasOracle(manager, floor_gwei=6, cap_gwei=5)
+            assert False, '下限高于上限时应当报错'
+        except ValueError:
+            pass
+    finally:
+        node.stop()
+
+
+def test_fee_history_transient_failure():
+    """eth_feeHistory偶发失败不会停止使用，连续失败达到上限后才停止"""
+    node = LocalRPCNode().start()
+    try:
+        node.mine(30)
+        manager = create_manager(node)
+        oracle = GasOracle(manager, max_fee_history_failures=3)
+        fee_history = node.rpc_eth_feeHistory
+
+        def timeout(*args):
+            raise RPCError('request timed out', -32000)
+
+        node.rpc_eth_feeHistory = timeout
+        oracle.update()
+        oracle.update()
+        assert oracle.fee_history_supported
+
+        node.rpc_eth_feeHistory = fee_history
+        oracle.update()
+        assert oracle.fee_history_supported and oracle.fee_history_failures == 0
+
+        node.rpc_eth_feeHistory = timeout
+        for _ in range(3):
+            oracle.update()
+        assert not oracle.fee_history_supported
+        assert oracle.get_price() is not None
+    finally:
+        node.stop()
+
+
+def test_fee_history_method_not_found():
+    """节点返回method not found时立即停止使用eth_feeHistory"""
+    node = LocalRPCNode().start()
+    try:
+        manager = create_manager(node)
+        # 未实现的方法返回 -32601
+        node.rpc_eth_feeHistory = None
+        oracle = GasOracle(manager)
+        oracle.update()
+        assert not oracle.fee_history_supported
+    finally:
+        node.stop()
+
+
+def test_start_derives_floor_and_cap():
+    """未配置的下限/上限按另一端调整，gas_price_gwei高于默认上限时仍可启动；两端都配置且矛盾时报错"""
+    node = LocalRPCNode(gas_price=Web3.to_wei(1, 'gwei')).start()
+    try:
+        node.mine(30)
+        manager = create_manager(node, gas_price_gwei=8, gas_oracle={})
+        oracle = manager.start_gas_oracle()
+        # 测试中只检查首次采样，停止后台线程
+        oracle.stop()
+        assert (oracle.floor, oracle.cap) == (Web3.to_wei(8, 'gwei'), Web3.to_wei(8, 'gwei'))
+        assert manager.get_gas_price() == Web3.to_wei(8, 'gwei')
+
+        manager = create_manager(node, gas_price_gwei=8, gas_oracle={'cap_gwei': 3})
+        oracle = manager.start_gas_oracle()
+        oracle.stop()
+        assert (oracle.floor, oracle.cap) == (Web3.to_wei(3, 'gwei'), Web3.to_wei(3, 'gwei'))
+
+        manager = create_manager(node, gas_oracle={'floor_gwei': 6, 'cap_gwei': 5})
+        try:
+            manager.start_gas_oracle()
+            assert False, '下限高于上限时应当报错'
+        except ValueError:
+            pass
+        assert manager.gas_oracle is None
+    finally:
+        node.stop()
+
+
+def main():
+    for test in (test_price_within_floor_and_cap, test_fee_history_transient_failure, test_fee_history_method_not_found,
+                 test_start_derives_floor_and_cap):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
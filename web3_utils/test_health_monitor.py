@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+连接健康检查测试脚本 - 基于本地JSON-RPC节点的停止和重启，验证缓存的连接状态、
+连续失败后标记断开，以及后台线程自动重连
+"""
+
+import time
+from web3_utils._test_helpers import create_manager
+from web3_utils.local_node import LocalRPCNode
+
+
+def wait_until(condition, timeout=5):
+    """等待条件成立，超时返回False"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_is_connected_uses_cached_state():
+    """默认返回缓存的连接状态，不产生RPC请求；probe=True时实时检查并更新缓存"""
+    node = LocalRPCNode().start()
+    try:
+        manager = create_manager(node)
+        requests = node.request_count
+        node.stop()
+        assert manager.is_connected()
+        assert node.request_count == requests
+
+        assert not manager.is_connected(probe=True)
+        assert not manager.is_connected()
+    finally:
+        node.stop()
+
+
+def test_check_health_marks_down_and_reconnects():
+    """连续失败达到health_max_failures次后标记为断开，节点恢复后重新连接并保留nonce管理器"""
+    node = LocalRPCNode().start()
+    try:
+        manager = create_manager(node, health_max_failures=2)
+        nonce_manager = manager.nonce_manager
+        node.stop()
+
+        # 第一次失败仍视为连接正常
+        assert manager.check_health()
+        assert manager.is_connected() and manager.health_failures == 1
+        assert not manager.check_health()
+        assert not manager.is_connected()
+        # 断开状态下每次检查都尝试重连
+        assert not manager.check_health()
+
+        node.start()
+        assert manager.check_health()
+        assert manager.is_connected() and manager.health_failures == 0
+        assert manager.nonce_manager is nonce_manager and nonce_manager.web3 is manager.web3
+    finally:
+        node.stop()
+
+
+def test_health_monitor_reconnects_in_background():
+    """后台健康检查线程在节点停止后标记断开，节点重启后自动恢复连接"""
+    node = LocalRPCNode().start()
+    manager = None
+    try:
+        manager = create_manager(node, health_check_interval=0.05, health_max_failures=2)
+        manager.start_health_monitor()
+        manager.start_health_monitor()
+        assert manager.health_thread.is_alive()
+
+        node.stop()
+        assert wait_until(lambda: not manager.is_connected())
+        node.start()
+        assert wait_until(manager.is_connected)
+        assert manager.web3.eth.block_number == node.block_number
+    finally:
+        if manager:
+            manager.stop_health_monitor()
+        node.stop()
+
+
+def main():
+    for test in (test_is_connected_uses_cached_state, test_check_health_marks_down_and_reconnects,
+                 test_health_monitor_reconnects_in_background):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
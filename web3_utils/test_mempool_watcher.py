@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MempoolWatcher测试脚本 - 基于本地JSON-RPC节点的pending交易过滤器，验证撤池交易的解码和触发回调
+"""
+
+from eth_abi import encode as abi_encode
+from web3_utils._test_helpers import (BR, POOL, POSITION_MANAGER, UNIT, USDT, create_manager, register_pool,
+                                      selector)
+from web3_utils.local_node import LocalRPCNode
+from web3_utils.mempool_watcher import MempoolWatcher
+from web3_utils.pool_feed import PoolLiquidityFeed
+
+
+def register_positions(node):
+    """任意token_id都返回USDT-BR、费率2500、区间[-100, 100]的头寸"""
+    def positions(data):
+        return abi_encode(['uint96', 'address', 'address', 'address', 'uint24', 'int24', 'int24', 'uint128',
+                           'uint256', 'uint256', 'uint128', 'uint128'],
+                          [0, '0x' + '00' * 20, USDT, BR, 2500, -100, 100, 0, 0, 0, 0, 0])
+
+    node.register_call(POSITION_MANAGER, selector('positions(uint256)'), positions)
+
+
+def test_pending_decrease_liquidity_triggers():
+    """其他钱包的multicall(decreaseLiquidity/collect/burn)在上链前被识别，超过阈值时触发回调"""
+    node = LocalRPCNode().start()
+    try:
+        register_pool(node, 1000 * UNIT, 1000 * UNIT)
+        register_positions(node)
+        manager = create_manager(node)
+        feed = PoolLiquidityFeed(manager, pools=[POOL], poll_interval=3600, resync_blocks=1000)
+        feed.start()
+        feed.stop()
+
+        events = []
+        watcher = MempoolWatcher(manager, feed, trigger_usd=5000, on_event=events.append)
+        assert watcher.poll() == []
+
+        # 其他钱包发出的撤池交易进入pending过滤器
+        rugger = create_manager(node)
+        large = rugger.submit_exit({'token_id': 7, 'liquidity': 10 ** 24})
+        small = rugger.submit_exit({'token_id': 8, 'liquidity': 10 ** 20})
+        # 自己的移除交易不上报
+        manager.submit_exit({'token_id': 9, 'liquidity': 10 ** 24})
+
+        found = watcher.poll()
+        assert watcher.seen == 3
+        assert found == events and len(events) == 2
+        expected = feed.position_value(feed.pool_addresses[0], -100, 100, 10 ** 24)['liquidity_usd']
+
+        large_event, small_event = events
+        assert large_event['hash'] == large.to_0x_hex()
+        assert large_event['kinds'] == ['burn_position', 'decrease']
+        assert large_event['token_ids'] == [7]
+        assert abs(large_event['removed_usd'] - expected) < 1e-6
+        assert large_event['trigger'] is True
+        assert small_event['hash'] == small.to_0x_hex()
+        assert 0 < small_event['removed_usd'] < 5000 and small_event['trigger'] is False
+
+        assert watcher.poll() == []
+    finally:
+        node.stop()
+
+
+def main():
+    for test in (test_pending_decrease_liquidity_triggers,):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NonceManager测试脚本 - 基于本地JSON-RPC节点验证并发发送交易时的nonce分配
+"""
+
+import threading
+from web3_utils._test_helpers import create_manager
+from web3_utils.local_node import LocalRPCNode
+
+
+def test_concurrent_submit():
+    """多线程同时发送交易，nonce连续且不重复，无需等待上链"""
+    node = LocalRPCNode().start()
+    try:
+        manager = create_manager(node)
+        hashes = []
+        lock = threading.Lock()
+
+        def submit(token_id):
+            tx_hash = manager.submit_exit({'token_id': token_id, 'liquidity': 1})
+            with lock:
+                hashes.append(tx_hash)
+
+        threads = [threading.Thread(target=submit, args=(i + 1,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(hashes) == 8
+        assert sorted(tx['nonce'] for tx in node.mempool.values()) == list(range(8))
+        assert node.method_counts.get('eth_getTransactionCount') == 1
+
+        node.mine()
+        assert not node.mempool
+        assert all(manager.web3.eth.get_transaction_receipt(h).status == 1 for h in hashes)
+    finally:
+        node.stop()
+
+
+def test_resync_after_external_transaction():
+    """钱包在其他地方发出交易导致nonce过低时，自动与链上重新同步"""
+    node = LocalRPCNode().start()
+    try:
+        manager = create_manager(node)
+        manager.submit_exit({'token_id': 1, 'liquidity': 1})
+        node.mine()
+        # 模拟外部交易占用nonce 1
+        node.nonces[manager.nonce_manager.address] = 2
+
+        try:
+            manager.submit_exit({'token_id': 2, 'liquidity': 1})
+            assert False, '应当返回nonce too low'
+        except Exception as e:
+            assert 'nonce too low' in str(e)
+        assert manager.nonce_manager.peek() == 2
+
+        manager.submit_exit({'token_id': 2, 'liquidity': 1})
+        assert [tx['nonce'] for tx in node.mempool.values()] == [2]
+    finally:
+        node.stop()
+
+
+def test_release_rolls_back_last_nonce():
+    """最后预留的nonce未使用时直接回退，不产生空洞"""
+    node = LocalRPCNode().start()
+    try:
+        manager = create_manager(node)
+        nonce_manager = manager.nonce_manager
+        first = nonce_manager.reserve()
+        second = nonce_manager.reserve()
+        nonce_manager.release(second, Exception('connection reset'))
+        assert nonce_manager.peek() == second
+        nonce_manager.confirm(first)
+        assert nonce_manager.reserve() == second
+    finally:
+        node.stop()
+
+
+def main():
+    for test in (test_concurrent_submit, test_resync_after_external_transaction, test_release_rolls_back_last_nonce):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
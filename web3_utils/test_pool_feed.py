@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PoolLiquidityFeed测试脚本 - 基于本地JSON-RPC节点回放池子事件，验证本地计算的流动性
+"""
+
+from eth_abi import encode as abi_encode
+from web3_utils._test_helpers import POOL, UNIT, create_manager, register_pool
+from web3_utils.local_node import LocalRPCNode, RPCError
+from web3_utils.pool_feed import PoolLiquidityFeed, MINT_TOPIC, BURN_TOPIC, SWAP_TOPIC
+
+OWNER = '0x00000000000000000000000000000000000000bb'
+
+
+def recorded_log(block, index, topics, types, values):
+    """构造一条录制的eth_getLogs结果"""
+    return {
+        'address': POOL,
+        'topics': topics,
+        'data': '0x' + abi_encode(types, values).hex(),
+        'blockNumber': hex(block),
+        'logIndex': hex(index),
+    }
+
+
+def owner_topics(topic):
+    return [topic, '0x' + OWNER[2:].rjust(64, '0'), '0x' + '00' * 32, '0x' + '00' * 32]
+
+
+def start_feed(node):
+    register_pool(node, 1000 * UNIT, 1000 * UNIT)
+    manager = create_manager(node)
+    feed = PoolLiquidityFeed(manager, pools=[POOL], poll_interval=3600, resync_blocks=1000)
+    feed.start()
+    feed.stop()
+    assert feed.snapshot['liquidity_usd'] == 2000
+    return feed
+
+
+def test_replay_mint_burn_swap():
+    """回放Mint/Burn/Swap事件后，本地储备和美元流动性按事件变化"""
+    node = LocalRPCNode().start()
+    try:
+        feed = start_feed(node)
+        logs = [
+            recorded_log(500, 0, owner_topics(MINT_TOPIC), ['address', 'uint128', 'uint256', 'uint256'],
+                         [OWNER, 10 ** 18, 100 * UNIT, 100 * UNIT]),
+            recorded_log(501, 1, owner_topics(BURN_TOPIC), ['uint128', 'uint256', 'uint256'],
+                         [10 ** 18, 50 * UNIT, 30 * UNIT]),
+            recorded_log(503, 2, [SWAP_TOPIC, '0x' + '00' * 32, '0x' + '00' * 32],
+                         ['int256', 'int256', 'uint160', 'uint128', 'int24'],
+                         [10 * UNIT, -5 * UNIT, 2 ** 96, 10 ** 20, 0]),
+        ]
+        last = node.replay_logs(logs)
+
+        node.mine()
+        snapshot = feed.poll()
+        assert snapshot['liquidity_usd'] == 2200
+
+        node.mine(last - node.block_number)
+        snapshot = feed.poll()
+        assert snapshot['block'] == last
+        assert snapshot['pools'][feed.pool_addresses[0]]['quote_amount'] == 1060
+        assert snapshot['pools'][feed.pool_addresses[0]]['base_amount'] == 1065
+        assert snapshot['liquidity_usd'] == 2125
+        assert feed.poll() is None
+    finally:
+        node.stop()
+
+
+def test_get_logs_error_retries_same_range():
+    """eth_getLogs出错时不推进last_block，下次轮询重新获取同一区间的事件"""
+    node = LocalRPCNode().start()
+    try:
+        feed = start_feed(node)
+        start_block = feed.last_block
+        node.replay_logs([
+            recorded_log(10, 0, owner_topics(BURN_TOPIC), ['uint128', 'uint256', 'uint256'],
+                         [10 ** 18, 200 * UNIT, 0]),
+        ])
+        node.mine(2)
+
+        get_logs = node.rpc_eth_getLogs
+
+        def rate_limited(criteria):
+            raise RPCError('rate limited', -32005)
+
+        node.rpc_eth_getLogs = rate_limited
+        assert feed.poll() is None
+        assert feed.last_block == start_block
+
+        node.rpc_eth_getLogs = get_logs
+        snapshot = feed.poll()
+        assert snapshot['liquidity_usd'] == 1800
+        assert feed.last_block == node.block_number
+    finally:
+        node.stop()
+
+
+def test_get_logs_range_capped():
+    """区间过大被节点拒绝后，按max_log_blocks分段追赶，每段事件只处理一次"""
+    node = LocalRPCNode().start()
+    try:
+        feed = start_feed(node)
+        feed.max_log_blocks = 5
+        start_block = feed.last_block
+        burn = recorded_log(10, 0, owner_topics(BURN_TOPIC), ['uint128', 'uint256', 'uint256'], [10 ** 18, 100 * UNIT, 0])
+        node.replay_logs([burn, dict(burn, blockNumber=hex(17))])
+        node.mine(start_block + 16 - node.block_number)
+
+        get_logs = node.rpc_eth_getLogs
+        ranges = []
+
+        def limited(criteria):
+            from_block = int(criteria['fromBlock'], 16)
+            to_block = node.block_number if criteria['toBlock'] == 'latest' else int(criteria['toBlock'], 16)
+            ranges.append((from_block, to_block))
+            if to_block - from_block + 1 > 5:
+                raise RPCError('exceed maximum block range: 5', -32005)
+            return get_logs(criteria)
+
+        node.rpc_eth_getLogs = limited
+        assert feed.poll() is None
+        assert feed.last_block == start_block and feed.head == node.block_number
+
+        snapshots = [feed.poll() for _ in range(4)]
+        # 前三段按max_log_blocks查询，追到已知最新区块附近后查询到latest
+        assert ranges[1:] == [(start_block + 1, start_block + 5), (start_block + 6, start_block + 10),
+                              (start_block + 11, start_block + 15), (start_block + 16, start_block + 16)]
+        assert feed.last_block == node.block_number
+        assert [s['liquidity_usd'] for s in snapshots if s] == [1900, 1800]
+    finally:
+        node.stop()
+
+
+def test_large_gap_resyncs_from_chain_state():
+    """落后超过max_gap_blocks时不回放事件，直接按最新区块的链上状态校正"""
+    node = LocalRPCNode().start()
+    try:
+        feed = start_feed(node)
+        feed.max_gap_blocks = 10
+        updates = []
+        feed.on_update = updates.append
+        node.replay_logs([
+            recorded_log(10, 0, owner_topics(BURN_TOPIC), ['uint128', 'uint256', 'uint256'], [10 ** 18, 100 * UNIT, 0]),
+        ])
+        node.mine(20)
+        register_pool(node, 700 * UNIT, 1000 * UNIT)
+
+        snapshot = feed.poll()
+        assert snapshot['liquidity_usd'] == 1700 and updates == [snapshot]
+        assert feed.last_block == feed.last_resync_block == node.block_number
+        assert feed.poll() is None
+    finally:
+        node.stop()
+
+
+def main():
+    for test in (test_replay_mint_burn_swap, test_get_logs_error_retries_same_range, test_get_logs_range_capped,
+                 test_large_gap_resyncs_from_chain_state):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
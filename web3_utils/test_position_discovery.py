@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+头寸批量查询测试脚本 - 基于本地JSON-RPC节点验证Multicall3分块枚举和逐个查询回退
+"""
+
+from web3_utils._test_helpers import BR, USDT, create_manager, register_positions
+from web3_utils.local_node import LocalRPCNode
+
+OTHER = '0x' + '22' * 20
+
+
+CHAIN_POSITIONS = {
+    1: (USDT, BR, 100),
+    2: (BR, USDT, 0),
+    3: (USDT, OTHER, 500),
+    4: (BR, USDT, 300),
+    5: (USDT, BR, 200),
+}
+
+
+def test_batched_discovery():
+    """分块的Multicall3查询返回全部活跃USDT-BR头寸（从新到旧），请求数与头寸数无关"""
+    node = LocalRPCNode().start()
+    try:
+        manager = create_manager(node, discovery_chunk_size=2)
+        register_positions(node, manager.nonce_manager.address, CHAIN_POSITIONS)
+        node.method_counts.clear()
+
+        positions = manager.get_v3_positions()
+        assert positions == [{'token_id': 5, 'liquidity': 200}, {'token_id': 4, 'liquidity': 300},
+                             {'token_id': 1, 'liquidity': 100}]
+        assert manager.current_positions == positions
+        # balanceOf 1次 + 索引和详情各3个分块
+        assert node.method_counts['eth_call'] == 7
+
+        # 全部查询固定在同一区块，包含流动性为0的头寸
+        block, details = manager.enumerate_positions(node.block_number)
+        assert block == node.block_number
+        assert [d['token_id'] for d in details] == [5, 4, 2, 1]
+    finally:
+        node.stop()
+
+
+def test_failed_call_skipped():
+    """单个头寸详情查询失败时跳过该头寸，不影响其他头寸"""
+    node = LocalRPCNode().start()
+    try:
+        manager = create_manager(node)
+        register_positions(node, manager.nonce_manager.address, CHAIN_POSITIONS, failing={4})
+        assert manager.get_v3_positions() == [{'token_id': 5, 'liquidity': 200}, {'token_id': 1, 'liquidity': 100}]
+    finally:
+        node.stop()
+
+
+def test_sequential_fallback():
+    """Multicall3不可用时回退到逐个查询，与批量查询一样返回全部活跃USDT-BR头寸（从新到旧）"""
+    node = LocalRPCNode().start()
+    try:
+        manager = create_manager(node, multicall3='0x' + '33' * 20)
+        register_positions(node, manager.nonce_manager.address, CHAIN_POSITIONS)
+        expected = [{'token_id': 5, 'liquidity': 200}, {'token_id': 4, 'liquidity': 300}, {'token_id': 1, 'liquidity': 100}]
+        assert manager.get_v3_positions() == expected
+        assert manager.get_v3_positions(batch=False) == expected
+        assert manager.get_current_positions() == expected
+    finally:
+        node.stop()
+
+
+def main():
+    for test in (test_batched_discovery, test_failed_call_skipped, test_sequential_fallback):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PositionIndex测试脚本 - 基于本地JSON-RPC节点验证头寸索引的增量同步和确认深度
+"""
+
+import os
+import tempfile
+from eth_abi import encode as abi_encode
+from web3_utils._test_helpers import POSITION_MANAGER, create_manager, register_positions
+from web3_utils.local_node import LocalRPCNode
+from web3_utils.position_index import (PositionIndex, TRANSFER_TOPIC, DECREASE_LIQUIDITY_TOPIC,
+                                       _address_topic, _int_topic)
+
+
+def decrease_log(node, token_id, liquidity, block):
+    return node.add_log(POSITION_MANAGER, [DECREASE_LIQUIDITY_TOPIC, _int_topic(token_id)],
+                        abi_encode(['uint128', 'uint256', 'uint256'], [liquidity, 0, 0]), block_number=block)
+
+
+def test_incremental_sync_with_confirmations():
+    """未确认区块的变化只体现在返回结果中，被重组移除后恢复；已确认的变化写入数据库"""
+    node = LocalRPCNode().start()
+    path = os.path.join(tempfile.mkdtemp(), 'position_index.db')
+    try:
+        node.mine(99)
+        manager = create_manager(node, position_index_path=path, position_confirmations=5)
+        register_positions(node, manager.nonce_manager.address, {1: 1000, 2: 1000})
+
+        assert manager.refresh_positions() == [{'token_id': 2, 'liquidity': 1000}, {'token_id': 1, 'liquidity': 1000}]
+        index = manager.position_index
+        assert index.last_block == 95
+
+        # 未确认区块的DecreaseLiquidity：返回值准确，数据库不变
+        reorged = decrease_log(node, 1, 400, 101)
+        node.mine()
+        assert manager.refresh_positions()[1] == {'token_id': 1, 'liquidity': 600}
+        assert index.positions[1]['liquidity'] == 1000
+        assert index.last_block == 96
+
+        # 重组移除该日志后，下次同步恢复
+        node.logs.remove(reorged)
+        assert manager.refresh_positions()[1] == {'token_id': 1, 'liquidity': 1000}
+
+        # 足够确认后写入数据库，重启后直接加载
+        decrease_log(node, 1, 300, 102)
+        node.mine(9)
+        assert manager.refresh_positions()[1] == {'token_id': 1, 'liquidity': 700}
+        assert index.last_block == 105
+        reloaded = PositionIndex(manager, path)
+        assert reloaded.last_block == 105 and reloaded.positions[1]['liquidity'] == 700
+
+        # 转出的头寸从索引中移除
+        wallet_topic = _address_topic(manager.nonce_manager.address)
+        node.add_log(POSITION_MANAGER, [TRANSFER_TOPIC, wallet_topic, _address_topic('0x' + '11' * 20), _int_topic(2)],
+                     block_number=111)
+        node.mine()
+        assert manager.refresh_positions() == [{'token_id': 1, 'liquidity': 700}]
+        assert manager.get_current_positions() == [{'token_id': 1, 'liquidity': 700}]
+    finally:
+        node.stop()
+
+
+def test_liquidity_logs_not_filtered_by_token_id():
+    """增减流动性日志查询不随索引头寸数量增长，其他钱包头寸的日志在本地忽略"""
+    node = LocalRPCNode().start()
+    path = os.path.join(tempfile.mkdtemp(), 'position_index.db')
+    try:
+        node.mine(99)
+        manager = create_manager(node, position_index_path=path, position_confirmations=0)
+        register_positions(node, manager.nonce_manager.address, {1: 1000, 2: 0})
+        manager.refresh_positions()
+
+        criteria = []
+        get_logs = node.rpc_eth_getLogs
+
+        def recording_get_logs(params):
+            criteria.append(params)
+            return get_logs(params)
+
+        node.rpc_eth_getLogs = recording_get_logs
+        decrease_log(node, 1, 400, 101)
+        decrease_log(node, 3, 500, 101)
+        node.mine()
+        assert manager.refresh_positions() == [{'token_id': 1, 'liquidity': 600}]
+        assert 3 not in manager.position_index.positions
+        assert all(len(c['topics']) <= 3 for c in criteria)
+        assert all(len(c['topics']) == 1 for c in criteria if isinstance(c['topics'][0], list))
+    finally:
+        node.stop()
+
+
+def main():
+    for test in (test_incremental_sync_with_confirmations, test_liquidity_logs_not_filtered_by_token_id):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ReceiptWatcher测试脚本 - 基于本地JSON-RPC节点验证按区块批量查询回执、替换交易和超时
+"""
+
+import time
+from web3_utils._test_helpers import create_manager, positions
+from web3_utils.local_node import LocalRPCNode
+from web3_utils.receipt_watcher import ReceiptWatcher
+
+
+def create_watcher(manager, **kwargs):
+    """创建回执监听，测试中手动调用poll，不启动后台线程"""
+    watcher = ReceiptWatcher(manager, **kwargs)
+    watcher.running = True
+    return watcher
+
+
+def test_one_batch_per_block():
+    """每个新区块只对全部待确认交易查询一次回执，同一区块内不重复查询"""
+    node = LocalRPCNode().start()
+    try:
+        manager = create_manager(node, batch_exit=False)
+        watcher = create_watcher(manager)
+        hashes = [manager.submit_exit(group) for group in manager.group_exit_positions(positions(3))]
+        futures = [watcher.watch(tx_hash) for tx_hash in hashes]
+        blocks = []
+        unknown = watcher.watch('0x' + 'ab' * 32, on_block=blocks.append)
+
+        watcher.poll()
+        watcher.poll()
+        assert node.method_counts['eth_getTransactionReceipt'] == 4
+        assert not any(f.done() for f in futures)
+
+        block = node.mine()
+        watcher.poll()
+        assert node.method_counts['eth_getTransactionReceipt'] == 8
+        assert [f.result(timeout=0).status for f in futures] == [1, 1, 1]
+        assert [f.result(timeout=0).blockNumber for f in futures] == [block] * 3
+        # 首次poll也视为新区块
+        assert blocks == [block - 1, block] and not unknown.done()
+        assert list(watcher.pending) == ['0x' + 'ab' * 32]
+    finally:
+        node.stop()
+
+
+def test_replacement_and_timeout():
+    """登记替换交易后任一哈希上链即完成；超过等待时间以TimeoutError结束"""
+    node = LocalRPCNode().start()
+    try:
+        manager = create_manager(node, batch_exit=False)
+        watcher = create_watcher(manager)
+        original = '0x' + 'cd' * 32
+        future = watcher.watch(original)
+        replacement = manager.submit_exit(positions(1))
+        watcher.add_hash(original, replacement)
+        expiring = watcher.watch('0x' + 'ef' * 32, timeout=0.01)
+
+        node.mine()
+        time.sleep(0.02)
+        watcher.poll()
+        assert bytes(future.result(timeout=0).transactionHash) == bytes(replacement)
+        try:
+            expiring.result(timeout=0)
+            assert False, '应当超时'
+        except TimeoutError:
+            pass
+        assert watcher.pending == {}
+    finally:
+        node.stop()
+
+
+def main():
+    for test in (test_one_batch_per_block, test_replacement_and_timeout):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RPCPoolProvider测试脚本 - 基于多个本地JSON-RPC节点验证故障切换、剔除、探测恢复、区块高度不回退和对冲广播
+"""
+
+import time
+import requests
+from eth_account import Account
+from web3 import Web3
+from web3_utils.local_node import LocalRPCNode, RPCError
+from web3_utils.rpc_pool import RPCPoolProvider
+
+# 没有服务监听的地址，连接立即被拒绝
+DEAD_URL = 'http://127.0.0.1:1'
+
+
+def create_pool(urls, **kwargs):
+    """创建连接池，测试中手动调用probe，不启动后台探测线程"""
+    pool = RPCPoolProvider(urls, **kwargs)
+    pool.probe_running = True
+    return pool
+
+
+def test_failover_and_eject():
+    """故障节点的请求切换到下一个节点；之后优先使用已知可用的节点，连续失败达到上限后剔除"""
+    node = LocalRPCNode().start()
+    try:
+        pool = create_pool([DEAD_URL, node.url], eject_seconds=0.2)
+        web3 = Web3(pool)
+        dead, live = pool.endpoints
+        assert web3.eth.block_number == node.block_number
+        assert dead.errors == 1 and live.selected == 1
+        assert [item['url'] for item in pool.stats()] == [node.url, DEAD_URL]
+
+        # 有延迟数据的可用节点优先，故障节点不再被请求
+        for _ in range(3):
+            assert web3.eth.block_number == node.block_number
+        assert dead.requests == 1 and live.selected == 4
+
+        # 探测连续失败后剔除；剔除期内不探测，到期后仍不可用则继续剔除
+        pool.probe()
+        pool.probe()
+        assert dead.is_ejected() and dead.consecutive_errors == 3
+        pool.probe()
+        assert dead.requests == 3
+        time.sleep(0.25)
+        pool.probe()
+        assert dead.requests == 4 and dead.is_ejected()
+    finally:
+        node.stop()
+
+
+def test_rate_limited_endpoint():
+    """限流错误计入节点错误并切换节点；普通的业务错误直接返回，不切换"""
+    limited, healthy = LocalRPCNode().start(), LocalRPCNode().start()
+    try:
+        healthy.mine(5)
+
+        def rate_limited():
+            raise RPCError('rate limit exceeded', -32005)
+
+        limited.rpc_eth_blockNumber = rate_limited
+        pool = create_pool([limited.url, healthy.url])
+        assert Web3(pool).eth.block_number == healthy.block_number
+        assert pool.endpoints[0].errors == 1 and pool.endpoints[1].selected == 1
+
+        reverted = pool.make_request('eth_call', [{'to': '0x' + '11' * 20, 'data': '0x'}, 'latest'])
+        assert reverted['error']['message'] == 'execution reverted'
+    finally:
+        limited.stop()
+        healthy.stop()
+
+
+def test_recover_and_block_lag():
+    """探测成功后剔除的节点恢复；区块高度落后过多的节点排在最后"""
+    behind, ahead = LocalRPCNode().start(), LocalRPCNode().start()
+    try:
+        pool = create_pool([behind.url, ahead.url], eject_seconds=0.1, max_block_lag=5)
+        pool.endpoints[0].ejected = True
+        pool.endpoints[0].ejected_until = time.time() + 0.1
+        time.sleep(0.15)
+        pool.probe()
+        assert not pool.endpoints[0].is_ejected() and pool.endpoints[0].ejected_until == 0
+
+        ahead.mine(10)
+        pool.probe()
+        assert [item['url'] for item in pool.stats()] == [ahead.url, behind.url]
+        assert Web3(pool).eth.block_number == ahead.block_number
+    finally:
+        behind.stop()
+        ahead.stop()
+
+
+def test_readmit_only_after_successful_probe():
+    """剔除期满后节点仍不参与路由，探测失败继续剔除，探测成功才重新加入"""
+    flaky, other = LocalRPCNode().start(), LocalRPCNode().start()
+    try:
+        pool = create_pool([flaky.url, other.url], eject_seconds=0.1, max_consecutive_errors=1)
+        endpoint = pool.endpoints[0]
+        flaky.stop()
+        Web3(pool).eth.block_number
+        assert endpoint.is_ejected()
+
+        time.sleep(0.15)
+        flaky.start()
+        assert endpoint.is_ejected()
+        assert [item['url'] for item in pool.stats()] == [other.url, flaky.url]
+        requests_before = endpoint.requests
+        Web3(pool).eth.block_number
+        assert endpoint.requests == requests_before
+
+        flaky.stop()
+        pool.probe()
+        assert endpoint.is_ejected() and endpoint.ejected_until > time.time()
+        flaky.start()
+        pool.probe()
+        assert endpoint.is_ejected()
+        time.sleep(0.15)
+        pool.probe()
+        assert not endpoint.is_ejected() and endpoint.ejected_until == 0
+    finally:
+        flaky.stop()
+        other.stop()
+
+
+def test_block_number_never_goes_back():
+    """读请求优先发往最高区块的节点；落后节点返回更低的高度时不返回给调用方"""
+    behind, ahead = LocalRPCNode().start(), LocalRPCNode().start()
+    try:
+        ahead.mine(2)
+        pool = create_pool([behind.url, ahead.url], max_block_lag=5)
+        web3 = Web3(pool)
+        pool.probe()
+        # 落后在max_block_lag以内仍是健康节点，但排在最高区块的节点之后
+        assert [item['url'] for item in pool.stats()] == [ahead.url, behind.url]
+        assert web3.eth.block_number == ahead.block_number
+
+        # 最高区块的节点故障时，落后节点的更低高度不返回，仍返回已知的最高区块
+        ahead.stop()
+        assert web3.eth.block_number == ahead.block_number
+        assert pool.endpoints[0].block_number == behind.block_number
+        behind.mine(5)
+        assert web3.eth.block_number == behind.block_number
+    finally:
+        behind.stop()
+        ahead.stop()
+
+
+def signed_transaction():
+    """返回 (原始交易, 交易哈希)"""
+    signed = Account.create().sign_transaction({
+        'nonce': 0, 'gasPrice': 10 ** 9, 'gas': 21000, 'to': '0x' + '11' * 20, 'value': 0, 'chainId': 56
+    })
+    return signed.raw_transaction, Web3.keccak(signed.raw_transaction)
+
+
+def test_hedged_broadcast_first_accept():
+    """对冲广播在最先接受的节点返回后立即返回，慢节点的回复在后台统计"""
+    fast, slow = LocalRPCNode().start(), LocalRPCNode().start()
+    try:
+        send = slow.rpc_eth_sendRawTransaction
+
+        def delayed(raw):
+            time.sleep(0.5)
+            return send(raw)
+
+        slow.rpc_eth_sendRawTransaction = delayed
+        pool = create_pool([slow.url, fast.url])
+        raw, tx_hash = signed_transaction()
+        started = time.perf_counter()
+        assert pool.broadcast_raw_transaction(raw) == tx_hash
+        assert time.perf_counter() - started < 0.4
+        assert Web3.to_hex(tx_hash) in fast.mempool
+        assert pool.endpoints[1].selected == 1
+
+        time.sleep(0.6)
+        assert Web3.to_hex(tx_hash) in slow.mempool
+        assert sorted(reply['status'] for reply in pool.last_broadcast['replies']) == ['accepted', 'accepted']
+    finally:
+        fast.stop()
+        slow.stop()
+
+
+def test_hedged_broadcast_errors():
+    """already known视为接受；没有节点接受时优先抛出节点返回的错误，其次才是连接异常"""
+    node, other = LocalRPCNode().start(), LocalRPCNode().start()
+    try:
+        def known(raw):
+            raise RPCError('already known', -32000)
+
+        def nonce_too_low(raw):
+            raise RPCError('nonce too low', -32000)
+
+        node.rpc_eth_sendRawTransaction = nonce_too_low
+        other.rpc_eth_sendRawTransaction = known
+        raw, tx_hash = signed_transaction()
+        assert create_pool([node.url, other.url]).broadcast_raw_transaction(raw) == tx_hash
+
+        pool = create_pool([DEAD_URL, node.url])
+        try:
+            pool.broadcast_raw_transaction(raw)
+            assert False, '没有节点接受时应当抛出异常'
+        except ValueError as e:
+            assert e.args[0] == {'code': -32000, 'message': 'nonce too low'}
+        assert sorted(reply['status'] for reply in pool.last_broadcast['replies']) == ['duplicate', 'error']
+
+        try:
+            create_pool([DEAD_URL]).broadcast_raw_transaction(raw)
+            assert False, '没有节点接受时应当抛出异常'
+        except requests.exceptions.ConnectionError:
+            pass
+    finally:
+        node.stop()
+        other.stop()
+
+
+def main():
+    for test in (test_failover_and_eject, test_rate_limited_endpoint, test_recover_and_block_lag,
+                 test_readmit_only_after_successful_probe, test_block_number_never_goes_back,
+                 test_hedged_broadcast_first_accept, test_hedged_broadcast_errors):
+        print(f"运行 {test.__name__}...")
+        test()
+        print("通过")
+
+
+if __name__ == "__main__":
+    main()
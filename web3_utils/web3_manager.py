@@ -6,6 +6,15 @@ Web3操作管理类 - 封装所有与Web3相关的操作
 
 from web3 import Web3
 import json
+from .position_index import PositionIndex
+from .armed_exit import ArmedExit
+from .nonce_manager import NonceManager
+from .receipt_watcher import ReceiptWatcher
+from .rpc_pool import RPCPoolProvider
+from .gas_oracle import GasOracle
+from .exit_simulator import ExitSimulator
+from .fee_bumper import FeeBumper
+import threading
 import time
 from datetime import datetime
 
@@ -18,21 +27,81 @@ except ImportError:
     except ImportError:
         geth_poa_middleware = None
 
-class Web3Manager:
-    """管理所有Web3相关操作"""
-    
+# Multicall3 在BSC等主流链上的统一部署地址
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+
+# positions() 返回值的ABI类型，用于解码Multicall3聚合结果
+POSITION_OUTPUT_TYPES = [
+    'uint96', 'address', 'address', 'address', 'uint24', 'int24', 'int24',
+    'uint128', 'uint256', 'uint256', 'uint128', 'uint128'
+]
+
+
+# EIP-1474中请求超出限制的错误码，节点拒绝gas超过区块上限的交易时返回
+LIMIT_EXCEEDED_CODE = -32005
+
+
+class ExitGasLimitError(ValueError):
+    """移除交易的gas超过区块gas上限"""
+
+    def __init__(self, gas, block_gas_limit):
+        super().__init__(f'移除交易gas {gas} 超过区块gas上限 {block_gas_limit}')
+        self.gas = gas
+        self.block_gas_limit = block_gas_limit
+
+
+def _rpc_error_code(error):
+    """提取JSON-RPC错误码，兼容web3.py 7的Web3RPCError和旧版本以字典为参数的ValueError，非RPC错误返回None"""
+    response = getattr(error, 'rpc_response', None)
+    if isinstance(response, dict) and isinstance(response.get('error'), dict):
+        return response['error'].get('code')
+    if error.args and isinstance(error.args[0], dict):
+        return error.args[0].get('code')
+    return None
+
+
+def _encode_function_call(contract, function_name, args):
+    """兼容encodeABI和encode_abi方法"""
+    try:
+        # 尝试新版本的encode_abi方法
+        return contract.encode_abi(function_name, args)
+    except AttributeError:
+        # 回退到旧版本的encodeABI方法
+        return contract.encodeABI(function_name, args)
+
+
+class Web3ManagerBase:
+    """Web3Manager与AsyncWeb3Manager共用的部分：ABI、合约对象缓存、交易编码/分组和签名等不涉及RPC的逻辑
+
+    子类负责创建self.web3并实现各自的（同步或异步）RPC方法。
+    """
+
     def __init__(self, config):
         """
-        初始化Web3Manager
-        
+        初始化共用状态
+
         Args:
             config (dict): 包含web3配置的字典
         """
         self.web3 = None
         self.config = config
-        self.position_manager_abi = self._load_position_manager_abi()
+        # ABI只解析一次，合约对象在首次使用时创建并缓存
+        self.position_manager_abi = json.loads(self._load_position_manager_abi())
+        self.multicall3_abi = json.loads(self._load_multicall3_abi())
+        self.position_manager = None
+        self.multicall3 = None
         self.current_positions = []
-        
+        # 最近一次批量查询头寸所基于的区块高度
+        self.last_discovery_block = None
+        self.chain_id = None
+        self.block_gas_limit = None
+        # 本地nonce分配器，连接成功后创建
+        self.nonce_manager = None
+        # gas价格预言机和移除交易预模拟（仅Web3Manager启动）
+        self.gas_oracle = None
+        self.exit_simulator = None
+        self.connected = False
+
     def _load_position_manager_abi(self):
         """加载Position Manager ABI"""
         return '''[
@@ -130,17 +199,238 @@ class Web3Manager:
                 "type": "function"
             }
         ]'''
+
+    def _load_multicall3_abi(self):
+        """加载Multicall3 ABI（仅包含aggregate3）"""
+        return '''[
+            {
+                "inputs": [
+                    {
+                        "components": [
+                            {"internalType": "address", "name": "target", "type": "address"},
+                            {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                            {"internalType": "bytes", "name": "callData", "type": "bytes"}
+                        ],
+                        "internalType": "struct Multicall3.Call3[]",
+                        "name": "calls",
+                        "type": "tuple[]"
+                    }
+                ],
+                "name": "aggregate3",
+                "outputs": [
+                    {
+                        "components": [
+                            {"internalType": "bool", "name": "success", "type": "bool"},
+                            {"internalType": "bytes", "name": "returnData", "type": "bytes"}
+                        ],
+                        "internalType": "struct Multicall3.Result[]",
+                        "name": "returnData",
+                        "type": "tuple[]"
+                    }
+                ],
+                "stateMutability": "payable",
+                "type": "function"
+            }
+        ]'''
+
+    def _get_position_manager(self):
+        """获取Position Manager合约对象（缓存，重新连接后重建）"""
+        if self.position_manager is None or self.position_manager.w3 is not self.web3:
+            self.position_manager = self.web3.eth.contract(
+                address=Web3.to_checksum_address(self.config['web3_config']['position_manager']),
+                abi=self.position_manager_abi
+            )
+        return self.position_manager
+
+    def _get_multicall3(self):
+        """获取Multicall3合约对象（缓存，重新连接后重建）"""
+        if self.multicall3 is None or self.multicall3.w3 is not self.web3:
+            self.multicall3 = self.web3.eth.contract(
+                address=Web3.to_checksum_address(self.config['web3_config'].get('multicall3', MULTICALL3_ADDRESS)),
+                abi=self.multicall3_abi
+            )
+        return self.multicall3
+
+    def _is_usdt_br_pair(self, token0, token1):
+        """判断代币对是否为USDT-BR"""
+        usdt = Web3.to_checksum_address(self.config['web3_config']['usdt'])
+        br = Web3.to_checksum_address(self.config['web3_config']['br'])
+        token0, token1 = Web3.to_checksum_address(token0), Web3.to_checksum_address(token1)
+        return (token0 == usdt and token1 == br) or (token0 == br and token1 == usdt)
+
+    def build_exit_calls(self, position, deadline=None):
+        """编码单个头寸的 decreaseLiquidity / collect / burn 调用"""
+        position_manager = self._get_position_manager()
+        wallet = Web3.to_checksum_address(self.config['web3_config']['wallet_address'])
+        token_id = position['token_id']
+        liquidity = position['liquidity']
+        deadline = deadline or int(time.time()) + 3600
+        uint128_max = int('0xffffffffffffffffffffffffffffffff', 16)
+
+        return [
+            _encode_function_call(position_manager, 'decreaseLiquidity', [(token_id, liquidity, 0, 0, deadline)]),
+            _encode_function_call(position_manager, 'collect', [(token_id, wallet, uint128_max, uint128_max)]),
+            _encode_function_call(position_manager, 'burn', [token_id])
+        ]
+
+    def build_exit_transaction(self, positions, nonce, gas_price, deadline=None):
+        """构建Multicall移除交易（未签名），多个头寸的调用合并到同一笔multicall中
+
+        直接组装交易字典而不调用build_transaction，构建过程不产生任何RPC请求。
+        gas见get_exit_gas_limit，超过已缓存的区块gas上限时抛出ExitGasLimitError。
+        """
+        if isinstance(positions, dict):
+            positions = [positions]
+        gas = self.get_exit_gas_limit(positions)
+        if self.block_gas_limit and gas > self.block_gas_limit:
+            raise ExitGasLimitError(gas, self.block_gas_limit)
+        position_manager = self._get_position_manager()
+        calls = [call for position in positions for call in self.build_exit_calls(position, deadline)]
+        return {
+            'to': position_manager.address,
+            'data': _encode_function_call(position_manager, 'multicall', [calls]),
+            'value': 0,
+            'nonce': nonce,
+            'gas': gas,
+            'gasPrice': gas_price,
+            'chainId': self.chain_id
+        }
+
+    def get_exit_gas_limit(self, positions):
+        """移除交易的gas上限
+
+        有对应的预模拟结果时按估算值 × web3_config.gas_margin（默认1.2）计算，
+        否则按 web3_config.gas_limit × 头寸数量 计算。
+        """
+        if self.exit_simulator is not None:
+            estimate = self.exit_simulator.gas_for(positions)
+            if estimate:
+                return int(estimate * self.config['web3_config'].get('gas_margin', 1.2))
+        return self.config['web3_config']['gas_limit'] * len(positions)
+
+    def get_block_gas_limit(self):
+        """区块gas上限，子类在连接时或首次使用时缓存"""
+        return self.block_gas_limit
+
+    def split_exit_batches(self, positions):
+        """将头寸分组，保证每组交易的gas不超过区块gas上限的 max_exit_gas_ratio（默认0.5）
+
+        先按 web3_config.gas_limit 估算每组大小，再用构建交易时实际使用的gas（get_exit_gas_limit，
+        可能来自预模拟估算 × gas_margin）逐组校验，超出的组对半拆分。
+        """
+        max_gas = self.get_block_gas_limit() * self.config['web3_config'].get('max_exit_gas_ratio', 0.5)
+        size = max(1, int(max_gas // self.config['web3_config']['gas_limit']))
+        groups = [positions[i:i + size] for i in range(0, len(positions), size)]
+        batches = []
+        while groups:
+            group = groups.pop(0)
+            if len(group) > 1 and self.get_exit_gas_limit(group) > max_gas:
+                half = len(group) // 2
+                groups[:0] = [group[:half], group[half:]]
+                continue
+            batches.append(group)
+        return batches
+
+    def group_exit_positions(self, positions):
+        """按配置将头寸分组，每组对应一笔移除交易
+
+        web3_config.batch_exit 开启时全部头寸合并为一组（超出区块gas上限时拆分），否则每个头寸一组。
+        """
+        if self.config['web3_config'].get('batch_exit', False):
+            return self.split_exit_batches(positions)
+        return [[position] for position in positions]
+
+    def build_exit_transactions(self, positions, nonce, gas_price, deadline=None):
+        """按配置构建全部移除交易，各交易依次占用从nonce开始的连续nonce
+
+        Returns:
+            list: (头寸列表, 未签名交易) 列表
+        """
+        return [
+            (group, self.build_exit_transaction(group, nonce + i, gas_price, deadline))
+            for i, group in enumerate(self.group_exit_positions(positions))
+        ]
+
+    def get_gas_price(self):
+        """获取发送交易使用的gas价格（wei）
+
+        gas价格预言机运行时使用其建议价格，否则使用 web3_config.gas_price_gwei。
+        """
+        if self.gas_oracle is not None and self.gas_oracle.get_price():
+            return self.gas_oracle.get_price()
+        return self.web3.to_wei(self.config['web3_config']['gas_price_gwei'], 'gwei')
+
+    def sign_transaction(self, txn):
+        """签名交易，返回原始交易字节"""
+        signed = self.web3.eth.account.sign_transaction(txn, self.config['web3_config']['private_key'])
+        # 兼容不同版本的web3.py库中SignedTransaction对象的属性名
+        try:
+            # 尝试新版本的raw_transaction属性
+            return signed.raw_transaction
+        except AttributeError:
+            # 回退到旧版本的rawTransaction属性
+            return signed.rawTransaction
+
+    def get_current_positions(self):
+        """获取当前缓存的头寸信息"""
+        return self.current_positions
+
+
+class Web3Manager(Web3ManagerBase):
+    """管理所有Web3相关操作"""
     
+    def __init__(self, config):
+        """
+        初始化Web3Manager
+        
+        Args:
+            config (dict): 包含web3配置的字典
+        """
+        super().__init__(config)
+        # 本地头寸索引，首次refresh_positions时创建
+        self.position_index = None
+        # 预签名退出交易，start_armed_exit时创建
+        self.armed_exit = None
+        # 交易回执监听，首次使用时创建
+        self.receipt_watcher = None
+        # 已广播的移除交易（交易哈希 -> 头寸/nonce/gas价格），用于未上链时提价重发
+        self.sent_exits = {}
+        self.fee_bumper = None
+        # 缓存的连接状态，由后台健康检查线程维护
+        self.health_failures = 0
+        self.health_running = False
+        self.health_thread = None
+
+    def _create_provider(self):
+        """创建HTTP Provider，配置了多个rpc_urls时使用按延迟路由的连接池"""
+        web3_config = self.config['web3_config']
+        request_kwargs = {}
+        if self.config['proxy_config']['enabled']:
+            request_kwargs = {
+                'proxies': {'http': self.config['proxy_config']['http_proxy'], 'https': self.config['proxy_config']['https_proxy']},
+                'timeout': 30
+            }
+
+        urls = web3_config.get('rpc_urls') or [web3_config['rpc_url']]
+        if len(urls) == 1:
+            return Web3.HTTPProvider(urls[0], request_kwargs=request_kwargs)
+
+        pool_config = web3_config.get('rpc_pool', {})
+        return RPCPoolProvider(
+            urls,
+            request_kwargs=request_kwargs,
+            window=pool_config.get('window', 50),
+            max_error_rate=pool_config.get('max_error_rate', 0.5),
+            max_consecutive_errors=pool_config.get('max_consecutive_errors', 3),
+            eject_seconds=pool_config.get('eject_seconds', 30),
+            probe_interval=pool_config.get('probe_interval', 10),
+            max_block_lag=pool_config.get('max_block_lag', 5)
+        )
+
     def connect(self):
         """创建Web3连接"""
         try:
-            if self.config['proxy_config']['enabled']:
-                self.web3 = Web3(Web3.HTTPProvider(self.config['web3_config']['rpc_url'], request_kwargs={
-                    'proxies': {'http': self.config['proxy_config']['http_proxy'], 'https': self.config['proxy_config']['https_proxy']},
-                    'timeout': 30
-                }))
-            else:
-                self.web3 = Web3(Web3.HTTPProvider(self.config['web3_config']['rpc_url']))
+            self.web3 = Web3(self._create_provider())
             
             # 安全注入POA中间件
             if geth_poa_middleware is not None:
@@ -150,30 +440,281 @@ class Web3Manager:
                     print(f'【BR】注入POA中间件失败: {e}')
             
             if hasattr(self.web3, 'is_connected') and self.web3.is_connected():
+                # 缓存链ID，构建交易时无需再查询
+                self.chain_id = self.web3.eth.chain_id
+                if self.config['web3_config'].get('wallet_address'):
+                    wallet = Web3.to_checksum_address(self.config['web3_config']['wallet_address'])
+                    if self.nonce_manager is not None and self.nonce_manager.address == wallet:
+                        # 重新连接时保留已预留的nonce，只切换Web3实例
+                        self.nonce_manager.web3 = self.web3
+                    else:
+                        self.nonce_manager = NonceManager(self.web3, wallet)
+                self.connected = True
                 print("【BR】✅ BSC网络连接成功")
                 return True
             else:
+                self.connected = False
                 print("【BR】❌ BSC网络连接失败")
                 return False
         except Exception as e:
+            self.connected = False
             print(f'【BR】Web3连接失败: {e}')
             return False
 
-    def is_connected(self):
-        """检查Web3连接状态"""
-        return hasattr(self, 'web3') and self.web3 is not None and self.web3.is_connected()
-    
-    def get_v3_positions(self):
-        """获取USDT-BR活跃头寸 - 倒序优化版本"""
-        if not self.web3 or not self.web3.is_connected():
+    def is_connected(self, probe=False):
+        """检查Web3连接状态
+
+        Args:
+            probe (bool): 是否发送请求实时检查；默认返回后台健康检查维护的缓存状态，不产生RPC请求
+        """
+        if self.web3 is None:
+            return False
+        if probe:
+            self.connected = self.web3.is_connected()
+        return self.connected
+
+    def check_health(self):
+        """实时检查连接，连续失败达到 web3_config.health_max_failures（默认2）次后标记为断开并重新连接"""
+        if self.connected:
+            try:
+                healthy = self.web3.is_connected()
+            except Exception:
+                healthy = False
+            if healthy:
+                self.health_failures = 0
+                return True
+            self.health_failures += 1
+            if self.health_failures < self.config['web3_config'].get('health_max_failures', 2):
+                return True
+            print("【BR】⚠️ Web3连接异常，正在重新连接...")
+            self.connected = False
+
+        # 断开状态下重新创建连接，恢复后同步链ID和nonce管理器
+        self.health_failures = 0
+        return self.connect()
+
+    def start_health_monitor(self):
+        """启动后台健康检查线程，间隔为 web3_config.health_check_interval（默认10秒）"""
+        if self.health_running:
+            return
+        self.health_running = True
+        interval = self.config['web3_config'].get('health_check_interval', 10)
+
+        def loop():
+            while self.health_running:
+                time.sleep(interval)
+                try:
+                    self.check_health()
+                except Exception as e:
+                    print(f'【BR】Web3健康检查失败: {e}')
+
+        self.health_thread = threading.Thread(target=loop)
+        self.health_thread.daemon = True
+        self.health_thread.start()
+
+    def stop_health_monitor(self):
+        """停止后台健康检查线程"""
+        self.health_running = False
+
+    def get_rpc_stats(self):
+        """获取RPC连接池的路由统计，未使用连接池时返回空列表"""
+        if self.web3 is not None and isinstance(self.web3.provider, RPCPoolProvider):
+            return self.web3.provider.stats()
+        return []
+
+    def aggregate_calls(self, calls, block_identifier='latest'):
+        """通过Multicall3批量执行只读调用
+
+        Args:
+            calls (list): (目标合约地址, calldata) 列表
+            block_identifier: 查询所基于的区块
+
+        Returns:
+            list: 与calls一一对应的 (success, returnData) 列表
+        """
+        multicall = self._get_multicall3()
+        chunk_size = max(1, int(self.config['web3_config'].get('discovery_chunk_size', 200)))
+
+        results = []
+        for start in range(0, len(calls), chunk_size):
+            chunk = [(Web3.to_checksum_address(target), True, data) for target, data in calls[start:start + chunk_size]]
+            results.extend(multicall.functions.aggregate3(chunk).call(block_identifier=block_identifier))
+        return results
+
+    def batch_call(self, method, params_list):
+        """批量执行同一RPC方法
+
+        web3支持 batch_requests 时合并为一次JSON-RPC批量请求，否则逐个执行。
+
+        Args:
+            method: web3方法，如 self.web3.eth.get_logs
+            params_list (list): 每次调用的参数元组列表
+
+        Returns:
+            list: 与params_list一一对应的结果
+        """
+        if not params_list:
+            return []
+        if hasattr(self.web3, 'batch_requests') and len(params_list) > 1:
+            with self.web3.batch_requests() as batch:
+                for params in params_list:
+                    batch.add(method(*params))
+                return batch.execute()
+        return [method(*params) for params in params_list]
+
+    def batch_rpc(self, requests):
+        """批量发送原始JSON-RPC请求，不经过web3的结果格式化
+
+        与batch_call不同，单个请求返回null或出错不会影响其他请求。
+
+        Args:
+            requests (list): (method, params) 列表
+
+        Returns:
+            list: 与requests一一对应的原始result，出错的请求对应None
+        """
+        return [response.get('result') if 'error' not in response else None
+                for response in self.batch_rpc_responses(requests)]
+
+    def batch_rpc_responses(self, requests):
+        """批量发送原始JSON-RPC请求，返回完整的响应（包含error字段）"""
+        if not requests:
+            return []
+        provider = self.web3.provider
+        if hasattr(provider, 'make_batch_request'):
+            responses = provider.make_batch_request(requests)
+            if isinstance(responses, dict):
+                raise ValueError(f"批量请求失败: {responses.get('error')}")
+            return responses
+        return [provider.make_request(method, params) for method, params in requests]
+
+    def read_positions(self, token_ids, block_identifier='latest'):
+        """通过Multicall3批量读取头寸详情
+
+        Returns:
+            dict: token_id -> {'token_id', 'token0', 'token1', 'liquidity'}，查询失败的token_id不包含在内
+        """
+        position_manager = self._get_position_manager()
+        calls = [
+            (position_manager.address, _encode_function_call(position_manager, 'positions', [token_id]))
+            for token_id in token_ids
+        ]
+        result = {}
+        for token_id, (success, data) in zip(token_ids, self.aggregate_calls(calls, block_identifier)):
+            if not success:
+                print(f"【BR】查询头寸 #{token_id} 详情失败，跳过")
+                continue
+            fields = self.web3.codec.decode(POSITION_OUTPUT_TYPES, data)
+            result[token_id] = {
+                'token_id': token_id,
+                'token0': Web3.to_checksum_address(fields[2]),
+                'token1': Web3.to_checksum_address(fields[3]),
+                'liquidity': fields[7]
+            }
+        return result
+
+    def enumerate_positions(self, block_identifier=None):
+        """通过Multicall3枚举钱包持有的全部USDT-BR头寸（包含流动性为0的头寸）
+
+        Args:
+            block_identifier (int): 查询所基于的区块高度，默认为最新区块
+
+        Returns:
+            tuple: (查询所基于的区块高度, 头寸详情列表)，列表按token_id从新到旧排列
+        """
+        position_manager = self._get_position_manager()
+        wallet = Web3.to_checksum_address(self.config['web3_config']['wallet_address'])
+
+        # 固定在同一区块查询，避免枚举过程中头寸变化导致数据不一致
+        block = self.web3.eth.block_number if block_identifier is None else block_identifier
+        balance = position_manager.functions.balanceOf(wallet).call(block_identifier=block)
+        self.last_discovery_block = block
+        if balance == 0:
+            return block, []
+
+        print(f"【BR】开始批量查询头寸，总数: {balance}，区块: {block}")
+
+        # 第一轮：批量获取全部token_id（倒序，从最新的头寸开始）
+        index_calls = [
+            (position_manager.address, _encode_function_call(position_manager, 'tokenOfOwnerByIndex', [wallet, i]))
+            for i in range(balance - 1, -1, -1)
+        ]
+        token_ids = []
+        for i, (success, data) in enumerate(self.aggregate_calls(index_calls, block)):
+            if not success:
+                print(f"【BR】查询头寸索引 {balance - 1 - i} 失败，跳过")
+                continue
+            token_ids.append(self.web3.codec.decode(['uint256'], data)[0])
+
+        # 第二轮：批量获取头寸详情
+        details = self.read_positions(token_ids, block)
+        return block, [
+            details[token_id] for token_id in token_ids
+            if token_id in details and self._is_usdt_br_pair(details[token_id]['token0'], details[token_id]['token1'])
+        ]
+
+    def _get_v3_positions_batched(self):
+        """批量查询头寸 - 通过Multicall3聚合，返回全部USDT-BR头寸"""
+        started = time.time()
+        block, details = self.enumerate_positions()
+
+        positions = []
+        for detail in details:
+            if detail['liquidity'] > 0:
+                positions.append({'token_id': detail['token_id'], 'liquidity': detail['liquidity']})
+                print(f"【BR】✅ 找到USDT-BR头寸 #{detail['token_id']}，流动性: {detail['liquidity']}")
+
+        print(f"【BR】🚀 批量查询完成，区块 {block}，USDT-BR头寸 {len(positions)} 个，耗时 {time.time() - started:.2f}s")
+        if not positions:
+            print("【BR】❌ 未找到USDT-BR头寸")
+        self.current_positions = positions
+        return positions
+
+    def get_v3_positions(self, batch=None):
+        """获取USDT-BR活跃头寸
+
+        Args:
+            batch (bool): 是否使用Multicall3批量查询，默认读取 web3_config.batch_discovery（默认开启）。
+                两种方式都返回全部USDT-BR头寸（从新到旧）；批量查询失败时回退到逐个查询。
+        """
+        if not self.is_connected():
             print("【BR】❌ Web3未连接")
             return []
-            
+
+        if batch is None:
+            batch = self.config['web3_config'].get('batch_discovery', True)
+
+        if batch:
+            try:
+                return self._get_v3_positions_batched()
+            except Exception as e:
+                print(f'【BR】批量查询头寸失败，回退到逐个查询: {e}')
+
+        return self._get_v3_positions_sequential()
+
+    def refresh_positions(self):
+        """刷新头寸缓存
+
+        配置了 web3_config.position_index_path（默认 br-auto/position_index.db）时，
+        通过本地头寸索引增量同步，只需查询自上次处理区块以来的日志；否则完整查询一次。
+        """
+        index_path = self.config['web3_config'].get('position_index_path', 'br-auto/position_index.db')
+        if not index_path or not self.web3:
+            return self.get_v3_positions()
+
         try:
-            position_manager = self.web3.eth.contract(
-                address=Web3.to_checksum_address(self.config['web3_config']['position_manager']),
-                abi=json.loads(self.position_manager_abi)
-            )
+            if self.position_index is None:
+                self.position_index = PositionIndex(self, index_path)
+            self.current_positions = self.position_index.sync()
+            return self.current_positions
+        except Exception as e:
+            print(f'【BR】头寸索引同步失败，回退到完整查询: {e}')
+            return self.get_v3_positions()
+
+    def _get_v3_positions_sequential(self):
+        """逐个查询头寸 - 倒序查询全部头寸，返回全部USDT-BR头寸（从新到旧），与批量查询结果一致"""
+        try:
+            position_manager = self._get_position_manager()
             
             wallet = Web3.to_checksum_address(self.config['web3_config']['wallet_address'])
             balance = position_manager.functions.balanceOf(wallet).call()
@@ -202,89 +743,257 @@ class Web3Manager:
                         position_info = {'token_id': token_id, 'liquidity': liquidity}
                         positions.append(position_info)
                         print(f"【BR】✅ 找到USDT-BR头寸 #{token_id}，流动性: {liquidity}")
-                        # 找到目标头寸后立即返回，提高效率
-                        print(f"【BR】🚀 倒序查询完成，查询了 {balance - i} 个头寸")
-                        self.current_positions = positions
-                        return positions
                 except Exception as e:
                     print(f"【BR】查询头寸 {i} 失败: {e}")
                     continue
             
-            print("【BR】❌ 未找到USDT-BR头寸")
-            self.current_positions = []
+            print(f"【BR】🚀 倒序查询完成，查询了 {balance} 个头寸，USDT-BR头寸 {len(positions)} 个")
+            if not positions:
+                print("【BR】❌ 未找到USDT-BR头寸")
+            self.current_positions = positions
             return positions
         except Exception as e:
             print(f'【BR】获取头寸失败: {e}')
             self.current_positions = []
             return []
-    
+
+    def get_block_gas_limit(self):
+        """获取区块gas上限（缓存）"""
+        if self.block_gas_limit is None:
+            self.block_gas_limit = self.web3.eth.get_block('latest')['gasLimit']
+        return self.block_gas_limit
+
+    def send_raw_transaction(self, raw_transaction):
+        """广播已签名的原始交易，返回交易哈希
+
+        使用多节点连接池且开启hedged_broadcast时，同时向全部节点广播，以最先接受的节点为准。
+        """
+        provider = self.web3.provider
+        if isinstance(provider, RPCPoolProvider) and self.config['web3_config'].get('hedged_broadcast', True):
+            return provider.broadcast_raw_transaction(
+                raw_transaction,
+                timeout=self.config['web3_config'].get('broadcast_timeout', 10)
+            )
+        return self.web3.eth.send_raw_transaction(raw_transaction)
+
+    def get_receipt_watcher(self):
+        """获取交易回执监听服务（首次调用时创建）"""
+        if self.receipt_watcher is None:
+            self.receipt_watcher = ReceiptWatcher(
+                self,
+                poll_interval=self.config['web3_config'].get('receipt_poll_interval', 0.5),
+                timeout=self.config['web3_config'].get('receipt_timeout', 120)
+            )
+        return self.receipt_watcher
+
+    def record_exit(self, tx_hash, positions, nonce, gas_price):
+        """记录已广播的移除交易，watch_exit时据此开启自动提价"""
+        if isinstance(positions, dict):
+            positions = [positions]
+        self.sent_exits[Web3.to_hex(tx_hash)] = {'positions': positions, 'nonce': nonce, 'gas_price': gas_price}
+
+    def get_fee_bumper(self):
+        """获取自动提价服务，web3_config.fee_bump.enabled（默认开启）关闭时返回None"""
+        bump_config = self.config['web3_config'].get('fee_bump', {})
+        if not bump_config.get('enabled', True):
+            return None
+        if self.fee_bumper is None:
+            self.fee_bumper = FeeBumper(
+                self,
+                bump_blocks=bump_config.get('bump_blocks', 3),
+                bump_ratio=bump_config.get('bump_ratio', 1.2),
+                max_gas_price_gwei=bump_config.get('max_gas_price_gwei', 5),
+                workers=bump_config.get('workers', 2)
+            )
+        return self.fee_bumper
+
+    def watch_exit(self, tx_hash, positions):
+        """登记移除交易，上链后输出结果，不阻塞调用线程
+
+        交易由submit_exit或预签名模式广播时，连续多个区块未上链会自动提价重发（见FeeBumper）。
+
+        Returns:
+            Future: 结果为交易回执
+        """
+        if isinstance(positions, dict):
+            positions = [positions]
+        label = ', '.join(f"#{p['token_id']}" for p in positions)
+        sent = self.sent_exits.get(Web3.to_hex(tx_hash))
+        bumper = self.get_fee_bumper() if sent else None
+        on_block = bumper.tracker(tx_hash, sent['positions'], sent['nonce'], sent['gas_price']) if bumper else None
+
+        def report(future):
+            self.sent_exits.pop(Web3.to_hex(tx_hash), None)
+            try:
+                if future.result().status == 1:
+                    print(f"【BR】✅ 头寸 {label} 自动移除成功")
+                else:
+                    print(f"【BR】❌ 头寸 {label} 自动移除失败")
+            except Exception as e:
+                print(f'【BR】等待头寸 {label} 移除交易失败: {e}')
+
+        return self.get_receipt_watcher().watch(tx_hash, callback=report, on_block=on_block)
+
+    def wait_for_exit(self, tx_hash, positions):
+        """等待移除交易上链，返回是否成功"""
+        try:
+            return self.watch_exit(tx_hash, positions).result().status == 1
+        except Exception:
+            return False
+
+    def submit_exit(self, positions, gas_price=None):
+        """构建、签名并广播移除交易，不等待上链
+
+        nonce由本地NonceManager分配，多笔交易可连续发送；广播失败时归还nonce。
+
+        Returns:
+            HexBytes: 交易哈希
+        """
+        nonce = self.nonce_manager.reserve()
+        gas_price = gas_price or self.get_gas_price()
+        try:
+            txn = self.build_exit_transaction(positions, nonce, gas_price)
+            tx_hash = self.send_raw_transaction(self.sign_transaction(txn))
+        except Exception as e:
+            self.nonce_manager.release(nonce, e)
+            raise
+        self.nonce_manager.confirm(nonce)
+        self.record_exit(tx_hash, positions, nonce, gas_price)
+        return tx_hash
+
     def execute_multicall(self, position):
         """执行Multicall原子操作"""
-        if not self.web3 or not self.web3.is_connected():
+        if not self.is_connected():
             print("【BR】❌ Web3未连接")
             return False
             
         try:
-            position_manager = self.web3.eth.contract(
-                address=Web3.to_checksum_address(self.config['web3_config']['position_manager']),
-                abi=json.loads(self.position_manager_abi)
-            )
-            
-            wallet = Web3.to_checksum_address(self.config['web3_config']['wallet_address'])
-            token_id = position['token_id']
-            liquidity = position['liquidity']
-            deadline = int(time.time()) + 3600
-            uint128_max = int('0xffffffffffffffffffffffffffffffff', 16)
-            
-            # 兼容不同版本的web3.py库
-            def encode_function_call(contract, function_name, args):
-                """兼容encodeABI和encode_abi方法"""
-                try:
-                    # 尝试新版本的encode_abi方法
-                    return contract.encode_abi(function_name, args)
-                except AttributeError:
-                    # 回退到旧版本的encodeABI方法
-                    return contract.encodeABI(function_name, args)
-            
-            # 构建Multicall
-            calls = [
-                encode_function_call(position_manager, 'decreaseLiquidity', [(token_id, liquidity, 0, 0, deadline)]),
-                encode_function_call(position_manager, 'collect', [(token_id, wallet, uint128_max, uint128_max)]),
-                encode_function_call(position_manager, 'burn', [token_id])
-            ]
-            
             # 发送交易
-            txn = position_manager.functions.multicall(calls).build_transaction({
-                'from': wallet,
-                'nonce': self.web3.eth.get_transaction_count(wallet),
-                'gas': self.config['web3_config']['gas_limit'],
-                'gasPrice': self.web3.to_wei(self.config['web3_config']['gas_price_gwei'], 'gwei')
-            })
-            
-            signed = self.web3.eth.account.sign_transaction(txn, self.config['web3_config']['private_key'])
-            # 兼容不同版本的web3.py库中SignedTransaction对象的属性名
-            try:
-                # 尝试新版本的raw_transaction属性
-                raw_transaction = signed.raw_transaction
-            except AttributeError:
-                # 回退到旧版本的rawTransaction属性
-                raw_transaction = signed.rawTransaction
-            
-            tx_hash = self.web3.eth.send_raw_transaction(raw_transaction)
+            tx_hash = self.submit_exit(position)
             
             print(f"【BR】🚀 自动移除交易: {tx_hash.hex()}")
-            receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
-            
-            if receipt.status == 1:
-                print(f"【BR】✅ 头寸 #{token_id} 自动移除成功")
-                return True
-            else:
-                print(f"【BR】❌ 头寸 #{token_id} 自动移除失败")
-                return False
+            return self.wait_for_exit(tx_hash, position)
         except Exception as e:
             print(f'【BR】执行自动移除失败: {e}')
             return False
-    
-    def get_current_positions(self):
-        """获取当前缓存的头寸信息"""
-        return self.current_positions
+
+    def submit_batch_exits(self, positions, gas_price=None):
+        """将全部头寸合并为multicall交易连续广播，超出区块gas上限时拆分为多笔，不等待上链
+
+        Returns:
+            list: (头寸列表, tx_hash) 列表
+        """
+        gas_price = gas_price or self.get_gas_price()
+        groups = self.split_exit_batches(positions)
+
+        sent = []
+        while groups:
+            group = groups.pop(0)
+            try:
+                tx_hash = self.submit_exit(group, gas_price)
+            except Exception as e:
+                # 超出区块gas上限（本地校验或节点返回limit exceeded）时对半拆分重试
+                if len(group) > 1 and (isinstance(e, ExitGasLimitError) or _rpc_error_code(e) == LIMIT_EXCEEDED_CODE):
+                    half = len(group) // 2
+                    print(f'【BR】⚠️ 合并交易超出gas上限，拆分为 {half} + {len(group) - half} 个头寸')
+                    groups[:0] = [group[:half], group[half:]]
+                    continue
+                raise
+            print(f"【BR】🚀 合并移除交易 ({len(group)} 个头寸): {tx_hash.hex()}")
+            sent.append((group, tx_hash))
+        return sent
+
+    def execute_batch_multicall(self, positions):
+        """将全部头寸的移除合并为一笔multicall交易发送，超出区块gas上限时拆分为多笔
+
+        所有交易先连续广播，再统一等待上链，使全部头寸尽量在同一区块退出。
+
+        Returns:
+            int: 成功移除的头寸数量
+        """
+        if not self.is_connected():
+            print("【BR】❌ Web3未连接")
+            return 0
+
+        try:
+            sent = self.submit_batch_exits(positions)
+            return sum(len(group) for group, tx_hash in sent if self.wait_for_exit(tx_hash, group))
+        except Exception as e:
+            print(f'【BR】执行合并移除失败: {e}')
+            return 0
+
+    def submit_exits(self, positions):
+        """广播全部头寸的移除交易，不等待上链
+
+        预签名交易恰好覆盖这些头寸时直接广播预签名交易；其余头寸在 web3_config.batch_exit 开启时
+        合并广播，否则逐个广播（nonce由本地分配，无需等待上一笔上链）。
+
+        Returns:
+            list: (头寸列表, tx_hash) 列表，广播失败的头寸不包含在内
+        """
+        sent = []
+        remaining = positions
+        if self.armed_exit and self.armed_exit.covers(positions):
+            # 预签名模式：直接广播已签名交易，未能广播的头寸走常规流程
+            sent.extend(self.armed_exit.fire())
+            sent_ids = {pos['token_id'] for group, _ in sent for pos in group}
+            remaining = [pos for pos in positions if pos['token_id'] not in sent_ids]
+
+        if remaining and self.config['web3_config'].get('batch_exit', False):
+            try:
+                sent.extend(self.submit_batch_exits(remaining))
+            except Exception as e:
+                print(f'【BR】合并移除交易发送失败: {e}')
+        elif remaining:
+            for i, position in enumerate(remaining):
+                print(f"【BR】处理头寸 #{position['token_id']} ({i+1}/{len(remaining)})")
+                try:
+                    tx_hash = self.submit_exit(position)
+                    print(f"【BR】🚀 自动移除交易: {tx_hash.hex()}")
+                    sent.append(([position], tx_hash))
+                except Exception as e:
+                    print(f"【BR】头寸 #{position['token_id']} 移除交易发送失败: {e}")
+        return sent
+
+    def start_armed_exit(self):
+        """启动预签名退出模式，后台持续为缓存头寸维护可直接广播的移除交易"""
+        if self.armed_exit is None:
+            self.armed_exit = ArmedExit(self, self.config['web3_config'].get('armed_exit_interval', 3))
+        self.armed_exit.start()
+        return self.armed_exit
+
+    def start_gas_oracle(self):
+        """启动gas价格预言机，参数读取 web3_config.gas_oracle
+
+        下限默认为 gas_price_gwei（不高于配置的上限），上限默认为5 gwei（不低于下限）；
+        两者都配置且下限高于上限时抛出ValueError。
+        """
+        if self.gas_oracle is None:
+            oracle_config = self.config['web3_config'].get('gas_oracle', {})
+            cap_gwei = oracle_config.get('cap_gwei')
+            floor_gwei = oracle_config.get('floor_gwei')
+            if floor_gwei is None:
+                floor_gwei = self.config['web3_config']['gas_price_gwei']
+                if cap_gwei is not None:
+                    floor_gwei = min(floor_gwei, cap_gwei)
+            if cap_gwei is None:
+                cap_gwei = max(5, floor_gwei)
+            self.gas_oracle = GasOracle(
+                self,
+                sample_blocks=oracle_config.get('sample_blocks', 20),
+                percentile=oracle_config.get('percentile', 60),
+                multiplier=oracle_config.get('multiplier', 1.2),
+                floor_gwei=floor_gwei,
+                cap_gwei=cap_gwei,
+                poll_interval=oracle_config.get('poll_interval', 1),
+                max_fee_history_failures=oracle_config.get('max_fee_history_failures', 5)
+            )
+        self.gas_oracle.start()
+        return self.gas_oracle
+
+    def start_exit_simulator(self):
+        """启动移除交易预模拟，每个新区块模拟一次缓存头寸的移除交易"""
+        if self.exit_simulator is None:
+            self.exit_simulator = ExitSimulator(self, self.config['web3_config'].get('simulate_interval', 1))
+        self.exit_simulator.start()
+        return self.exit_simulator